@@ -10,6 +10,15 @@ from datetime import datetime, date
 from enum import Enum
 import json
 
+from utilities.text_normalization import get_term_matcher
+
+
+# Risk types whose keywords stop counting when negated ("not paranoid"); suicide,
+# self-harm and violence mentions are followed up even when denied
+NEGATABLE_RISK_TYPES = ["psychosis", "substance_abuse", "trauma_indicators"]
+
+FAMILY_HISTORY_KEYWORDS = {"family_history": ["depression", "anxiety", "bipolar", "schizophrenia", "suicide*"]}
+
 
 class HistorySection(Enum):
     """Types of history sections"""
@@ -66,6 +75,8 @@ class ClinicalHistoryTaking:
         self.history_templates = self._initialize_history_templates()
         self.risk_indicators = self._initialize_risk_indicators()
         self.follow_up_protocols = self._initialize_follow_up_protocols()
+        self.risk_matcher = get_term_matcher(self.risk_indicators, negatable_groups=NEGATABLE_RISK_TYPES)
+        self.family_history_matcher = get_term_matcher(FAMILY_HISTORY_KEYWORDS)
     
     def _initialize_history_templates(self) -> Dict[HistorySection, List[Dict]]:
         """Initialize structured history taking templates"""
@@ -352,31 +363,31 @@ class ClinicalHistoryTaking:
         }
     
     def _initialize_risk_indicators(self) -> Dict[str, List[str]]:
-        """Initialize risk indicator keywords and phrases"""
+        """Initialize risk indicator keywords and phrases (matched as whole words; "*" also matches longer forms)"""
         return {
             "suicide_risk": [
-                "suicide", "kill myself", "end it all", "better off dead",
+                "suicide*", "kill myself", "end it all", "better off dead",
                 "suicidal thoughts", "want to die", "no point living",
                 "hopeless", "worthless", "burden to others"
             ],
             "self_harm": [
-                "cut myself", "self-harm", "self-injury", "burning",
+                "cut myself", "self-harm*", "self-injury", "burning",
                 "scratching", "hitting myself", "self-mutilation"
             ],
             "violence_risk": [
                 "hurt someone", "kill them", "homicidal", "violence",
-                "revenge", "get back at", "make them pay", "weapon"
+                "revenge", "get back at", "make them pay", "weapon*"
             ],
             "psychosis": [
-                "hearing voices", "hallucinations", "paranoid", "conspiracy",
-                "people following me", "delusions", "not real", "visions"
+                "hearing voices", "hallucination*", "paranoid", "conspiracy",
+                "people following me", "delusion*", "not real", "visions"
             ],
             "substance_abuse": [
                 "drinking heavily", "using drugs", "can't stop", "withdrawal",
-                "need to use", "tolerance", "blackouts", "overdose"
+                "need to use", "tolerance", "blackouts", "overdose*"
             ],
             "trauma_indicators": [
-                "flashbacks", "nightmares", "can't forget", "keeps happening",
+                "flashback*", "nightmare*", "can't forget", "keeps happening",
                 "triggered", "avoidance", "hypervigilant", "jumpy"
             ]
         }
@@ -466,16 +477,8 @@ class ClinicalHistoryTaking:
         if not answer:
             return []
         
-        answer_lower = answer.lower()
-        found_indicators = []
-        
-        for risk_type, keywords in self.risk_indicators.items():
-            for keyword in keywords:
-                if keyword.lower() in answer_lower:
-                    found_indicators.append(risk_type)
-                    break
-        
-        return found_indicators
+        hits = self.risk_matcher.scan(answer)
+        return [risk_type for risk_type in self.risk_indicators if hits.count(risk_type) > 0]
     
     def _assess_clinical_significance(self, section: HistorySection, 
                                    answer: str, risk_indicators: List[str]) -> str:
@@ -490,8 +493,7 @@ class ClinicalHistoryTaking:
                 return "moderate"
         
         if section == HistorySection.FAMILY_HISTORY:
-            family_keywords = ["depression", "anxiety", "bipolar", "schizophrenia", "suicide"]
-            if any(keyword in answer.lower() for keyword in family_keywords):
+            if answer and self.family_history_matcher.scan(answer):
                 return "moderate"
         
         return "routine"
@@ -514,8 +516,9 @@ class ClinicalHistoryTaking:
         # Section-specific follow-ups
         section_questions = self.history_templates.get(section, [])
         for question_template in section_questions:
-            if any(keyword in answer.lower() for keyword in 
-                   question_template.get("risk_keywords", [])):
+            risk_keywords = question_template.get("risk_keywords", [])
+            if risk_keywords and answer and \
+                    get_term_matcher({"risk_keywords": risk_keywords}, negation_window=0).scan(answer):
                 follow_ups.extend(question_template.get("follow_ups", []))
                 break
         
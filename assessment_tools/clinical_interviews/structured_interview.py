@@ -11,6 +11,8 @@ from enum import Enum
 import json
 import re
 
+from utilities.identifiers import new_id
+
 
 class InterviewType(Enum):
     """Types of structured interviews"""
@@ -444,7 +446,7 @@ class StructuredClinicalInterview:
     def create_interview_session(self, patient_id: str, interview_type: InterviewType,
                                interviewer: str = "AI_Therapist") -> InterviewSession:
         """Create a new structured interview session"""
-        session_id = f"{patient_id}_{interview_type.value}_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+        session_id = f"{patient_id}_{interview_type.value}_{new_id()}"
         
         return InterviewSession(
             session_id=session_id,
@@ -10,6 +10,8 @@ from datetime import datetime, date
 from enum import Enum
 import json
 
+from utilities.identifiers import new_id
+
 
 class AssessmentType(Enum):
     """Types of clinical assessments"""
@@ -656,7 +658,7 @@ class AssessmentTemplateManager:
         if not template:
             return None
         
-        assessment_id = f"{patient_id}_{template_id}_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+        assessment_id = f"{patient_id}_{template_id}_{new_id()}"
         
         return AssessmentResult(
             assessment_id=assessment_id,
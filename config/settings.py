@@ -62,6 +62,12 @@ class DatabaseConfig:
     connection_timeout: int = 30
     max_connections: int = 10
     
+    # Hot/cold archival tiering, applied with utilities.archive_manager.configure_archiving()
+    archive_enabled: bool = True
+    archive_horizon_days: int = 365  # Completed sessions and data older than this move to cold storage
+    archive_location: str = "data/archive"
+    archive_compression_level: int = 6  # zlib level 1-9
+    
     # SQLite specific settings
     sqlite_settings: Dict[str, Any] = field(default_factory=lambda: {
         "journal_mode": "WAL",
@@ -392,6 +398,9 @@ class TherapySystemSettings:
         if not self.database.db_path:
             validation_errors.append("Database path is required")
         
+        if self.database.archive_enabled and self.database.archive_horizon_days < 30:
+            validation_errors.append("Archive horizon must be at least 30 days")
+        
         # Validate Gemini API settings
         if not self.gemini.api_key and self.system.environment == Environment.PRODUCTION:
             validation_errors.append("Gemini API key is required for production environment")
@@ -10,6 +10,8 @@ from datetime import datetime, timedelta
 from enum import Enum
 import json
 
+from utilities.identifiers import new_id
+
 
 class TherapyModality(Enum):
     """Therapeutic modalities"""
@@ -882,7 +884,7 @@ class TherapyProtocolManager:
         elif learning_style == 'auditory':
             adaptations.append("Use verbal processing and audio materials")
         
-        adaptation_id = f"{protocol_id}_adapted_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+        adaptation_id = f"{protocol_id}_adapted_{new_id()}"
         
         return ProtocolAdaptation(
             adaptation_id=adaptation_id,
@@ -5,17 +5,28 @@ Handles all interactions with Gemini 2.5 Pro for therapeutic conversations
 """
 
 import os
+import re
+import hashlib
+import sys
 import time
 import json
 import logging
-from typing import Dict, List, Optional, Any, Union, Tuple
-from dataclasses import dataclass, field
+import sqlite3
+import threading
+from collections import OrderedDict, deque
+from typing import Dict, List, Optional, Any, Union, Tuple, Set, AsyncIterator, Iterable
+from dataclasses import dataclass, field, asdict
 from datetime import datetime, timedelta
 from enum import Enum
 import asyncio
-import aiohttp
 from pathlib import Path
 
+from core.model_backends import ModelBackend, create_model_backend
+from utilities.data_storage import WritePipeline, WriteEvent, RowWrite, WriteOperation, get_write_pipeline
+from utilities.instrumentation import MetricsSink, TurnMetrics, create_metrics_sink
+from utilities.text_normalization import get_term_matcher
+from utilities.identifiers import new_id
+
 # Note: In a real implementation, you would use the official Google AI SDK
 # For demonstration, this shows the structure and integration patterns
 
@@ -50,6 +61,25 @@ class SafetyLevel(Enum):
     CRITICAL = "critical"
 
 
+SAFETY_LEVEL_ORDER = {
+    SafetyLevel.LOW: 0,
+    SafetyLevel.MEDIUM: 1,
+    SafetyLevel.HIGH: 2,
+    SafetyLevel.CRITICAL: 3
+}
+
+# Messages that switch the expected response to a crisis response. None of these
+# cues is dropped when negated: "never been so hopeless" is an intensifier, not a denial
+CRISIS_RESPONSE_KEYWORDS = {
+    'crisis': ['suicide*', 'kill myself', 'end it all', 'hurt myself', 'die'],
+    'hopelessness': ['hopeless*']
+}
+
+# Response screen flags that keep a generated response from the patient, checked in
+# this order. Streaming and blocking turns replace a flagged response alike
+RESPONSE_REPLACEMENT_FLAGS = ('boundary_concern', 'inadequate_crisis_response')
+
+
 @dataclass
 class ConversationContext:
     """Context for therapeutic conversation"""
@@ -62,9 +92,10 @@ class ConversationContext:
     risk_level: str = "low"
     active_goals: List[str] = field(default_factory=list)
     recent_assessments: Dict[str, Any] = field(default_factory=dict)
-    conversation_history: List[Dict[str, str]] = field(default_factory=list)
+    conversation_history: List[Any] = field(default_factory=list)  # ConversationTurn records (legacy dicts accepted)
     cultural_considerations: List[str] = field(default_factory=list)
     preferred_interventions: List[str] = field(default_factory=list)
+    rolling_summary: Optional['RollingConversationSummary'] = None
 
 
 @dataclass
@@ -78,6 +109,7 @@ class TherapeuticPrompt:
     expected_response_type: ResponseType
     max_tokens: int = 1000
     temperature: float = 0.7
+    section_tokens: Dict[str, int] = field(default_factory=dict)
 
 
 @dataclass
@@ -92,15 +124,606 @@ class AIResponse:
     follow_up_needed: bool = False
     timestamp: datetime = field(default_factory=datetime.now)
     tokens_used: int = 0
+    time_to_first_token_ms: Optional[float] = None
+    total_latency_ms: Optional[float] = None
+    replaced_mid_stream: bool = False
+    from_cache: bool = False
+    stage_timings_ms: Dict[str, float] = field(default_factory=dict)
+
+
+class StreamEventType(Enum):
+    """Events emitted by a streamed response"""
+    CHUNK = "chunk"        # Content to append to what the patient sees
+    REPLACE = "replace"    # Discard everything streamed so far and show this content instead
+    COMPLETE = "complete"  # Final AIResponse with metadata
+
+
+@dataclass
+class StreamEvent:
+    """One item yielded by stream_therapeutic_response"""
+    event_type: StreamEventType
+    content: str = ""
+    response: Optional[AIResponse] = None
+
+
+class RequestPriority(Enum):
+    """Scheduling priority for model calls"""
+    LIVE = "live"    # Patient-facing conversation
+    BATCH = "batch"  # Offline jobs that yield to live traffic
+
+
+@dataclass
+class BatchGenerationRequest:
+    """One prompt in an offline generation job"""
+    request_id: str
+    context: ConversationContext
+    user_message: str
+    mode: ConversationMode = ConversationMode.THERAPY_SESSION
+    job_type: str = "general"  # e.g. progress_note, session_summary, homework_draft
+
+
+@dataclass
+class BatchGenerationResult:
+    """Result for one batch request"""
+    request_id: str
+    prompt_key: str
+    response: AIResponse
+    from_checkpoint: bool = False
+    deduplicated: bool = False
+
+
+@dataclass
+class ResponseCacheMetrics:
+    """Effectiveness metrics for the response cache"""
+    hits: int = 0
+    misses: int = 0
+    bypassed: int = 0
+    stores: int = 0
+    evictions: int = 0
+    expirations: int = 0
+    
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+
+class ResponseCache:
+    """Opt-in cache for repetitive psychoeducation and skill-instruction turns
+    
+    Entries are keyed by a normalized (patient, mode, modality, phase, intent)
+    signature, where the intent is the message's content words in sorted order,
+    so "Can you explain grounding?" and "explain grounding please" share an
+    entry. The prompt carries the patient's history, summary, goals and mood,
+    so replies are never shared between patients. The interface only consults
+    the cache for low-risk turns.
+    """
+    
+    CACHEABLE_MODES = (ConversationMode.PSYCHOEDUCATION, ConversationMode.SKILL_BUILDING)
+    STOPWORDS = frozenset([
+        'a', 'an', 'the', 'and', 'or', 'to', 'of', 'for', 'on', 'in', 'me', 'my', 'i',
+        'you', 'your', 'can', 'could', 'would', 'will', 'please', 'about', 'how', 'what',
+        'is', 'it', 'do', 'does', 'with', 'some', 'something', 'that', 'this', 'again',
+        'tell', 'show', 'help', 'want', 'like', 'just', 'more', 'be', 'are'
+    ])
+    
+    def __init__(self, max_entries: int = 500, ttl_seconds: float = 24 * 3600):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: 'OrderedDict[Tuple[str, str, str, str, str], Tuple[AIResponse, float]]' = OrderedDict()
+        self.metrics = ResponseCacheMetrics()
+    
+    def signature(self, mode: ConversationMode, context: ConversationContext,
+                  user_message: str) -> Tuple[str, str, str, str, str]:
+        """Normalized cache key for a turn"""
+        
+        words = re.findall(r"[a-z0-9]+(?:-[a-z0-9]+)*", user_message.lower())
+        intent = ' '.join(sorted({word for word in words if word not in self.STOPWORDS}))
+        return (
+            context.patient_id,
+            mode.value,
+            context.therapy_modality.strip().lower(),
+            context.treatment_phase.strip().lower(),
+            intent
+        )
+    
+    def get(self, key: Tuple[str, str, str, str, str]) -> Optional[AIResponse]:
+        """Fresh copy of a cached response, or None"""
+        
+        entry = self._entries.get(key)
+        if entry is None:
+            self.metrics.misses += 1
+            return None
+        
+        response, stored_at = entry
+        if time.time() - stored_at > self.ttl_seconds:
+            del self._entries[key]
+            self.metrics.expirations += 1
+            self.metrics.misses += 1
+            return None
+        
+        self._entries.move_to_end(key)
+        self.metrics.hits += 1
+        return AIResponse(
+            content=response.content,
+            response_type=response.response_type,
+            confidence_score=response.confidence_score,
+            safety_flags=list(response.safety_flags),
+            suggested_interventions=list(response.suggested_interventions),
+            risk_indicators=list(response.risk_indicators),
+            follow_up_needed=response.follow_up_needed,
+            tokens_used=0,
+            from_cache=True
+        )
+    
+    def put(self, key: Tuple[str, str, str, str, str], response: AIResponse):
+        """Cache a clean response, evicting least-recently-used entries"""
+        
+        self._entries[key] = (response, time.time())
+        self._entries.move_to_end(key)
+        self.metrics.stores += 1
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.metrics.evictions += 1
+    
+    def record_bypass(self):
+        self.metrics.bypassed += 1
+    
+    def clear(self):
+        self._entries.clear()
+    
+    def get_metrics(self) -> Dict[str, Any]:
+        metrics = asdict(self.metrics)
+        metrics['entries'] = len(self._entries)
+        metrics['hit_rate'] = self.metrics.hit_rate
+        return metrics
+
+
+class ConversationTurn:
+    """Compact record of one conversation turn
+    
+    Slotted with an interned role and an epoch timestamp; supports the
+    ``turn['content']`` / ``turn.get('role')`` access used for dict histories.
+    """
+    
+    __slots__ = ('role', 'content', 'timestamp')
+    
+    def __init__(self, role: str, content: str, timestamp: Optional[float] = None):
+        self.role = sys.intern(role)
+        self.content = content
+        self.timestamp = timestamp if timestamp is not None else time.time()
+    
+    @classmethod
+    def from_value(cls, value: Union['ConversationTurn', Dict[str, Any]]) -> 'ConversationTurn':
+        """Accept either a turn or a legacy history dict"""
+        if isinstance(value, ConversationTurn):
+            return value
+        
+        timestamp = value.get('timestamp')
+        if isinstance(timestamp, str):
+            try:
+                timestamp = datetime.fromisoformat(timestamp).timestamp()
+            except ValueError:
+                timestamp = None
+        return cls(value.get('role', 'unknown'), value.get('content', ''), timestamp)
+    
+    def __getitem__(self, key: str) -> Any:
+        if key == 'timestamp':
+            return datetime.fromtimestamp(self.timestamp).isoformat()
+        if key in ('role', 'content'):
+            return getattr(self, key)
+        raise KeyError(key)
+    
+    def get(self, key: str, default: Any = None) -> Any:
+        try:
+            return self[key]
+        except KeyError:
+            return default
+    
+    def to_dict(self) -> Dict[str, Any]:
+        return {'role': self.role, 'content': self.content, 'timestamp': self['timestamp']}
+    
+    def approximate_size(self) -> int:
+        """Approximate bytes held by this turn (the interned role is shared)"""
+        return ConversationMemoryStore.TURN_OVERHEAD_BYTES + sys.getsizeof(self.content)
+    
+    def __repr__(self) -> str:
+        return f"ConversationTurn(role={self.role!r}, content={self.content[:40]!r})"
+
+
+class RollingConversationSummary:
+    """Incremental session summary that absorbs turns as they leave the window
+    
+    Theme, risk and observation tallies are updated once per turn, so summaries
+    and insights never rescan the history. Turns that age out of the prompt
+    window are folded into short gists; when the gists exceed the token budget
+    the oldest are dropped and survive only through the session-wide tallies.
+    """
+    
+    # Matched on whole words; a trailing * also matches longer forms
+    THEME_KEYWORDS = {
+        'anxiety management': ['anxiety'],
+        'depression symptoms': ['depression'],
+        'stress coping': ['stress*'],
+        'relationship issues': ['relationship*']
+    }
+    OBSERVATION_KEYWORDS = {
+        'anxiety': ['anxious', 'worried'],
+        'depressive': ['sad', 'depressed'],
+        'improvement': ['better', 'improved']
+    }
+    RISK_KEYWORDS = ['suicid*', 'hurt*', 'hopeless*', 'worthless*', 'die', 'died', 'dies', 'dying']
+    GIST_WORDS = 24
+    
+    def __init__(self, token_budget: int = 300):
+        self.token_budget = token_budget
+        self.user_turns = 0
+        self.assistant_turns = 0
+        self.folded_turns = 0
+        self.risk_mentions = 0
+        self.theme_counts: Dict[str, int] = {}
+        self.observation_counts: Dict[str, int] = {}
+        self.gists: deque = deque()
+        self.gist_tokens = 0
+        self.dropped_gists = 0
+    
+    def observe(self, turn: 'ConversationTurn'):
+        """Update the tallies with a new turn"""
+        
+        if turn.role != 'user':
+            self.assistant_turns += 1
+            return
+        
+        self.user_turns += 1
+        hits = self._term_matcher().scan(turn.content)
+        for theme in self.THEME_KEYWORDS:
+            if hits.count(('theme', theme)):
+                self.theme_counts[theme] = self.theme_counts.get(theme, 0) + 1
+        for observation in self.OBSERVATION_KEYWORDS:
+            if hits.count(('observation', observation)):
+                self.observation_counts[observation] = self.observation_counts.get(observation, 0) + 1
+        if hits.count('risk'):
+            self.risk_mentions += 1
+    
+    @classmethod
+    def _term_matcher(cls):
+        """One matcher over the theme, observation and risk vocabularies"""
+        
+        groups = {('theme', theme): keywords for theme, keywords in cls.THEME_KEYWORDS.items()}
+        groups.update({('observation', name): keywords for name, keywords in cls.OBSERVATION_KEYWORDS.items()})
+        groups['risk'] = cls.RISK_KEYWORDS
+        return get_term_matcher(groups, negatable_groups=[])
+    
+    def fold(self, turn: 'ConversationTurn'):
+        """Absorb a turn leaving the history window into the rolling gists"""
+        
+        self.folded_turns += 1
+        words = turn.content.split()
+        gist = ' '.join(words[:self.GIST_WORDS]) + (' ...' if len(words) > self.GIST_WORDS else '')
+        gist = f"{turn.role.upper()}: {gist}"
+        tokens = len(gist.split())
+        self.gists.append((gist, tokens))
+        self.gist_tokens += tokens
+        
+        # Keep the overview line within budget too
+        while self.gists and self.gist_tokens > self.token_budget - self.GIST_WORDS:
+            _, dropped_tokens = self.gists.popleft()
+            self.gist_tokens -= dropped_tokens
+            self.dropped_gists += 1
+    
+    @property
+    def total_turns(self) -> int:
+        return self.user_turns + self.assistant_turns
+    
+    @property
+    def themes(self) -> List[str]:
+        return [theme for theme in self.THEME_KEYWORDS if self.theme_counts.get(theme)]
+    
+    def format_for_prompt(self) -> str:
+        """Long-range context for turns no longer in the history window"""
+        
+        if not self.folded_turns:
+            return ""
+        
+        overview = (
+            f"Earlier in this session ({self.folded_turns} turns summarised): "
+            f"themes: {', '.join(self.themes) or 'general support'}; "
+            f"risk mentions: {self.risk_mentions}"
+        )
+        lines = [overview]
+        if self.dropped_gists:
+            lines.append(f"({self.dropped_gists} earlier turns condensed into the overview above)")
+        lines.extend(gist for gist, _ in self.gists)
+        return '\n'.join(lines)
+    
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'token_budget': self.token_budget,
+            'user_turns': self.user_turns,
+            'assistant_turns': self.assistant_turns,
+            'folded_turns': self.folded_turns,
+            'risk_mentions': self.risk_mentions,
+            'theme_counts': self.theme_counts,
+            'observation_counts': self.observation_counts,
+            'gists': [gist for gist, _ in self.gists],
+            'dropped_gists': self.dropped_gists
+        }
+    
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'RollingConversationSummary':
+        summary = cls(token_budget=data.get('token_budget', 300))
+        for name in ('user_turns', 'assistant_turns', 'folded_turns', 'risk_mentions', 'dropped_gists'):
+            setattr(summary, name, data.get(name, 0))
+        summary.theme_counts = dict(data.get('theme_counts', {}))
+        summary.observation_counts = dict(data.get('observation_counts', {}))
+        for gist in data.get('gists', []):
+            tokens = len(gist.split())
+            summary.gists.append((gist, tokens))
+            summary.gist_tokens += tokens
+        return summary
+    
+    def approximate_size(self) -> int:
+        return 512 + sum(sys.getsizeof(gist) for gist, _ in self.gists)
+
+
+class SessionConversation:
+    """History window plus rolling summary held for one session"""
+    
+    __slots__ = ('turns', 'summary')
+    
+    def __init__(self, turns: List['ConversationTurn'], summary: Optional[RollingConversationSummary] = None):
+        self.turns = turns
+        self.summary = summary
+    
+    def approximate_size(self) -> int:
+        size = sum(turn.approximate_size() for turn in self.turns)
+        if self.summary is not None:
+            size += self.summary.approximate_size()
+        return size
+
+
+@dataclass
+class ConversationMemoryMetrics:
+    """Size and effectiveness metrics for the conversation store"""
+    sessions: int = 0
+    bytes_used: int = 0
+    max_bytes: int = 0
+    hits: int = 0
+    misses: int = 0
+    spill_hits: int = 0
+    lru_evictions: int = 0
+    ttl_evictions: int = 0
+    spilled_sessions: int = 0
+    
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+
+class ConversationMemoryStore:
+    """Bounded per-session conversation store with LRU + TTL eviction
+    
+    Sessions are evicted least-recently-used first once either the session
+    count or the byte ceiling is exceeded. If a spill database is configured,
+    sessions evicted for space are written to SQLite and promoted back on the
+    next lookup; sessions idle beyond the TTL are dropped everywhere.
+    """
+    
+    TURN_OVERHEAD_BYTES = 72  # slotted object with three references
+    
+    def __init__(self, max_sessions: int = 1000, ttl_seconds: float = 4 * 3600,
+                 max_bytes: int = 64 * 1024 * 1024, spill_db_path: Optional[str] = None):
+        self.max_sessions = max_sessions
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self.spill_db_path = spill_db_path
+        
+        # session_key -> (conversation, last_access, bytes)
+        self._sessions: 'OrderedDict[str, Tuple[SessionConversation, float, int]]' = OrderedDict()
+        self._bytes_used = 0
+        self._lock = threading.Lock()
+        self.metrics = ConversationMemoryMetrics(max_bytes=max_bytes)
+        self.logger = logging.getLogger(__name__)
+        
+        if self.spill_db_path:
+            self._init_spill_database()
+    
+    def _init_spill_database(self):
+        """Create the spill table for evicted-but-active sessions"""
+        Path(self.spill_db_path).parent.mkdir(parents=True, exist_ok=True)
+        with sqlite3.connect(self.spill_db_path) as conn:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS conversation_spill (
+                    session_key TEXT PRIMARY KEY,
+                    turns TEXT NOT NULL,
+                    last_access REAL NOT NULL
+                )
+            ''')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_conversation_spill_access ON conversation_spill(last_access)')
+            conn.commit()
+    
+    def get(self, session_key: str) -> Optional[SessionConversation]:
+        """Return the session's conversation, refreshing its recency, or None"""
+        
+        now = time.time()
+        with self._lock:
+            entry = self._sessions.get(session_key)
+            if entry is not None:
+                conversation, last_access, size = entry
+                if now - last_access > self.ttl_seconds:
+                    self._drop(session_key)
+                    self.metrics.ttl_evictions += 1
+                else:
+                    self._sessions[session_key] = (conversation, now, size)
+                    self._sessions.move_to_end(session_key)
+                    self.metrics.hits += 1
+                    return conversation
+        
+        conversation = self._load_spilled(session_key, now)
+        if conversation is not None:
+            self.put(session_key, conversation)
+            with self._lock:
+                self.metrics.hits += 1
+                self.metrics.spill_hits += 1
+            return conversation
+        
+        with self._lock:
+            self.metrics.misses += 1
+        return None
+    
+    def put(self, session_key: str, conversation: SessionConversation):
+        """Store or replace a session's conversation and enforce the bounds"""
+        
+        size = conversation.approximate_size()
+        spill: List[Tuple[str, SessionConversation, float]] = []
+        
+        with self._lock:
+            self._drop(session_key)
+            self._sessions[session_key] = (conversation, time.time(), size)
+            self._bytes_used += size
+            spill = self._enforce_bounds(protect=session_key)
+        
+        self._spill(spill)
+    
+    def discard(self, session_key: str):
+        """Forget a session that has ended"""
+        
+        with self._lock:
+            self._drop(session_key)
+        
+        if self.spill_db_path:
+            try:
+                with sqlite3.connect(self.spill_db_path) as conn:
+                    conn.execute('DELETE FROM conversation_spill WHERE session_key = ?', (session_key,))
+                    conn.commit()
+            except Exception as e:
+                self.logger.error(f"Error discarding spilled conversation: {e}")
+    
+    def purge_expired(self) -> int:
+        """Drop sessions idle beyond the TTL, in memory and in the spill table"""
+        
+        cutoff = time.time() - self.ttl_seconds
+        with self._lock:
+            expired = [key for key, (_, last_access, _) in self._sessions.items() if last_access < cutoff]
+            for key in expired:
+                self._drop(key)
+            self.metrics.ttl_evictions += len(expired)
+        
+        if self.spill_db_path:
+            try:
+                with sqlite3.connect(self.spill_db_path) as conn:
+                    cursor = conn.execute('DELETE FROM conversation_spill WHERE last_access < ?', (cutoff,))
+                    conn.commit()
+                    with self._lock:
+                        self.metrics.ttl_evictions += cursor.rowcount
+            except Exception as e:
+                self.logger.error(f"Error purging spilled conversations: {e}")
+        
+        return len(expired)
+    
+    def get_metrics(self) -> Dict[str, Any]:
+        """Current size, hit rate and eviction counts"""
+        
+        with self._lock:
+            self.metrics.sessions = len(self._sessions)
+            self.metrics.bytes_used = self._bytes_used
+            metrics = asdict(self.metrics)
+            metrics['hit_rate'] = self.metrics.hit_rate
+        return metrics
+    
+    def __contains__(self, session_key: str) -> bool:
+        with self._lock:
+            return session_key in self._sessions
+    
+    def __len__(self) -> int:
+        return len(self._sessions)
+    
+    def _drop(self, session_key: str):
+        """Remove a session from memory (caller holds the lock)"""
+        entry = self._sessions.pop(session_key, None)
+        if entry is not None:
+            self._bytes_used -= entry[2]
+    
+    def _enforce_bounds(self, protect: str) -> List[Tuple[str, SessionConversation, float]]:
+        """Evict LRU sessions until within bounds (caller holds the lock)"""
+        
+        now = time.time()
+        evicted = []
+        while self._sessions and (len(self._sessions) > self.max_sessions
+                                  or self._bytes_used > self.max_bytes):
+            session_key, (conversation, last_access, size) = next(iter(self._sessions.items()))
+            if session_key == protect:
+                break
+            self._drop(session_key)
+            if now - last_access > self.ttl_seconds:
+                self.metrics.ttl_evictions += 1
+            else:
+                self.metrics.lru_evictions += 1
+                evicted.append((session_key, conversation, last_access))
+        return evicted
+    
+    def _spill(self, evicted: List[Tuple[str, SessionConversation, float]]):
+        """Write sessions evicted for space to the spill database"""
+        
+        if not evicted or not self.spill_db_path:
+            return
+        
+        try:
+            rows = [
+                (key, json.dumps({
+                    'turns': [[t.role, t.content, t.timestamp] for t in conversation.turns],
+                    'summary': conversation.summary.to_dict() if conversation.summary else None
+                }), last_access)
+                for key, conversation, last_access in evicted
+            ]
+            with sqlite3.connect(self.spill_db_path) as conn:
+                conn.executemany('''
+                    INSERT OR REPLACE INTO conversation_spill (session_key, turns, last_access)
+                    VALUES (?, ?, ?)
+                ''', rows)
+                conn.commit()
+            with self._lock:
+                self.metrics.spilled_sessions += len(rows)
+        except Exception as e:
+            self.logger.error(f"Error spilling conversations: {e}")
+    
+    def _load_spilled(self, session_key: str, now: float) -> Optional[SessionConversation]:
+        """Promote a spilled session back into memory"""
+        
+        if not self.spill_db_path:
+            return None
+        
+        try:
+            with sqlite3.connect(self.spill_db_path) as conn:
+                row = conn.execute(
+                    'SELECT turns, last_access FROM conversation_spill WHERE session_key = ?',
+                    (session_key,)
+                ).fetchone()
+                if not row:
+                    return None
+                conn.execute('DELETE FROM conversation_spill WHERE session_key = ?', (session_key,))
+                conn.commit()
+            
+            if now - row[1] > self.ttl_seconds:
+                with self._lock:
+                    self.metrics.ttl_evictions += 1
+                return None
+            data = json.loads(row[0])
+            turns = [ConversationTurn(role, content, timestamp) for role, content, timestamp in data['turns']]
+            summary = RollingConversationSummary.from_dict(data['summary']) if data.get('summary') else None
+            return SessionConversation(turns, summary)
+        except Exception as e:
+            self.logger.error(f"Error loading spilled conversation: {e}")
+            return None
 
 
 class GeminiTherapyInterface:
     """Professional AI interface for therapy sessions"""
     
-    def __init__(self, api_key: Optional[str] = None, config: Optional[Dict[str, Any]] = None):
+    def __init__(self, api_key: Optional[str] = None, config: Optional[Dict[str, Any]] = None,
+                 write_pipeline: Optional[WritePipeline] = None):
         self.api_key = api_key or os.getenv("GEMINI_API_KEY")
-        if not self.api_key:
-            raise ValueError("Gemini API key is required")
         
         # Configuration
         self.config = config or {}
@@ -115,16 +738,55 @@ class GeminiTherapyInterface:
         self.therapy_guidelines = self._initialize_therapy_guidelines()
         self.prompt_templates = self._initialize_prompt_templates()
         
+        # Model transport; only the real http backend needs an API key
+        self.backend: ModelBackend = create_model_backend(
+            self.config, api_key=self.api_key,
+            responder=lambda payload, prompt: self._generate_simulated_response(prompt)
+        )
+        
         # Conversation management
-        self.conversation_memory: Dict[str, List[Dict[str, Any]]] = {}
+        self.max_history_turns = self.config.get("max_history_turns", 20)  # 10 exchanges
+        self.summary_token_budget = self.config.get("summary_token_budget", 300)
+        self.conversation_memory = ConversationMemoryStore(
+            max_sessions=self.config.get("memory_max_sessions", 1000),
+            ttl_seconds=self.config.get("memory_ttl_seconds", 4 * 3600),
+            max_bytes=self.config.get("memory_max_bytes", 64 * 1024 * 1024),
+            spill_db_path=self.config.get("memory_spill_db_path")
+        )
         self.safety_monitor = TherapySafetyMonitor()
         
         # Logging
         self.logger = logging.getLogger(__name__)
         
+        # Per-turn latency and token instrumentation
+        self.metrics_sink: MetricsSink = create_metrics_sink(self.config)
+        
+        # Optional transcript persistence through the shared write pipeline
+        self.write_pipeline = write_pipeline
+        if self.write_pipeline is None and self.config.get("conversation_db_path"):
+            self.write_pipeline = get_write_pipeline(self.config["conversation_db_path"])
+        self._persistence_tasks: set = set()
+        if self.write_pipeline is not None:
+            self._init_turn_table()
+        
         # Rate limiting
         self.last_request_time = 0
         self.min_request_interval = 1.0  # seconds
+        self.batch_request_interval = self.config.get("batch_request_interval", self.min_request_interval)
+        self.live_requests_waiting = 0
+        
+        # Opt-in cache for repetitive psychoeducation / skill-building turns
+        self.response_cache: Optional[ResponseCache] = None
+        if self.config.get("response_cache_enabled", False):
+            self.response_cache = ResponseCache(
+                max_entries=self.config.get("response_cache_max_entries", 500),
+                ttl_seconds=self.config.get("response_cache_ttl_seconds", 24 * 3600)
+            )
+        
+        # Streaming latency samples (milliseconds), most recent last
+        self.ttft_samples: List[float] = []
+        self.max_latency_samples = 1000
+        self.streams_replaced = 0
     
     def _initialize_safety_settings(self) -> Dict[str, str]:
         """Initialize safety settings for therapeutic context"""
@@ -320,13 +982,23 @@ class GeminiTherapyInterface:
             'treatment_phase': context.treatment_phase,
             'session_number': context.session_number,
             'patient_context': self._format_patient_context(context),
-            'risk_level': context.risk_level
+            'risk_level': context.risk_level,
+            # Mode-specific placeholders (previously unfilled, which made these modes fail)
+            'education_topic': user_message,
+            'skill_type': ', '.join(context.preferred_interventions) or 'as requested by patient',
+            'difficulty_level': 'adapted to patient',
+            'assessment_type': 'ongoing clinical assessment',
+            'crisis_details': user_message
         }
         
         system_prompt = template.format(**context_vars)
         
-        # Add conversation history
+        # Add conversation history, preceded by the rolling summary of older turns
         history_prompt = self._format_conversation_history(context.conversation_history)
+        if context.rolling_summary is not None:
+            earlier_context = context.rolling_summary.format_for_prompt()
+            if earlier_context:
+                history_prompt = f"{earlier_context}\n{history_prompt}"
         
         # Create context prompt
         context_prompt = f"""
@@ -359,6 +1031,17 @@ class GeminiTherapyInterface:
         If ANY safety concerns arise, prioritize safety response over other therapeutic goals.
         """
         
+        # Token counts by section, for instrumentation
+        history_tokens = len(history_prompt.split())
+        message_tokens = len(user_message.split())
+        section_tokens = {
+            'system': len(system_prompt.split()),
+            'session_context': len(context_prompt.split()) - history_tokens - message_tokens,
+            'history': history_tokens,
+            'user_message': message_tokens,
+            'safety_instructions': len(safety_instructions.split())
+        }
+        
         return TherapeuticPrompt(
             system_prompt=system_prompt,
             context_prompt=context_prompt,
@@ -367,7 +1050,8 @@ class GeminiTherapyInterface:
             safety_instructions=safety_instructions,
             expected_response_type=self._determine_response_type(mode, user_message),
             max_tokens=self.max_tokens,
-            temperature=self.temperature
+            temperature=self.temperature,
+            section_tokens=section_tokens
         )
     
     def _format_patient_context(self, context: ConversationContext) -> str:
@@ -390,7 +1074,7 @@ class GeminiTherapyInterface:
         
         return '\n'.join(context_parts) if context_parts else "No specific context provided"
     
-    def _format_conversation_history(self, history: List[Dict[str, str]]) -> str:
+    def _format_conversation_history(self, history: List[Any]) -> str:
         """Format conversation history for context"""
         if not history:
             return "No previous conversation in this session."
@@ -410,8 +1094,7 @@ class GeminiTherapyInterface:
         """Determine expected response type based on mode and message"""
         
         # Check for crisis indicators
-        crisis_keywords = ['suicide', 'kill myself', 'end it all', 'hurt myself', 'die', 'hopeless']
-        if any(keyword in user_message.lower() for keyword in crisis_keywords):
+        if get_term_matcher(CRISIS_RESPONSE_KEYWORDS, negatable_groups=[]).scan(user_message):
             return ResponseType.CRISIS_RESPONSE
         
         # Mode-based response types
@@ -428,51 +1111,604 @@ class GeminiTherapyInterface:
     async def generate_therapeutic_response(self, context: ConversationContext,
                                           user_message: str, 
                                           mode: ConversationMode = ConversationMode.THERAPY_SESSION) -> AIResponse:
-        """Generate therapeutic response using Gemini AI"""
+        """Generate therapeutic response using Gemini AI
         
-        try:
-            # Rate limiting
-            await self._enforce_rate_limit()
+        The turn runs as a short pipeline:
             
-            # Create therapeutic prompt
-            prompt = self.create_therapeutic_prompt(context, user_message, mode)
+            pre-screen ──┬─> persist user turn (background)
+                         └─> cache lookup (cacheable modes only)
+            prompt build ──> rate limit ──> model call ──> post-process ──> post-screen ──> history
+        
+        Pre-screening and prompt construction take microseconds, so they run
+        inline; a CRITICAL pre-screen returns the crisis response before any
+        model call is made. Persistence never blocks the model call. Per-stage
+        timings are recorded on the response.
+        """
+        
+        timings: Dict[str, float] = {}
+        started = time.perf_counter()
+        
+        try:
+            safety_check = self._timed_call(timings, 'prescreen', self.safety_monitor.screen_message, user_message)
+            self._persist_turn_async(context, 'user', user_message, safety_check.risk_level)
             
-            # Safety pre-screening
-            safety_check = self.safety_monitor.screen_message(user_message)
             if safety_check.risk_level == SafetyLevel.CRITICAL:
-                return self._create_crisis_response(user_message, safety_check)
+                crisis_response = self._create_crisis_response(user_message, safety_check)
+                self._persist_turn_async(context, 'assistant', crisis_response.content, safety_check.risk_level)
+                return self._finish_turn(crisis_response, timings, started, context, mode)
             
-            # Generate AI response
-            ai_response = await self._call_gemini_api(prompt)
+            prompt = self._timed_call(timings, 'prompt_build', self.create_therapeutic_prompt,
+                                      context, user_message, mode)
+            
+            # Cached psychoeducation / skill content skips the model call
+            cache_key = self._response_cache_key(context, user_message, mode, safety_check)
+            if cache_key is not None:
+                cached_response = self.response_cache.get(cache_key)
+                if cached_response is not None:
+                    self._update_conversation_history(context, user_message, cached_response.content)
+                    self._persist_turn_async(context, 'assistant', cached_response.content, safety_check.risk_level)
+                    return self._finish_turn(cached_response, timings, started, context, mode, prompt)
+            
+            ai_response = await self._model_stage(timings, prompt)
             
             # Post-process response
+            stage_start = time.perf_counter()
             processed_response = self._process_ai_response(ai_response, prompt, context)
+            timings['post_process'] = (time.perf_counter() - stage_start) * 1000
+            
+            # Safety post-screening
+            stage_start = time.perf_counter()
+            response_safety = self.safety_monitor.screen_response(processed_response.content)
+            replacement_reason = self._replacement_reason(response_safety.flags)
+            if replacement_reason:
+                processed_response = self._create_screened_replacement(replacement_reason, user_message, safety_check)
+            else:
+                processed_response.safety_flags.extend(response_safety.flags)
+            timings['post_screen'] = (time.perf_counter() - stage_start) * 1000
             
             # Update conversation history
+            stage_start = time.perf_counter()
             self._update_conversation_history(context, user_message, processed_response.content)
+            timings['history_update'] = (time.perf_counter() - stage_start) * 1000
             
-            # Safety post-screening
+            self._persist_turn_async(context, 'assistant', processed_response.content, safety_check.risk_level)
+            self._store_cached_response(cache_key, processed_response)
+            return self._finish_turn(processed_response, timings, started, context, mode, prompt)
+            
+        except Exception as e:
+            self.logger.error(f"Error generating therapeutic response: {e}")
+            return self._finish_turn(self._create_error_response(str(e)), timings, started, context, mode)
+    
+    async def _timed_stage(self, timings: Dict[str, float], stage: str, awaitable) -> Any:
+        """Await a pipeline stage and record its wall time"""
+        
+        stage_start = time.perf_counter()
+        try:
+            return await awaitable
+        finally:
+            timings[stage] = (time.perf_counter() - stage_start) * 1000
+    
+    def _timed_call(self, timings: Dict[str, float], stage: str, func, *args) -> Any:
+        """Run a synchronous pipeline stage inline and record its wall time"""
+        
+        stage_start = time.perf_counter()
+        try:
+            return func(*args)
+        finally:
+            timings[stage] = (time.perf_counter() - stage_start) * 1000
+    
+    async def _model_stage(self, timings: Dict[str, float], prompt: TherapeuticPrompt) -> Dict[str, Any]:
+        """Rate limit -> model call; cancellable at any await"""
+        
+        await self._timed_stage(timings, 'rate_limit', self._enforce_rate_limit())
+        return await self._timed_stage(timings, 'model_call', self._call_gemini_api(prompt))
+    
+    def _finish_turn(self, response: AIResponse, timings: Dict[str, float], started: float,
+                     context: ConversationContext, mode: ConversationMode,
+                     prompt: Optional[TherapeuticPrompt] = None) -> AIResponse:
+        """Attach stage timings and total latency to the turn's response and report them"""
+        
+        timings['total'] = (time.perf_counter() - started) * 1000
+        response.stage_timings_ms = timings
+        response.total_latency_ms = timings['total']
+        self._emit_turn_metrics(response, context, mode, prompt)
+        return response
+    
+    def _emit_turn_metrics(self, response: AIResponse, context: ConversationContext,
+                           mode: ConversationMode, prompt: Optional[TherapeuticPrompt] = None,
+                           streamed: bool = False):
+        """Report a completed turn to the metrics sink"""
+        
+        try:
+            tokens_by_section = dict(prompt.section_tokens) if prompt else {}
+            tokens_by_section['completion'] = len(response.content.split())
+            
+            self.metrics_sink.record_turn(TurnMetrics(
+                mode=mode.value,
+                modality=context.therapy_modality,
+                response_type=response.response_type.value,
+                stage_timings_ms=dict(response.stage_timings_ms),
+                tokens_by_section=tokens_by_section,
+                tokens_used=response.tokens_used,
+                from_cache=response.from_cache,
+                streamed=streamed,
+                time_to_first_token_ms=response.time_to_first_token_ms if streamed else None,
+                safety_flags=list(response.safety_flags)
+            ))
+        except Exception as e:
+            self.logger.error(f"Error recording turn metrics: {e}")
+    
+    def get_prometheus_metrics(self) -> str:
+        """Prometheus text exposition of the in-memory registry, if one is configured"""
+        
+        sinks = getattr(self.metrics_sink, 'sinks', [self.metrics_sink])
+        for sink in sinks:
+            if hasattr(sink, 'export_prometheus'):
+                return sink.export_prometheus()
+        return ""
+    
+    def _init_turn_table(self):
+        """Create the transcript table written by the persistence stage"""
+        
+        try:
+            with sqlite3.connect(self.write_pipeline.db_path) as conn:
+                conn.execute('''
+                    CREATE TABLE IF NOT EXISTS conversation_turns (
+                        turn_id TEXT PRIMARY KEY,
+                        patient_id TEXT NOT NULL,
+                        session_id TEXT NOT NULL,
+                        role TEXT NOT NULL,
+                        content TEXT NOT NULL,
+                        risk_level TEXT,
+                        created_date TEXT NOT NULL
+                    )
+                ''')
+                conn.execute('''
+                    CREATE INDEX IF NOT EXISTS idx_conversation_turns_session
+                    ON conversation_turns(patient_id, session_id, created_date)
+                ''')
+                conn.commit()
+        except Exception as e:
+            self.logger.error(f"Error creating conversation turn table: {e}")
+    
+    def _persist_turn_async(self, context: ConversationContext, role: str,
+                            content: str, risk_level: SafetyLevel):
+        """Queue a transcript write without blocking the turn"""
+        
+        if self.write_pipeline is None:
+            return
+        
+        now = datetime.now()
+        event = WriteEvent(
+            event_type=f"conversation_{role}_turn",
+            patient_id=context.patient_id,
+            source="gemini_interface",
+            durable=SAFETY_LEVEL_ORDER[risk_level] >= SAFETY_LEVEL_ORDER[SafetyLevel.HIGH],
+            writes=[RowWrite(WriteOperation.INSERT, "conversation_turns", values={
+                "turn_id": new_id("TURN"),
+                "patient_id": context.patient_id,
+                "session_id": context.session_id,
+                "role": role,
+                "content": content,
+                "risk_level": risk_level.value,
+                "created_date": now.isoformat()
+            })]
+        )
+        
+        task = asyncio.ensure_future(self.write_pipeline.write_async(event))
+        self._persistence_tasks.add(task)
+        task.add_done_callback(self._on_persisted)
+    
+    def _on_persisted(self, task: 'asyncio.Future'):
+        self._persistence_tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            self.logger.error(f"Error persisting conversation turn: {task.exception()}")
+    
+    async def flush_persistence(self):
+        """Wait for queued transcript writes to commit"""
+        if self._persistence_tasks:
+            await asyncio.gather(*list(self._persistence_tasks), return_exceptions=True)
+    
+    def _response_cache_key(self, context: ConversationContext, user_message: str,
+                            mode: ConversationMode, safety_check: 'SafetyScreeningResult'
+                            ) -> Optional[Tuple[str, str, str, str, str]]:
+        """Cache signature for the turn, or None if it must not be cached"""
+        
+        if self.response_cache is None or mode not in ResponseCache.CACHEABLE_MODES:
+            return None
+        
+        # Never serve or store cached content for anything the monitor flags
+        if (safety_check.risk_level != SafetyLevel.LOW or safety_check.flags
+                or context.risk_level.lower() != 'low'):
+            self.response_cache.record_bypass()
+            return None
+        
+        return self.response_cache.signature(mode, context, user_message)
+    
+    def _store_cached_response(self, cache_key: Optional[Tuple[str, str, str, str, str]], response: AIResponse):
+        """Cache a generated response only if it came back clean"""
+        
+        if cache_key is None or response.safety_flags or response.risk_indicators:
+            return
+        self.response_cache.put(cache_key, response)
+    
+    def get_response_cache_metrics(self) -> Dict[str, Any]:
+        """Hit rate and size of the response cache (empty if disabled)"""
+        return self.response_cache.get_metrics() if self.response_cache else {}
+    
+    async def stream_therapeutic_response(self, context: ConversationContext,
+                                          user_message: str,
+                                          mode: ConversationMode = ConversationMode.THERAPY_SESSION
+                                          ) -> AsyncIterator[StreamEvent]:
+        """Stream a therapeutic response chunk by chunk
+        
+        Each chunk is screened before it is released. A short tail of the buffer is
+        held back so a flagged phrase split across chunks is caught before any of it
+        reaches the patient. The screen applies screen_response's rules, so a stream
+        ends with the same text a blocking turn would return: a boundary concern
+        cancels the model stream at once, crisis content is held back until the
+        support terms follow, and either way a REPLACE event carries the same vetted
+        replacement a blocking turn uses. The last event is always COMPLETE with the
+        final AIResponse. The user turn and whatever the patient was finally shown
+        are persisted exactly as generate_therapeutic_response persists them.
+        """
+        
+        started = time.perf_counter()
+        first_chunk_at: Optional[float] = None
+        
+        try:
+            # Safety pre-screening: crisis messages never reach the model
+            safety_check = self.safety_monitor.screen_message(user_message)
+            self._persist_turn_async(context, 'user', user_message, safety_check.risk_level)
+            if safety_check.risk_level == SafetyLevel.CRITICAL:
+                crisis_response = self._create_crisis_response(user_message, safety_check)
+                self._persist_turn_async(context, 'assistant', crisis_response.content, safety_check.risk_level)
+                self._record_stream_latency(crisis_response, started, time.perf_counter(), context, mode)
+                yield StreamEvent(StreamEventType.CHUNK, content=crisis_response.content)
+                yield StreamEvent(StreamEventType.COMPLETE, response=crisis_response)
+                return
+            
+            prompt = self.create_therapeutic_prompt(context, user_message, mode)
+            
+            cache_key = self._response_cache_key(context, user_message, mode, safety_check)
+            if cache_key is not None:
+                cached_response = self.response_cache.get(cache_key)
+                if cached_response is not None:
+                    self._update_conversation_history(context, user_message, cached_response.content)
+                    self._persist_turn_async(context, 'assistant', cached_response.content, safety_check.risk_level)
+                    self._record_stream_latency(cached_response, started, time.perf_counter(), context, mode, prompt)
+                    yield StreamEvent(StreamEventType.CHUNK, content=cached_response.content)
+                    yield StreamEvent(StreamEventType.COMPLETE, response=cached_response)
+                    return
+            
+            await self._enforce_rate_limit()
+            
+            screen = IncrementalResponseScreen(self.safety_monitor)
+            released = 0
+            cancel_reason: Optional[str] = None
+            
+            model_stream = self._stream_gemini_api(prompt)
+            try:
+                async for chunk in model_stream:
+                    cancel_reason = screen.feed(chunk)
+                    if cancel_reason:
+                        break
+                    
+                    releasable = screen.releasable_length()
+                    if releasable > released:
+                        text = screen.text[released:releasable]
+                        released = releasable
+                        if first_chunk_at is None:
+                            first_chunk_at = time.perf_counter()
+                        yield StreamEvent(StreamEventType.CHUNK, content=text)
+            finally:
+                # Closing the generator cancels the in-flight model call
+                await model_stream.aclose()
+            
+            if cancel_reason is None:
+                cancel_reason = screen.finish()
+            if cancel_reason:
+                replacement = self._create_screened_replacement(cancel_reason, user_message, safety_check,
+                                                                streamed=True)
+                self.streams_replaced += 1
+                self.logger.warning(f"Streamed response replaced: {cancel_reason}")
+                self._update_conversation_history(context, user_message, replacement.content)
+                self._persist_turn_async(context, 'assistant', replacement.content, safety_check.risk_level)
+                self._record_stream_latency(replacement, started, first_chunk_at, context, mode, prompt)
+                yield StreamEvent(StreamEventType.REPLACE, content=replacement.content)
+                yield StreamEvent(StreamEventType.COMPLETE, response=replacement)
+                return
+            
+            # Release the held-back tail
+            full_text = screen.text
+            if len(full_text) > released:
+                if first_chunk_at is None:
+                    first_chunk_at = time.perf_counter()
+                yield StreamEvent(StreamEventType.CHUNK, content=full_text[released:])
+            
+            completion_tokens = len(full_text.split())
+            ai_response = {
+                'choices': [{'message': {'content': full_text}, 'finish_reason': 'stop'}],
+                'usage': {'total_tokens': completion_tokens}
+            }
+            processed_response = self._process_ai_response(ai_response, prompt, context)
+            
+            # Post-processing may add text, so the processed response gets the blocking screen too
             response_safety = self.safety_monitor.screen_response(processed_response.content)
+            replacement_reason = self._replacement_reason(response_safety.flags)
+            if replacement_reason:
+                replacement = self._create_screened_replacement(replacement_reason, user_message, safety_check,
+                                                                streamed=True)
+                self.streams_replaced += 1
+                self._update_conversation_history(context, user_message, replacement.content)
+                self._persist_turn_async(context, 'assistant', replacement.content, safety_check.risk_level)
+                self._record_stream_latency(replacement, started, first_chunk_at, context, mode, prompt)
+                yield StreamEvent(StreamEventType.REPLACE, content=replacement.content)
+                yield StreamEvent(StreamEventType.COMPLETE, response=replacement)
+                return
+            
+            self._update_conversation_history(context, user_message, processed_response.content)
+            self._persist_turn_async(context, 'assistant', processed_response.content, safety_check.risk_level)
             processed_response.safety_flags.extend(response_safety.flags)
+            self._store_cached_response(cache_key, processed_response)
+            self._record_stream_latency(processed_response, started, first_chunk_at, context, mode, prompt)
+            yield StreamEvent(StreamEventType.COMPLETE, response=processed_response)
+        
+        except Exception as e:
+            self.logger.error(f"Error streaming therapeutic response: {e}")
+            error_response = self._create_error_response(str(e))
+            self._record_stream_latency(error_response, started, first_chunk_at, context, mode)
+            yield StreamEvent(StreamEventType.REPLACE, content=error_response.content)
+            yield StreamEvent(StreamEventType.COMPLETE, response=error_response)
+    
+    async def _stream_gemini_api(self, prompt: TherapeuticPrompt) -> AsyncIterator[str]:
+        """Stream completion text from Gemini as it is generated"""
+        
+        async for chunk in self.backend.stream(self._build_api_payload(prompt), prompt):
+            yield chunk
+    
+    def _replacement_reason(self, flags: List[str]) -> Optional[str]:
+        """The response screen flag that keeps a response from the patient, if any"""
+        for flag in RESPONSE_REPLACEMENT_FLAGS:
+            if flag in flags:
+                return flag
+        return None
+    
+    def _create_screened_replacement(self, reason: str, user_message: str, safety_check: Any,
+                                     streamed: bool = False) -> AIResponse:
+        """Vetted response that replaces one the response screen flagged"""
+        
+        if reason == 'inadequate_crisis_response':
+            replacement = self._create_crisis_response(user_message, safety_check)
+        else:
+            replacement = AIResponse(
+                content=(
+                    "I want to keep our focus on you and what you're experiencing. "
+                    "Could you tell me a bit more about what feels most important to you right now, "
+                    "so we can work through it together?"
+                ),
+                response_type=ResponseType.THERAPEUTIC,
+                confidence_score=0.7,
+                follow_up_needed=True
+            )
+        
+        replacement.safety_flags.append(f"{'stream' if streamed else 'response'}_replaced_{reason}")
+        replacement.replaced_mid_stream = streamed
+        return replacement
+    
+    def _record_stream_latency(self, response: AIResponse, started: float, first_chunk_at: Optional[float],
+                               context: ConversationContext, mode: ConversationMode,
+                               prompt: Optional[TherapeuticPrompt] = None):
+        """Attach time-to-first-token and total latency to a streamed response and report them
+        
+        When nothing was streamed (an empty completion, or an early failure or
+        replacement), the first token is taken to be the final response.
+        """
+        
+        finished = time.perf_counter()
+        response.time_to_first_token_ms = ((first_chunk_at or finished) - started) * 1000
+        response.total_latency_ms = (finished - started) * 1000
+        response.stage_timings_ms.setdefault('total', response.total_latency_ms)
+        self._emit_turn_metrics(response, context, mode, prompt, streamed=True)
+        
+        self.ttft_samples.append(response.time_to_first_token_ms)
+        if len(self.ttft_samples) > self.max_latency_samples:
+            self.ttft_samples = self.ttft_samples[-self.max_latency_samples:]
+    
+    def get_streaming_metrics(self) -> Dict[str, Any]:
+        """Time-to-first-token percentiles over recent streamed responses"""
+        
+        if not self.ttft_samples:
+            return {'streams': 0, 'streams_replaced': self.streams_replaced}
+        
+        ordered = sorted(self.ttft_samples)
+        
+        def percentile(fraction: float) -> float:
+            return ordered[min(int(fraction * len(ordered)), len(ordered) - 1)]
+        
+        return {
+            'streams': len(ordered),
+            'streams_replaced': self.streams_replaced,
+            'ttft_p50_ms': percentile(0.50),
+            'ttft_p95_ms': percentile(0.95),
+            'ttft_p99_ms': percentile(0.99),
+            'ttft_max_ms': ordered[-1]
+        }
+    
+    async def generate_batch(self, requests: Iterable[BatchGenerationRequest],
+                             max_concurrency: int = 4,
+                             checkpoint_path: Optional[str] = None) -> AsyncIterator[BatchGenerationResult]:
+        """Generate responses for an offline job, yielding results as they complete
+        
+        Requests are consumed lazily and run at BATCH priority, which yields the
+        shared rate limit to live conversations. Identical prompts are generated
+        once and the response is shared. Completed prompts are appended to the
+        checkpoint file, so rerunning the job with the same path skips them.
+        Batch calls never touch conversation history.
+        """
+        
+        completed = self._load_batch_checkpoint(checkpoint_path)
+        restored_keys = set(completed)
+        pending: Dict[str, List[BatchGenerationRequest]] = {}
+        work: asyncio.Queue = asyncio.Queue(maxsize=max_concurrency * 2)
+        results: asyncio.Queue = asyncio.Queue()
+        finished = object()
+        
+        async def produce():
+            for request in requests:
+                key = self._batch_prompt_key(request)
+                if key in completed:
+                    await results.put(BatchGenerationResult(
+                        request.request_id, key, completed[key],
+                        from_checkpoint=key in restored_keys,
+                        deduplicated=key not in restored_keys
+                    ))
+                elif key in pending:
+                    pending[key].append(request)
+                else:
+                    pending[key] = [request]
+                    await work.put(key)
+            for _ in range(max_concurrency):
+                await work.put(None)
+        
+        async def consume():
+            while True:
+                key = await work.get()
+                if key is None:
+                    return
+                response = await self._generate_batch_item(pending[key][0])
+                if 'system_error' not in response.safety_flags:
+                    completed[key] = response
+                    self._append_batch_checkpoint(checkpoint_path, key, response)
+                for position, request in enumerate(pending.pop(key)):
+                    await results.put(BatchGenerationResult(
+                        request.request_id, key, response, deduplicated=position > 0
+                    ))
+        
+        async def run():
+            try:
+                await asyncio.gather(produce(), *(consume() for _ in range(max_concurrency)))
+            except Exception as e:
+                self.logger.error(f"Error running batch generation: {e}")
+            finally:
+                await results.put(finished)
+        
+        runner = asyncio.ensure_future(run())
+        try:
+            while True:
+                result = await results.get()
+                if result is finished:
+                    break
+                yield result
+        finally:
+            if not runner.done():
+                runner.cancel()
+    
+    async def _generate_batch_item(self, request: BatchGenerationRequest,
+                                   priority: RequestPriority = RequestPriority.BATCH) -> AIResponse:
+        """Single offline generation; mirrors the live path without history updates"""
+        
+        try:
+            await self._enforce_rate_limit(priority)
             
-            return processed_response
+            prompt = self.create_therapeutic_prompt(request.context, request.user_message, request.mode)
+            
+            safety_check = self.safety_monitor.screen_message(request.user_message)
+            if safety_check.risk_level == SafetyLevel.CRITICAL:
+                return self._create_crisis_response(request.user_message, safety_check)
+            
+            ai_response = await self._call_gemini_api(prompt)
+            processed_response = self._process_ai_response(ai_response, prompt, request.context)
             
+            response_safety = self.safety_monitor.screen_response(processed_response.content)
+            processed_response.safety_flags.extend(response_safety.flags)
+            return processed_response
+        
         except Exception as e:
-            self.logger.error(f"Error generating therapeutic response: {e}")
+            self.logger.error(f"Error generating batch item {request.request_id}: {e}")
             return self._create_error_response(str(e))
     
-    async def _call_gemini_api(self, prompt: TherapeuticPrompt) -> Dict[str, Any]:
-        """Call Gemini API with therapeutic prompt"""
+    def _batch_prompt_key(self, request: BatchGenerationRequest) -> str:
+        """Stable hash of the fully rendered prompt, used for dedupe and checkpoints"""
+        
+        prompt = self.create_therapeutic_prompt(request.context, request.user_message, request.mode)
+        digest = hashlib.sha256()
+        for part in (request.mode.value, self.model_name, prompt.system_prompt,
+                     prompt.context_prompt, prompt.user_message):
+            digest.update(part.encode('utf-8'))
+            digest.update(b'\x00')
+        return digest.hexdigest()
+    
+    def _load_batch_checkpoint(self, checkpoint_path: Optional[str]) -> Dict[str, AIResponse]:
+        """Responses already completed by a previous run of the job"""
+        
+        completed: Dict[str, AIResponse] = {}
+        if not checkpoint_path or not os.path.exists(checkpoint_path):
+            return completed
+        
+        try:
+            with open(checkpoint_path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue  # torn final line from an interrupted run
+                    completed[record['prompt_key']] = self._response_from_record(record['response'])
+        except Exception as e:
+            self.logger.error(f"Error loading batch checkpoint: {e}")
+        
+        return completed
+    
+    def _append_batch_checkpoint(self, checkpoint_path: Optional[str], prompt_key: str, response: AIResponse):
+        """Durably record one completed prompt"""
         
-        # This is a placeholder for the actual Gemini API call
-        # In real implementation, you would use the official Google AI SDK
+        if not checkpoint_path:
+            return
         
-        headers = {
-            'Authorization': f'Bearer {self.api_key}',
-            'Content-Type': 'application/json'
+        try:
+            Path(checkpoint_path).parent.mkdir(parents=True, exist_ok=True)
+            with open(checkpoint_path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps({'prompt_key': prompt_key, 'response': self._response_to_record(response)}) + '\n')
+                f.flush()
+                os.fsync(f.fileno())
+        except Exception as e:
+            self.logger.error(f"Error writing batch checkpoint: {e}")
+    
+    def _response_to_record(self, response: AIResponse) -> Dict[str, Any]:
+        return {
+            'content': response.content,
+            'response_type': response.response_type.value,
+            'confidence_score': response.confidence_score,
+            'safety_flags': response.safety_flags,
+            'suggested_interventions': response.suggested_interventions,
+            'risk_indicators': response.risk_indicators,
+            'follow_up_needed': response.follow_up_needed,
+            'timestamp': response.timestamp.isoformat(),
+            'tokens_used': response.tokens_used
         }
+    
+    def _response_from_record(self, record: Dict[str, Any]) -> AIResponse:
+        return AIResponse(
+            content=record['content'],
+            response_type=ResponseType(record['response_type']),
+            confidence_score=record['confidence_score'],
+            safety_flags=record.get('safety_flags', []),
+            suggested_interventions=record.get('suggested_interventions', []),
+            risk_indicators=record.get('risk_indicators', []),
+            follow_up_needed=record.get('follow_up_needed', False),
+            timestamp=datetime.fromisoformat(record['timestamp']),
+            tokens_used=record.get('tokens_used', 0)
+        )
+    
+    async def _call_gemini_api(self, prompt: TherapeuticPrompt) -> Dict[str, Any]:
+        """Call Gemini API with therapeutic prompt"""
         
-        payload = {
+        return await self.backend.generate(self._build_api_payload(prompt), prompt)
+    
+    def _build_api_payload(self, prompt: TherapeuticPrompt) -> Dict[str, Any]:
+        """Chat-completion request body for a therapeutic prompt"""
+        
+        return {
             'model': self.model_name,
             'messages': [
                 {
@@ -490,24 +1726,23 @@ class GeminiTherapyInterface:
             'top_k': self.top_k,
             'safety_settings': self.safety_settings
         }
-        
-        # Simulate API call for demonstration
-        # In real implementation, replace with actual Gemini API endpoint
-        simulated_response = {
-            'choices': [{
-                'message': {
-                    'content': self._generate_simulated_response(prompt)
-                },
-                'finish_reason': 'stop'
-            }],
-            'usage': {
-                'total_tokens': 500,
-                'prompt_tokens': 300,
-                'completion_tokens': 200
-            }
-        }
-        
-        return simulated_response
+    
+    async def close(self):
+        """Release backend connections"""
+        await self.flush_persistence()
+        await self.backend.close()
+        self.metrics_sink.close()
+    
+    async def __aenter__(self) -> 'GeminiTherapyInterface':
+        return self
+    
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+    
+    def get_connection_metrics(self) -> Dict[str, Any]:
+        """Connection pool reuse metrics (empty for backends without a pool)"""
+        get_metrics = getattr(self.backend, 'get_connection_metrics', None)
+        return get_metrics() if get_metrics else {}
     
     def _generate_simulated_response(self, prompt: TherapeuticPrompt) -> str:
         """Generate simulated therapeutic response for demonstration"""
@@ -723,54 +1958,114 @@ class GeminiTherapyInterface:
                                    user_message: str, ai_response: str):
         """Update conversation history"""
         
-        # Add to context history
-        context.conversation_history.extend([
-            {'role': 'user', 'content': user_message, 'timestamp': datetime.now().isoformat()},
-            {'role': 'assistant', 'content': ai_response, 'timestamp': datetime.now().isoformat()}
-        ])
+        now = time.time()
+        self._append_conversation_turns(
+            context, [ConversationTurn('user', user_message, now), ConversationTurn('assistant', ai_response, now)]
+        )
+    
+    def record_assistant_turn(self, context: ConversationContext, content: str,
+                              risk_level: SafetyLevel = SafetyLevel.LOW):
+        """Add an assistant message the patient was shown without a preceding user turn
         
-        # Maintain memory limit
-        max_history = 20  # 10 exchanges
-        if len(context.conversation_history) > max_history:
-            context.conversation_history = context.conversation_history[-max_history:]
+        Used for content generated outside a reply, such as phase openings, so
+        later prompts and the stored transcript include it. Call from a
+        coroutine; the transcript write is queued on the running loop.
+        """
         
-        # Store in memory by session
-        session_key = f"{context.patient_id}_{context.session_id}"
-        self.conversation_memory[session_key] = context.conversation_history
+        self._append_conversation_turns(context, [ConversationTurn('assistant', content)])
+        self._persist_turn_async(context, 'assistant', content, risk_level)
     
-    async def _enforce_rate_limit(self):
-        """Enforce rate limiting for API calls"""
-        current_time = time.time()
-        time_since_last = current_time - self.last_request_time
+    def _append_conversation_turns(self, context: ConversationContext, new_turns: List[ConversationTurn]):
+        session_key = self._session_key(context)
+        
+        # Resume a session the caller holds no history for
+        if not context.conversation_history and context.rolling_summary is None:
+            stored = self.conversation_memory.get(session_key)
+            if stored:
+                context.conversation_history = list(stored.turns)
+                context.rolling_summary = stored.summary
+        
+        history = [ConversationTurn.from_value(turn) for turn in context.conversation_history]
+        summary = self._get_rolling_summary(context, history)
+        
+        for turn in new_turns:
+            summary.observe(turn)
+        history.extend(new_turns)
+        
+        # Maintain memory limit, folding aged-out turns into the rolling summary
+        if len(history) > self.max_history_turns:
+            for turn in history[:-self.max_history_turns]:
+                summary.fold(turn)
+            history = history[-self.max_history_turns:]
         
-        if time_since_last < self.min_request_interval:
-            await asyncio.sleep(self.min_request_interval - time_since_last)
+        context.conversation_history = history
         
-        self.last_request_time = time.time()
+        # Store in memory by session
+        self.conversation_memory.put(session_key, SessionConversation(history, summary))
+    
+    def _get_rolling_summary(self, context: ConversationContext,
+                             history: Optional[List[ConversationTurn]] = None) -> RollingConversationSummary:
+        """Context's rolling summary, seeded once from any history it arrived with"""
+        
+        if context.rolling_summary is None:
+            summary = RollingConversationSummary(token_budget=self.summary_token_budget)
+            for turn in history if history is not None else context.conversation_history:
+                summary.observe(ConversationTurn.from_value(turn))
+            context.rolling_summary = summary
+        return context.rolling_summary
+    
+    def _session_key(self, context: ConversationContext) -> str:
+        return f"{context.patient_id}_{context.session_id}"
+    
+    def get_conversation_history(self, patient_id: str, session_id: str) -> List[ConversationTurn]:
+        """Stored history for a session, or an empty list if evicted"""
+        stored = self.conversation_memory.get(f"{patient_id}_{session_id}")
+        return list(stored.turns) if stored else []
+    
+    def end_conversation(self, patient_id: str, session_id: str):
+        """Release a finished session's history"""
+        self.conversation_memory.discard(f"{patient_id}_{session_id}")
+    
+    def get_memory_metrics(self) -> Dict[str, Any]:
+        """Conversation store size, hit rate and eviction counts"""
+        return self.conversation_memory.get_metrics()
+    
+    async def _enforce_rate_limit(self, priority: RequestPriority = RequestPriority.LIVE):
+        """Enforce rate limiting for API calls
+        
+        Batch calls only take a slot when no live call is waiting for one.
+        """
+        if priority == RequestPriority.BATCH:
+            while True:
+                remaining = self.batch_request_interval - (time.time() - self.last_request_time)
+                if self.live_requests_waiting == 0 and remaining <= 0:
+                    break
+                await asyncio.sleep(max(remaining, 0.05))
+            self.last_request_time = time.time()
+            return
+        
+        self.live_requests_waiting += 1
+        try:
+            current_time = time.time()
+            time_since_last = current_time - self.last_request_time
+            
+            if time_since_last < self.min_request_interval:
+                await asyncio.sleep(self.min_request_interval - time_since_last)
+            
+            self.last_request_time = time.time()
+        finally:
+            self.live_requests_waiting -= 1
     
     def generate_session_summary(self, context: ConversationContext) -> str:
         """Generate session summary based on conversation"""
         
-        if not context.conversation_history:
+        if not context.conversation_history and context.rolling_summary is None:
             return "No conversation occurred in this session."
         
-        # Extract key themes and topics
-        all_content = ' '.join([
-            exchange['content'] for exchange in context.conversation_history 
-            if exchange['role'] == 'user'
-        ])
-        
-        # Simple keyword extraction for demonstration
+        # Themes come from the rolling tallies, which cover turns beyond the window
         # In real implementation, this would use more sophisticated NLP
-        themes = []
-        if 'anxiety' in all_content.lower():
-            themes.append('anxiety management')
-        if 'depression' in all_content.lower():
-            themes.append('depression symptoms')
-        if 'stress' in all_content.lower():
-            themes.append('stress coping')
-        if 'relationship' in all_content.lower():
-            themes.append('relationship issues')
+        rolling = self._get_rolling_summary(context)
+        themes = rolling.themes
         
         summary = f"""
         SESSION SUMMARY:
@@ -783,7 +2078,7 @@ class GeminiTherapyInterface:
         Session Notes:
         - Patient engaged in therapeutic conversation
         - Risk level maintained at: {context.risk_level}
-        - Conversation exchanges: {len(context.conversation_history) // 2}
+        - Conversation exchanges: {rolling.total_turns // 2}
         
         Follow-up Recommendations:
         - Continue with current treatment approach
@@ -796,11 +2091,13 @@ class GeminiTherapyInterface:
     def get_conversation_insights(self, context: ConversationContext) -> Dict[str, Any]:
         """Extract insights from conversation for clinical documentation"""
         
+        rolling = self._get_rolling_summary(context)
+        
         insights = {
             'session_metrics': {
-                'total_exchanges': len(context.conversation_history) // 2,
-                'session_duration_estimated': len(context.conversation_history) * 2,  # minutes
-                'patient_engagement': 'active' if len(context.conversation_history) > 4 else 'limited'
+                'total_exchanges': rolling.total_turns // 2,
+                'session_duration_estimated': rolling.total_turns * 2,  # minutes
+                'patient_engagement': 'active' if rolling.total_turns > 4 else 'limited'
             },
             'clinical_observations': [],
             'risk_factors': [],
@@ -808,31 +2105,23 @@ class GeminiTherapyInterface:
             'recommendations': []
         }
         
-        # Analyze conversation content
-        user_messages = [
-            exchange['content'] for exchange in context.conversation_history 
-            if exchange['role'] == 'user'
-        ]
-        
-        all_user_content = ' '.join(user_messages).lower()
-        
-        # Clinical observations
-        if 'anxious' in all_user_content or 'worried' in all_user_content:
+        # Clinical observations (per-turn tallies, no rescan of the history)
+        observations = rolling.observation_counts
+        if observations.get('anxiety'):
             insights['clinical_observations'].append('Patient reported anxiety symptoms')
-        if 'sad' in all_user_content or 'depressed' in all_user_content:
+        if observations.get('depressive'):
             insights['clinical_observations'].append('Patient reported depressive symptoms')
-        if 'better' in all_user_content or 'improved' in all_user_content:
+        if observations.get('improvement'):
             insights['therapeutic_progress'].append('Patient reported improvement')
         
         # Risk factors
-        risk_keywords = ['suicide', 'hurt', 'hopeless', 'worthless', 'die']
-        if any(keyword in all_user_content for keyword in risk_keywords):
+        if rolling.risk_mentions:
             insights['risk_factors'].append('Risk indicators present - requires follow-up')
         
         # Recommendations
         if context.risk_level != 'low':
             insights['recommendations'].append('Continue safety monitoring')
-        if len(user_messages) < 3:
+        if rolling.user_turns < 3:
             insights['recommendations'].append('Encourage more active participation')
         
         return insights
@@ -842,38 +2131,60 @@ class TherapySafetyMonitor:
     """Safety monitoring for therapeutic conversations"""
     
     def __init__(self):
+        # Whole-word keywords ("*" also matches longer forms, as the old substring
+        # screen did: "hopelessness", "desperately"). Only psychosis cues are dropped
+        # when negated ("not paranoid"); suicide, self-harm, violence, crisis and
+        # distress cues count regardless, since "never felt this desperate" or
+        # "no one can help me" intensify rather than deny
         self.risk_keywords = {
-            'suicide': ['suicide', 'kill myself', 'end it all', 'better off dead', 'suicidal'],
-            'self_harm': ['cut myself', 'hurt myself', 'self-harm', 'self harm'],
-            'violence': ['hurt someone', 'kill them', 'violent', 'weapon'],
-            'crisis': ['emergency', 'crisis', 'help me', 'desperate'],
-            'psychosis': ['voices', 'hallucination', 'paranoid', 'conspiracy']
+            'suicide': ['suicide*', 'kill myself', 'end it all', 'better off dead', 'suicidal'],
+            'self_harm': ['cut myself', 'hurt myself', 'self-harm*', 'self harm*'],
+            'violence': ['hurt someone', 'kill them', 'violent*', 'weapon*'],
+            'crisis': ['emergenc*', 'crisis', 'help me', 'desperat*'],
+            'psychosis': ['voices', 'hallucination*', 'paranoid', 'conspiracy']
         }
+        self.distress_indicators = {
+            'high_distress': ['overwhelming*', 'can\'t cope', 'unbearab*', 'hopeless*']
+        }
+        self.risk_matcher = get_term_matcher(self.risk_keywords, negatable_groups=['psychosis'])
+        self.distress_matcher = get_term_matcher(self.distress_indicators, negatable_groups=[])
+        
+        # Response screening vocabulary, matched on whole words and shared with streaming
+        # screens. Nothing in a response is negated; "help*" still covers "helpline"
+        self.response_crisis_terms = ['crisis', 'emergency', 'suicide']
+        self.response_support_terms = ['safety', 'help*']
+        self.boundary_phrases = ['personal experience', 'i feel', 'my life', 'i think you should']
+        self.response_matcher = get_term_matcher(
+            {'response': self.response_crisis_terms + self.response_support_terms + self.boundary_phrases},
+            negation_window=0
+        )
+        self.longest_response_term = max(
+            len(term.split()) for term in self.response_crisis_terms + self.boundary_phrases
+        )
     
     def screen_message(self, message: str) -> 'SafetyScreeningResult':
         """Screen user message for safety concerns"""
         
-        message_lower = message.lower()
+        risk_hits = self.risk_matcher.scan(message)
         risk_level = SafetyLevel.LOW
         flags = []
         recommendations = []
         
         # Check for high-risk keywords
-        for category, keywords in self.risk_keywords.items():
-            if any(keyword in message_lower for keyword in keywords):
+        for category in self.risk_keywords:
+            if risk_hits.count(category) > 0:
                 flags.append(f'{category}_indicators')
                 
                 if category in ['suicide', 'self_harm', 'violence']:
                     risk_level = SafetyLevel.CRITICAL
                     recommendations.append('Immediate safety assessment required')
                 elif category in ['crisis', 'psychosis']:
-                    risk_level = max(risk_level, SafetyLevel.HIGH)
+                    risk_level = max(risk_level, SafetyLevel.HIGH, key=SAFETY_LEVEL_ORDER.get)
                     recommendations.append('Enhanced monitoring needed')
         
         # Context-based risk assessment
-        distress_indicators = ['overwhelming', 'can\'t cope', 'unbearable', 'hopeless']
-        if any(indicator in message_lower for indicator in distress_indicators):
-            risk_level = max(risk_level, SafetyLevel.MEDIUM)
+        if self.distress_matcher.scan(message):
+            risk_level = max(risk_level, SafetyLevel.MEDIUM, key=SAFETY_LEVEL_ORDER.get)
             flags.append('high_distress')
         
         return SafetyScreeningResult(
@@ -885,20 +2196,15 @@ class TherapySafetyMonitor:
     def screen_response(self, response: str) -> 'SafetyScreeningResult':
         """Screen AI response for appropriate content"""
         
-        response_lower = response.lower()
-        flags = []
+        flags = self.response_flags(self.response_matcher.find_terms(response))
         recommendations = []
         
         # Check for appropriate crisis response
-        if any(word in response_lower for word in ['crisis', 'emergency', 'suicide']):
-            if 'safety' not in response_lower or 'help' not in response_lower:
-                flags.append('inadequate_crisis_response')
-                recommendations.append('Enhance crisis intervention content')
+        if 'inadequate_crisis_response' in flags:
+            recommendations.append('Enhance crisis intervention content')
         
         # Check for boundary violations
-        inappropriate_phrases = ['personal experience', 'i feel', 'my life', 'i think you should']
-        if any(phrase in response_lower for phrase in inappropriate_phrases):
-            flags.append('boundary_concern')
+        if 'boundary_concern' in flags:
             recommendations.append('Review professional boundaries')
         
         return SafetyScreeningResult(
@@ -906,6 +2212,17 @@ class TherapySafetyMonitor:
             flags=flags,
             recommendations=recommendations
         )
+    
+    def response_flags(self, terms: Set[str]) -> List[str]:
+        """Response screening flags for the response_matcher terms found in a response"""
+        
+        flags = []
+        if any(term in terms for term in self.response_crisis_terms):
+            if not all(term in terms for term in self.response_support_terms):
+                flags.append('inadequate_crisis_response')
+        if any(term in terms for term in self.boundary_phrases):
+            flags.append('boundary_concern')
+        return flags
 
 
 @dataclass
@@ -916,6 +2233,86 @@ class SafetyScreeningResult:
     recommendations: List[str]
 
 
+class IncrementalResponseScreen:
+    """Applies screen_response's rules to a growing response buffer
+    
+    Terms are matched on whole words with the monitor's response matcher. Each
+    chunk rescans only the words completed since the last one plus the few
+    before them that a phrase could still extend, so screening a whole stream
+    stays linear in its length; a word still being streamed is matched once it
+    is complete. A boundary phrase settles the verdict at once. A crisis term
+    only matters if the response never offers the support terms, so text from
+    where it was found is held back until they appear or the stream ends.
+    """
+    
+    def __init__(self, monitor: TherapySafetyMonitor):
+        self.monitor = monitor
+        self.text = ""
+        self.terms: Set[str] = set()
+        self._scanned = 0        # end of the text already scanned as complete words
+        self._rescan_from = 0    # where the next scan starts
+        self._hold_from: Optional[int] = None
+    
+    def feed(self, chunk: str) -> Optional[str]:
+        """Add a chunk; returns the cancel reason if the stream must stop"""
+        
+        self.text += chunk
+        for index in range(len(self.text) - 1, self._scanned - 1, -1):
+            if self.text[index].isspace():
+                self._scan(index + 1)
+                break
+        
+        if 'boundary_concern' in self.monitor.response_flags(self.terms):
+            return 'boundary_concern'
+        return None
+    
+    def finish(self) -> Optional[str]:
+        """Screen the rest of the buffer once the stream ends; returns the replacement reason, if any"""
+        
+        self._scan(len(self.text))
+        flags = self.monitor.response_flags(self.terms)
+        for flag in RESPONSE_REPLACEMENT_FLAGS:
+            if flag in flags:
+                return flag
+        return None
+    
+    def releasable_length(self) -> int:
+        """Prefix length that can no longer become part of a flagged phrase"""
+        if self._hold_from is not None:
+            return min(self._rescan_from, self._hold_from)
+        return self._rescan_from
+    
+    def _scan(self, end: int):
+        """Match terms in the text up to end, which must fall on a word boundary"""
+        
+        start = self._rescan_from
+        self.terms |= self.monitor.response_matcher.find_terms(self.text[start:end])
+        
+        if 'inadequate_crisis_response' in self.monitor.response_flags(self.terms):
+            if self._hold_from is None:
+                self._hold_from = start
+        else:
+            self._hold_from = None
+        
+        self._scanned = end
+        self._rescan_from = self._words_before(end, self.monitor.longest_response_term - 1)
+    
+    def _words_before(self, end: int, words: int) -> int:
+        """Start of the last `words` words before end"""
+        
+        position = end
+        while words > 0 and position > 0:
+            while position > 0 and self.text[position - 1].isspace():
+                position -= 1
+            word_end = position
+            while position > 0 and not self.text[position - 1].isspace():
+                position -= 1
+            # Bare punctuation holds no word the matcher could use
+            if any(char.isalnum() for char in self.text[position:word_end]):
+                words -= 1
+        return position
+
+
 # Example usage and testing
 if __name__ == "__main__":
     import asyncio
@@ -1038,6 +2435,38 @@ if __name__ == "__main__":
             print(f"Recommendations: {result.recommendations}")
             print()
         
+        print("="*60)
+        
+        # Demonstrate streaming delivery
+        print("=== STREAMING RESPONSE DEMONSTRATION ===")
+        interface.min_request_interval = 0
+        async for event in interface.stream_therapeutic_response(
+            context,
+            "I keep replaying a conversation with my boss over and over.",
+            ConversationMode.THERAPY_SESSION
+        ):
+            if event.event_type == StreamEventType.CHUNK:
+                print(event.content, end="", flush=True)
+            elif event.event_type == StreamEventType.REPLACE:
+                print(f"\n[replaced] {event.content}")
+            else:
+                print(f"\n\nTime to first token: {event.response.time_to_first_token_ms:.2f} ms")
+                print(f"Total latency: {event.response.total_latency_ms:.2f} ms")
+        print(f"Streaming metrics: {interface.get_streaming_metrics()}")
+        print()
+        
+        # Demonstrate offline batch generation
+        print("=== BATCH GENERATION DEMONSTRATION ===")
+        batch_requests = [
+            BatchGenerationRequest(f"NOTE_{n}", context, "Draft a brief progress note for this session.",
+                                   ConversationMode.THERAPY_SESSION, "progress_note")
+            for n in range(3)
+        ]
+        async for result in interface.generate_batch(batch_requests, max_concurrency=2):
+            print(f"{result.request_id}: {len(result.response.content)} chars "
+                  f"(deduplicated={result.deduplicated}, from_checkpoint={result.from_checkpoint})")
+        print()
+        
         print("="*60)
         print("Gemini interface ready for therapeutic conversations!")
         print("Features: Safety monitoring, context awareness, evidence-based responses")
@@ -0,0 +1,531 @@
+"""
+Model Backends Module
+Pluggable transport layer between the therapy interface and the language model
+Provides the HTTP client, an in-process fake and a local stub server for load testing
+"""
+
+import json
+import math
+import time
+import random
+import hashlib
+import asyncio
+import logging
+import weakref
+from typing import Dict, List, Optional, Any, Callable, AsyncIterator
+from dataclasses import dataclass, field, asdict
+
+import aiohttp
+from aiohttp import web
+
+
+DEFAULT_GEMINI_BASE_URL = "https://generativelanguage.googleapis.com/v1beta/openai"
+CHAT_COMPLETIONS_PATH = "/chat/completions"
+
+STUB_RESPONSES = [
+    "Thank you for sharing that with me. It sounds like this has been weighing on you. "
+    "What feels most important for us to focus on right now?",
+    "That makes a lot of sense given what you've been going through. "
+    "Let's slow down and look at this together, one piece at a time.",
+    "I notice how much effort you're putting into coping with this. "
+    "Would it help to practise a grounding exercise before we go further?",
+    "Let's look at the thought you just described. What evidence supports it, "
+    "and what evidence doesn't quite fit?"
+]
+
+
+class ModelBackendError(Exception):
+    """Raised when a backend cannot produce a completion"""
+    
+    def __init__(self, message: str, status: Optional[int] = None, retryable: bool = False):
+        super().__init__(message)
+        self.status = status
+        self.retryable = retryable
+
+
+def split_into_chunks(content: str, words_per_chunk: int = 4) -> List[str]:
+    """Split text into chunks of a few words, keeping the original whitespace"""
+    
+    words = []
+    start = 0
+    for index, char in enumerate(content):
+        if char.isspace() and index + 1 < len(content) and not content[index + 1].isspace():
+            words.append(content[start:index + 1])
+            start = index + 1
+    words.append(content[start:])
+    return [''.join(words[i:i + words_per_chunk]) for i in range(0, len(words), words_per_chunk)]
+
+
+def completion_payload(content: str, prompt_tokens: int = 0) -> Dict[str, Any]:
+    """Chat-completion response body for a piece of content"""
+    
+    completion_tokens = len(content.split())
+    return {
+        'choices': [{
+            'message': {'role': 'assistant', 'content': content},
+            'finish_reason': 'stop'
+        }],
+        'usage': {
+            'total_tokens': prompt_tokens + completion_tokens,
+            'prompt_tokens': prompt_tokens,
+            'completion_tokens': completion_tokens
+        }
+    }
+
+
+def estimate_prompt_tokens(payload: Dict[str, Any]) -> int:
+    """Whitespace token estimate for a chat-completion request"""
+    return sum(len(str(message.get('content', '')).split()) for message in payload.get('messages', []))
+
+
+class ModelBackend:
+    """Interface every model backend implements"""
+    
+    name = "base"
+    
+    async def generate(self, payload: Dict[str, Any], prompt: Any = None) -> Dict[str, Any]:
+        """Return a chat-completion response body for the request payload"""
+        raise NotImplementedError
+    
+    async def stream(self, payload: Dict[str, Any], prompt: Any = None) -> AsyncIterator[str]:
+        """Yield completion text as it is generated
+        
+        Backends without native streaming deliver the full completion as one chunk.
+        """
+        response = await self.generate(payload, prompt)
+        yield response['choices'][0]['message']['content']
+    
+    async def close(self):
+        """Release any connections held by the backend"""
+        return None
+
+
+class FakeModelBackend(ModelBackend):
+    """In-process backend with no network I/O
+    
+    The responder maps (payload, prompt) to completion text; the interface
+    passes its simulated therapeutic responses.
+    """
+    
+    name = "fake"
+    
+    def __init__(self, responder: Optional[Callable[[Dict[str, Any], Any], str]] = None,
+                 latency_seconds: float = 0.0, chunk_words: int = 4):
+        self.responder = responder or (lambda payload, prompt: STUB_RESPONSES[0])
+        self.latency_seconds = latency_seconds
+        self.chunk_words = chunk_words
+        self.request_count = 0
+    
+    async def generate(self, payload: Dict[str, Any], prompt: Any = None) -> Dict[str, Any]:
+        self.request_count += 1
+        await asyncio.sleep(self.latency_seconds)
+        return completion_payload(self.responder(payload, prompt), estimate_prompt_tokens(payload))
+    
+    async def stream(self, payload: Dict[str, Any], prompt: Any = None) -> AsyncIterator[str]:
+        self.request_count += 1
+        await asyncio.sleep(self.latency_seconds)
+        for chunk in split_into_chunks(self.responder(payload, prompt), self.chunk_words):
+            await asyncio.sleep(0)
+            yield chunk
+
+
+@dataclass
+class ConnectionPoolMetrics:
+    """Connection reuse counters for an HTTP backend's pools"""
+    sessions_created: int = 0
+    requests: int = 0
+    connections_created: int = 0
+    connections_reused: int = 0
+    connection_queued_waits: int = 0
+    dns_cache_hits: int = 0
+    dns_cache_misses: int = 0
+    
+    @property
+    def reuse_ratio(self) -> float:
+        acquired = self.connections_created + self.connections_reused
+        return self.connections_reused / acquired if acquired else 0.0
+    
+    @property
+    def requests_per_connection(self) -> float:
+        return self.requests / self.connections_created if self.connections_created else 0.0
+
+
+class HttpModelBackend(ModelBackend):
+    """Chat-completions client over pooled, keep-alive aiohttp sessions
+    
+    Works against Gemini's OpenAI-compatible endpoint or the local stub server.
+    One ClientSession is kept per event loop, since sessions and their
+    connectors are bound to the loop that created them. Connector limits
+    follow the interface's concurrency settings, and DNS results are cached.
+    429 and 5xx responses are retried with exponential backoff.
+    """
+    
+    name = "http"
+    
+    def __init__(self, base_url: str = DEFAULT_GEMINI_BASE_URL, api_key: Optional[str] = None,
+                 endpoint_path: str = CHAT_COMPLETIONS_PATH, timeout_seconds: float = 60.0,
+                 max_connections: int = 100, max_connections_per_host: int = 32,
+                 keepalive_seconds: float = 30.0, dns_cache_ttl_seconds: int = 300,
+                 max_retries: int = 2, retry_backoff_seconds: float = 0.5,
+                 shutdown_grace_seconds: float = 0.25):
+        self.base_url = base_url.rstrip('/')
+        self.api_key = api_key
+        self.endpoint_path = endpoint_path
+        self.timeout_seconds = timeout_seconds
+        self.max_connections = max_connections
+        self.max_connections_per_host = max_connections_per_host
+        self.keepalive_seconds = keepalive_seconds
+        self.dns_cache_ttl_seconds = dns_cache_ttl_seconds
+        self.max_retries = max_retries
+        self.retry_backoff_seconds = retry_backoff_seconds
+        self.shutdown_grace_seconds = shutdown_grace_seconds
+        self.logger = logging.getLogger(__name__)
+        self.metrics = ConnectionPoolMetrics()
+        
+        # event loop -> session; entries vanish with their loop
+        self._sessions: 'weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, aiohttp.ClientSession]' = \
+            weakref.WeakKeyDictionary()
+    
+    @property
+    def url(self) -> str:
+        return self.base_url + self.endpoint_path
+    
+    def _headers(self) -> Dict[str, str]:
+        headers = {'Content-Type': 'application/json'}
+        if self.api_key:
+            headers['Authorization'] = f'Bearer {self.api_key}'
+        return headers
+    
+    def _get_session(self) -> aiohttp.ClientSession:
+        """The running loop's session, created on first use"""
+        
+        loop = asyncio.get_running_loop()
+        session = self._sessions.get(loop)
+        if session is None or session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.max_connections,
+                limit_per_host=self.max_connections_per_host,
+                keepalive_timeout=self.keepalive_seconds,
+                use_dns_cache=True,
+                ttl_dns_cache=self.dns_cache_ttl_seconds
+            )
+            session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=self.timeout_seconds),
+                headers=self._headers(),
+                trace_configs=[self._build_trace_config()]
+            )
+            self._sessions[loop] = session
+            self.metrics.sessions_created += 1
+        return session
+    
+    def _build_trace_config(self) -> aiohttp.TraceConfig:
+        """Hook connection lifecycle events into the reuse metrics"""
+        
+        trace_config = aiohttp.TraceConfig()
+        metrics = self.metrics
+        
+        async def on_request_start(session, context, params):
+            metrics.requests += 1
+        
+        async def on_connection_create_end(session, context, params):
+            metrics.connections_created += 1
+        
+        async def on_connection_reuseconn(session, context, params):
+            metrics.connections_reused += 1
+        
+        async def on_connection_queued_start(session, context, params):
+            metrics.connection_queued_waits += 1
+        
+        async def on_dns_cache_hit(session, context, params):
+            metrics.dns_cache_hits += 1
+        
+        async def on_dns_cache_miss(session, context, params):
+            metrics.dns_cache_misses += 1
+        
+        trace_config.on_request_start.append(on_request_start)
+        trace_config.on_connection_create_end.append(on_connection_create_end)
+        trace_config.on_connection_reuseconn.append(on_connection_reuseconn)
+        trace_config.on_connection_queued_start.append(on_connection_queued_start)
+        trace_config.on_dns_cache_hit.append(on_dns_cache_hit)
+        trace_config.on_dns_cache_miss.append(on_dns_cache_miss)
+        return trace_config
+    
+    def get_connection_metrics(self) -> Dict[str, Any]:
+        """Pool reuse counters plus currently open sessions"""
+        
+        metrics = asdict(self.metrics)
+        metrics['reuse_ratio'] = self.metrics.reuse_ratio
+        metrics['requests_per_connection'] = self.metrics.requests_per_connection
+        metrics['open_sessions'] = sum(1 for session in self._sessions.values() if not session.closed)
+        return metrics
+    
+    async def generate(self, payload: Dict[str, Any], prompt: Any = None) -> Dict[str, Any]:
+        attempt = 0
+        while True:
+            try:
+                async with self._get_session().post(self.url, json=payload) as response:
+                    if response.status == 200:
+                        return await response.json()
+                    body = await response.text()
+                    raise ModelBackendError(
+                        f"Model request failed with HTTP {response.status}: {body[:200]}",
+                        status=response.status,
+                        retryable=response.status == 429 or response.status >= 500
+                    )
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                error = ModelBackendError(f"Model request failed: {e}", retryable=True)
+            except ModelBackendError as e:
+                error = e
+            
+            if not error.retryable or attempt >= self.max_retries:
+                raise error
+            attempt += 1
+            await asyncio.sleep(self.retry_backoff_seconds * (2 ** (attempt - 1)))
+    
+    async def stream(self, payload: Dict[str, Any], prompt: Any = None) -> AsyncIterator[str]:
+        stream_payload = dict(payload, stream=True)
+        async with self._get_session().post(self.url, json=stream_payload) as response:
+            if response.status != 200:
+                body = await response.text()
+                raise ModelBackendError(
+                    f"Model stream failed with HTTP {response.status}: {body[:200]}",
+                    status=response.status,
+                    retryable=response.status == 429 or response.status >= 500
+                )
+            
+            # Server-sent events: "data: {json}" lines terminated by "data: [DONE]"
+            async for raw_line in response.content:
+                line = raw_line.decode('utf-8').strip()
+                if not line.startswith('data:'):
+                    continue
+                data = line[len('data:'):].strip()
+                if data == '[DONE]':
+                    return
+                delta = json.loads(data)['choices'][0].get('delta', {})
+                if delta.get('content'):
+                    yield delta['content']
+    
+    async def close(self):
+        """Close every pooled session
+        
+        The current loop's session is awaited; sessions owned by other running
+        loops are closed on their own loop. A short grace period lets TLS
+        transports finish closing before the loop shuts down.
+        """
+        
+        current_loop = asyncio.get_running_loop()
+        closed_here = False
+        for loop, session in list(self._sessions.items()):
+            if session.closed:
+                continue
+            if loop is current_loop:
+                await session.close()
+                closed_here = True
+            elif loop.is_running():
+                asyncio.run_coroutine_threadsafe(session.close(), loop)
+            else:
+                self.logger.warning("Discarding HTTP session whose event loop is no longer running")
+        self._sessions.clear()
+        
+        if closed_here and self.shutdown_grace_seconds:
+            await asyncio.sleep(self.shutdown_grace_seconds)
+
+
+@dataclass
+class StubLatencyProfile:
+    """Latency and error distribution for the stub server"""
+    distribution: str = "lognormal"  # fixed, uniform or lognormal
+    mean_ms: float = 400.0
+    spread_ms: float = 150.0  # uniform half-width, or lognormal standard deviation
+    error_rate: float = 0.0
+    error_statuses: List[int] = field(default_factory=lambda: [429, 500, 503])
+    first_chunk_ms: float = 150.0  # streaming: delay before the first chunk
+    chunk_interval_ms: float = 20.0
+    seed: int = 7
+    
+    def sample_latency(self, rng: random.Random) -> float:
+        """Latency in seconds drawn from the configured distribution"""
+        
+        if self.distribution == "fixed" or self.spread_ms <= 0:
+            latency_ms = self.mean_ms
+        elif self.distribution == "uniform":
+            latency_ms = rng.uniform(self.mean_ms - self.spread_ms, self.mean_ms + self.spread_ms)
+        else:
+            # Parameterise the underlying normal so the lognormal has the requested mean/stddev
+            variance = (self.spread_ms / self.mean_ms) ** 2
+            sigma = math.sqrt(math.log1p(variance))
+            mu = math.log(self.mean_ms) - sigma ** 2 / 2
+            latency_ms = rng.lognormvariate(mu, sigma)
+        return max(latency_ms, 0.0) / 1000
+
+
+class StubModelServer:
+    """Local chat-completions server with deterministic content and tunable latency
+    
+    Responses are picked by hashing the request messages, so the same prompt
+    always yields the same completion. Latency and injected errors are drawn
+    from a seeded generator, making a soak test reproducible for a given
+    request order.
+    """
+    
+    def __init__(self, profile: Optional[StubLatencyProfile] = None,
+                 host: str = "127.0.0.1", port: int = 0,
+                 responses: Optional[List[str]] = None):
+        self.profile = profile or StubLatencyProfile()
+        self.host = host
+        self.port = port
+        self.responses = responses or STUB_RESPONSES
+        self.request_count = 0
+        self.error_count = 0
+        self._rng = random.Random(self.profile.seed)
+        self._runner: Optional[web.AppRunner] = None
+        self.logger = logging.getLogger(__name__)
+    
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+    
+    async def start(self) -> 'StubModelServer':
+        """Start serving; port 0 binds an ephemeral port"""
+        
+        app = web.Application()
+        app.router.add_post(CHAT_COMPLETIONS_PATH, self._handle_completion)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port)
+        await site.start()
+        self.port = site._server.sockets[0].getsockname()[1]
+        self.logger.info(f"Stub model server listening on {self.url}")
+        return self
+    
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+    
+    async def __aenter__(self) -> 'StubModelServer':
+        return await self.start()
+    
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.stop()
+    
+    def _select_response(self, payload: Dict[str, Any]) -> str:
+        digest = hashlib.sha256(json.dumps(payload.get('messages', []), sort_keys=True).encode('utf-8'))
+        return self.responses[int.from_bytes(digest.digest()[:4], 'big') % len(self.responses)]
+    
+    async def _handle_completion(self, request: web.Request) -> web.StreamResponse:
+        self.request_count += 1
+        payload = await request.json()
+        
+        latency = self.profile.sample_latency(self._rng)
+        fail = self._rng.random() < self.profile.error_rate
+        status = self._rng.choice(self.profile.error_statuses) if fail else 200
+        
+        if fail:
+            self.error_count += 1
+            await asyncio.sleep(latency)
+            return web.json_response({'error': {'code': status, 'message': 'Injected stub error'}}, status=status)
+        
+        content = self._select_response(payload)
+        if not payload.get('stream'):
+            await asyncio.sleep(latency)
+            return web.json_response(completion_payload(content, estimate_prompt_tokens(payload)))
+        
+        response = web.StreamResponse(headers={'Content-Type': 'text/event-stream'})
+        await response.prepare(request)
+        await asyncio.sleep(self.profile.first_chunk_ms / 1000)
+        for chunk in split_into_chunks(content):
+            event = {'choices': [{'delta': {'content': chunk}, 'finish_reason': None}]}
+            await response.write(f"data: {json.dumps(event)}\n\n".encode('utf-8'))
+            await asyncio.sleep(self.profile.chunk_interval_ms / 1000)
+        await response.write(b"data: [DONE]\n\n")
+        await response.write_eof()
+        return response
+
+
+def create_model_backend(config: Dict[str, Any], api_key: Optional[str] = None,
+                         responder: Optional[Callable[[Dict[str, Any], Any], str]] = None) -> ModelBackend:
+    """Build the backend named by config["model_backend"]
+    
+    - "fake" (default): in-process, no network
+    - "http": real API; requires an API key
+    - "stub": HTTP client pointed at config["stub_server_url"]
+    A ModelBackend instance may also be passed directly.
+    """
+    
+    backend = config.get("model_backend", "fake")
+    if isinstance(backend, ModelBackend):
+        return backend
+    
+    http_options = {
+        'timeout_seconds': config.get("request_timeout_seconds", 60.0),
+        'max_connections': config.get("max_connections", 100),
+        'max_connections_per_host': config.get("max_concurrent_requests", 32),
+        'keepalive_seconds': config.get("keepalive_seconds", 30.0),
+        'dns_cache_ttl_seconds': config.get("dns_cache_ttl_seconds", 300),
+        'max_retries': config.get("max_retries", 2),
+    }
+    
+    if backend == "http":
+        if not api_key:
+            raise ValueError("Gemini API key is required for the http model backend")
+        return HttpModelBackend(
+            base_url=config.get("api_base_url", DEFAULT_GEMINI_BASE_URL),
+            api_key=api_key,
+            **http_options
+        )
+    if backend == "stub":
+        if not config.get("stub_server_url"):
+            raise ValueError("stub_server_url is required for the stub model backend")
+        return HttpModelBackend(base_url=config["stub_server_url"], **http_options)
+    if backend == "fake":
+        return FakeModelBackend(
+            responder=responder,
+            latency_seconds=config.get("fake_latency_seconds", 0.0),
+            chunk_words=config.get("stream_chunk_words", 4)
+        )
+    
+    raise ValueError(f"Unknown model backend: {backend}")
+
+
+# Example usage and testing
+if __name__ == "__main__":
+
+    async def demonstrate_model_backends():
+        print("=== MODEL BACKEND DEMONSTRATION ===\n")
+        
+        payload = {
+            'model': 'gemini-2.5-pro',
+            'messages': [
+                {'role': 'system', 'content': 'You are a supportive therapist.'},
+                {'role': 'user', 'content': 'I have been feeling anxious at work.'}
+            ]
+        }
+        
+        fake = create_model_backend({"model_backend": "fake"})
+        response = await fake.generate(payload)
+        print(f"Fake backend: {response['choices'][0]['message']['content'][:60]}...")
+        print(f"Usage: {response['usage']}")
+        print()
+        
+        profile = StubLatencyProfile(distribution="lognormal", mean_ms=50, spread_ms=20, error_rate=0.1)
+        async with StubModelServer(profile) as server:
+            stub = create_model_backend({"model_backend": "stub", "stub_server_url": server.url, "max_retries": 3})
+            
+            started = time.perf_counter()
+            results = await asyncio.gather(*(stub.generate(payload) for _ in range(20)), return_exceptions=True)
+            elapsed = time.perf_counter() - started
+            failures = sum(isinstance(result, Exception) for result in results)
+            print(f"Stub server at {server.url}")
+            print(f"20 concurrent requests in {elapsed:.2f}s, {failures} failed after retries")
+            print(f"Server saw {server.request_count} requests, {server.error_count} injected errors")
+            
+            chunks = [chunk async for chunk in stub.stream(payload)]
+            print(f"Streamed {len(chunks)} chunks: {''.join(chunks)[:60]}...")
+            print(f"Connection metrics: {stub.get_connection_metrics()}")
+            await stub.close()
+        
+        print("\n" + "="*60)
+    
+    asyncio.run(demonstrate_model_backends())
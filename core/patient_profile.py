@@ -12,9 +12,14 @@ from dataclasses import dataclass, field, asdict
 from datetime import datetime, date, timedelta
 from enum import Enum
 import hashlib
+import hmac
 import logging
 from pathlib import Path
 
+from utilities.archive_manager import ArchiveManager, get_archive_manager
+from utilities.export_tools import StreamingExporter, ExportManifest
+from utilities.identifiers import new_id
+
 
 class Gender(Enum):
     """Gender options"""
@@ -190,14 +195,132 @@ class PatientProfile:
     privacy_settings: Dict[str, Any] = field(default_factory=dict)
 
 
+def _parse_enum(enum_class, raw: Any):
+    """Enum member from its stored value, also accepting legacy 'Class.MEMBER' strings"""
+    if isinstance(raw, enum_class):
+        return raw
+    if isinstance(raw, str) and raw.startswith(f"{enum_class.__name__}."):
+        return enum_class[raw.split(".", 1)[1]]
+    return enum_class(raw)
+
+
+def _json_default(value: Any) -> Any:
+    """JSON encoder fallback that stores enums by value and dates in ISO format"""
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return str(value)
+
+
+def pseudonymize_id(identifier: str, salt: str) -> str:
+    """Deterministic salted pseudonym, stable across tables for the same salt"""
+    digest = hmac.new(salt.encode("utf-8"), identifier.encode("utf-8"), hashlib.sha256).hexdigest()
+    return f"ANON_{digest[:16]}"
+
+
+def get_age_range(birth_date: date) -> str:
+    """Get age range for anonymization"""
+    today = date.today()
+    age = today.year - birth_date.year
+    if (today.month, today.day) < (birth_date.month, birth_date.day):
+        age -= 1
+    
+    if age < 18:
+        return "under_18"
+    elif age < 25:
+        return "18_24"
+    elif age < 35:
+        return "25_34"
+    elif age < 45:
+        return "35_44"
+    elif age < 55:
+        return "45_54"
+    elif age < 65:
+        return "55_64"
+    else:
+        return "65_plus"
+
+
+def days_since(anchor: Optional[date], timestamp: Optional[str]) -> Optional[int]:
+    """Whole days between an anchor date and an ISO timestamp, used in place of real dates"""
+    if not anchor or not timestamp:
+        return None
+    return (datetime.fromisoformat(timestamp).date() - anchor).days
+
+
+def profile_anchor_date(row: Tuple) -> date:
+    """Treatment start date of a patient_profiles row, falling back to its creation date"""
+    treatment_progress = json.loads(row[6])
+    if treatment_progress.get('treatment_start_date'):
+        return datetime.fromisoformat(treatment_progress['treatment_start_date']).date()
+    return datetime.fromisoformat(row[8]).date()
+
+
+def anonymize_profile_row(row: Tuple, salt: str) -> Dict[str, Any]:
+    """Build a research record straight from a patient_profiles row
+    
+    Only the fields kept for research are decoded; contact details, social
+    history, preferences, notes and raw assessment entries are never loaded.
+    Dates are reported as day offsets from the start of treatment.
+    """
+    
+    (patient_id, demographics_json, clinical_info_json, _social_history_json,
+     _treatment_preferences_json, assessment_history_json, treatment_progress_json,
+     treatment_status, created_date, _last_updated, _notes_json,
+     _consent_status_json, _privacy_settings_json) = row
+    
+    demographics = json.loads(demographics_json)
+    clinical_info = json.loads(clinical_info_json)
+    assessment_history = json.loads(assessment_history_json)
+    treatment_progress = json.loads(treatment_progress_json)
+    anchor = profile_anchor_date(row)
+    
+    total_sessions = treatment_progress.get('total_sessions', 0)
+    sessions_attended = treatment_progress.get('sessions_attended', 0)
+    
+    return {
+        'patient_id': pseudonymize_id(patient_id, salt),
+        'demographics': {
+            'age_range': get_age_range(datetime.fromisoformat(demographics['date_of_birth']).date()),
+            'gender': _parse_enum(Gender, demographics['gender']).value,
+            'region': 'REDACTED'  # Could keep general region if needed
+        },
+        'clinical_info': {
+            'primary_diagnosis': clinical_info.get('primary_diagnosis'),
+            'secondary_diagnoses': clinical_info.get('secondary_diagnoses', []),
+            'current_risk_level': _parse_enum(RiskLevel, clinical_info['current_risk_level']).value
+        },
+        'assessment_history': {
+            'assessment_count': len(assessment_history.get('assessments', [])),
+            'latest_scores': assessment_history.get('latest_scores', {}),
+            'score_trends': {
+                measure: [(days_since(anchor, str(point[0])), point[1]) for point in points]
+                for measure, points in assessment_history.get('score_trends', {}).items()
+            }
+        },
+        'treatment_progress': {
+            'treatment_duration_days': (date.today() - anchor).days,
+            'total_sessions': total_sessions,
+            'sessions_attended': sessions_attended,
+            'attendance_rate': sessions_attended / max(total_sessions, 1),
+            'homework_completion_rate': treatment_progress.get('homework_completion_rate', 0.0),
+            'treatment_phase': treatment_progress.get('current_treatment_phase')
+        },
+        'treatment_status': _parse_enum(TreatmentStatus, treatment_status).value
+    }
+
+
 class PatientProfileManager:
     """Manages patient profiles with database integration"""
     
-    def __init__(self, db_path: str = "data/therapy_system.db"):
+    def __init__(self, db_path: str = "data/therapy_system.db",
+                 archive_manager: Optional[ArchiveManager] = None):
         self.db_path = db_path
         self.logger = logging.getLogger(__name__)
         self._ensure_database_exists()
         self._create_tables()
+        self.archive_manager = archive_manager or get_archive_manager(db_path)
     
     def _ensure_database_exists(self):
         """Ensure database directory and file exist"""
@@ -349,23 +472,9 @@ class PatientProfileManager:
     def _generate_patient_id(self, demographics: Demographics) -> str:
         """Generate unique patient ID"""
         
-        # Create hash from demographic info for uniqueness
-        demographic_string = f"{demographics.first_name}{demographics.last_name}{demographics.date_of_birth}"
-        hash_object = hashlib.sha256(demographic_string.encode())
-        hash_hex = hash_object.hexdigest()[:8]
-        
-        # Combine with timestamp for additional uniqueness
-        timestamp = datetime.now().strftime("%Y%m%d")
-        patient_id = f"PT_{timestamp}_{hash_hex.upper()}"
-        
-        # Ensure uniqueness in database
-        counter = 1
-        base_id = patient_id
-        while self.get_patient_profile(patient_id) is not None:
-            patient_id = f"{base_id}_{counter:02d}"
-            counter += 1
-        
-        return patient_id
+        # Time-ordered and unique without a lookup, so concurrent intakes for
+        # the same demographics cannot race to the same ID
+        return new_id("PT")
     
     def _save_profile_to_db(self, profile: PatientProfile):
         """Save patient profile to database"""
@@ -382,18 +491,18 @@ class PatientProfileManager:
                 ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
             """, (
                 profile.patient_id,
-                json.dumps(asdict(profile.demographics), default=str),
-                json.dumps(asdict(profile.clinical_info), default=str),
-                json.dumps(asdict(profile.social_history), default=str),
-                json.dumps(asdict(profile.treatment_preferences), default=str),
-                json.dumps(asdict(profile.assessment_history), default=str),
-                json.dumps(asdict(profile.treatment_progress), default=str),
+                json.dumps(asdict(profile.demographics), default=_json_default),
+                json.dumps(asdict(profile.clinical_info), default=_json_default),
+                json.dumps(asdict(profile.social_history), default=_json_default),
+                json.dumps(asdict(profile.treatment_preferences), default=_json_default),
+                json.dumps(asdict(profile.assessment_history), default=_json_default),
+                json.dumps(asdict(profile.treatment_progress), default=_json_default),
                 profile.treatment_status.value,
                 profile.created_date.isoformat(),
                 profile.last_updated.isoformat(),
                 json.dumps(profile.notes),
                 json.dumps(profile.consent_status),
-                json.dumps(profile.privacy_settings, default=str)
+                json.dumps(profile.privacy_settings, default=_json_default)
             ))
             
             conn.commit()
@@ -434,11 +543,11 @@ class PatientProfileManager:
         demographics_data['date_of_birth'] = datetime.fromisoformat(demographics_data['date_of_birth']).date()
         
         # Convert enum values
-        demographics_data['gender'] = Gender(demographics_data['gender'])
-        social_history_data['marital_status'] = MaritalStatus(social_history_data['marital_status'])
-        social_history_data['education_level'] = EducationLevel(social_history_data['education_level'])
-        social_history_data['employment_status'] = EmploymentStatus(social_history_data['employment_status'])
-        clinical_info_data['current_risk_level'] = RiskLevel(clinical_info_data['current_risk_level'])
+        demographics_data['gender'] = _parse_enum(Gender, demographics_data['gender'])
+        social_history_data['marital_status'] = _parse_enum(MaritalStatus, social_history_data['marital_status'])
+        social_history_data['education_level'] = _parse_enum(EducationLevel, social_history_data['education_level'])
+        social_history_data['employment_status'] = _parse_enum(EmploymentStatus, social_history_data['employment_status'])
+        clinical_info_data['current_risk_level'] = _parse_enum(RiskLevel, clinical_info_data['current_risk_level'])
         
         # Convert datetime strings
         if clinical_info_data['last_risk_assessment']:
@@ -463,7 +572,7 @@ class PatientProfileManager:
             treatment_preferences=TreatmentPreferences(**treatment_preferences_data),
             assessment_history=AssessmentHistory(**assessment_history_data),
             treatment_progress=TreatmentProgress(**treatment_progress_data),
-            treatment_status=TreatmentStatus(treatment_status),
+            treatment_status=_parse_enum(TreatmentStatus, treatment_status),
             created_date=datetime.fromisoformat(created_date),
             last_updated=datetime.fromisoformat(last_updated),
             notes=json.loads(notes_json) if notes_json else [],
@@ -1051,6 +1160,9 @@ class PatientProfileManager:
             
             export_data['safety_plans'] = safety_plans
         
+        # Sessions and time-series data moved to the cold tier
+        export_data['archived_history'] = self.archive_manager.get_archive_summary(patient_id)
+        
         # Remove sensitive information if not requested
         if not include_sensitive:
             # Redact sensitive demographic info
@@ -1063,71 +1175,44 @@ class PatientProfileManager:
         
         return export_data
     
-    def anonymize_patient_data(self, patient_id: str) -> Dict[str, Any]:
-        """Create anonymized version of patient data for research"""
-        
-        profile = self.get_patient_profile(patient_id)
-        if not profile:
-            return {}
+    def stream_patient_export(self, patient_id: str, output_dir: str = "data/exports",
+                              include_sensitive: bool = False, export_format: str = "ndjson",
+                              compress: bool = True, modules: Optional[List[str]] = None) -> ExportManifest:
+        """Export all of a patient's module data to disk in constant memory
         
-        # Create anonymized copy
-        anonymized = asdict(profile)
+        Unlike export_patient_data, rows are streamed table by table into
+        NDJSON/CSV files with a checksummed manifest, including archived data.
+        """
         
-        # Remove all identifying information
-        anonymized['patient_id'] = f"ANON_{uuid.uuid4().hex[:8]}"
-        anonymized['demographics'] = {
-            'age_range': self._get_age_range(profile.demographics.date_of_birth),
-            'gender': profile.demographics.gender.value,
-            'region': 'REDACTED'  # Could keep general region if needed
-        }
+        exporter = StreamingExporter(
+            db_path=self.db_path,
+            output_dir=output_dir,
+            export_format=export_format,
+            compress=compress,
+            archive_manager=self.archive_manager
+        )
+        return exporter.export_patient(patient_id, modules, include_sensitive)
+    
+    def anonymize_patient_data(self, patient_id: str, salt: Optional[str] = None) -> Dict[str, Any]:
+        """Create anonymized version of patient data for research
         
-        # Keep clinical and treatment data but remove identifying details
-        anonymized['clinical_info']['primary_diagnosis'] = profile.clinical_info.primary_diagnosis
-        anonymized['clinical_info']['secondary_diagnoses'] = profile.clinical_info.secondary_diagnoses
-        anonymized['clinical_info']['current_risk_level'] = profile.clinical_info.current_risk_level.value
+        Pass the same salt across calls to get linkable pseudonyms; without
+        one a random salt is used and the pseudonym cannot be re-derived.
+        """
         
-        # Keep assessment trends and scores
-        anonymized['assessment_history'] = profile.assessment_history.__dict__
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT * FROM patient_profiles WHERE patient_id = ?", (patient_id,))
+            row = cursor.fetchone()
         
-        # Keep treatment progress metrics
-        anonymized['treatment_progress'] = {
-            'treatment_duration_days': (
-                (date.today() - profile.treatment_progress.treatment_start_date).days
-                if profile.treatment_progress.treatment_start_date else None
-            ),
-            'total_sessions': profile.treatment_progress.total_sessions,
-            'sessions_attended': profile.treatment_progress.sessions_attended,
-            'attendance_rate': (
-                profile.treatment_progress.sessions_attended / 
-                max(profile.treatment_progress.total_sessions, 1)
-            ),
-            'homework_completion_rate': profile.treatment_progress.homework_completion_rate,
-            'treatment_phase': profile.treatment_progress.current_treatment_phase
-        }
+        if not row:
+            return {}
         
-        return anonymized
+        return anonymize_profile_row(row, salt or uuid.uuid4().hex)
     
     def _get_age_range(self, birth_date: date) -> str:
         """Get age range for anonymization"""
-        today = date.today()
-        age = today.year - birth_date.year
-        if today < birth_date.replace(year=today.year):
-            age -= 1
-        
-        if age < 18:
-            return "under_18"
-        elif age < 25:
-            return "18_24"
-        elif age < 35:
-            return "25_34"
-        elif age < 45:
-            return "35_44"
-        elif age < 55:
-            return "45_54"
-        elif age < 65:
-            return "55_64"
-        else:
-            return "65_plus"
+        return get_age_range(birth_date)
     
     def delete_patient_profile(self, patient_id: str, permanent: bool = False) -> bool:
         """Delete or deactivate patient profile"""
@@ -1147,6 +1232,9 @@ class PatientProfileManager:
                     
                     conn.commit()
                 
+                # Archived data must go too
+                self.archive_manager.purge_patient(patient_id)
+                
                 self.logger.info(f"Permanently deleted patient profile: {patient_id}")
             else:
                 # Soft deletion - deactivate
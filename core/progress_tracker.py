@@ -15,6 +15,10 @@ import logging
 import numpy as np
 from pathlib import Path
 
+from utilities.archive_manager import ArchiveManager, get_archive_manager
+from utilities.data_storage import WritePipeline, WriteEvent, RowWrite, WriteOperation, get_write_pipeline
+from utilities.identifiers import new_id
+
 
 class ProgressMetricType(Enum):
     """Types of progress metrics"""
@@ -152,11 +156,15 @@ class ProgressSummary:
 class ProgressTracker:
     """Comprehensive progress tracking and analytics system"""
     
-    def __init__(self, db_path: str = "data/therapy_system.db"):
+    def __init__(self, db_path: str = "data/therapy_system.db",
+                 archive_manager: Optional[ArchiveManager] = None,
+                 write_pipeline: Optional[WritePipeline] = None):
         self.db_path = db_path
         self.logger = logging.getLogger(__name__)
         self._ensure_database_exists()
         self._create_tables()
+        self.archive_manager = archive_manager or get_archive_manager(db_path)
+        self.write_pipeline = write_pipeline or get_write_pipeline(db_path)
         
         # Configuration
         self.reliable_change_indices = self._initialize_rci_values()
@@ -533,39 +541,25 @@ class ProgressTracker:
         trends = []
         
         try:
+            start_date = datetime.now() - timedelta(days=days_lookback)
+            
             with sqlite3.connect(self.db_path) as conn:
                 cursor = conn.cursor()
                 
-                # Get metrics to analyze
-                if metric_type:
-                    metrics = [metric_type]
-                else:
-                    cursor.execute("""
-                        SELECT DISTINCT metric_type FROM progress_data 
-                        WHERE patient_id = ? AND timestamp >= ?
-                    """, (patient_id, (datetime.now() - timedelta(days=days_lookback)).isoformat()))
-                    metrics = [ProgressMetricType(row[0]) for row in cursor.fetchall()]
+                # Get data points for every metric in the window, hot and archived
+                series = self._get_metric_series(cursor, patient_id, start_date, metric_type)
+            
+            for metric_value, data_points in series.items():
+                if len(data_points) < 2:
+                    continue
                 
-                for metric in metrics:
-                    # Get data points for this metric
-                    cursor.execute("""
-                        SELECT value, timestamp FROM progress_data
-                        WHERE patient_id = ? AND metric_type = ? AND timestamp >= ?
-                        ORDER BY timestamp
-                    """, (patient_id, metric.value, (datetime.now() - timedelta(days=days_lookback)).isoformat()))
-                    
-                    data_points = cursor.fetchall()
-                    
-                    if len(data_points) < 2:
-                        continue
+                # Calculate trend
+                trend = self._calculate_trend_analysis(ProgressMetricType(metric_value), data_points)
+                if trend:
+                    trends.append(trend)
                     
-                    # Calculate trend
-                    trend = self._calculate_trend_analysis(metric, data_points)
-                    if trend:
-                        trends.append(trend)
-                        
-                        # Cache trend in database
-                        self._cache_trend_calculation(patient_id, trend)
+                    # Cache trend in database
+                    self._cache_trend_calculation(patient_id, trend)
             
             return trends
             
@@ -573,6 +567,40 @@ class ProgressTracker:
             self.logger.error(f"Failed to calculate progress trends: {e}")
             return []
     
+    def _get_metric_series(self, cursor: sqlite3.Cursor, patient_id: str, start_date: datetime,
+                           metric_type: Optional[ProgressMetricType] = None) -> Dict[str, List[Tuple[float, str]]]:
+        """(value, timestamp) points per metric since start_date, merging archived data"""
+        
+        query = """
+            SELECT metric_type, value, timestamp FROM progress_data
+            WHERE patient_id = ? AND timestamp >= ?
+        """
+        params = [patient_id, start_date.isoformat()]
+        
+        if metric_type:
+            query += " AND metric_type = ?"
+            params.append(metric_type.value)
+        
+        cursor.execute(query + " ORDER BY timestamp", params)
+        
+        series: Dict[str, List[Tuple[float, str]]] = {}
+        for metric_value, value, timestamp in cursor.fetchall():
+            series.setdefault(metric_value, []).append((value, timestamp))
+        
+        # Windows reaching past the archive horizon also read the cold tier
+        if self.archive_manager.has_archived_data("progress_data", patient_id, start_date):
+            archived: Dict[str, List[Tuple[float, str]]] = {}
+            for row in self.archive_manager.iter_archived_rows("progress_data", patient_id, start=start_date):
+                if metric_type and row[2] != metric_type.value:
+                    continue
+                archived.setdefault(row[2], []).append((row[3], row[4]))
+            
+            # Archived points are always older than hot ones
+            for metric_value, points in archived.items():
+                series[metric_value] = points + series.get(metric_value, [])
+        
+        return series
+    
     def _calculate_trend_analysis(self, metric_type: ProgressMetricType, 
                                  data_points: List[Tuple[float, str]]) -> Optional[ProgressTrend]:
         """Calculate statistical trend analysis"""
@@ -773,7 +801,7 @@ class ProgressTracker:
         """Create progress alert"""
         
         try:
-            alert_id = f"ALERT_{patient_id}_{metric_type.value}_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+            alert_id = f"ALERT_{patient_id}_{metric_type.value}_{new_id()}"
             
             alert = ProgressAlert(
                 alert_id=alert_id,
@@ -785,27 +813,23 @@ class ProgressTracker:
                 created_date=datetime.now()
             )
             
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.cursor()
-                
-                cursor.execute("""
-                    INSERT INTO progress_alerts (
-                        alert_id, patient_id, alert_level, metric_type, description,
-                        recommendations, created_date, acknowledged, resolved
-                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-                """, (
-                    alert.alert_id,
-                    alert.patient_id,
-                    alert.alert_level.value,
-                    alert.metric_type.value,
-                    alert.description,
-                    json.dumps(alert.recommendations),
-                    alert.created_date.isoformat(),
-                    alert.acknowledged,
-                    alert.resolved
-                ))
-                
-                conn.commit()
+            self.write_pipeline.record(WriteEvent(
+                event_type="progress_alert_created",
+                patient_id=patient_id,
+                source="progress_tracker",
+                durable=alert_level in (AlertLevel.ORANGE, AlertLevel.RED),
+                writes=[RowWrite(WriteOperation.INSERT, "progress_alerts", values={
+                    "alert_id": alert.alert_id,
+                    "patient_id": alert.patient_id,
+                    "alert_level": alert.alert_level.value,
+                    "metric_type": alert.metric_type.value,
+                    "description": alert.description,
+                    "recommendations": json.dumps(alert.recommendations),
+                    "created_date": alert.created_date.isoformat(),
+                    "acknowledged": alert.acknowledged,
+                    "resolved": alert.resolved
+                })]
+            ))
             
             self.logger.info(f"Created progress alert: {alert_id}")
             
@@ -946,14 +970,14 @@ class ProgressTracker:
             with sqlite3.connect(self.db_path) as conn:
                 cursor = conn.cursor()
                 
-                start_date = (datetime.now() - timedelta(days=days_lookback)).isoformat()
+                start_date = datetime.now() - timedelta(days=days_lookback)
                 
-                cursor.execute("""
-                    SELECT AVG(value) FROM progress_data
-                    WHERE patient_id = ? AND metric_type = ? AND timestamp >= ?
-                """, (patient_id, ProgressMetricType.HOMEWORK_COMPLIANCE.value, start_date))
+                series = self._get_metric_series(
+                    cursor, patient_id, start_date, ProgressMetricType.HOMEWORK_COMPLIANCE
+                )
+                values = [point[0] for point in series.get(ProgressMetricType.HOMEWORK_COMPLIANCE.value, [])]
                 
-                result = cursor.fetchone()[0]
+                result = statistics.mean(values) if values else None
                 return (result * 100) if result else 0.0
                 
         except Exception as e:
@@ -967,15 +991,12 @@ class ProgressTracker:
             with sqlite3.connect(self.db_path) as conn:
                 cursor = conn.cursor()
                 
-                start_date = (datetime.now() - timedelta(days=days_lookback)).isoformat()
-                
-                cursor.execute("""
-                    SELECT value, timestamp FROM progress_data
-                    WHERE patient_id = ? AND metric_type = ? AND timestamp >= ?
-                    ORDER BY timestamp
-                """, (patient_id, ProgressMetricType.RISK_LEVEL.value, start_date))
+                start_date = datetime.now() - timedelta(days=days_lookback)
                 
-                risk_data = cursor.fetchall()
+                series = self._get_metric_series(
+                    cursor, patient_id, start_date, ProgressMetricType.RISK_LEVEL
+                )
+                risk_data = series.get(ProgressMetricType.RISK_LEVEL.value, [])
                 
                 if len(risk_data) < 2:
                     return TrendDirection.INSUFFICIENT_DATA
@@ -1087,6 +1108,7 @@ class ProgressTracker:
         alerts = []
         
         try:
+            self.write_pipeline.flush()
             with sqlite3.connect(self.db_path) as conn:
                 cursor = conn.cursor()
                 
@@ -1121,6 +1143,7 @@ class ProgressTracker:
         """Resolve progress alert"""
         
         try:
+            self.write_pipeline.flush()
             with sqlite3.connect(self.db_path) as conn:
                 cursor = conn.cursor()
                 
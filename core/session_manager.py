@@ -6,14 +6,17 @@ Handles session scheduling, structure, flow, and documentation
 
 import sqlite3
 import json
-import uuid
-from typing import Dict, List, Optional, Any, Union, Tuple
+from typing import Dict, List, Optional, Any, Union, Tuple, Callable
 from dataclasses import dataclass, field, asdict
 from datetime import datetime, date, timedelta
 from enum import Enum
 import logging
 from pathlib import Path
 
+from utilities.archive_manager import ArchiveManager, get_archive_manager
+from utilities.data_storage import WritePipeline, WriteEvent, RowWrite, WriteOperation, get_write_pipeline
+from utilities.identifiers import new_id
+
 
 class SessionType(Enum):
     """Types of therapy sessions"""
@@ -143,15 +146,26 @@ class TherapySession:
 class SessionManager:
     """Comprehensive session management system"""
     
-    def __init__(self, db_path: str = "data/therapy_system.db"):
+    def __init__(self, db_path: str = "data/therapy_system.db",
+                 archive_manager: Optional[ArchiveManager] = None,
+                 write_pipeline: Optional[WritePipeline] = None):
         self.db_path = db_path
         self.logger = logging.getLogger(__name__)
         self._ensure_database_exists()
         self._create_tables()
         
+        # Completed sessions past the archive horizon are read from the cold tier
+        self.archive_manager = archive_manager or get_archive_manager(db_path)
+        
+        # Clinical notes go through the shared group-commit writer
+        self.write_pipeline = write_pipeline or get_write_pipeline(db_path)
+        
         # Initialize templates and resources
         self.session_templates = self._initialize_session_templates()
         self.homework_templates = self._initialize_homework_templates()
+        
+        # Called with (session, new_phase) after each successful phase advance
+        self.phase_listeners: List[Callable[[TherapySession, SessionPhase], None]] = []
     
     def _ensure_database_exists(self):
         """Ensure database directory and file exist"""
@@ -486,7 +500,7 @@ class SessionManager:
                       therapy_modality: str, treatment_phase: str) -> TherapySession:
         """Create new therapy session"""
         
-        session_id = f"{patient_id}_SESSION_{session_number:03d}_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+        session_id = f"{patient_id}_SESSION_{session_number:03d}_{new_id()}"
         
         # Generate session goals
         session_goals = self._generate_session_goals(therapy_modality, treatment_phase, session_number)
@@ -516,7 +530,7 @@ class SessionManager:
         # Phase-specific goals
         if treatment_phase == "assessment":
             goals.append(SessionGoal(
-                goal_id=f"GOAL_ASSESS_{uuid.uuid4().hex[:8]}",
+                goal_id=new_id("GOAL_ASSESS"),
                 description="Complete comprehensive assessment",
                 priority=1,
                 target_phase=SessionPhase.MAIN_WORK,
@@ -524,7 +538,7 @@ class SessionManager:
             ))
         elif treatment_phase == "stabilization":
             goals.append(SessionGoal(
-                goal_id=f"GOAL_STAB_{uuid.uuid4().hex[:8]}",
+                goal_id=new_id("GOAL_STAB"),
                 description="Establish safety and stability",
                 priority=1,
                 target_phase=SessionPhase.MAIN_WORK,
@@ -532,7 +546,7 @@ class SessionManager:
             ))
         elif treatment_phase == "working":
             goals.append(SessionGoal(
-                goal_id=f"GOAL_WORK_{uuid.uuid4().hex[:8]}",
+                goal_id=new_id("GOAL_WORK"),
                 description="Practice core therapeutic skills",
                 priority=1,
                 target_phase=SessionPhase.MAIN_WORK,
@@ -542,7 +556,7 @@ class SessionManager:
         # Session number specific goals
         if session_number == 1:
             goals.append(SessionGoal(
-                goal_id=f"GOAL_INTRO_{uuid.uuid4().hex[:8]}",
+                goal_id=new_id("GOAL_INTRO"),
                 description="Establish therapeutic relationship",
                 priority=2,
                 target_phase=SessionPhase.OPENING,
@@ -567,7 +581,7 @@ class SessionManager:
             
             # Add session start note
             start_note = SessionNote(
-                note_id=f"NOTE_{session_id}_START_{datetime.now().strftime('%H%M%S')}",
+                note_id=f"NOTE_{session_id}_START_{new_id()}",
                 note_type="session_start",
                 content="Session started",
                 timestamp=datetime.now()
@@ -597,7 +611,7 @@ class SessionManager:
                 
                 # Add phase completion note
                 phase_note = SessionNote(
-                    note_id=f"NOTE_{session_id}_{session.current_phase.value}_{datetime.now().strftime('%H%M%S')}",
+                    note_id=f"NOTE_{session_id}_{session.current_phase.value}_{new_id()}",
                     note_type="phase_completion",
                     content=f"Completed {session.current_phase.value} phase. {phase_notes}",
                     timestamp=datetime.now(),
@@ -612,12 +626,52 @@ class SessionManager:
             self._update_session_in_db(session)
             
             self.logger.info(f"Advanced session {session_id} to phase: {next_phase.value}")
+            self._notify_phase_listeners(session, next_phase)
             return True
             
         except Exception as e:
             self.logger.error(f"Failed to advance session phase: {e}")
             return False
     
+    def add_phase_listener(self, listener: Callable[[TherapySession, SessionPhase], None]):
+        """Register a callback for phase advances (e.g. speculative content warming)"""
+        self.phase_listeners.append(listener)
+    
+    def _notify_phase_listeners(self, session: TherapySession, phase: SessionPhase):
+        """Listener failures are logged and never fail the phase advance"""
+        for listener in self.phase_listeners:
+            try:
+                listener(session, phase)
+            except Exception as e:
+                self.logger.error(f"Phase listener failed: {e}")
+    
+    def get_session_template(self, session: TherapySession) -> Dict[str, Any]:
+        """Structure template that applies to a session"""
+        
+        if session.session_type == SessionType.CRISIS:
+            return self.session_templates["CRISIS_INTERVENTION"]
+        if session.therapy_modality.upper().startswith("DBT"):
+            return self.session_templates["DBT_SKILLS"]
+        return self.session_templates["CBT_STANDARD"]
+    
+    def get_phase_template(self, session: TherapySession, phase: SessionPhase) -> Optional[Dict[str, Any]]:
+        """Template entry for a phase, if the session's template includes it"""
+        
+        for phase_template in self.get_session_template(session)["phases"]:
+            if phase_template["phase"] == phase:
+                return phase_template
+        return None
+    
+    def predict_next_phase(self, session: TherapySession,
+                           current_phase: SessionPhase) -> Optional[Dict[str, Any]]:
+        """Template entry for the phase that normally follows current_phase"""
+        
+        phases = self.get_session_template(session)["phases"]
+        for index, phase_template in enumerate(phases[:-1]):
+            if phase_template["phase"] == current_phase:
+                return phases[index + 1]
+        return None
+    
     def add_intervention(self, session_id: str, intervention_type: InterventionType,
                         notes: str = "", phase: Optional[SessionPhase] = None) -> bool:
         """Add intervention to session"""
@@ -633,7 +687,7 @@ class SessionManager:
             
             # Add intervention note
             intervention_note = SessionNote(
-                note_id=f"NOTE_{session_id}_INT_{datetime.now().strftime('%H%M%S')}",
+                note_id=f"NOTE_{session_id}_INT_{new_id()}",
                 note_type="intervention",
                 content=f"Applied {intervention_type.value}: {notes}",
                 timestamp=datetime.now(),
@@ -662,7 +716,7 @@ class SessionManager:
                 return False
             
             note = SessionNote(
-                note_id=f"NOTE_{session_id}_{note_type}_{datetime.now().strftime('%H%M%S')}",
+                note_id=f"NOTE_{session_id}_{note_type}_{new_id()}",
                 note_type=note_type,
                 content=content,
                 timestamp=datetime.now(),
@@ -682,7 +736,30 @@ class SessionManager:
                 })
             
             session.last_updated = datetime.now()
-            self._update_session_in_db(session)
+            
+            # Risk notes wait for a fully synced commit before returning; others commit in the background
+            self.write_pipeline.record(WriteEvent(
+                event_type="session_note_added",
+                patient_id=session.patient_id,
+                source="session_manager",
+                durable=bool(risk_indicators) or follow_up_needed,
+                writes=[
+                    RowWrite(WriteOperation.UPSERT, "session_notes", values={
+                        "note_id": note.note_id,
+                        "session_id": session_id,
+                        "note_type": note.note_type,
+                        "content": note.content,
+                        "timestamp": note.timestamp.isoformat(),
+                        "phase": note.phase.value if note.phase else None,
+                        "risk_indicators": json.dumps(note.risk_indicators),
+                        "follow_up_needed": note.follow_up_needed
+                    }),
+                    RowWrite(WriteOperation.UPDATE, "therapy_sessions", values={
+                        "risk_assessment": json.dumps(session.risk_assessment),
+                        "last_updated": session.last_updated.isoformat()
+                    }, where={"session_id": session_id})
+                ]
+            ))
             
             self.logger.info(f"Added session note: {note_type} to session {session_id}")
             return True
@@ -708,7 +785,7 @@ class SessionManager:
             
             # Create homework assignment
             assignment = HomeworkAssignment(
-                assignment_id=f"HW_{session_id}_{homework_template_id}_{datetime.now().strftime('%H%M%S')}",
+                assignment_id=f"HW_{session_id}_{homework_template_id}_{new_id()}",
                 title=template.title,
                 description=template.description,
                 instructions=custom_instructions or template.instructions,
@@ -722,7 +799,7 @@ class SessionManager:
             
             # Add homework assignment note
             hw_note = SessionNote(
-                note_id=f"NOTE_{session_id}_HW_{datetime.now().strftime('%H%M%S')}",
+                note_id=f"NOTE_{session_id}_HW_{new_id()}",
                 note_type="homework_assigned",
                 content=f"Assigned homework: {assignment.title}. Due: {assignment.due_date}",
                 timestamp=datetime.now(),
@@ -787,7 +864,7 @@ class SessionManager:
             
             # Add session completion note
             completion_note = SessionNote(
-                note_id=f"NOTE_{session_id}_COMPLETE_{datetime.now().strftime('%H%M%S')}",
+                note_id=f"NOTE_{session_id}_COMPLETE_{new_id()}",
                 note_type="session_completion",
                 content=f"Session completed. Summary: {session_summary}",
                 timestamp=datetime.now()
@@ -812,6 +889,7 @@ class SessionManager:
         """Retrieve session by ID"""
         
         try:
+            self.write_pipeline.flush()
             with sqlite3.connect(self.db_path) as conn:
                 cursor = conn.cursor()
                 
@@ -820,78 +898,110 @@ class SessionManager:
                 session_row = cursor.fetchone()
                 
                 if not session_row:
-                    return None
-                
-                # Parse session data
-                session = self._row_to_session(session_row)
+                    # Fall back to the cold tier for archived sessions
+                    return self._get_archived_session(session_id)
                 
-                # Get session goals
                 cursor.execute("SELECT * FROM session_goals WHERE session_id = ?", (session_id,))
-                for goal_row in cursor.fetchall():
-                    goal = SessionGoal(
-                        goal_id=goal_row[0],
-                        description=goal_row[2],
-                        priority=goal_row[3],
-                        target_phase=SessionPhase(goal_row[4]),
-                        success_criteria=json.loads(goal_row[5]) if goal_row[5] else [],
-                        achieved=bool(goal_row[6]),
-                        notes=goal_row[7] or ""
-                    )
-                    session.session_goals.append(goal)
+                goal_rows = cursor.fetchall()
                 
-                # Get session notes
                 cursor.execute("SELECT * FROM session_notes WHERE session_id = ?", (session_id,))
-                for note_row in cursor.fetchall():
-                    note = SessionNote(
-                        note_id=note_row[0],
-                        note_type=note_row[2],
-                        content=note_row[3],
-                        timestamp=datetime.fromisoformat(note_row[4]),
-                        phase=SessionPhase(note_row[5]) if note_row[5] else None,
-                        risk_indicators=json.loads(note_row[6]) if note_row[6] else [],
-                        follow_up_needed=bool(note_row[7])
-                    )
-                    session.session_notes.append(note)
+                note_rows = cursor.fetchall()
                 
-                # Get homework assignments
                 cursor.execute("SELECT * FROM homework_assignments WHERE session_id = ?", (session_id,))
-                for hw_row in cursor.fetchall():
-                    assignment = HomeworkAssignment(
-                        assignment_id=hw_row[0],
-                        title=hw_row[2],
-                        description=hw_row[3],
-                        instructions=json.loads(hw_row[4]) if hw_row[4] else [],
-                        due_date=datetime.fromisoformat(hw_row[5]).date() if hw_row[5] else None,
-                        estimated_time_minutes=hw_row[6] or 30,
-                        difficulty_level=hw_row[7] or "moderate",
-                        therapeutic_rationale=hw_row[8] or ""
-                    )
-                    session.homework_assignments.append(assignment)
+                hw_rows = cursor.fetchall()
                 
-                # Get session metrics
                 cursor.execute("SELECT * FROM session_metrics WHERE session_id = ?", (session_id,))
                 metrics_row = cursor.fetchone()
-                if metrics_row:
-                    session.session_metrics = SessionMetrics(
-                        start_time=datetime.fromisoformat(metrics_row[1]),
-                        end_time=datetime.fromisoformat(metrics_row[2]) if metrics_row[2] else None,
-                        duration_minutes=metrics_row[3],
-                        patient_engagement_score=metrics_row[4],
-                        mood_pre_session=metrics_row[5],
-                        mood_post_session=metrics_row[6],
-                        anxiety_pre_session=metrics_row[7],
-                        anxiety_post_session=metrics_row[8],
-                        homework_completion_rate=metrics_row[9],
-                        goals_achieved=metrics_row[10] or 0,
-                        total_goals=metrics_row[11] or 0
-                    )
                 
-                return session
+            return self._assemble_session(session_row, goal_rows, note_rows, hw_rows, metrics_row)
                 
         except Exception as e:
             self.logger.error(f"Failed to retrieve session: {e}")
             return None
     
+    def _get_archived_session(self, session_id: str) -> Optional[TherapySession]:
+        """Rebuild an archived session from its cold-tier rows"""
+        
+        archived_rows = self.archive_manager.get_archived_session_rows(session_id)
+        if not archived_rows or not archived_rows.get("therapy_sessions"):
+            return None
+        
+        metrics_rows = archived_rows.get("session_metrics", [])
+        
+        return self._assemble_session(
+            archived_rows["therapy_sessions"][0],
+            archived_rows.get("session_goals", []),
+            archived_rows.get("session_notes", []),
+            archived_rows.get("homework_assignments", []),
+            metrics_rows[0] if metrics_rows else None
+        )
+    
+    def _assemble_session(self, session_row: Tuple, goal_rows: List[Tuple],
+                          note_rows: List[Tuple], hw_rows: List[Tuple],
+                          metrics_row: Optional[Tuple]) -> TherapySession:
+        """Build a TherapySession from its table rows"""
+        
+        # Parse session data
+        session = self._row_to_session(session_row)
+        
+        # Session goals
+        for goal_row in goal_rows:
+            goal = SessionGoal(
+                goal_id=goal_row[0],
+                description=goal_row[2],
+                priority=goal_row[3],
+                target_phase=SessionPhase(goal_row[4]),
+                success_criteria=json.loads(goal_row[5]) if goal_row[5] else [],
+                achieved=bool(goal_row[6]),
+                notes=goal_row[7] or ""
+            )
+            session.session_goals.append(goal)
+        
+        # Session notes
+        for note_row in note_rows:
+            note = SessionNote(
+                note_id=note_row[0],
+                note_type=note_row[2],
+                content=note_row[3],
+                timestamp=datetime.fromisoformat(note_row[4]),
+                phase=SessionPhase(note_row[5]) if note_row[5] else None,
+                risk_indicators=json.loads(note_row[6]) if note_row[6] else [],
+                follow_up_needed=bool(note_row[7])
+            )
+            session.session_notes.append(note)
+        
+        # Homework assignments
+        for hw_row in hw_rows:
+            assignment = HomeworkAssignment(
+                assignment_id=hw_row[0],
+                title=hw_row[2],
+                description=hw_row[3],
+                instructions=json.loads(hw_row[4]) if hw_row[4] else [],
+                due_date=datetime.fromisoformat(hw_row[5]).date() if hw_row[5] else None,
+                estimated_time_minutes=hw_row[6] or 30,
+                difficulty_level=hw_row[7] or "moderate",
+                therapeutic_rationale=hw_row[8] or ""
+            )
+            session.homework_assignments.append(assignment)
+        
+        # Session metrics
+        if metrics_row:
+            session.session_metrics = SessionMetrics(
+                start_time=datetime.fromisoformat(metrics_row[1]),
+                end_time=datetime.fromisoformat(metrics_row[2]) if metrics_row[2] else None,
+                duration_minutes=metrics_row[3],
+                patient_engagement_score=metrics_row[4],
+                mood_pre_session=metrics_row[5],
+                mood_post_session=metrics_row[6],
+                anxiety_pre_session=metrics_row[7],
+                anxiety_post_session=metrics_row[8],
+                homework_completion_rate=metrics_row[9],
+                goals_achieved=metrics_row[10] or 0,
+                total_goals=metrics_row[11] or 0
+            )
+        
+        return session
+    
     def _row_to_session(self, row: Tuple) -> TherapySession:
         """Convert database row to TherapySession object"""
         
@@ -927,6 +1037,8 @@ class SessionManager:
     def _save_session_to_db(self, session: TherapySession):
         """Save session to database"""
         
+        # Queued note events must not land after, and overwrite, this save
+        self.write_pipeline.flush()
         with sqlite3.connect(self.db_path) as conn:
             cursor = conn.cursor()
             
@@ -961,6 +1073,7 @@ class SessionManager:
     def _update_session_in_db(self, session: TherapySession):
         """Update existing session in database"""
         
+        self.write_pipeline.flush()
         with sqlite3.connect(self.db_path) as conn:
             cursor = conn.cursor()
             
@@ -1062,8 +1175,9 @@ class SessionManager:
             
             conn.commit()
     
-    def get_patient_sessions(self, patient_id: str, limit: Optional[int] = None) -> List[TherapySession]:
-        """Get all sessions for a patient"""
+    def get_patient_sessions(self, patient_id: str, limit: Optional[int] = None,
+                             include_archived: bool = True) -> List[TherapySession]:
+        """Get all sessions for a patient, including archived ones"""
         
         sessions = []
         
@@ -1072,7 +1186,7 @@ class SessionManager:
                 cursor = conn.cursor()
                 
                 query = """
-                    SELECT session_id FROM therapy_sessions 
+                    SELECT session_id, session_number FROM therapy_sessions 
                     WHERE patient_id = ? 
                     ORDER BY session_number DESC
                 """
@@ -1081,11 +1195,22 @@ class SessionManager:
                     query += f" LIMIT {limit}"
                 
                 cursor.execute(query, (patient_id,))
-                
-                for row in cursor.fetchall():
-                    session = self.get_session(row[0])
-                    if session:
-                        sessions.append(session)
+                session_refs = cursor.fetchall()
+            
+            # Merge in summary rows for sessions that live in the cold tier
+            if include_archived:
+                session_refs.extend(
+                    (archived['session_id'], archived['session_number'])
+                    for archived in self.archive_manager.get_archived_sessions(patient_id)
+                )
+                session_refs.sort(key=lambda ref: ref[1], reverse=True)
+                if limit:
+                    session_refs = session_refs[:limit]
+            
+            for session_id, _ in session_refs:
+                session = self.get_session(session_id)
+                if session:
+                    sessions.append(session)
                 
             return sessions
             
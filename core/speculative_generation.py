@@ -0,0 +1,327 @@
+"""
+Speculative Generation Module
+Background pre-generation of predictable session-phase content
+Warms the opening of the next session phase while the current one is in progress
+"""
+
+import time
+import asyncio
+import logging
+from typing import Dict, List, Optional, Any, Callable, Tuple
+from dataclasses import dataclass, field, asdict
+
+from core.gemini_interface import (
+    GeminiTherapyInterface, ConversationContext, ConversationMode, AIResponse,
+    BatchGenerationRequest, RequestPriority
+)
+from core.session_manager import SessionManager, TherapySession, SessionPhase
+
+
+@dataclass
+class SpeculationMetrics:
+    """Counters for tuning speculative pre-generation"""
+    started: int = 0
+    completed: int = 0
+    hits: int = 0
+    inflight_hits: int = 0  # served by awaiting a speculation still in progress
+    misses: int = 0
+    wasted: int = 0  # generated or started but never served
+    cancelled: int = 0
+    budget_skips: int = 0
+    risk_skips: int = 0
+    tokens_spent: int = 0
+    tokens_wasted: int = 0
+    
+    @property
+    def hit_rate(self) -> float:
+        served = self.hits + self.inflight_hits + self.misses
+        return (self.hits + self.inflight_hits) / served if served else 0.0
+    
+    @property
+    def waste_rate(self) -> float:
+        return self.wasted / self.started if self.started else 0.0
+
+
+@dataclass
+class _Speculation:
+    """One warmed (or warming) phase opening"""
+    session_id: str
+    phase: SessionPhase
+    task: 'asyncio.Task'
+    started_at: float = field(default_factory=time.time)
+
+
+class SpeculativePhaseGenerator:
+    """Pre-generates the next phase's opening when a session advances
+    
+    Registered as a SessionManager phase listener. On each advance it looks up
+    the phase that normally follows in the session's template and generates
+    its opening at batch priority, so live turns keep precedence. Speculations
+    for phases the session did not reach are cancelled on the next advance.
+    Speculation stops while the token budget for the current hour is spent or
+    the session carries risk indicators. get_phase_opening serves the warmed
+    response when it matches the phase the session actually reached.
+    """
+    
+    def __init__(self, interface: GeminiTherapyInterface, session_manager: SessionManager,
+                 token_budget_per_hour: int = 20000, max_inflight: int = 2,
+                 ttl_seconds: float = 1800,
+                 context_provider: Optional[Callable[[TherapySession], ConversationContext]] = None,
+                 loop: Optional[asyncio.AbstractEventLoop] = None):
+        self.interface = interface
+        self.session_manager = session_manager
+        self.token_budget_per_hour = token_budget_per_hour
+        self.max_inflight = max_inflight
+        self.ttl_seconds = ttl_seconds
+        self.context_provider = context_provider or self._default_context
+        self.loop = loop
+        self.logger = logging.getLogger(__name__)
+        
+        self.metrics = SpeculationMetrics()
+        self._speculations: Dict[Tuple[str, SessionPhase], _Speculation] = {}
+        self._budget_window_start = time.time()
+        self._budget_spent = 0
+    
+    def attach(self):
+        """Start listening for phase advances"""
+        self.session_manager.add_phase_listener(self.on_phase_advanced)
+    
+    # ========================================================================
+    # SPECULATION
+    # ========================================================================
+    
+    def on_phase_advanced(self, session: TherapySession, phase: SessionPhase):
+        """Phase listener: warm the opening of the phase after `phase`"""
+        
+        # Anything warmed for a phase other than the one just reached is stale;
+        # the one for this phase is left for get_phase_opening to serve
+        for key in [key for key in self._speculations if key[0] == session.session_id and key[1] != phase]:
+            self._discard(key, reason="superseded")
+        
+        next_phase = self.session_manager.predict_next_phase(session, phase)
+        if next_phase is None or (session.session_id, next_phase['phase']) in self._speculations:
+            return
+        
+        if session.risk_assessment.get("indicators_present"):
+            self.metrics.risk_skips += 1
+            return
+        
+        if not self._budget_available():
+            self.metrics.budget_skips += 1
+            return
+        
+        loop = self._target_loop()
+        if loop is None:
+            return
+        
+        context = self.context_provider(session)
+        request = BatchGenerationRequest(
+            request_id=f"SPEC_{session.session_id}_{next_phase['phase'].value}",
+            context=context,
+            user_message=self._phase_opening_message(next_phase),
+            mode=ConversationMode.THERAPY_SESSION,
+            job_type="phase_opening"
+        )
+        
+        def schedule():
+            task = loop.create_task(self._speculate(request))
+            self._speculations[(session.session_id, next_phase['phase'])] = _Speculation(
+                session.session_id, next_phase['phase'], task
+            )
+            self.metrics.started += 1
+        
+        if self._in_loop(loop):
+            schedule()
+        else:
+            loop.call_soon_threadsafe(schedule)
+    
+    async def _speculate(self, request: BatchGenerationRequest) -> Optional[AIResponse]:
+        """Generate at batch priority; unsafe results are dropped"""
+        
+        response = await self.interface._generate_batch_item(request)
+        self.metrics.completed += 1
+        self.metrics.tokens_spent += response.tokens_used
+        self._budget_spent += response.tokens_used
+        
+        if response.safety_flags or response.risk_indicators:
+            return None
+        return response
+    
+    def _phase_opening_message(self, phase_template: Dict[str, Any]) -> str:
+        prompts = "; ".join(phase_template.get("prompts", []))
+        objectives = ", ".join(phase_template.get("objectives", []))
+        return (
+            f"[Session moving to the {phase_template['phase'].value.replace('_', ' ')} phase] "
+            f"Open this phase in one or two warm sentences. Objectives: {objectives}. "
+            f"Suggested questions: {prompts}"
+        )
+    
+    def _default_context(self, session: TherapySession) -> ConversationContext:
+        return ConversationContext(
+            patient_id=session.patient_id,
+            session_id=session.session_id,
+            therapy_modality=session.therapy_modality,
+            session_number=session.session_number,
+            treatment_phase=session.treatment_phase,
+            risk_level="elevated" if session.risk_assessment.get("indicators_present") else "low"
+        )
+    
+    def _budget_available(self) -> bool:
+        """Hourly token budget and in-flight cap"""
+        
+        now = time.time()
+        if now - self._budget_window_start >= 3600:
+            self._budget_window_start = now
+            self._budget_spent = 0
+        
+        inflight = sum(1 for spec in self._speculations.values() if not spec.task.done())
+        return self._budget_spent < self.token_budget_per_hour and inflight < self.max_inflight
+    
+    def _target_loop(self) -> Optional[asyncio.AbstractEventLoop]:
+        try:
+            return asyncio.get_running_loop()
+        except RuntimeError:
+            if self.loop is None or self.loop.is_closed():
+                self.logger.debug("No event loop available for speculative generation")
+                return None
+            return self.loop
+    
+    def _in_loop(self, loop: asyncio.AbstractEventLoop) -> bool:
+        try:
+            return asyncio.get_running_loop() is loop
+        except RuntimeError:
+            return False
+    
+    # ========================================================================
+    # SERVING
+    # ========================================================================
+    
+    async def get_phase_opening(self, session: TherapySession, phase: SessionPhase,
+                                context: Optional[ConversationContext] = None) -> AIResponse:
+        """Opening for the phase the session just reached, from the speculation if possible
+        
+        The served opening is added to the conversation history and transcript
+        as an assistant turn, so the model remembers what the patient was shown.
+        """
+        
+        context = context or self.context_provider(session)
+        response = await self._serve_phase_opening(session, phase, context)
+        self.interface.record_assistant_turn(context, response.content)
+        return response
+    
+    async def _serve_phase_opening(self, session: TherapySession, phase: SessionPhase,
+                                   context: ConversationContext) -> AIResponse:
+        speculation = self._speculations.pop((session.session_id, phase), None)
+        
+        if speculation is not None and context.risk_level.lower() == "low":
+            fresh = time.time() - speculation.started_at <= self.ttl_seconds
+            was_ready = speculation.task.done()
+            try:
+                response = await speculation.task if fresh else None
+            except Exception as e:
+                self.logger.error(f"Speculative generation failed: {e}")
+                response = None
+            
+            if response is not None:
+                if was_ready:
+                    self.metrics.hits += 1
+                else:
+                    self.metrics.inflight_hits += 1
+                return response
+            self._count_waste(speculation)
+        elif speculation is not None:
+            self._discard_speculation(speculation, reason="risk escalated")
+        
+        # Miss: generate now on the live path
+        self.metrics.misses += 1
+        phase_template = self.session_manager.get_phase_template(session, phase) or {"phase": phase}
+        return await self.interface._generate_batch_item(BatchGenerationRequest(
+            request_id=f"PHASE_{session.session_id}_{phase.value}",
+            context=context,
+            user_message=self._phase_opening_message(phase_template),
+            mode=ConversationMode.THERAPY_SESSION,
+            job_type="phase_opening"
+        ), priority=RequestPriority.LIVE)
+    
+    def cancel_session(self, session_id: str):
+        """Drop any speculation for a session that ended or escalated"""
+        for key in [key for key in self._speculations if key[0] == session_id]:
+            self._discard(key, reason="cancelled")
+    
+    def _discard(self, key: Tuple[str, SessionPhase], reason: str):
+        speculation = self._speculations.pop(key, None)
+        if speculation is not None:
+            self._discard_speculation(speculation, reason)
+    
+    def _discard_speculation(self, speculation: _Speculation, reason: str):
+        if not speculation.task.done():
+            speculation.task.cancel()
+            self.metrics.cancelled += 1
+        self._count_waste(speculation)
+        self.logger.debug(f"Discarded speculation for {speculation.session_id}: {reason}")
+    
+    def _count_waste(self, speculation: _Speculation):
+        self.metrics.wasted += 1
+        if speculation.task.done() and not speculation.task.cancelled() and speculation.task.exception() is None:
+            result = speculation.task.result()
+            if result is not None:
+                self.metrics.tokens_wasted += result.tokens_used
+    
+    def expire_stale(self) -> int:
+        """Discard speculations older than the TTL"""
+        
+        cutoff = time.time() - self.ttl_seconds
+        stale = [key for key, spec in self._speculations.items() if spec.started_at < cutoff]
+        for key in stale:
+            self._discard(key, reason="expired")
+        return len(stale)
+    
+    def get_metrics(self) -> Dict[str, Any]:
+        metrics = asdict(self.metrics)
+        metrics['hit_rate'] = self.metrics.hit_rate
+        metrics['waste_rate'] = self.metrics.waste_rate
+        metrics['pending'] = len(self._speculations)
+        metrics['budget_remaining'] = max(self.token_budget_per_hour - self._budget_spent, 0)
+        return metrics
+
+
+# Example usage and testing
+if __name__ == "__main__":
+    import tempfile
+    from datetime import datetime
+    from core.session_manager import SessionType
+    
+    async def demonstrate_speculation():
+        print("=== SPECULATIVE PHASE GENERATION DEMONSTRATION ===\n")
+        
+        db_path = f"{tempfile.mkdtemp()}/speculation_demo.db"
+        session_manager = SessionManager(db_path)
+        interface = GeminiTherapyInterface(config={"fake_latency_seconds": 0.2, "batch_request_interval": 0})
+        interface.min_request_interval = 0
+        
+        generator = SpeculativePhaseGenerator(interface, session_manager)
+        generator.attach()
+        
+        session = session_manager.create_session(
+            "PT_DEMO", SessionType.THERAPY, 4, datetime.now(), "CBT", "working"
+        )
+        session_manager.start_session(session.session_id)
+        
+        for phase in [SessionPhase.OPENING, SessionPhase.CHECK_IN, SessionPhase.HOMEWORK_REVIEW,
+                      SessionPhase.AGENDA_SETTING, SessionPhase.MAIN_WORK]:
+            session_manager.advance_session_phase(session.session_id, phase)
+            
+            started = time.perf_counter()
+            opening = await generator.get_phase_opening(session_manager.get_session(session.session_id), phase)
+            print(f"{phase.value}: opening served in {(time.perf_counter() - started) * 1000:.1f} ms "
+                  f"({len(opening.content)} chars)")
+            
+            await asyncio.sleep(0.3)  # the patient works through the phase
+        
+        print("\nSpeculation metrics:")
+        for key, value in generator.get_metrics().items():
+            print(f"  {key}: {value}")
+        
+        print("\n" + "="*60)
+    
+    asyncio.run(demonstrate_speculation())
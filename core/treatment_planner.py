@@ -14,6 +14,7 @@ import json
 
 from config.therapy_protocols import TherapyModality, TreatmentPhase, THERAPY_PROTOCOLS
 from config.assessment_templates import AssessmentType, CLINICAL_CUTOFFS
+from utilities.identifiers import new_id
 
 
 class GoalStatus(Enum):
@@ -187,7 +188,7 @@ class TreatmentPlanner:
         """
         Create initial treatment plan based on assessment results
         """
-        plan_id = f"plan_{patient_id}_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+        plan_id = f"plan_{patient_id}_{new_id()}"
         
         # Determine primary modality based on assessment
         modality = self._select_treatment_modality(assessment_results, clinical_presentation)
@@ -352,7 +353,7 @@ class TreatmentPlanner:
             phq9_score = assessment_results['phq9'].get('total_score', 0)
             if phq9_score >= 10:
                 goal = TreatmentGoal(
-                    goal_id=f"goal_depression_{current_time.strftime('%Y%m%d_%H%M%S')}",
+                    goal_id=new_id("goal_depression"),
                     specific="Reduce depression symptoms to minimal level",
                     measurable=f"Decrease PHQ-9 score from {phq9_score} to below 5",
                     achievable="Through weekly therapy and homework practice",
@@ -379,7 +380,7 @@ class TreatmentPlanner:
             gad7_score = assessment_results['gad7'].get('total_score', 0)
             if gad7_score >= 10:
                 goal = TreatmentGoal(
-                    goal_id=f"goal_anxiety_{current_time.strftime('%Y%m%d_%H%M%S')}_1",
+                    goal_id=new_id("goal_anxiety"),
                     specific="Develop effective anxiety management skills",
                     measurable=f"Reduce GAD-7 score from {gad7_score} to below 8",
                     achievable="Through relaxation training and exposure exercises",
@@ -403,7 +404,7 @@ class TreatmentPlanner:
         
         # Functional goals
         functional_goal = TreatmentGoal(
-            goal_id=f"goal_functional_{current_time.strftime('%Y%m%d_%H%M%S')}",
+            goal_id=new_id("goal_functional"),
             specific="Improve overall daily functioning and quality of life",
             measurable="Score 7 or higher on Outcome Rating Scale for 3 consecutive sessions",
             achievable="Through consistent therapy attendance and homework completion",
@@ -641,7 +642,7 @@ class TreatmentPlanner:
         notes: str = ""
     ):
         """Update progress on a specific goal"""
-        progress_id = f"progress_{goal_id}_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+        progress_id = f"progress_{goal_id}_{new_id()}"
         
         with sqlite3.connect(self.db_path) as conn:
             cursor = conn.cursor()
@@ -796,7 +797,7 @@ class TreatmentPlanner:
             conn.commit()
         
         # Create new revised plan
-        new_plan_id = f"plan_{current_plan.patient_id}_{datetime.now().strftime('%Y%m%d_%H%M%S')}_rev"
+        new_plan_id = f"plan_{current_plan.patient_id}_{new_id()}_rev"
         
         revised_plan = TreatmentPlan(
             plan_id=new_plan_id,
@@ -13,6 +13,8 @@ from dataclasses import dataclass, asdict
 import json
 
 from config.therapy_protocols import TherapyModality, InterventionType
+from utilities.identifiers import new_id
+from utilities.reference_catalog import get_reference_library
 
 
 class ActivityType(Enum):
@@ -126,6 +128,10 @@ class ActivityScheduler:
     
     def __init__(self, db_path: str = "data/therapy_system.db"):
         self.db_path = db_path
+        self.reference_activities = get_reference_library(
+            "behavioral_activities", self._get_default_activities, key="activity_id",
+            indexes={"activity_type": "activity_type", "difficulty_level": "difficulty_level"}
+        )
         self._initialize_database()
         self._load_default_activities()
     
@@ -213,7 +219,21 @@ class ActivityScheduler:
     
     def _load_default_activities(self):
         """Load default activity library"""
-        default_activities = [
+        default_activities = self.reference_activities.values()
+        
+        # Check if default activities already exist
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT COUNT(*) FROM activity_library WHERE is_default = TRUE")
+            count = cursor.fetchone()[0]
+            
+            if count == 0:  # Load defaults if not already present
+                for activity in default_activities:
+                    self._save_activity(activity, is_default=True)
+    
+    def _get_default_activities(self) -> List[Activity]:
+        """Default activity library"""
+        return [
             # Pleasant Activities
             Activity("act_001", "Take a warm bath", "Relaxing bath with favorite products", 
                     ActivityType.PLEASANT, 30, 1, 7, 3, ["bath products", "towel"]),
@@ -270,16 +290,6 @@ class ActivityScheduler:
             Activity("act_022", "Yoga/Stretching", "Gentle movement and flexibility", 
                     ActivityType.PHYSICAL, 30, 2, 6, 6, ["yoga mat", "comfortable clothes"]),
         ]
-        
-        # Check if default activities already exist
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.cursor()
-            cursor.execute("SELECT COUNT(*) FROM activity_library WHERE is_default = TRUE")
-            count = cursor.fetchone()[0]
-            
-            if count == 0:  # Load defaults if not already present
-                for activity in default_activities:
-                    self._save_activity(activity, is_default=True)
     
     def _save_activity(self, activity: Activity, is_default: bool = False):
         """Save activity to database"""
@@ -512,7 +522,7 @@ class ActivityScheduler:
             """, (
                 scheduled_activity.schedule_id, scheduled_activity.activity_id,
                 scheduled_activity.patient_id, scheduled_activity.scheduled_date.date(),
-                scheduled_activity.scheduled_time, scheduled_activity.duration_minutes,
+                scheduled_activity.scheduled_time.strftime('%H:%M:%S'), scheduled_activity.duration_minutes,
                 scheduled_activity.status.value, scheduled_activity.actual_start_time,
                 scheduled_activity.actual_duration, scheduled_activity.mood_before,
                 scheduled_activity.mood_after, scheduled_activity.pleasure_experienced,
@@ -954,7 +964,7 @@ class ActivityScheduler:
         required_materials: List[str] = None
     ) -> Activity:
         """Add custom activity to patient's library"""
-        activity_id = f"custom_{patient_id}_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+        activity_id = f"custom_{patient_id}_{new_id()}"
         
         activity = Activity(
             activity_id=activity_id,
@@ -987,7 +997,7 @@ class ActivityScheduler:
             if not activity_data:
                 raise ValueError(f"Activity {activity_id} not found")
         
-        schedule_id = f"single_{patient_id}_{scheduled_date.strftime('%Y%m%d')}_{scheduled_time.strftime('%H%M')}"
+        schedule_id = f"single_{patient_id}_{new_id()}"
         
         scheduled_activity = ScheduledActivity(
             schedule_id=schedule_id,
@@ -1019,7 +1029,7 @@ class ActivityScheduler:
                     completion_notes = ?
                 WHERE schedule_id = ?
             """, (
-                new_date.date(), new_time, ActivityStatus.RESCHEDULED.value,
+                new_date.date(), new_time.strftime('%H:%M:%S'), ActivityStatus.RESCHEDULED.value,
                 f"Rescheduled: {reason}", schedule_id
             ))
             
@@ -13,6 +13,8 @@ from dataclasses import dataclass, asdict
 import json
 
 from config.therapy_protocols import TherapyModality, InterventionType
+from utilities.identifiers import new_id
+from utilities.reference_catalog import get_reference_library
 
 
 # ============================================================================
@@ -136,6 +138,8 @@ class BehavioralExperiment:
     
     # Execution tracking
     status: ExperimentStatus
+    created_date: datetime
+    last_updated: datetime
     actual_date: Optional[datetime] = None
     actual_duration: Optional[int] = None
     
@@ -153,8 +157,6 @@ class BehavioralExperiment:
     next_experiments: List[str] = None
     
     # Metadata
-    created_date: datetime
-    last_updated: datetime
     therapist_notes: str = ""
     
     def __post_init__(self):
@@ -203,6 +205,10 @@ class BehavioralExperimentDesigner:
     
     def __init__(self, db_path: str = "data/therapy_system.db"):
         self.db_path = db_path
+        self.reference_templates = get_reference_library(
+            "experiment_templates", self._create_default_templates, key="template_id",
+            indexes={"experiment_type": "experiment_type", "difficulty_level": "difficulty_level"}
+        )
         self._initialize_database()
         self._load_experiment_templates()
     
@@ -322,8 +328,7 @@ class BehavioralExperimentDesigner:
             count = cursor.fetchone()[0]
             
             if count == 0:  # Load defaults if not already present
-                templates = self._create_default_templates()
-                for template in templates:
+                for template in self.reference_templates.values():
                     self._save_experiment_template(template, is_default=True)
     
     def _create_default_templates(self) -> List[ExperimentTemplate]:
@@ -505,6 +510,41 @@ class BehavioralExperimentDesigner:
             ))
             conn.commit()
     
+    def _get_template_by_id(self, template_id: str) -> Optional[ExperimentTemplate]:
+        """Get experiment template by ID"""
+        template = self.reference_templates.get(template_id)
+        if template is not None:
+            return template
+        
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT * FROM experiment_templates WHERE template_id = ?", (template_id,))
+            row = cursor.fetchone()
+            
+            return self._reconstruct_template_from_row(row) if row else None
+    
+    def _reconstruct_template_from_row(self, row: Tuple) -> ExperimentTemplate:
+        """Reconstruct ExperimentTemplate from database row; built-in templates come from the reference catalog"""
+        template = self.reference_templates.get(row[0])
+        if template is not None:
+            return template
+        
+        return ExperimentTemplate(
+            template_id=row[0],
+            name=row[1],
+            experiment_type=ExperimentType(row[2]),
+            description=row[3] or "",
+            target_conditions=json.loads(row[4] or '[]'),
+            common_beliefs=json.loads(row[5] or '[]'),
+            typical_predictions=json.loads(row[6] or '[]'),
+            suggested_steps=json.loads(row[7] or '[]'),
+            common_obstacles=json.loads(row[8] or '[]'),
+            safety_considerations=json.loads(row[9] or '[]'),
+            adaptation_notes=row[10] or "",
+            difficulty_level=row[11],
+            prerequisite_skills=json.loads(row[12] or '[]')
+        )
+    
     # ========================================================================
     # EXPERIMENT DESIGN AND CREATION
     # ========================================================================
@@ -575,7 +615,7 @@ class BehavioralExperimentDesigner:
         custom_design: Dict[str, Any] = None
     ) -> BehavioralExperiment:
         """Design a new behavioral experiment"""
-        experiment_id = f"exp_{patient_id}_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+        experiment_id = f"exp_{patient_id}_{new_id()}"
         
         if template_id:
             return self._create_experiment_from_template(experiment_id, patient_id, template_id)
@@ -669,7 +709,7 @@ class BehavioralExperimentDesigner:
         evidence_against: List[str] = None
     ) -> Prediction:
         """Add a prediction to an existing experiment"""
-        prediction_id = f"pred_{experiment_id}_{datetime.now().strftime('%H%M%S')}"
+        prediction_id = f"pred_{experiment_id}_{new_id()}"
         
         return Prediction(
             prediction_id=prediction_id,
@@ -691,7 +731,7 @@ class BehavioralExperimentDesigner:
         test_without: bool = True
     ) -> SafetyBehavior:
         """Add a safety behavior to test in the experiment"""
-        behavior_id = f"safe_{experiment_id}_{datetime.now().strftime('%H%M%S')}"
+        behavior_id = f"safe_{experiment_id}_{new_id()}"
         
         return SafetyBehavior(
             behavior_id=behavior_id,
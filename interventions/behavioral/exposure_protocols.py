@@ -8,6 +8,8 @@ import json
 import math
 
 from config.therapy_protocols import TherapyModality, InterventionType
+from utilities.identifiers import new_id
+from utilities.reference_catalog import get_reference_library
 
 
 # ============================================================================
@@ -105,6 +107,7 @@ class ExposureSession:
     
     # Execution tracking
     status: ExposureStatus
+    created_date: datetime
     actual_start_time: Optional[datetime] = None
     actual_duration: Optional[int] = None
     
@@ -130,7 +133,6 @@ class ExposureSession:
     homework_assigned: List[str] = None
     
     # Metadata
-    created_date: datetime
     therapist_notes: str = ""
     
     def __post_init__(self):
@@ -160,6 +162,8 @@ class ExposureHierarchy:
     exposure_items: List[ExposureItem]
     current_level: int  # Current working level (1-8)
     mastery_criteria: Dict[str, Any]  # Criteria for moving up hierarchy
+    created_date: datetime
+    last_updated: datetime
     
     # Progress tracking
     total_sessions_completed: int = 0
@@ -167,8 +171,6 @@ class ExposureHierarchy:
     estimated_completion_date: Optional[datetime] = None
     
     # Metadata
-    created_date: datetime
-    last_updated: datetime
     therapist_notes: str = ""
     
     def __post_init__(self):
@@ -212,6 +214,10 @@ class ExposureTherapyManager:
     
     def __init__(self, db_path: str = "data/therapy_system.db"):
         self.db_path = db_path
+        self.reference_protocols = get_reference_library(
+            "exposure_protocols", self._create_default_protocols, key="protocol_id",
+            indexes={"condition": "target_conditions"}
+        )
         self._initialize_database()
         self._load_exposure_protocols()
     
@@ -333,8 +339,7 @@ class ExposureTherapyManager:
             count = cursor.fetchone()[0]
             
             if count == 0:  # Load defaults if not already present
-                protocols = self._create_default_protocols()
-                for protocol in protocols:
+                for protocol in self.reference_protocols.values():
                     self._save_exposure_protocol(protocol, is_default=True)
     
     def _create_default_protocols(self) -> List[ExposureProtocol]:
@@ -559,7 +564,7 @@ class ExposureTherapyManager:
         custom_items: List[Dict[str, Any]] = None
     ) -> ExposureHierarchy:
         """Create exposure hierarchy for patient"""
-        hierarchy_id = f"hier_{patient_id}_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+        hierarchy_id = f"hier_{patient_id}_{new_id()}"
         
         # Default mastery criteria
         mastery_criteria = {
@@ -702,7 +707,7 @@ class ExposureTherapyManager:
             raise ValueError(f"No item found for level {target_level}")
         
         # Create session
-        session_id = f"exp_session_{patient_id}_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+        session_id = f"exp_session_{patient_id}_{new_id()}"
         
         session = ExposureSession(
             session_id=session_id,
@@ -1128,6 +1133,10 @@ class ExposureTherapyManager:
 
     def _get_protocol_by_id(self, protocol_id: str) -> Optional[ExposureProtocol]:
         """Get exposure protocol by ID"""
+        protocol = self.reference_protocols.get(protocol_id)
+        if protocol is not None:
+            return protocol
+        
         with sqlite3.connect(self.db_path) as conn:
             cursor = conn.cursor()
             cursor.execute("SELECT * FROM exposure_protocols WHERE protocol_id = ?", (protocol_id,))
@@ -1155,35 +1164,11 @@ class ExposureTherapyManager:
 
     def _get_protocols_by_category(self, fear_category: str) -> List[ExposureProtocol]:
         """Get protocols relevant to fear category"""
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.cursor()
-            cursor.execute("SELECT * FROM exposure_protocols WHERE is_default = TRUE")
-            rows = cursor.fetchall()
-            
-            protocols = []
-            for row in rows:
-                protocol = ExposureProtocol(
-                    protocol_id=row[0],
-                    name=row[1],
-                    target_conditions=json.loads(row[2] or '[]'),
-                    description=row[3],
-                    typical_hierarchy_items=json.loads(row[4] or '[]'),
-                    session_structure=json.loads(row[5] or '[]'),
-                    safety_guidelines=json.loads(row[6] or '[]'),
-                    contraindications=json.loads(row[7] or '[]'),
-                    typical_session_duration=row[8],
-                    sessions_per_week=row[9],
-                    estimated_total_sessions=row[10],
-                    adaptation_notes=row[11] or "",
-                    prerequisite_skills=json.loads(row[12] or '[]'),
-                    evidence_base=row[13] or ""
-                )
-                
-                # Check if protocol is relevant to fear category
-                if any(fear_category.lower() in condition.lower() for condition in protocol.target_conditions):
-                    protocols.append(protocol)
-            
-            return protocols
+        # The default protocols are the built-in library, so they are matched in memory
+        return [
+            protocol for protocol in self.reference_protocols.values()
+            if any(fear_category.lower() in condition.lower() for condition in protocol.target_conditions)
+        ]
 
     # ========================================================================
     # PROGRESS ANALYSIS AND REPORTING
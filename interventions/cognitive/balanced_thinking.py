@@ -6,6 +6,8 @@ from dataclasses import dataclass
 import json
 
 from config.therapy_protocols import TherapyModality, InterventionType
+from utilities.text_normalization import TermMatches, get_term_matcher
+from utilities.identifiers import new_id
 
 
 class ThinkingStyle(Enum):
@@ -21,6 +23,15 @@ class ThinkingStyle(Enum):
     PERSONALIZATION = "personalization"
 
 
+THINKING_ERROR_INDICATORS = {
+    ThinkingStyle.ALL_OR_NOTHING.value: ['always', 'never', 'everyone', 'no one', 'everything', 'nothing', 'completely', 'totally'],
+    ThinkingStyle.OVERGENERALIZATION.value: ['all', 'every', 'constantly', 'forever', 'typical'],
+    ThinkingStyle.SHOULD_STATEMENTS.value: ['should', 'must', 'have to', 'ought to', 'supposed to'],
+    ThinkingStyle.MAGNIFICATION.value: ['disaster', 'terrible', 'awful', 'horrible', 'catastrophe', 'ruined'],
+    ThinkingStyle.EMOTIONAL_REASONING.value: ['feel like', 'feel that', 'sense that']
+}
+
+
 class ThoughtType(Enum):
     AUTOMATIC_THOUGHT = "automatic_thought"
     INTERMEDIATE_BELIEF = "intermediate_belief"
@@ -76,6 +87,7 @@ class BalancedThinkingProcessor:
     def __init__(self, db_path: str = "data/therapy_system.db"):
         self.db_path = db_path
         self._initialize_database()
+        self.thinking_error_matcher = get_term_matcher(THINKING_ERROR_INDICATORS)
     
     def _initialize_database(self):
         with sqlite3.connect(self.db_path) as conn:
@@ -133,7 +145,7 @@ class BalancedThinkingProcessor:
         emotion_intensity: int,
         session_id: Optional[str] = None
     ) -> ThoughtRecord:
-        record_id = f"thought_{patient_id}_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+        record_id = f"thought_{patient_id}_{new_id()}"
         
         record = ThoughtRecord(
             record_id=record_id,
@@ -155,30 +167,13 @@ class BalancedThinkingProcessor:
         return record
     
     def identify_thinking_errors(self, thought: str) -> List[str]:
-        errors = []
-        thought_lower = thought.lower()
-        
-        all_or_nothing_words = ['always', 'never', 'everyone', 'no one', 'everything', 'nothing', 'completely', 'totally']
-        if any(word in thought_lower for word in all_or_nothing_words):
-            errors.append(ThinkingStyle.ALL_OR_NOTHING.value)
-        
-        overgeneralization_words = ['all', 'every', 'constantly', 'forever', 'typical']
-        if any(word in thought_lower for word in overgeneralization_words):
-            errors.append(ThinkingStyle.OVERGENERALIZATION.value)
-        
-        should_words = ['should', 'must', 'have to', 'ought to', 'supposed to']
-        if any(word in thought_lower for word in should_words):
-            errors.append(ThinkingStyle.SHOULD_STATEMENTS.value)
-        
-        catastrophic_words = ['disaster', 'terrible', 'awful', 'horrible', 'catastrophe', 'ruined']
-        if any(word in thought_lower for word in catastrophic_words):
-            errors.append(ThinkingStyle.MAGNIFICATION.value)
-        
-        emotional_words = ['feel like', 'feel that', 'sense that']
-        if any(phrase in thought_lower for phrase in emotional_words):
-            errors.append(ThinkingStyle.EMOTIONAL_REASONING.value)
+        return self.thinking_errors_from_matches(self.thinking_error_matcher.scan(thought))
+    
+    def thinking_errors_from_matches(self, thought_hits: TermMatches) -> List[str]:
+        """identify_thinking_errors from hits already found, possibly by a combined matcher"""
         
-        return errors
+        hits = self.thinking_error_matcher.matches(thought_hits)
+        return [style for style in THINKING_ERROR_INDICATORS if hits.count(style) > 0]
     
     def generate_evidence_questions(self, thought: str) -> Dict[str, List[str]]:
         questions = {
@@ -286,7 +281,7 @@ class BalancedThinkingProcessor:
         original_thought: str,
         thought_type: ThoughtType
     ) -> BalancedThinkingExercise:
-        exercise_id = f"balance_{patient_id}_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+        exercise_id = f"balance_{patient_id}_{new_id()}"
         
         exercise = BalancedThinkingExercise(
             exercise_id=exercise_id,
@@ -1,12 +1,14 @@
 import sqlite3
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Tuple, Any, Union
+from typing import Dict, List, Optional, Tuple, Any, Union, Iterable
 from enum import Enum
 from dataclasses import dataclass
 import json
 import re
 
 from config.therapy_protocols import TherapyModality, InterventionType
+from utilities.text_normalization import TermMatches, get_term_matcher
+from utilities.identifiers import new_id
 
 
 class DistortionType(Enum):
@@ -66,17 +68,173 @@ class DistortionChallenge:
     challenge_questions: List[str]
     evidence_collected: Dict[str, List[str]]
     alternative_thoughts: List[str]
-    effectiveness_rating: Optional[int] = None
     created_date: datetime
+    effectiveness_rating: Optional[int] = None
     completed_date: Optional[datetime] = None
 
 
+class DistortionMatchEngine:
+    """Distortion pattern library compiled for single-pass scoring
+    
+    Trigger words, phrases and severity markers share one term matcher over
+    the thought; context indicators get one over the context. Matching is on
+    whole words, and terms negated within their clause ("not a failure") do
+    not count. Every pattern owns a run of counters (words, phrases, one per
+    severity level) in a flat array and each term maps to the counters it
+    feeds, so a thought costs one scan plus work proportional to its hits.
+    Only patterns with a hit are scored, by the per-pattern rules of
+    identify_distortions with list lengths and severity bonuses precomputed.
+    """
+    
+    SEVERITY_SCORES = {"severe": (3, 0.3), "moderate": (2, 0.2)}
+    DEFAULT_SEVERITY_SCORE = (1, 0.1)
+    
+    def __init__(self, patterns: Dict[DistortionType, DistortionPattern]):
+        self.distortion_values = [distortion_type.value for distortion_type in patterns]
+        self.layouts = []
+        
+        thought_groups = {}
+        context_groups = {}
+        counter = 0
+        for index, pattern in enumerate(patterns.values()):
+            words_slot, phrases_slot = counter, counter + 1
+            thought_groups[words_slot] = pattern.trigger_words
+            thought_groups[phrases_slot] = pattern.trigger_phrases
+            context_groups[index] = pattern.context_indicators
+            levels = []
+            for slot, (sev_level, markers) in enumerate(pattern.severity_markers.items(), start=counter + 2):
+                thought_groups[slot] = markers
+                levels.append((slot,) + self.SEVERITY_SCORES.get(sev_level, self.DEFAULT_SEVERITY_SCORE))
+            counter += 2 + len(levels)
+            self.layouts.append((
+                words_slot, len(pattern.trigger_words),
+                phrases_slot, len(pattern.trigger_phrases),
+                len(pattern.context_indicators), tuple(levels)
+            ))
+        self.counter_count = counter
+        
+        self.thought_matcher = get_term_matcher(thought_groups)
+        self.context_matcher = get_term_matcher(context_groups)
+        
+        slot_patterns = {}
+        for index, (words_slot, _, _, _, _, levels) in enumerate(self.layouts):
+            for slot in range(words_slot, words_slot + 2 + len(levels)):
+                slot_patterns[slot] = index
+        self.term_counters: Dict[str, Tuple[Tuple[int, int], ...]] = {}
+        for slot, terms in thought_groups.items():
+            for term in terms:
+                self.term_counters[term] = self.term_counters.get(term, ()) + ((slot, slot_patterns[slot]),)
+    
+    def score(self, thought: str, context: str = "") -> Tuple[List[str], Dict[str, int], Dict[str, float], List[str]]:
+        """distortions found, severity levels, confidence scores and context factors"""
+        
+        thought_hits = self.thought_matcher.scan(thought)
+        context_hits = self.context_matcher.scan(context) if context else None
+        return self.score_matches(thought_hits, context_hits)
+    
+    def score_matches(
+        self,
+        thought_hits: TermMatches,
+        context_hits: Optional[TermMatches]
+    ) -> Tuple[List[str], Dict[str, int], Dict[str, float], List[str]]:
+        """score() from hits already found, possibly by a combined matcher"""
+        
+        counters = [0] * self.counter_count
+        candidates = set()
+        term_counters = self.term_counters
+        for term in thought_hits.terms:
+            for slot, index in term_counters.get(term, ()):
+                counters[slot] += 1
+                candidates.add(index)
+        
+        context_hits = self.context_matcher.matches(context_hits) if context_hits else None
+        if context_hits:
+            candidates.update(context_hits.counts)
+        
+        distortions_found = []
+        severity_levels = {}
+        confidence_scores = {}
+        context_factors = []
+        
+        for index in sorted(candidates):
+            words_slot, word_total, phrases_slot, phrase_total, context_total, levels = self.layouts[index]
+            confidence = 0.0
+            severity = 1
+            
+            word_matches = counters[words_slot]
+            if word_matches > 0:
+                confidence += (word_matches / word_total) * 0.6
+            
+            phrase_matches = counters[phrases_slot]
+            if phrase_matches > 0:
+                confidence += (phrase_matches / phrase_total) * 0.8
+            
+            context_matches = context_hits.count(index) if context_hits else 0
+            if context_matches > 0:
+                confidence += (context_matches / context_total) * 0.4
+                context_factors.extend(context_hits.matched(index))
+            
+            for slot, level_severity, bonus in levels:
+                if counters[slot] > 0:
+                    severity = level_severity
+                    confidence += bonus
+            
+            if confidence >= 0.3:
+                distortion = self.distortion_values[index]
+                distortions_found.append(distortion)
+                severity_levels[distortion] = severity
+                confidence_scores[distortion] = min(1.0, confidence)
+        
+        return distortions_found, severity_levels, confidence_scores, context_factors
+
+
+class DistortionAggregateDeltas:
+    """Changes to the daily distortion aggregates from identifications added (+1) or backed out (-1)"""
+    
+    def __init__(self):
+        # (patient, day, distortion) -> [occurrences, severity sum]
+        self.counts: Dict[Tuple[str, str, str], List[int]] = {}
+        # (patient, day) -> identifications
+        self.totals: Dict[Tuple[str, str], int] = {}
+        # (patient, distortion) -> [frequency, contexts JSON, last occurrence]
+        self.patterns: Dict[Tuple[str, str], List[Any]] = {}
+        self.has_removals = False
+    
+    def add(
+        self,
+        patient_id: str,
+        distortions: List[str],
+        severity_levels: Dict[str, int],
+        created_date: Union[datetime, str],
+        sign: int,
+        context_factors: Optional[List[str]] = None
+    ):
+        timestamp = created_date if isinstance(created_date, str) else created_date.isoformat(" ")
+        day = timestamp[:10]
+        if sign < 0:
+            self.has_removals = True
+        
+        self.totals[(patient_id, day)] = self.totals.get((patient_id, day), 0) + sign
+        for distortion in distortions:
+            counts = self.counts.setdefault((patient_id, day, distortion), [0, 0])
+            counts[0] += sign
+            counts[1] += sign * severity_levels.get(distortion, 1)
+            
+            pattern = self.patterns.setdefault((patient_id, distortion), [0, None, None])
+            pattern[0] += sign
+            if sign > 0 and (pattern[2] is None or timestamp >= pattern[2]):
+                pattern[2] = timestamp
+                if context_factors:
+                    pattern[1] = json.dumps(context_factors)
+
+
 class CognitiveDistortionDetector:
     
     def __init__(self, db_path: str = "data/therapy_system.db"):
         self.db_path = db_path
         self._initialize_database()
         self._load_distortion_patterns()
+        self.match_engine = DistortionMatchEngine(self.distortion_patterns)
     
     def _initialize_database(self):
         with sqlite3.connect(self.db_path) as conn:
@@ -126,6 +284,34 @@ class CognitiveDistortionDetector:
                 )
             """)
             
+            # Daily aggregates kept in step with distortion_identifications, so
+            # reports sum a date range instead of re-parsing every identification
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS distortion_daily_counts (
+                    patient_id TEXT NOT NULL,
+                    day TEXT NOT NULL,
+                    distortion_type TEXT NOT NULL,
+                    occurrences INTEGER NOT NULL DEFAULT 0,
+                    severity_sum INTEGER NOT NULL DEFAULT 0,
+                    PRIMARY KEY (patient_id, day, distortion_type)
+                ) WITHOUT ROWID
+            """)
+            
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS distortion_daily_totals (
+                    patient_id TEXT NOT NULL,
+                    day TEXT NOT NULL,
+                    identifications INTEGER NOT NULL DEFAULT 0,
+                    PRIMARY KEY (patient_id, day)
+                ) WITHOUT ROWID
+            """)
+            
+            cursor.execute("SELECT 1 FROM distortion_daily_totals LIMIT 1")
+            aggregates_empty = cursor.fetchone() is None
+            cursor.execute("SELECT 1 FROM distortion_identifications LIMIT 1")
+            if aggregates_empty and cursor.fetchone() is not None:
+                self._rebuild_distortion_aggregates(cursor)
+            
             conn.commit()
     
     def _load_distortion_patterns(self):
@@ -297,56 +483,24 @@ class CognitiveDistortionDetector:
         }
     
     def identify_distortions(self, thought: str, context: str = "") -> DistortionIdentification:
-        identification_id = f"distort_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
-        thought_lower = thought.lower()
-        
-        distortions_found = []
-        severity_levels = {}
-        confidence_scores = {}
-        context_factors = []
-        
-        for distortion_type, pattern in self.distortion_patterns.items():
-            confidence = 0.0
-            severity = 1
-            
-            word_matches = sum(1 for word in pattern.trigger_words if word in thought_lower)
-            if word_matches > 0:
-                confidence += (word_matches / len(pattern.trigger_words)) * 0.6
-            
-            phrase_matches = sum(1 for phrase in pattern.trigger_phrases if phrase in thought_lower)
-            if phrase_matches > 0:
-                confidence += (phrase_matches / len(pattern.trigger_phrases)) * 0.8
-            
-            context_matches = sum(1 for indicator in pattern.context_indicators if indicator in context.lower())
-            if context_matches > 0:
-                confidence += (context_matches / len(pattern.context_indicators)) * 0.4
-                context_factors.extend([indicator for indicator in pattern.context_indicators if indicator in context.lower()])
-            
-            for sev_level, markers in pattern.severity_markers.items():
-                marker_matches = sum(1 for marker in markers if marker in thought_lower)
-                if marker_matches > 0:
-                    if sev_level == "severe":
-                        severity = 3
-                        confidence += 0.3
-                    elif sev_level == "moderate":
-                        severity = 2
-                        confidence += 0.2
-                    else:
-                        severity = 1
-                        confidence += 0.1
-            
-            if confidence >= 0.3:
-                distortions_found.append(distortion_type.value)
-                severity_levels[distortion_type.value] = severity
-                confidence_scores[distortion_type.value] = min(1.0, confidence)
+        identification_id = f"distort_{new_id()}"
+        return self.build_identification(identification_id, thought, self.match_engine.score(thought, context))
+    
+    def build_identification(
+        self,
+        identification_id: str,
+        thought: str,
+        scores: Tuple[List[str], Dict[str, int], Dict[str, float], List[str]]
+    ) -> DistortionIdentification:
+        distortions_found, severity_levels, confidence_scores, context_factors = scores
         
         identification = DistortionIdentification(
             identification_id=identification_id,
             patient_id="",
             original_thought=thought,
-            distortions_found=distortions_found,
-            severity_levels=severity_levels,
-            confidence_scores=confidence_scores,
+            distortions_found=list(distortions_found),
+            severity_levels=dict(severity_levels),
+            confidence_scores=dict(confidence_scores),
             context_factors=list(set(context_factors)),
             created_date=datetime.now()
         )
@@ -469,22 +623,126 @@ class CognitiveDistortionDetector:
         return challenge
     
     def save_distortion_identification(self, identification: DistortionIdentification, patient_id: str):
-        identification.patient_id = patient_id
+        self.save_distortion_identifications([identification], patient_id)
+    
+    def save_distortion_identifications(self, identifications: Iterable[DistortionIdentification], patient_id: str):
+        identifications = list(identifications)
+        for identification in identifications:
+            identification.patient_id = patient_id
         
         with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.cursor()
-            cursor.execute("""
-                INSERT OR REPLACE INTO distortion_identifications (
-                    identification_id, patient_id, original_thought, distortions_found,
-                    severity_levels, confidence_scores, context_factors, created_date, session_id
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """, (
+            self.write_distortion_identifications(conn.cursor(), identifications)
+            conn.commit()
+    
+    def write_distortion_identifications(self, cursor: sqlite3.Cursor, identifications: List[DistortionIdentification]):
+        """Insert identifications in one executemany on the caller's transaction
+        
+        The daily aggregates and distortion_patterns are updated in the same
+        transaction; an identification saved again under its id has its earlier
+        version backed out first.
+        """
+        
+        if not identifications:
+            return
+        
+        deltas = DistortionAggregateDeltas()
+        identification_ids = [identification.identification_id for identification in identifications]
+        for start in range(0, len(identification_ids), 500):
+            chunk = identification_ids[start:start + 500]
+            cursor.execute(f"""
+                SELECT patient_id, distortions_found, severity_levels, created_date
+                FROM distortion_identifications
+                WHERE identification_id IN ({", ".join("?" * len(chunk))})
+            """, chunk)
+            for patient_id, distortions, severities, created_date in cursor.fetchall():
+                deltas.add(patient_id, json.loads(distortions or "[]"), json.loads(severities or "{}"), created_date, -1)
+        
+        cursor.executemany("""
+            INSERT OR REPLACE INTO distortion_identifications (
+                identification_id, patient_id, original_thought, distortions_found,
+                severity_levels, confidence_scores, context_factors, created_date, session_id
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, [
+            (
                 identification.identification_id, identification.patient_id, identification.original_thought,
                 json.dumps(identification.distortions_found), json.dumps(identification.severity_levels),
                 json.dumps(identification.confidence_scores), json.dumps(identification.context_factors),
-                identification.created_date, identification.session_id
-            ))
-            conn.commit()
+                identification.created_date.isoformat(" "), identification.session_id
+            )
+            for identification in identifications
+        ])
+        
+        for identification in identifications:
+            deltas.add(
+                identification.patient_id, identification.distortions_found, identification.severity_levels,
+                identification.created_date, 1, identification.context_factors
+            )
+        self._apply_aggregate_deltas(cursor, deltas)
+    
+    def _rebuild_distortion_aggregates(self, cursor: sqlite3.Cursor):
+        """Recompute the daily aggregates and distortion_patterns from every identification"""
+        
+        cursor.execute("DELETE FROM distortion_daily_counts")
+        cursor.execute("DELETE FROM distortion_daily_totals")
+        cursor.execute("DELETE FROM distortion_patterns")
+        
+        deltas = DistortionAggregateDeltas()
+        cursor.execute("""
+            SELECT patient_id, distortions_found, severity_levels, created_date, context_factors
+            FROM distortion_identifications
+            ORDER BY created_date
+        """)
+        for patient_id, distortions, severities, created_date, context_factors in cursor.fetchall():
+            deltas.add(
+                patient_id, json.loads(distortions or "[]"), json.loads(severities or "{}"),
+                created_date, 1, json.loads(context_factors or "[]")
+            )
+        self._apply_aggregate_deltas(cursor, deltas)
+    
+    def _apply_aggregate_deltas(self, cursor: sqlite3.Cursor, deltas: 'DistortionAggregateDeltas'):
+        cursor.executemany("""
+            INSERT INTO distortion_daily_counts (patient_id, day, distortion_type, occurrences, severity_sum)
+            VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT (patient_id, day, distortion_type) DO UPDATE SET
+                occurrences = occurrences + excluded.occurrences,
+                severity_sum = severity_sum + excluded.severity_sum
+        """, [key + tuple(values) for key, values in deltas.counts.items()])
+        
+        cursor.executemany("""
+            INSERT INTO distortion_daily_totals (patient_id, day, identifications)
+            VALUES (?, ?, ?)
+            ON CONFLICT (patient_id, day) DO UPDATE SET
+                identifications = identifications + excluded.identifications
+        """, [key + (count,) for key, count in deltas.totals.items()])
+        
+        cursor.executemany("""
+            INSERT INTO distortion_patterns (
+                pattern_id, patient_id, distortion_type, frequency, contexts, last_occurrence
+            ) VALUES (?, ?, ?, ?, ?, ?)
+            ON CONFLICT (pattern_id) DO UPDATE SET
+                frequency = frequency + excluded.frequency,
+                contexts = COALESCE(excluded.contexts, contexts),
+                last_occurrence = CASE
+                    WHEN excluded.last_occurrence > COALESCE(last_occurrence, '') THEN excluded.last_occurrence
+                    ELSE last_occurrence
+                END
+        """, [
+            (f"{patient_id}_{distortion}", patient_id, distortion, frequency, contexts, last_occurrence)
+            for (patient_id, distortion), (frequency, contexts, last_occurrence) in deltas.patterns.items()
+        ])
+        
+        if deltas.has_removals:
+            cursor.executemany("""
+                DELETE FROM distortion_daily_counts
+                WHERE patient_id = ? AND day = ? AND distortion_type = ? AND occurrences <= 0
+            """, list(deltas.counts))
+            cursor.executemany("""
+                DELETE FROM distortion_daily_totals
+                WHERE patient_id = ? AND day = ? AND identifications <= 0
+            """, list(deltas.totals))
+            cursor.executemany("""
+                DELETE FROM distortion_patterns WHERE pattern_id = ? AND frequency <= 0
+            """, [(f"{patient_id}_{distortion}",) for patient_id, distortion in deltas.patterns])
     
     def save_distortion_challenge(self, challenge: DistortionChallenge):
         with sqlite3.connect(self.db_path) as conn:
@@ -505,48 +763,39 @@ class CognitiveDistortionDetector:
     
     def get_patient_distortion_patterns(self, patient_id: str, days: int = 30) -> Dict[str, Any]:
         end_date = datetime.now()
-        start_date = end_date - timedelta(days=days)
+        start_day = (end_date - timedelta(days=days)).date().isoformat()
+        recent_day = (end_date - timedelta(days=7)).date().isoformat()
         
         with sqlite3.connect(self.db_path) as conn:
             cursor = conn.cursor()
             cursor.execute("""
-                SELECT distortions_found, severity_levels, created_date
-                FROM distortion_identifications
-                WHERE patient_id = ? AND created_date >= ?
-            """, (patient_id, start_date))
+                SELECT COALESCE(SUM(identifications), 0),
+                       COALESCE(SUM(CASE WHEN day >= ? THEN identifications ELSE 0 END), 0)
+                FROM distortion_daily_totals
+                WHERE patient_id = ? AND day >= ?
+            """, (recent_day, patient_id, start_day))
+            total_identifications, recent_count = cursor.fetchone()
             
-            records = cursor.fetchall()
+            cursor.execute("""
+                SELECT distortion_type, SUM(occurrences), SUM(severity_sum)
+                FROM distortion_daily_counts
+                WHERE patient_id = ? AND day >= ?
+                GROUP BY distortion_type
+            """, (patient_id, start_day))
+            distortion_totals = cursor.fetchall()
         
-        if not records:
+        if not total_identifications:
             return {"error": "No distortion records found"}
         
-        distortion_counts = {}
-        severity_totals = {}
-        dates = []
-        
-        for row in records:
-            distortions = json.loads(row[0])
-            severities = json.loads(row[1])
-            dates.append(datetime.fromisoformat(row[2]))
-            
-            for distortion in distortions:
-                distortion_counts[distortion] = distortion_counts.get(distortion, 0) + 1
-                severity = severities.get(distortion, 1)
-                if distortion not in severity_totals:
-                    severity_totals[distortion] = {"total": 0, "count": 0}
-                severity_totals[distortion]["total"] += severity
-                severity_totals[distortion]["count"] += 1
-        
+        distortion_counts = {distortion: count for distortion, count, _ in distortion_totals}
+        average_severities = {
+            distortion: round(severity_sum / count, 1) for distortion, count, severity_sum in distortion_totals
+        }
         most_common = sorted(distortion_counts.items(), key=lambda x: x[1], reverse=True)[:5]
         
-        average_severities = {}
-        for distortion, data in severity_totals.items():
-            average_severities[distortion] = round(data["total"] / data["count"], 1)
-        
         frequency_trend = "stable"
-        if len(dates) > 1:
-            recent_count = len([d for d in dates if d >= datetime.now() - timedelta(days=7)])
-            older_count = len([d for d in dates if d < datetime.now() - timedelta(days=7)])
+        if total_identifications > 1:
+            older_count = total_identifications - recent_count
             if recent_count > older_count * 1.2:
                 frequency_trend = "increasing"
             elif recent_count < older_count * 0.8:
@@ -554,7 +803,7 @@ class CognitiveDistortionDetector:
         
         patterns = {
             "analysis_period_days": days,
-            "total_identifications": len(records),
+            "total_identifications": total_identifications,
             "most_common_distortions": [
                 {"distortion": dist, "frequency": count, "average_severity": average_severities.get(dist, 1)}
                 for dist, count in most_common
@@ -698,40 +947,41 @@ class CognitiveDistortionDetector:
     
     def get_distortion_progress(self, patient_id: str, weeks: int = 4) -> Dict[str, Any]:
         end_date = datetime.now()
-        start_date = end_date - timedelta(weeks=weeks)
+        start_day = (end_date - timedelta(weeks=weeks)).date().isoformat()
         
         with sqlite3.connect(self.db_path) as conn:
             cursor = conn.cursor()
             cursor.execute("""
-                SELECT distortions_found, severity_levels, created_date
-                FROM distortion_identifications
-                WHERE patient_id = ? AND created_date >= ?
-                ORDER BY created_date
-            """, (patient_id, start_date))
+                SELECT day, identifications
+                FROM distortion_daily_totals
+                WHERE patient_id = ? AND day >= ?
+            """, (patient_id, start_day))
+            daily_totals = cursor.fetchall()
             
-            records = cursor.fetchall()
+            cursor.execute("""
+                SELECT day, distortion_type, occurrences, severity_sum
+                FROM distortion_daily_counts
+                WHERE patient_id = ? AND day >= ?
+            """, (patient_id, start_day))
+            daily_counts = cursor.fetchall()
         
-        if not records:
+        if not daily_totals:
             return {"error": "No progress data found"}
         
+        # Keyed by (ISO year, week) so a window spanning new year stays in order
         weekly_data = {}
-        for row in records:
-            distortions = json.loads(row[0])
-            severities = json.loads(row[1])
-            week = datetime.fromisoformat(row[2]).isocalendar()[1]
-            
-            if week not in weekly_data:
-                weekly_data[week] = {"count": 0, "severity_sum": 0, "distortions": set()}
-            
-            weekly_data[week]["count"] += len(distortions)
-            weekly_data[week]["distortions"].update(distortions)
-            
-            for distortion in distortions:
-                severity = severities.get(distortion, 1)
-                weekly_data[week]["severity_sum"] += severity
+        for day, _ in daily_totals:
+            week = datetime.fromisoformat(day).isocalendar()[:2]
+            weekly_data.setdefault(week, {"count": 0, "severity_sum": 0, "distortions": set()})
+        
+        for day, distortion, occurrences, severity_sum in daily_counts:
+            data = weekly_data[datetime.fromisoformat(day).isocalendar()[:2]]
+            data["count"] += occurrences
+            data["severity_sum"] += severity_sum
+            data["distortions"].add(distortion)
         
         weekly_progress = []
-        for week, data in sorted(weekly_data.items()):
+        for (_, week), data in sorted(weekly_data.items()):
             avg_severity = data["severity_sum"] / data["count"] if data["count"] > 0 else 0
             weekly_progress.append({
                 "week": week,
@@ -754,7 +1004,7 @@ class CognitiveDistortionDetector:
             "analysis_period_weeks": weeks,
             "weekly_breakdown": weekly_progress,
             "trend": trend_analysis,
-            "total_identifications": len(records),
+            "total_identifications": sum(count for _, count in daily_totals),
             "improvement_indicators": self._generate_improvement_indicators(weekly_progress)
         }
         
@@ -999,54 +1249,65 @@ class CognitiveDistortionDetector:
         return intervention_plan
     
     def track_intervention_effectiveness(self, patient_id: str, intervention_start_date: datetime) -> Dict[str, Any]:
+        start_day = intervention_start_date.date().isoformat()
+        
         with sqlite3.connect(self.db_path) as conn:
             cursor = conn.cursor()
             
             cursor.execute("""
-                SELECT distortions_found, severity_levels, created_date
-                FROM distortion_identifications
-                WHERE patient_id = ? AND created_date >= ?
-                ORDER BY created_date
-            """, (patient_id, intervention_start_date))
+                SELECT COALESCE(SUM(identifications), 0)
+                FROM distortion_daily_totals
+                WHERE patient_id = ? AND day >= ?
+            """, (patient_id, start_day))
+            post_records = cursor.fetchone()[0]
             
-            post_intervention = cursor.fetchall()
+            # Baseline: the most recent days before the intervention holding at least 20 identifications
+            cursor.execute("""
+                SELECT day, identifications
+                FROM distortion_daily_totals
+                WHERE patient_id = ? AND day < ?
+                ORDER BY day DESC
+            """, (patient_id, start_day))
+            pre_records = 0
+            pre_start_day = start_day
+            for day, count in cursor:
+                pre_records += count
+                pre_start_day = day
+                if pre_records >= 20:
+                    break
             
             cursor.execute("""
-                SELECT distortions_found, severity_levels, created_date
-                FROM distortion_identifications
-                WHERE patient_id = ? AND created_date < ?
-                ORDER BY created_date DESC
-                LIMIT 20
-            """, (patient_id, intervention_start_date))
+                SELECT distortion_type, SUM(occurrences), SUM(severity_sum)
+                FROM distortion_daily_counts
+                WHERE patient_id = ? AND day >= ?
+                GROUP BY distortion_type
+            """, (patient_id, start_day))
+            post_intervention = cursor.fetchall()
             
+            cursor.execute("""
+                SELECT distortion_type, SUM(occurrences), SUM(severity_sum)
+                FROM distortion_daily_counts
+                WHERE patient_id = ? AND day >= ? AND day < ?
+                GROUP BY distortion_type
+            """, (patient_id, pre_start_day, start_day))
             pre_intervention = cursor.fetchall()
         
-        if not pre_intervention or not post_intervention:
+        if not pre_records or not post_records:
             return {"error": "Insufficient data for effectiveness tracking"}
         
-        def analyze_period(records):
-            total_distortions = 0
-            severity_sum = 0
-            distortion_types = set()
-            
-            for row in records:
-                distortions = json.loads(row[0])
-                severities = json.loads(row[1])
-                total_distortions += len(distortions)
-                distortion_types.update(distortions)
-                
-                for d in distortions:
-                    severity_sum += severities.get(d, 1)
+        def analyze_period(distortion_totals, record_count):
+            total_distortions = sum(count for _, count, _ in distortion_totals)
+            severity_sum = sum(severity for _, _, severity in distortion_totals)
             
             return {
                 "total_episodes": total_distortions,
-                "unique_types": len(distortion_types),
+                "unique_types": len(distortion_totals),
                 "average_severity": severity_sum / total_distortions if total_distortions > 0 else 0,
-                "episodes_per_record": total_distortions / len(records) if records else 0
+                "episodes_per_record": total_distortions / record_count if record_count else 0
             }
         
-        pre_stats = analyze_period(pre_intervention)
-        post_stats = analyze_period(post_intervention)
+        pre_stats = analyze_period(pre_intervention, pre_records)
+        post_stats = analyze_period(post_intervention, post_records)
         
         effectiveness = {
             "intervention_start": intervention_start_date.strftime('%Y-%m-%d'),
@@ -0,0 +1,193 @@
+"""
+Thought Analysis Module
+Batch and streaming analysis of many thoughts across the cognitive interventions
+Each thought is scanned once for distortions, thought category and thinking errors
+"""
+
+import sqlite3
+from typing import Dict, List, Optional, Tuple, Any, Union, Iterable, Iterator
+from dataclasses import dataclass
+import json
+
+from utilities.text_normalization import get_combined_matcher
+from utilities.identifiers import new_id
+from interventions.cognitive.cognitive_distortions import CognitiveDistortionDetector, DistortionIdentification
+from interventions.cognitive.thought_challenging import ThoughtChallenger, EMOTION_CATEGORIES
+from interventions.cognitive.balanced_thinking import BalancedThinkingProcessor
+
+
+# A thought, or a dict with "thought" and optional "emotion" and "context" (journal and diary imports)
+ThoughtInput = Union[str, Dict[str, str]]
+
+
+@dataclass
+class ThoughtAnalysis:
+    identification: DistortionIdentification
+    thought_category: str
+    thinking_errors: List[str]
+    emotion: str = ""
+    context: str = ""
+    
+    @property
+    def thought(self) -> str:
+        return self.identification.original_thought
+
+
+class ThoughtBatchAnalyzer:
+    """Distortions, thought category and thinking errors for many thoughts at once
+    
+    Results match identify_distortions, categorize_thought and
+    identify_thinking_errors called one by one. The three modules' vocabularies
+    are combined into one term matcher, so each thought and context is scanned
+    a single time and every module scores from the same hits.
+    Repeated entries within a batch are scored once.
+    """
+    
+    def __init__(
+        self,
+        db_path: str = "data/therapy_system.db",
+        detector: Optional[CognitiveDistortionDetector] = None,
+        challenger: Optional[ThoughtChallenger] = None,
+        processor: Optional[BalancedThinkingProcessor] = None
+    ):
+        self.db_path = db_path
+        self.detector = detector or CognitiveDistortionDetector(db_path)
+        self.challenger = challenger or ThoughtChallenger(db_path)
+        self.processor = processor or BalancedThinkingProcessor(db_path)
+        self._initialize_database()
+        
+        self.thought_matcher = get_combined_matcher(
+            self.detector.match_engine.thought_matcher,
+            self.challenger.category_matcher,
+            self.processor.thinking_error_matcher
+        )
+        self.context_matcher = get_combined_matcher(
+            self.detector.match_engine.context_matcher,
+            self.challenger.category_matcher
+        )
+    
+    def _initialize_database(self):
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS thought_analyses (
+                    identification_id TEXT PRIMARY KEY,
+                    patient_id TEXT NOT NULL,
+                    original_thought TEXT NOT NULL,
+                    emotion TEXT,
+                    thought_category TEXT,
+                    thinking_errors TEXT,
+                    distortions_found TEXT,
+                    created_date TIMESTAMP,
+                    session_id TEXT,
+                    FOREIGN KEY (identification_id) REFERENCES distortion_identifications (identification_id)
+                )
+            """)
+            
+            cursor.execute("""
+                CREATE INDEX IF NOT EXISTS idx_thought_analyses_patient
+                ON thought_analyses (patient_id, created_date)
+            """)
+            
+            conn.commit()
+    
+    def analyze_thoughts(self, thoughts: Iterable[ThoughtInput]) -> List[ThoughtAnalysis]:
+        return list(self.iter_thought_analyses(thoughts))
+    
+    def iter_thought_analyses(self, thoughts: Iterable[ThoughtInput]) -> Iterator[ThoughtAnalysis]:
+        """Analyze lazily, one result per input, so large imports can be streamed"""
+        
+        scored: Dict[Tuple[str, str, str], Tuple[Any, str, List[str]]] = {}
+        
+        for item in thoughts:
+            thought, emotion, context = self._unpack(item)
+            key = (thought, emotion.lower(), context)
+            
+            result = scored.get(key)
+            if result is None:
+                result = scored[key] = self._score(*key)
+            scores, thought_category, thinking_errors = result
+            
+            identification = self.detector.build_identification(new_id("distort"), thought, scores)
+            yield ThoughtAnalysis(
+                identification=identification,
+                thought_category=thought_category,
+                thinking_errors=list(thinking_errors),
+                emotion=emotion,
+                context=context
+            )
+    
+    def _unpack(self, item: ThoughtInput) -> Tuple[str, str, str]:
+        if isinstance(item, str):
+            return item, "", ""
+        return item["thought"], item.get("emotion") or "", item.get("context") or ""
+    
+    def _score(self, thought: str, emotion_lower: str, context: str) -> Tuple[Any, str, List[str]]:
+        thought_hits = self.thought_matcher.scan(thought)
+        context_hits = self.context_matcher.scan(context) if context else None
+        
+        scores = self.detector.match_engine.score_matches(thought_hits, context_hits)
+        thought_category = EMOTION_CATEGORIES.get(emotion_lower) or \
+            self.challenger.categorize_matches(thought_hits, context_hits)
+        thinking_errors = self.processor.thinking_errors_from_matches(thought_hits)
+        
+        return scores, thought_category, thinking_errors
+    
+    def save_analyses(self, analyses: List[ThoughtAnalysis], patient_id: str, session_id: Optional[str] = None):
+        """Persist a batch in one transaction, one executemany per table"""
+        
+        identifications = [analysis.identification for analysis in analyses]
+        for identification in identifications:
+            identification.patient_id = patient_id
+            identification.session_id = session_id or identification.session_id
+        
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            self.detector.write_distortion_identifications(cursor, identifications)
+            cursor.executemany("""
+                INSERT OR REPLACE INTO thought_analyses (
+                    identification_id, patient_id, original_thought, emotion, thought_category,
+                    thinking_errors, distortions_found, created_date, session_id
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """, [
+                (
+                    analysis.identification.identification_id, patient_id, analysis.thought,
+                    analysis.emotion, analysis.thought_category, json.dumps(analysis.thinking_errors),
+                    json.dumps(analysis.identification.distortions_found),
+                    analysis.identification.created_date, analysis.identification.session_id
+                )
+                for analysis in analyses
+            ])
+            conn.commit()
+    
+    def analyze_and_save(
+        self,
+        thoughts: Iterable[ThoughtInput],
+        patient_id: str,
+        session_id: Optional[str] = None,
+        chunk_size: int = 500
+    ) -> Dict[str, Any]:
+        """Stream an import through analysis and persistence in chunks of chunk_size"""
+        
+        summary = {"thoughts_analyzed": 0, "with_distortions": 0, "distortion_counts": {}, "category_counts": {}}
+        
+        chunk = []
+        for analysis in self.iter_thought_analyses(thoughts):
+            chunk.append(analysis)
+            summary["thoughts_analyzed"] += 1
+            if analysis.identification.distortions_found:
+                summary["with_distortions"] += 1
+            for distortion in analysis.identification.distortions_found:
+                summary["distortion_counts"][distortion] = summary["distortion_counts"].get(distortion, 0) + 1
+            summary["category_counts"][analysis.thought_category] = \
+                summary["category_counts"].get(analysis.thought_category, 0) + 1
+            
+            if len(chunk) >= chunk_size:
+                self.save_analyses(chunk, patient_id, session_id)
+                chunk = []
+        
+        if chunk:
+            self.save_analyses(chunk, patient_id, session_id)
+        
+        return summary
@@ -6,6 +6,50 @@ from dataclasses import dataclass
 import json
 
 from config.therapy_protocols import TherapyModality, InterventionType
+from utilities.text_normalization import TermMatches, get_term_matcher
+from utilities.identifiers import new_id
+
+
+THOUGHT_CATEGORY_INDICATORS = {
+    "self_criticism": [
+        "stupid", "worthless", "failure", "can't do anything",
+        "terrible at", "not good enough", "should be better", "disappointing"
+    ],
+    "worry_anxiety": [
+        "what if", "worried about", "anxious", "something bad", "go wrong",
+        "can't handle", "disaster", "terrible", "scared that"
+    ],
+    "depression": [
+        "hopeless", "pointless", "nothing matters", "no one cares", "give up",
+        "can't see", "dark", "empty", "meaningless"
+    ],
+    "perfectionism": [
+        "should be perfect", "must be", "have to", "not good enough",
+        "mistake", "mess up", "flawless", "exactly right"
+    ],
+    "relationships": [
+        "he thinks", "she said", "they don't", "nobody likes", "rejected",
+        "relationship", "friend", "family", "partner", "love"
+    ],
+    "work_performance": [
+        "work", "job", "boss", "colleagues", "performance", "career",
+        "promotion", "fired", "incompetent", "professional"
+    ],
+    "anger_irritation": [
+        "angry", "furious", "irritated", "annoyed", "hate", "can't stand",
+        "ridiculous", "unfair", "shouldn't have"
+    ]
+}
+
+EMOTION_CATEGORIES = {
+    "angry": "anger_irritation",
+    "sad": "depression",
+    "worried": "worry_anxiety",
+    "anxious": "worry_anxiety",
+    "frustrated": "anger_irritation",
+    "ashamed": "self_criticism",
+    "guilty": "self_criticism"
+}
 
 
 class ChallengeType(Enum):
@@ -73,6 +117,7 @@ class ThoughtChallenger:
         self.db_path = db_path
         self._initialize_database()
         self._load_challenge_templates()
+        self.category_matcher = get_term_matcher(THOUGHT_CATEGORY_INDICATORS)
     
     def _initialize_database(self):
         with sqlite3.connect(self.db_path) as conn:
@@ -308,64 +353,25 @@ class ThoughtChallenger:
                 conn.commit()
     
     def categorize_thought(self, thought: str, emotion: str = "", context: str = "") -> str:
-        thought_lower = thought.lower()
-        context_lower = context.lower()
         emotion_lower = emotion.lower()
         
-        category_indicators = {
-            "self_criticism": [
-                "I'm", "I am", "stupid", "worthless", "failure", "can't do anything",
-                "terrible at", "not good enough", "should be better", "disappointing"
-            ],
-            "worry_anxiety": [
-                "what if", "worried about", "anxious", "something bad", "go wrong",
-                "can't handle", "disaster", "terrible", "scared that"
-            ],
-            "depression": [
-                "hopeless", "pointless", "nothing matters", "no one cares", "give up",
-                "can't see", "dark", "empty", "meaningless"
-            ],
-            "perfectionism": [
-                "should be perfect", "must be", "have to", "not good enough",
-                "mistake", "mess up", "flawless", "exactly right"
-            ],
-            "relationships": [
-                "he thinks", "she said", "they don't", "nobody likes", "rejected",
-                "relationship", "friend", "family", "partner", "love"
-            ],
-            "work_performance": [
-                "work", "job", "boss", "colleagues", "performance", "career",
-                "promotion", "fired", "incompetent", "professional"
-            ],
-            "anger_irritation": [
-                "angry", "furious", "irritated", "annoyed", "hate", "can't stand",
-                "ridiculous", "unfair", "shouldn't have"
-            ]
-        }
+        if emotion_lower in EMOTION_CATEGORIES:
+            return EMOTION_CATEGORIES[emotion_lower]
         
-        emotion_categories = {
-            "angry": "anger_irritation",
-            "sad": "depression",
-            "worried": "worry_anxiety",
-            "anxious": "worry_anxiety",
-            "frustrated": "anger_irritation",
-            "ashamed": "self_criticism",
-            "guilty": "self_criticism"
+        thought_hits = self.category_matcher.scan(thought)
+        context_hits = self.category_matcher.scan(context) if context else None
+        return self.categorize_matches(thought_hits, context_hits)
+    
+    def categorize_matches(self, thought_hits: TermMatches, context_hits: Optional[TermMatches]) -> str:
+        """categorize_thought from hits already found, possibly by a combined matcher"""
+        
+        thought_hits = self.category_matcher.matches(thought_hits)
+        context_counts = self.category_matcher.matches(context_hits).counts if context_hits else {}
+        scores = {
+            category: thought_hits.count(category) * 2 + context_counts.get(category, 0)
+            for category in THOUGHT_CATEGORY_INDICATORS
         }
         
-        if emotion_lower in emotion_categories:
-            return emotion_categories[emotion_lower]
-        
-        scores = {}
-        for category, indicators in category_indicators.items():
-            score = 0
-            for indicator in indicators:
-                if indicator in thought_lower:
-                    score += 2
-                if indicator in context_lower:
-                    score += 1
-            scores[category] = score
-        
         if max(scores.values()) > 0:
             return max(scores, key=scores.get)
         
@@ -403,7 +409,7 @@ class ThoughtChallenger:
         session_id: Optional[str] = None
     ) -> ThoughtChallenge:
         
-        challenge_id = f"challenge_{patient_id}_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+        challenge_id = f"challenge_{patient_id}_{new_id()}"
         thought_category = self.categorize_thought(original_thought, emotion, situation_context)
         challenge_type = self.select_challenge_method(thought_category, original_thought)
         challenge_questions = self.get_challenge_questions(challenge_type, thought_category)
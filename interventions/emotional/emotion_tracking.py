@@ -12,14 +12,22 @@ Created: 2025
 
 import sqlite3
 import json
+import logging
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional, Tuple, Any
 from dataclasses import dataclass, field
 from enum import Enum
-import uuid
 import statistics
+from collections import Counter
 from pathlib import Path
 
+import numpy as np
+
+from utilities.archive_manager import ArchiveManager, get_archive_manager
+from utilities.data_storage import WritePipeline, WriteEvent, RowWrite, WriteOperation, get_write_pipeline
+from utilities.identifiers import new_id
+from interventions.emotional.safety_alerts import EmotionAlertStream, get_alert_stream
+
 
 # ============================================================================
 # ENUMS AND DATA STRUCTURES
@@ -84,10 +92,38 @@ class TriggerType(Enum):
     UNKNOWN = "unknown"
 
 
+# Integer codes for the columnar analysis arrays, by enum declaration order
+EMOTION_CODES = {emotion.value: code for code, emotion in enumerate(EmotionCategory)}
+TRIGGER_CODES = {trigger.value: code for code, trigger in enumerate(TriggerType)}
+NO_TRIGGER = -1
+
+DAY_NAMES = ("Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday")
+
+# Entries an emotion needs in the analysis period to count as a pattern
+MIN_PATTERN_ENTRIES = 3
+
+# Emotions a new DBT diary card starts with
+DIARY_CARD_EMOTIONS = ("anger", "sadness", "fear", "shame", "guilt", "joy", "love", "excitement", "contentment")
+
+# DBT skills reference
+DBT_SKILLS = {
+    "distress_tolerance": ["TIPP", "ACCEPTS", "Distract", "Self-Soothe", "IMPROVE", "Pros/Cons"],
+    "emotion_regulation": ["PLEASE", "Mastery Activities", "Pleasant Events", "Opposite Action"],
+    "interpersonal": ["DEAR MAN", "GIVE", "FAST", "Boundaries"],
+    "mindfulness": ["Observe", "Describe", "Participate", "One-mindfully", "Non-judgmentally"]
+}
+
+# Bit per reference skill in a diary card's skills mask
+SKILL_BITS = {
+    skill: 1 << bit
+    for bit, skill in enumerate(skill for skills in DBT_SKILLS.values() for skill in skills)
+}
+
+
 @dataclass
 class EmotionEntry:
     """Individual emotion tracking entry"""
-    entry_id: str = field(default_factory=lambda: str(uuid.uuid4()))
+    entry_id: str = field(default_factory=new_id)
     patient_id: str = ""
     timestamp: datetime = field(default_factory=datetime.now)
     
@@ -128,7 +164,7 @@ class EmotionEntry:
 @dataclass
 class DBTDiaryCard:
     """DBT-specific diary card for daily emotion tracking"""
-    diary_id: str = field(default_factory=lambda: str(uuid.uuid4()))
+    diary_id: str = field(default_factory=new_id)
     patient_id: str = ""
     date: datetime = field(default_factory=lambda: datetime.now().replace(hour=0, minute=0, second=0, microsecond=0))
     
@@ -166,7 +202,7 @@ class DBTDiaryCard:
 @dataclass
 class EmotionPattern:
     """Identified emotion patterns from tracking data"""
-    pattern_id: str = field(default_factory=lambda: str(uuid.uuid4()))
+    pattern_id: str = field(default_factory=new_id)
     patient_id: str = ""
     
     # Pattern identification
@@ -195,6 +231,85 @@ class EmotionPattern:
     created_date: datetime = field(default_factory=datetime.now)
 
 
+@dataclass
+class EmotionColumns:
+    """Emotion entries for one patient and period as parallel arrays, newest first"""
+    timestamps: np.ndarray  # datetime64[us]
+    emotions: np.ndarray  # EMOTION_CODES
+    intensities: np.ndarray
+    triggers: np.ndarray  # TRIGGER_CODES, NO_TRIGGER when none was recorded
+    intervention_needed: np.ndarray
+    
+    # JSON arrays, left unparsed until an emotion's pattern needs them
+    thoughts: List[str] = field(default_factory=list)
+    behaviors: List[str] = field(default_factory=list)
+    physical_sensations: List[str] = field(default_factory=list)
+    
+    def __len__(self) -> int:
+        return len(self.emotions)
+
+
+@dataclass
+class DiaryCardSeries:
+    """Numeric DBT diary card fields as arrays, one row per card in date order"""
+    dates: np.ndarray  # datetime64[D]
+    self_harm_urges: np.ndarray
+    suicide_urges: np.ndarray
+    hours_slept: np.ndarray  # NaN where not recorded
+    completed: np.ndarray
+    skills_used: np.ndarray  # skills logged on the card
+    skills_mask: np.ndarray  # SKILL_BITS of the reference skills logged
+    emotion_levels: np.ndarray  # cards x EMOTION_CODES, float64
+    other_emotions: List[Dict[str, float]] = field(default_factory=list)  # per card, emotions outside EMOTION_CODES
+    
+    def __len__(self) -> int:
+        return len(self.dates)
+
+
+@dataclass
+class WeeklyDiaryRollups:
+    """Precomputed per-week DBT diary card aggregates as arrays, one row per week with cards"""
+    week_starts: np.ndarray  # datetime64[D], Mondays
+    card_counts: np.ndarray
+    completed_counts: np.ndarray
+    self_harm_urges_sum: np.ndarray
+    self_harm_urges_max: np.ndarray
+    suicide_urges_sum: np.ndarray
+    suicide_urges_max: np.ndarray
+    hours_slept_sum: np.ndarray
+    hours_slept_days: np.ndarray
+    skills_used: np.ndarray
+    skills_mask: np.ndarray  # reference skills practised during the week
+    emotion_sums: np.ndarray  # weeks x EMOTION_CODES, float64
+    other_emotion_sums: List[Dict[str, float]] = field(default_factory=list)  # per week, emotions outside EMOTION_CODES
+    
+    def __len__(self) -> int:
+        return len(self.week_starts)
+    
+    @property
+    def completion_rate(self) -> np.ndarray:
+        return self.completed_counts / np.maximum(self.card_counts, 1)
+    
+    @property
+    def mean_self_harm_urges(self) -> np.ndarray:
+        return self.self_harm_urges_sum / np.maximum(self.card_counts, 1)
+    
+    @property
+    def mean_suicide_urges(self) -> np.ndarray:
+        return self.suicide_urges_sum / np.maximum(self.card_counts, 1)
+    
+    @property
+    def mean_hours_slept(self) -> np.ndarray:
+        return np.divide(
+            self.hours_slept_sum, self.hours_slept_days,
+            out=np.full(len(self), np.nan), where=self.hours_slept_days > 0
+        )
+    
+    @property
+    def emotion_means(self) -> np.ndarray:
+        return self.emotion_sums / np.maximum(self.card_counts, 1)[:, None]
+
+
 # ============================================================================
 # MAIN CLASS
 # ============================================================================
@@ -211,11 +326,24 @@ class EmotionTracker:
     - Therapeutic insights generation
     """
     
-    def __init__(self, db_path: str = "data/therapy_system.db"):
+    def __init__(self, db_path: str = "data/therapy_system.db",
+                 archive_manager: Optional[ArchiveManager] = None,
+                 write_pipeline: Optional[WritePipeline] = None,
+                 alert_stream: Optional[EmotionAlertStream] = None):
         """Initialize the emotion tracking system"""
         self.db_path = db_path
+        self.logger = logging.getLogger(__name__)
         self._initialize_database()
         
+        # Safety counters are updated as entries are logged; subscribe to it for alerts
+        self.alert_stream = alert_stream or get_alert_stream(db_path)
+        
+        # Entries past the archive horizon are read back from the cold tier
+        self.archive_manager = archive_manager or get_archive_manager(db_path)
+        
+        # Entries are appended through the shared group-commit writer
+        self.write_pipeline = write_pipeline or get_write_pipeline(db_path)
+        
         # Common emotions list for easier selection
         self.common_emotions = {
             "positive": ["joy", "happiness", "excitement", "contentment", "love", "gratitude", "pride", "relief"],
@@ -224,12 +352,7 @@ class EmotionTracker:
         }
         
         # DBT skills reference
-        self.dbt_skills = {
-            "distress_tolerance": ["TIPP", "ACCEPTS", "Distract", "Self-Soothe", "IMPROVE", "Pros/Cons"],
-            "emotion_regulation": ["PLEASE", "Mastery Activities", "Pleasant Events", "Opposite Action"],
-            "interpersonal": ["DEAR MAN", "GIVE", "FAST", "Boundaries"],
-            "mindfulness": ["Observe", "Describe", "Participate", "One-mindfully", "Non-judgmentally"]
-        }
+        self.dbt_skills = DBT_SKILLS
     
     # ========================================================================
     # DATABASE INITIALIZATION
@@ -297,6 +420,62 @@ class EmotionTracker:
                 )
             """)
             
+            # Metrics written before emotion levels were stored losslessly are
+            # dropped here and rebuilt from the cards below
+            cursor.execute("PRAGMA table_info(dbt_diary_metrics)")
+            metrics_columns = {row[1] for row in cursor.fetchall()}
+            if metrics_columns and "other_emotions" not in metrics_columns:
+                cursor.execute("DROP TABLE dbt_diary_metrics")
+                cursor.execute("DROP TABLE IF EXISTS dbt_weekly_rollups")
+            
+            # Numeric diary card fields in typed columns; emotion levels are packed
+            # float64 arrays indexed by EMOTION_CODES with any other emotions kept
+            # as a JSON dict, logged skills a SKILL_BITS mask
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS dbt_diary_metrics (
+                    diary_id TEXT PRIMARY KEY,
+                    patient_id TEXT NOT NULL,
+                    day TEXT NOT NULL,
+                    week_start TEXT NOT NULL,
+                    self_harm_urges INTEGER NOT NULL,
+                    suicide_urges INTEGER NOT NULL,
+                    hours_slept REAL,
+                    completed INTEGER NOT NULL,
+                    skills_used INTEGER NOT NULL,
+                    skills_mask INTEGER NOT NULL,
+                    emotion_levels BLOB NOT NULL,
+                    other_emotions TEXT NOT NULL,  -- JSON dict {emotion: level}
+                    FOREIGN KEY (diary_id) REFERENCES dbt_diary_cards (diary_id)
+                )
+            """)
+            
+            cursor.execute("""
+                CREATE INDEX IF NOT EXISTS idx_dbt_diary_metrics_patient_day
+                ON dbt_diary_metrics (patient_id, day)
+            """)
+            
+            # Weekly diary card aggregates (weeks start on Monday), refreshed whenever a card is saved
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS dbt_weekly_rollups (
+                    patient_id TEXT NOT NULL,
+                    week_start TEXT NOT NULL,
+                    card_count INTEGER NOT NULL,
+                    completed_count INTEGER NOT NULL,
+                    self_harm_urges_sum INTEGER NOT NULL,
+                    self_harm_urges_max INTEGER NOT NULL,
+                    suicide_urges_sum INTEGER NOT NULL,
+                    suicide_urges_max INTEGER NOT NULL,
+                    hours_slept_sum REAL NOT NULL,
+                    hours_slept_days INTEGER NOT NULL,
+                    skills_used INTEGER NOT NULL,
+                    skills_mask INTEGER NOT NULL,
+                    emotion_sums BLOB NOT NULL,  -- float64 array indexed by EMOTION_CODES
+                    other_emotion_sums TEXT NOT NULL,  -- JSON dict {emotion: sum}
+                    last_updated TEXT NOT NULL,
+                    PRIMARY KEY (patient_id, week_start)
+                ) WITHOUT ROWID
+            """)
+            
             # Emotion patterns table
             cursor.execute("""
                 CREATE TABLE IF NOT EXISTS emotion_patterns (
@@ -321,6 +500,13 @@ class EmotionTracker:
                 )
             """)
             
+            # Databases created before the metrics table get it filled from their cards once
+            cursor.execute("SELECT 1 FROM dbt_diary_metrics LIMIT 1")
+            metrics_empty = cursor.fetchone() is None
+            cursor.execute("SELECT 1 FROM dbt_diary_cards LIMIT 1")
+            if metrics_empty and cursor.fetchone() is not None:
+                self._rebuild_diary_metrics(cursor)
+            
             conn.commit()
     
     # ========================================================================
@@ -331,34 +517,41 @@ class EmotionTracker:
         """Log a new emotion entry"""
         entry.last_updated = datetime.now()
         
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.cursor()
-            
-            cursor.execute("""
-                INSERT INTO emotion_entries (
-                    entry_id, patient_id, timestamp, emotion, intensity,
-                    duration_minutes, trigger_type, trigger_description,
-                    situation_context, location, people_present,
-                    physical_sensations, thoughts, behaviors,
-                    coping_skills_used, coping_effectiveness,
-                    intervention_needed, tracking_method, session_id,
-                    therapist_notes, created_date, last_updated
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """, (
-                entry.entry_id, entry.patient_id, entry.timestamp.isoformat(),
-                entry.emotion.value, entry.intensity, entry.duration_minutes,
-                entry.trigger.value if entry.trigger else None,
-                entry.trigger_description, entry.situation_context,
-                entry.location, json.dumps(entry.people_present),
-                json.dumps(entry.physical_sensations),
-                json.dumps(entry.thoughts), json.dumps(entry.behaviors),
-                json.dumps(entry.coping_skills_used), entry.coping_effectiveness,
-                entry.intervention_needed, entry.tracking_method.value,
-                entry.session_id, entry.therapist_notes,
-                entry.created_date.isoformat(), entry.last_updated.isoformat()
-            ))
-            
-            conn.commit()
+        # Entries flagged for intervention wait for a synced commit; the rest commit in the background
+        self.write_pipeline.record(WriteEvent(
+            event_type="emotion_logged",
+            patient_id=entry.patient_id,
+            source="emotion_tracking",
+            durable=entry.intervention_needed,
+            writes=[RowWrite(WriteOperation.INSERT, "emotion_entries", values={
+                "entry_id": entry.entry_id,
+                "patient_id": entry.patient_id,
+                "timestamp": entry.timestamp.isoformat(),
+                "emotion": entry.emotion.value,
+                "intensity": entry.intensity,
+                "duration_minutes": entry.duration_minutes,
+                "trigger_type": entry.trigger.value if entry.trigger else None,
+                "trigger_description": entry.trigger_description,
+                "situation_context": entry.situation_context,
+                "location": entry.location,
+                "people_present": json.dumps(entry.people_present),
+                "physical_sensations": json.dumps(entry.physical_sensations),
+                "thoughts": json.dumps(entry.thoughts),
+                "behaviors": json.dumps(entry.behaviors),
+                "coping_skills_used": json.dumps(entry.coping_skills_used),
+                "coping_effectiveness": entry.coping_effectiveness,
+                "intervention_needed": entry.intervention_needed,
+                "tracking_method": entry.tracking_method.value,
+                "session_id": entry.session_id,
+                "therapist_notes": entry.therapist_notes,
+                "created_date": entry.created_date.isoformat(),
+                "last_updated": entry.last_updated.isoformat()
+            })]
+        ))
+        
+        self.alert_stream.observe(
+            entry.patient_id, entry.timestamp, entry.intensity, entry.intervention_needed, entry.entry_id
+        )
         
         return entry.entry_id
     
@@ -372,6 +565,7 @@ class EmotionTracker:
     ) -> List[EmotionEntry]:
         """Retrieve emotion entries with optional filtering"""
         
+        self.write_pipeline.flush()
         with sqlite3.connect(self.db_path) as conn:
             cursor = conn.cursor()
             
@@ -398,36 +592,52 @@ class EmotionTracker:
             
             cursor.execute(query, params)
             rows = cursor.fetchall()
-            
-            entries = []
-            for row in rows:
-                entry = EmotionEntry(
-                    entry_id=row[0],
-                    patient_id=row[1],
-                    timestamp=datetime.fromisoformat(row[2]),
-                    emotion=EmotionCategory(row[3]),
-                    intensity=row[4],
-                    duration_minutes=row[5],
-                    trigger=TriggerType(row[6]) if row[6] else None,
-                    trigger_description=row[7] or "",
-                    situation_context=row[8] or "",
-                    location=row[9] or "",
-                    people_present=json.loads(row[10] or '[]'),
-                    physical_sensations=json.loads(row[11] or '[]'),
-                    thoughts=json.loads(row[12] or '[]'),
-                    behaviors=json.loads(row[13] or '[]'),
-                    coping_skills_used=json.loads(row[14] or '[]'),
-                    coping_effectiveness=row[15],
-                    intervention_needed=bool(row[16]),
-                    tracking_method=TrackingMethod(row[17]),
-                    session_id=row[18],
-                    therapist_notes=row[19] or "",
-                    created_date=datetime.fromisoformat(row[20]),
-                    last_updated=datetime.fromisoformat(row[21])
+        
+        entries = [self._row_to_emotion_entry(row) for row in rows]
+        
+        # Ranges reaching past the archive horizon also read the cold tier
+        if (limit is None or len(entries) < limit) and \
+                self.archive_manager.has_archived_data("emotion_entries", patient_id, start_date):
+            archived = [
+                self._row_to_emotion_entry(row)
+                for row in self.archive_manager.iter_archived_rows(
+                    "emotion_entries", patient_id, start_date, end_date
                 )
-                entries.append(entry)
-            
-            return entries
+                if not emotion_filter or row[3] == emotion_filter.value
+            ]
+            archived.reverse()
+            entries.extend(archived)
+            if limit:
+                entries = entries[:limit]
+        
+        return entries
+    
+    def _row_to_emotion_entry(self, row: Tuple) -> EmotionEntry:
+        """Convert an emotion_entries row into an EmotionEntry"""
+        return EmotionEntry(
+            entry_id=row[0],
+            patient_id=row[1],
+            timestamp=datetime.fromisoformat(row[2]),
+            emotion=EmotionCategory(row[3]),
+            intensity=row[4],
+            duration_minutes=row[5],
+            trigger=TriggerType(row[6]) if row[6] else None,
+            trigger_description=row[7] or "",
+            situation_context=row[8] or "",
+            location=row[9] or "",
+            people_present=json.loads(row[10] or '[]'),
+            physical_sensations=json.loads(row[11] or '[]'),
+            thoughts=json.loads(row[12] or '[]'),
+            behaviors=json.loads(row[13] or '[]'),
+            coping_skills_used=json.loads(row[14] or '[]'),
+            coping_effectiveness=row[15],
+            intervention_needed=bool(row[16]),
+            tracking_method=TrackingMethod(row[17]),
+            session_id=row[18],
+            therapist_notes=row[19] or "",
+            created_date=datetime.fromisoformat(row[20]),
+            last_updated=datetime.fromisoformat(row[21])
+        )
     
     # ========================================================================
     # DBT DIARY CARD MANAGEMENT
@@ -441,10 +651,7 @@ class EmotionTracker:
         )
         
         # Initialize with common DBT emotions
-        diary_card.emotions = {
-            "anger": 0, "sadness": 0, "fear": 0, "shame": 0, "guilt": 0,
-            "joy": 0, "love": 0, "excitement": 0, "contentment": 0
-        }
+        diary_card.emotions = {emotion: 0 for emotion in DIARY_CARD_EMOTIONS}
         
         # Initialize medications dict (empty by default)
         diary_card.medications_taken = {}
@@ -453,15 +660,21 @@ class EmotionTracker:
         return diary_card
     
     def update_dbt_diary_card(self, diary_card: DBTDiaryCard) -> bool:
-        """Update an existing DBT diary card"""
+        """Update an existing DBT diary card and the weekly rollup it falls in"""
         diary_card.last_updated = datetime.now()
         return self._save_dbt_diary_card(diary_card)
     
     def _save_dbt_diary_card(self, diary_card: DBTDiaryCard) -> bool:
-        """Save DBT diary card to database"""
+        """Save DBT diary card, its numeric metrics and its week's rollup in one transaction"""
         with sqlite3.connect(self.db_path) as conn:
             cursor = conn.cursor()
             
+            # A card moved to another date leaves its old week to be recomputed too
+            cursor.execute("""
+                SELECT patient_id, week_start FROM dbt_diary_metrics WHERE diary_id = ?
+            """, (diary_card.diary_id,))
+            weeks = set(cursor.fetchall())
+            
             cursor.execute("""
                 INSERT OR REPLACE INTO dbt_diary_cards (
                     diary_id, patient_id, date, emotions, self_harm_urges,
@@ -484,10 +697,124 @@ class EmotionTracker:
                 diary_card.created_date.isoformat(), diary_card.last_updated.isoformat()
             ))
             
+            metrics_row = self._diary_metrics_row(diary_card)
+            self._write_diary_metrics(cursor, [metrics_row])
+            weeks.add((diary_card.patient_id, metrics_row[3]))
+            self._refresh_weekly_rollups(cursor, weeks)
+            
             conn.commit()
         
         return True
     
+    def _diary_metrics_row(self, diary_card: DBTDiaryCard) -> Tuple:
+        """Typed dbt_diary_metrics row for a card
+        
+        Raises ValueError for an emotion level that is not a number or an urge
+        rating that is not a whole number, so the card is not saved with
+        metrics that disagree with it.
+        """
+        day = diary_card.date.date()
+        week_start = day - timedelta(days=day.weekday())
+        
+        emotion_levels = np.zeros(len(EMOTION_CODES), dtype=np.float64)
+        other_emotions = {}
+        for emotion, level in diary_card.emotions.items():
+            try:
+                level = float(level or 0)
+            except (TypeError, ValueError):
+                raise ValueError(f"Emotion level for {emotion!r} must be a number, got {level!r}")
+            code = EMOTION_CODES.get(emotion)
+            if code is not None:
+                emotion_levels[code] = level
+            else:
+                other_emotions[emotion] = level
+        
+        urges = []
+        for name in ("self_harm_urges", "suicide_urges"):
+            value = getattr(diary_card, name) or 0
+            if not isinstance(value, (int, float)) or value != int(value):
+                raise ValueError(f"{name} must be a whole number, got {value!r}")
+            urges.append(int(value))
+        
+        skill_lists = (
+            diary_card.distress_tolerance_skills, diary_card.emotion_regulation_skills,
+            diary_card.interpersonal_skills, diary_card.mindfulness_skills
+        )
+        skills_mask = 0
+        for skills in skill_lists:
+            for skill in skills:
+                skills_mask |= SKILL_BITS.get(skill, 0)
+        
+        return (
+            diary_card.diary_id, diary_card.patient_id, day.isoformat(), week_start.isoformat(),
+            urges[0], urges[1], diary_card.hours_slept,
+            int(bool(diary_card.completed)), sum(len(skills) for skills in skill_lists), skills_mask,
+            emotion_levels.tobytes(), json.dumps(other_emotions, sort_keys=True)
+        )
+    
+    def _write_diary_metrics(self, cursor: sqlite3.Cursor, metrics_rows: List[Tuple]):
+        cursor.executemany("""
+            INSERT OR REPLACE INTO dbt_diary_metrics (
+                diary_id, patient_id, day, week_start, self_harm_urges, suicide_urges,
+                hours_slept, completed, skills_used, skills_mask, emotion_levels, other_emotions
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, metrics_rows)
+    
+    def _refresh_weekly_rollups(self, cursor: sqlite3.Cursor, weeks: set):
+        """Recompute the rollups of (patient_id, week_start) weeks from their metrics rows"""
+        now = datetime.now().isoformat()
+        
+        for patient_id, week_start in weeks:
+            cursor.execute("""
+                SELECT self_harm_urges, suicide_urges, hours_slept, completed,
+                       skills_used, skills_mask, emotion_levels, other_emotions
+                FROM dbt_diary_metrics
+                WHERE patient_id = ? AND week_start = ?
+            """, (patient_id, week_start))
+            rows = cursor.fetchall()
+            
+            if not rows:
+                cursor.execute("""
+                    DELETE FROM dbt_weekly_rollups WHERE patient_id = ? AND week_start = ?
+                """, (patient_id, week_start))
+                continue
+            
+            self_harm, suicide, hours_slept, completed, skills_used, masks, levels, others = zip(*rows)
+            recorded_sleep = [hours for hours in hours_slept if hours is not None]
+            skills_mask = 0
+            for mask in masks:
+                skills_mask |= mask
+            emotion_sums = np.frombuffer(b"".join(levels), dtype=np.float64).reshape(len(rows), -1).sum(axis=0)
+            other_emotion_sums = Counter()
+            for other in others:
+                other_emotion_sums.update(json.loads(other))
+            
+            cursor.execute("""
+                INSERT OR REPLACE INTO dbt_weekly_rollups (
+                    patient_id, week_start, card_count, completed_count,
+                    self_harm_urges_sum, self_harm_urges_max, suicide_urges_sum, suicide_urges_max,
+                    hours_slept_sum, hours_slept_days, skills_used, skills_mask,
+                    emotion_sums, other_emotion_sums, last_updated
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """, (
+                patient_id, week_start, len(rows), sum(completed),
+                sum(self_harm), max(self_harm), sum(suicide), max(suicide),
+                float(sum(recorded_sleep)), len(recorded_sleep), sum(skills_used), skills_mask,
+                emotion_sums.tobytes(), json.dumps(dict(other_emotion_sums), sort_keys=True), now
+            ))
+    
+    def _rebuild_diary_metrics(self, cursor: sqlite3.Cursor):
+        """Fill dbt_diary_metrics and dbt_weekly_rollups from the stored diary cards"""
+        cursor.execute("SELECT * FROM dbt_diary_cards")
+        metrics_rows = []
+        for row in cursor.fetchall():
+            try:
+                metrics_rows.append(self._diary_metrics_row(self._row_to_dbt_diary_card(row)))
+            except ValueError as e:
+                self.logger.warning(f"Diary card {row[0]} left out of the metrics: {e}")
+        self._write_diary_metrics(cursor, metrics_rows)
+        self._refresh_weekly_rollups(cursor, {(row[1], row[3]) for row in metrics_rows})
+    
     def get_dbt_diary_card(self, patient_id: str, date: datetime) -> Optional[DBTDiaryCard]:
         """Retrieve DBT diary card for a specific date"""
         date_str = date.replace(hour=0, minute=0, second=0, microsecond=0).isoformat()
@@ -504,27 +831,7 @@ class EmotionTracker:
             if not row:
                 return None
             
-            return DBTDiaryCard(
-                diary_id=row[0],
-                patient_id=row[1],
-                date=datetime.fromisoformat(row[2]),
-                emotions=json.loads(row[3] or '{}'),
-                self_harm_urges=row[4],
-                suicide_urges=row[5],
-                distress_tolerance_skills=json.loads(row[6] or '[]'),
-                emotion_regulation_skills=json.loads(row[7] or '[]'),
-                interpersonal_skills=json.loads(row[8] or '[]'),
-                mindfulness_skills=json.loads(row[9] or '[]'),
-                medications_taken=json.loads(row[10] or '{}'),
-                substances_used=json.loads(row[11] or '{}'),
-                hours_slept=row[12],
-                self_care_activities=json.loads(row[13] or '[]'),
-                daily_notes=row[14] or "",
-                therapist_review=row[15] or "",
-                completed=bool(row[16]),
-                created_date=datetime.fromisoformat(row[17]),
-                last_updated=datetime.fromisoformat(row[18])
-            )
+            return self._row_to_dbt_diary_card(row)
     
     def get_dbt_diary_cards_range(
         self, 
@@ -542,175 +849,320 @@ class EmotionTracker:
                 ORDER BY date ASC
             """, (patient_id, start_date.isoformat(), end_date.isoformat()))
             
-            diary_cards = []
-            for row in cursor.fetchall():
-                diary_card = DBTDiaryCard(
-                    diary_id=row[0],
-                    patient_id=row[1],
-                    date=datetime.fromisoformat(row[2]),
-                    emotions=json.loads(row[3] or '{}'),
-                    self_harm_urges=row[4],
-                    suicide_urges=row[5],
-                    distress_tolerance_skills=json.loads(row[6] or '[]'),
-                    emotion_regulation_skills=json.loads(row[7] or '[]'),
-                    interpersonal_skills=json.loads(row[8] or '[]'),
-                    mindfulness_skills=json.loads(row[9] or '[]'),
-                    medications_taken=json.loads(row[10] or '{}'),
-                    substances_used=json.loads(row[11] or '{}'),
-                    hours_slept=row[12],
-                    self_care_activities=json.loads(row[13] or '[]'),
-                    daily_notes=row[14] or "",
-                    therapist_review=row[15] or "",
-                    completed=bool(row[16]),
-                    created_date=datetime.fromisoformat(row[17]),
-                    last_updated=datetime.fromisoformat(row[18])
-                )
-                diary_cards.append(diary_card)
+            return [self._row_to_dbt_diary_card(row) for row in cursor.fetchall()]
+    
+    def _row_to_dbt_diary_card(self, row: Tuple) -> DBTDiaryCard:
+        """Convert database row to DBTDiaryCard object"""
+        return DBTDiaryCard(
+            diary_id=row[0],
+            patient_id=row[1],
+            date=datetime.fromisoformat(row[2]),
+            emotions=json.loads(row[3] or '{}'),
+            self_harm_urges=row[4],
+            suicide_urges=row[5],
+            distress_tolerance_skills=json.loads(row[6] or '[]'),
+            emotion_regulation_skills=json.loads(row[7] or '[]'),
+            interpersonal_skills=json.loads(row[8] or '[]'),
+            mindfulness_skills=json.loads(row[9] or '[]'),
+            medications_taken=json.loads(row[10] or '{}'),
+            substances_used=json.loads(row[11] or '{}'),
+            hours_slept=row[12],
+            self_care_activities=json.loads(row[13] or '[]'),
+            daily_notes=row[14] or "",
+            therapist_review=row[15] or "",
+            completed=bool(row[16]),
+            created_date=datetime.fromisoformat(row[17]),
+            last_updated=datetime.fromisoformat(row[18])
+        )
+    
+    def _diary_day_bounds(self, start_date: datetime, end_date: datetime) -> Tuple[str, str]:
+        """First and last card day inside [start_date, end_date]; cards are dated at midnight"""
+        first_day = start_date.date()
+        if start_date.time() != datetime.min.time():
+            first_day += timedelta(days=1)
+        return first_day.isoformat(), end_date.date().isoformat()
+    
+    def get_diary_card_series(
+        self,
+        patient_id: str,
+        start_date: datetime,
+        end_date: datetime
+    ) -> DiaryCardSeries:
+        """Numeric fields of the diary cards in a date range, as arrays for charting"""
+        first_day, last_day = self._diary_day_bounds(start_date, end_date)
+        
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
             
-            return diary_cards
+            cursor.execute("""
+                SELECT day, self_harm_urges, suicide_urges, hours_slept, completed,
+                       skills_used, skills_mask, emotion_levels, other_emotions
+                FROM dbt_diary_metrics
+                WHERE patient_id = ? AND day BETWEEN ? AND ?
+                ORDER BY day ASC
+            """, (patient_id, first_day, last_day))
+            rows = cursor.fetchall()
+        
+        columns = list(zip(*rows)) if rows else [()] * 9
+        return DiaryCardSeries(
+            dates=np.array(columns[0], dtype="datetime64[D]"),
+            self_harm_urges=np.array(columns[1], dtype=np.int16),
+            suicide_urges=np.array(columns[2], dtype=np.int16),
+            hours_slept=np.array(columns[3], dtype=float),
+            completed=np.array(columns[4], dtype=bool),
+            skills_used=np.array(columns[5], dtype=np.int16),
+            skills_mask=np.array(columns[6], dtype=np.int64),
+            emotion_levels=np.frombuffer(b"".join(columns[7]), dtype=np.float64).reshape(len(rows), len(EMOTION_CODES)),
+            other_emotions=[json.loads(other) for other in columns[8]]
+        )
+    
+    def get_weekly_diary_rollups(
+        self,
+        patient_id: str,
+        start_date: datetime,
+        end_date: datetime
+    ) -> WeeklyDiaryRollups:
+        """Precomputed rollups of the weeks (Monday to Sunday) overlapping a date range"""
+        first_day, last_day = self._diary_day_bounds(start_date, end_date)
+        first_day = datetime.fromisoformat(first_day)
+        first_week = (first_day - timedelta(days=first_day.weekday())).date().isoformat()
+        
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            
+            cursor.execute("""
+                SELECT week_start, card_count, completed_count,
+                       self_harm_urges_sum, self_harm_urges_max, suicide_urges_sum, suicide_urges_max,
+                       hours_slept_sum, hours_slept_days, skills_used, skills_mask, emotion_sums,
+                       other_emotion_sums
+                FROM dbt_weekly_rollups
+                WHERE patient_id = ? AND week_start BETWEEN ? AND ?
+                ORDER BY week_start ASC
+            """, (patient_id, first_week, last_day))
+            rows = cursor.fetchall()
+        
+        columns = list(zip(*rows)) if rows else [()] * 13
+        return WeeklyDiaryRollups(
+            week_starts=np.array(columns[0], dtype="datetime64[D]"),
+            card_counts=np.array(columns[1], dtype=np.int32),
+            completed_counts=np.array(columns[2], dtype=np.int32),
+            self_harm_urges_sum=np.array(columns[3], dtype=np.int32),
+            self_harm_urges_max=np.array(columns[4], dtype=np.int16),
+            suicide_urges_sum=np.array(columns[5], dtype=np.int32),
+            suicide_urges_max=np.array(columns[6], dtype=np.int16),
+            hours_slept_sum=np.array(columns[7], dtype=float),
+            hours_slept_days=np.array(columns[8], dtype=np.int32),
+            skills_used=np.array(columns[9], dtype=np.int32),
+            skills_mask=np.array(columns[10], dtype=np.int64),
+            emotion_sums=np.frombuffer(b"".join(columns[11]), dtype=np.float64).reshape(len(rows), len(EMOTION_CODES)),
+            other_emotion_sums=[json.loads(other) for other in columns[12]]
+        )
+    
+    def get_diary_card_totals(
+        self,
+        patient_id: str,
+        start_date: datetime,
+        end_date: datetime
+    ) -> Dict[str, int]:
+        """Card, completion and urge totals for a date range
+        
+        Whole weeks inside the range come from dbt_weekly_rollups; only the
+        partial weeks at either end are summed from per-card metrics.
+        """
+        first_day, last_day = self._diary_day_bounds(start_date, end_date)
+        # Mondays of the weeks lying entirely inside [first_day, last_day]
+        last_full_week = (datetime.fromisoformat(last_day) - timedelta(days=6)).date().isoformat()
+        
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            
+            cursor.execute("""
+                SELECT COALESCE(SUM(card_count), 0), COALESCE(SUM(completed_count), 0),
+                       COALESCE(SUM(self_harm_urges_sum), 0), COALESCE(SUM(suicide_urges_sum), 0)
+                FROM dbt_weekly_rollups
+                WHERE patient_id = ? AND week_start BETWEEN ? AND ?
+            """, (patient_id, first_day, last_full_week))
+            full_weeks = cursor.fetchone()
+            
+            cursor.execute("""
+                SELECT COUNT(*), COALESCE(SUM(completed), 0),
+                       COALESCE(SUM(self_harm_urges), 0), COALESCE(SUM(suicide_urges), 0)
+                FROM dbt_diary_metrics
+                WHERE patient_id = ? AND day BETWEEN ? AND ?
+                  AND NOT (week_start BETWEEN ? AND ?)
+            """, (patient_id, first_day, last_day, first_day, last_full_week))
+            edge_days = cursor.fetchone()
+        
+        card_count, completed_count, self_harm_urges, suicide_urges = (
+            full + edge for full, edge in zip(full_weeks, edge_days)
+        )
+        return {
+            "card_count": card_count,
+            "completed_count": completed_count,
+            "self_harm_urges_sum": self_harm_urges,
+            "suicide_urges_sum": suicide_urges
+        }
     
     # ========================================================================
     # EMOTION PATTERN ANALYSIS
     # ========================================================================
     
+    def get_emotion_columns(
+        self,
+        patient_id: str,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None
+    ) -> EmotionColumns:
+        """The fields pattern analysis reads, fetched as arrays rather than EmotionEntry objects"""
+        
+        self.write_pipeline.flush()
+        with sqlite3.connect(self.db_path) as conn:
+            rows = conn.execute("""
+                SELECT timestamp, emotion, intensity, trigger_type, intervention_needed,
+                       thoughts, behaviors, physical_sensations
+                FROM emotion_entries
+                WHERE patient_id = ? AND timestamp >= ? AND timestamp <= ?
+                ORDER BY timestamp DESC
+            """, (
+                patient_id,
+                start_date.isoformat() if start_date else "",
+                end_date.isoformat() if end_date else "9999"
+            )).fetchall()
+        
+        # Same ordering as get_emotion_entries: hot rows, then the cold tier newest first
+        if self.archive_manager.has_archived_data("emotion_entries", patient_id, start_date):
+            archived = [
+                (row[2], row[3], row[4], row[6], row[16], row[12], row[13], row[11])
+                for row in self.archive_manager.iter_archived_rows(
+                    "emotion_entries", patient_id, start_date, end_date
+                )
+            ]
+            archived.reverse()
+            rows.extend(archived)
+        
+        count = len(rows)
+        columns = list(zip(*rows)) if rows else [()] * 8
+        return EmotionColumns(
+            timestamps=np.array(columns[0], dtype="datetime64[us]"),
+            emotions=np.fromiter((EMOTION_CODES[value] for value in columns[1]), dtype=np.int64, count=count),
+            intensities=np.array(columns[2], dtype=np.int64),
+            triggers=np.fromiter(
+                (TRIGGER_CODES[value] if value else NO_TRIGGER for value in columns[3]), dtype=np.int64, count=count
+            ),
+            intervention_needed=np.array(columns[4], dtype=bool),
+            thoughts=list(columns[5]),
+            behaviors=list(columns[6]),
+            physical_sensations=list(columns[7])
+        )
+    
     def analyze_emotion_patterns(
         self, 
         patient_id: str, 
         analysis_period_days: int = 30
     ) -> List[EmotionPattern]:
-        """Analyze emotion patterns from tracking data"""
+        """Analyze emotion patterns from tracking data
+        
+        Frequencies, intensity sums, hour and weekday histograms and
+        emotion-by-trigger counts are computed as grouped counts over the
+        entry arrays, for every emotion at once.
+        """
         end_date = datetime.now()
         start_date = end_date - timedelta(days=analysis_period_days)
         
-        # Get all emotion entries in the period
-        entries = self.get_emotion_entries(patient_id, start_date, end_date)
+        columns = self.get_emotion_columns(patient_id, start_date, end_date)
         
-        if not entries:
+        if not len(columns):
             return []
         
-        # Group entries by emotion type
-        emotion_groups = {}
-        for entry in entries:
-            emotion_key = entry.emotion.value
-            if emotion_key not in emotion_groups:
-                emotion_groups[emotion_key] = []
-            emotion_groups[emotion_key].append(entry)
+        emotions = columns.emotions
+        emotion_count = len(EMOTION_CODES)
+        trigger_count = len(TRIGGER_CODES)
         
-        patterns = []
+        entry_counts = np.bincount(emotions, minlength=emotion_count)
+        intensity_sums = np.bincount(emotions, weights=columns.intensities, minlength=emotion_count)
         
-        for emotion_type, emotion_entries in emotion_groups.items():
-            if len(emotion_entries) < 3:  # Need at least 3 entries for pattern analysis
-                continue
-            
-            pattern = self._analyze_single_emotion_pattern(
-                patient_id, emotion_type, emotion_entries, start_date, end_date
-            )
-            patterns.append(pattern)
-        
-        # Sort by frequency (most common patterns first)
-        patterns.sort(key=lambda x: x.frequency_per_week, reverse=True)
+        days = columns.timestamps.astype("datetime64[D]")
+        hours = (columns.timestamps - days).astype("timedelta64[h]").astype(np.int64)
+        weekdays = (days.astype(np.int64) + 3) % 7  # 1970-01-01 was a Thursday
+        hour_counts = np.bincount(emotions * 24 + hours, minlength=emotion_count * 24).reshape(emotion_count, 24)
+        day_counts = np.bincount(emotions * 7 + weekdays, minlength=emotion_count * 7).reshape(emotion_count, 7)
         
-        # Save patterns to database
-        for pattern in patterns:
-            self._save_emotion_pattern(pattern)
+        triggered = columns.triggers != NO_TRIGGER
+        trigger_counts = np.bincount(
+            emotions[triggered] * trigger_count + columns.triggers[triggered],
+            minlength=emotion_count * trigger_count
+        ).reshape(emotion_count, trigger_count)
         
-        return patterns
-    
-    def _analyze_single_emotion_pattern(
-        self,
-        patient_id: str,
-        emotion_type: str,
-        entries: List[EmotionEntry],
-        start_date: datetime,
-        end_date: datetime
-    ) -> EmotionPattern:
-        """Analyze patterns for a specific emotion"""
-        
-        pattern = EmotionPattern(
-            patient_id=patient_id,
-            primary_emotion=EmotionCategory(emotion_type),
-            date_range_start=start_date,
-            date_range_end=end_date
-        )
-        
-        # Calculate basic statistics
-        intensities = [entry.intensity for entry in entries]
-        pattern.average_intensity = statistics.mean(intensities)
-        
-        # Calculate frequency per week
         days_analyzed = (end_date - start_date).days
         weeks_analyzed = max(1, days_analyzed / 7)
-        pattern.frequency_per_week = len(entries) / weeks_analyzed
-        
-        # Analyze triggers
-        trigger_counts = {}
-        for entry in entries:
-            if entry.trigger:
-                trigger_key = entry.trigger.value
-                trigger_counts[trigger_key] = trigger_counts.get(trigger_key, 0) + 1
+        emotion_types = list(EmotionCategory)
+        trigger_types = list(TriggerType)
         
-        # Get most common triggers (at least 20% of entries)
-        min_trigger_count = max(1, len(entries) * 0.2)
-        common_triggers = [
-            TriggerType(trigger) for trigger, count in trigger_counts.items()
-            if count >= min_trigger_count
-        ]
-        pattern.common_triggers = common_triggers
+        # Emotions in order of their most recent entry, as the per-entry grouping produced them
+        codes, first_positions = np.unique(emotions, return_index=True)
         
-        # Analyze time patterns
-        time_counts = {}
-        day_counts = {}
+        patterns = []
         
-        for entry in entries:
-            hour = entry.timestamp.hour
-            day_of_week = entry.timestamp.strftime('%A')
+        for code in codes[np.argsort(first_positions)]:
+            entry_count = int(entry_counts[code])
+            if entry_count < MIN_PATTERN_ENTRIES:
+                continue
             
-            time_counts[str(hour)] = time_counts.get(str(hour), 0) + 1
-            day_counts[day_of_week] = day_counts.get(day_of_week, 0) + 1
-        
-        pattern.time_patterns = time_counts
-        pattern.day_patterns = day_counts
-        
-        # Analyze common thoughts and behaviors
-        all_thoughts = []
-        all_behaviors = []
-        all_physical = []
-        
-        for entry in entries:
-            all_thoughts.extend(entry.thoughts)
-            all_behaviors.extend(entry.behaviors)
-            all_physical.extend(entry.physical_sensations)
-        
-        # Find most common thoughts/behaviors (simple frequency count)
-        thought_counts = {}
-        behavior_counts = {}
-        physical_counts = {}
-        
-        for thought in all_thoughts:
-            thought_counts[thought] = thought_counts.get(thought, 0) + 1
-        
-        for behavior in all_behaviors:
-            behavior_counts[behavior] = behavior_counts.get(behavior, 0) + 1
+            pattern = EmotionPattern(
+                patient_id=patient_id,
+                primary_emotion=emotion_types[code],
+                date_range_start=start_date,
+                date_range_end=end_date
+            )
+            pattern.average_intensity = float(intensity_sums[code] / entry_count)
+            pattern.frequency_per_week = entry_count / weeks_analyzed
             
-        for sensation in all_physical:
-            physical_counts[sensation] = physical_counts.get(sensation, 0) + 1
-        
-        # Keep top 5 most common in each category
-        pattern.common_thoughts = sorted(thought_counts.keys(), 
-                                       key=lambda x: thought_counts[x], reverse=True)[:5]
-        pattern.common_behaviors = sorted(behavior_counts.keys(), 
-                                        key=lambda x: behavior_counts[x], reverse=True)[:5]
-        pattern.physical_patterns = sorted(physical_counts.keys(), 
-                                         key=lambda x: physical_counts[x], reverse=True)[:5]
+            # Triggers behind at least 20% of the emotion's entries, most frequent first
+            min_trigger_count = max(1, entry_count * 0.2)
+            emotion_triggers = trigger_counts[code]
+            pattern.common_triggers = [
+                trigger_types[trigger] for trigger in np.argsort(-emotion_triggers, kind="stable")
+                if emotion_triggers[trigger] >= min_trigger_count
+            ]
+            
+            pattern.time_patterns = {
+                str(hour): int(count) for hour, count in enumerate(hour_counts[code]) if count
+            }
+            pattern.day_patterns = {
+                DAY_NAMES[day]: int(count) for day, count in enumerate(day_counts[code]) if count
+            }
+            
+            positions = np.flatnonzero(emotions == code)
+            pattern.common_thoughts = self._most_common_items(columns.thoughts, positions)
+            pattern.common_behaviors = self._most_common_items(columns.behaviors, positions)
+            pattern.physical_patterns = self._most_common_items(columns.physical_sensations, positions)
+            
+            pattern.recommended_interventions = self._generate_intervention_recommendations(pattern)
+            pattern.therapeutic_focus_areas = self._identify_focus_areas(pattern)
+            pattern.confidence_score = self._calculate_confidence_score(pattern, entry_count)
+            
+            patterns.append(pattern)
         
-        # Generate intervention recommendations
-        pattern.recommended_interventions = self._generate_intervention_recommendations(pattern)
-        pattern.therapeutic_focus_areas = self._identify_focus_areas(pattern)
+        # Sort by frequency (most common patterns first)
+        patterns.sort(key=lambda x: x.frequency_per_week, reverse=True)
         
-        # Calculate confidence score
-        pattern.confidence_score = self._calculate_confidence_score(pattern, len(entries))
+        self._save_emotion_patterns(patterns)
         
-        return pattern
+        return patterns
+    
+    def _most_common_items(self, json_lists: List[str], positions: np.ndarray, top: int = 5) -> List[str]:
+        """The top most frequent items across the JSON arrays at positions
+        
+        Entries repeat the same lists, so each distinct array is parsed once
+        and weighted by how often it occurs.
+        """
+        list_counts = Counter(json_lists[position] for position in positions)
+        counts = Counter()
+        for value, occurrences in list_counts.items():
+            if value and value != "[]":
+                for item in json.loads(value):
+                    counts[item] += occurrences
+        return [item for item, _ in counts.most_common(top)]
     
     def _generate_intervention_recommendations(self, pattern: EmotionPattern) -> List[str]:
         """Generate therapeutic intervention recommendations based on pattern"""
@@ -825,10 +1277,17 @@ class EmotionTracker:
     
     def _save_emotion_pattern(self, pattern: EmotionPattern):
         """Save emotion pattern to database"""
+        self._save_emotion_patterns([pattern])
+    
+    def _save_emotion_patterns(self, patterns: List[EmotionPattern]):
+        """Save a set of emotion patterns in one transaction"""
+        if not patterns:
+            return
+        
         with sqlite3.connect(self.db_path) as conn:
             cursor = conn.cursor()
             
-            cursor.execute("""
+            cursor.executemany("""
                 INSERT OR REPLACE INTO emotion_patterns (
                     pattern_id, patient_id, primary_emotion, common_triggers,
                     average_intensity, frequency_per_week, time_patterns,
@@ -837,18 +1296,21 @@ class EmotionTracker:
                     therapeutic_focus_areas, date_range_start, date_range_end,
                     confidence_score, created_date
                 ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """, (
-                pattern.pattern_id, pattern.patient_id, pattern.primary_emotion.value,
-                json.dumps([t.value for t in pattern.common_triggers]),
-                pattern.average_intensity, pattern.frequency_per_week,
-                json.dumps(pattern.time_patterns), json.dumps(pattern.day_patterns),
-                json.dumps(pattern.common_thoughts), json.dumps(pattern.common_behaviors),
-                json.dumps(pattern.physical_patterns),
-                json.dumps(pattern.recommended_interventions),
-                json.dumps(pattern.therapeutic_focus_areas),
-                pattern.date_range_start.isoformat(), pattern.date_range_end.isoformat(),
-                pattern.confidence_score, pattern.created_date.isoformat()
-            ))
+            """, [
+                (
+                    pattern.pattern_id, pattern.patient_id, pattern.primary_emotion.value,
+                    json.dumps([t.value for t in pattern.common_triggers]),
+                    pattern.average_intensity, pattern.frequency_per_week,
+                    json.dumps(pattern.time_patterns), json.dumps(pattern.day_patterns),
+                    json.dumps(pattern.common_thoughts), json.dumps(pattern.common_behaviors),
+                    json.dumps(pattern.physical_patterns),
+                    json.dumps(pattern.recommended_interventions),
+                    json.dumps(pattern.therapeutic_focus_areas),
+                    pattern.date_range_start.isoformat(), pattern.date_range_end.isoformat(),
+                    pattern.confidence_score, pattern.created_date.isoformat()
+                )
+                for pattern in patterns
+            ])
             
             conn.commit()
     
@@ -867,7 +1329,8 @@ class EmotionTracker:
         
         # Get all data
         entries = self.get_emotion_entries(patient_id, start_date, end_date)
-        diary_cards = self.get_dbt_diary_cards_range(patient_id, start_date, end_date)
+        diary_totals = self.get_diary_card_totals(patient_id, start_date, end_date)
+        weekly_diaries = self.get_weekly_diary_rollups(patient_id, start_date, end_date)
         patterns = self.analyze_emotion_patterns(patient_id, report_period_days)
         
         # Basic statistics
@@ -881,9 +1344,8 @@ class EmotionTracker:
         
         # DBT diary card completion rate
         diary_completion_rate = 0
-        if diary_cards:
-            completed_cards = sum(1 for card in diary_cards if card.completed)
-            diary_completion_rate = completed_cards / len(diary_cards)
+        if diary_totals["card_count"]:
+            diary_completion_rate = diary_totals["completed_count"] / diary_totals["card_count"]
         
         # Coping skills effectiveness
         coping_effectiveness = []
@@ -898,7 +1360,7 @@ class EmotionTracker:
         intervention_needed_count = sum(1 for e in entries if e.intervention_needed)
         
         # Generate insights
-        insights = self._generate_insights(entries, patterns, diary_cards)
+        insights = self._generate_insights(entries, patterns, diary_totals)
         
         report = {
             "report_period": {
@@ -909,7 +1371,7 @@ class EmotionTracker:
             "summary_statistics": {
                 "total_emotion_entries": total_entries,
                 "average_intensity": round(avg_intensity, 2),
-                "diary_cards_completed": len([c for c in diary_cards if c.completed]),
+                "diary_cards_completed": diary_totals["completed_count"],
                 "diary_completion_rate": round(diary_completion_rate, 2),
                 "high_intensity_episodes": high_intensity_count,
                 "interventions_needed": intervention_needed_count
@@ -930,6 +1392,13 @@ class EmotionTracker:
                 }
                 for pattern in patterns[:5]  # Top 5 patterns
             ],
+            "weekly_diary_trends": {
+                "week_starts": [str(week) for week in weekly_diaries.week_starts],
+                "completion_rate": weekly_diaries.completion_rate.round(2).tolist(),
+                "mean_self_harm_urges": weekly_diaries.mean_self_harm_urges.round(2).tolist(),
+                "mean_suicide_urges": weekly_diaries.mean_suicide_urges.round(2).tolist(),
+                "mean_hours_slept": weekly_diaries.mean_hours_slept.round(2).tolist()
+            },
             "therapeutic_insights": insights,
             "generated_at": datetime.now().isoformat()
         }
@@ -940,7 +1409,7 @@ class EmotionTracker:
         self, 
         entries: List[EmotionEntry], 
         patterns: List[EmotionPattern],
-        diary_cards: List[DBTDiaryCard]
+        diary_totals: Dict[str, int]
     ) -> List[str]:
         """Generate therapeutic insights from data analysis"""
         insights = []
@@ -967,9 +1436,9 @@ class EmotionTracker:
                 insights.append(f"High frequency of {top_pattern.primary_emotion.value} suggests this as primary treatment target.")
         
         # DBT-specific insights
-        if diary_cards:
-            avg_self_harm = statistics.mean([c.self_harm_urges for c in diary_cards])
-            avg_suicide = statistics.mean([c.suicide_urges for c in diary_cards])
+        if diary_totals["card_count"]:
+            avg_self_harm = diary_totals["self_harm_urges_sum"] / diary_totals["card_count"]
+            avg_suicide = diary_totals["suicide_urges_sum"] / diary_totals["card_count"]
             
             if avg_self_harm >= 3:
                 insights.append("Elevated self-harm urges require immediate attention and safety planning.")
@@ -977,9 +1446,9 @@ class EmotionTracker:
                 insights.append("Suicide ideation present - requires ongoing safety assessment and intervention.")
         
         # Coping insights
-        coping_attempts = [e for e in entries if e.coping_skills_used]
-        if coping_attempts:
-            avg_effectiveness = statistics.mean([e.coping_effectiveness for e in coping_attempts if e.coping_effectiveness])
+        coping_ratings = [e.coping_effectiveness for e in entries if e.coping_skills_used and e.coping_effectiveness]
+        if coping_ratings:
+            avg_effectiveness = statistics.mean(coping_ratings)
             if avg_effectiveness < 5:
                 insights.append("Low coping effectiveness suggests need for skills training or strategy modification.")
         
@@ -999,22 +1468,30 @@ class EmotionTracker:
         """Get a summary of emotions for a specific week"""
         week_end = week_start + timedelta(days=7)
         
-        entries = self.get_emotion_entries(patient_id, week_start, week_end)
-        diary_cards = self.get_dbt_diary_cards_range(patient_id, week_start, week_end)
+        columns = self.get_emotion_columns(patient_id, week_start, week_end)
+        diaries = self.get_diary_card_series(patient_id, week_start, week_end)
+        
+        # Daily emotion averages; an entry exactly at week_end counts towards the week only
+        first_day = np.datetime64(week_start.date())
+        day_index = (columns.timestamps.astype("datetime64[D]") - first_day).astype(np.int64)
+        in_week = (day_index >= 0) & (day_index < 7)
+        day_index, emotions = day_index[in_week], columns.emotions[in_week]
+        
+        entry_counts = np.bincount(day_index, minlength=7)
+        intensity_sums = np.bincount(day_index, weights=columns.intensities[in_week], minlength=7)
+        emotion_counts = np.bincount(
+            day_index * len(EMOTION_CODES) + emotions, minlength=7 * len(EMOTION_CODES)
+        ).reshape(7, len(EMOTION_CODES))
+        emotion_types = list(EmotionCategory)
         
-        # Daily emotion averages
         daily_emotions = {}
         for i in range(7):
-            day = week_start + timedelta(days=i)
-            day_key = day.strftime('%Y-%m-%d')
-            day_entries = [e for e in entries if e.timestamp.date() == day.date()]
-            
-            if day_entries:
+            day_key = (week_start + timedelta(days=i)).strftime('%Y-%m-%d')
+            if entry_counts[i]:
                 daily_emotions[day_key] = {
-                    "average_intensity": statistics.mean([e.intensity for e in day_entries]),
-                    "entry_count": len(day_entries),
-                    "most_common_emotion": max(set([e.emotion.value for e in day_entries]), 
-                                             key=[e.emotion.value for e in day_entries].count)
+                    "average_intensity": float(intensity_sums[i] / entry_counts[i]),
+                    "entry_count": int(entry_counts[i]),
+                    "most_common_emotion": emotion_types[int(emotion_counts[i].argmax())].value
                 }
             else:
                 daily_emotions[day_key] = {
@@ -1024,18 +1501,17 @@ class EmotionTracker:
                 }
         
         # DBT diary completion
-        diary_completion = {}
-        for card in diary_cards:
-            day_key = card.date.strftime('%Y-%m-%d')
-            diary_completion[day_key] = card.completed
+        diary_completion = {
+            str(day): bool(completed) for day, completed in zip(diaries.dates, diaries.completed)
+        }
         
         return {
             "week_start": week_start.isoformat(),
             "week_end": week_end.isoformat(),
             "daily_emotions": daily_emotions,
             "diary_completion": diary_completion,
-            "total_entries": len(entries),
-            "average_weekly_intensity": statistics.mean([e.intensity for e in entries]) if entries else 0
+            "total_entries": len(columns),
+            "average_weekly_intensity": float(columns.intensities.mean()) if len(columns) else 0
         }
     
     # ========================================================================
@@ -1043,56 +1519,38 @@ class EmotionTracker:
     # ========================================================================
     
     def check_safety_alerts(self, patient_id: str) -> List[Dict[str, Any]]:
-        """Check for safety alerts based on recent emotion tracking"""
-        alerts = []
-        
-        # Check recent high-intensity episodes
-        recent_entries = self.get_emotion_entries(
-            patient_id, 
-            datetime.now() - timedelta(days=7), 
-            limit=50
-        )
+        """Check for safety alerts based on recent emotion tracking
         
-        high_intensity_count = sum(1 for e in recent_entries if e.intensity >= 9)
-        if high_intensity_count >= 3:
-            alerts.append({
-                "type": "high_intensity_episodes",
-                "severity": "high",
-                "message": f"{high_intensity_count} high-intensity emotional episodes in past week",
-                "recommendation": "Consider crisis intervention and safety planning"
-            })
-        
-        # Check intervention requests
-        intervention_needed = sum(1 for e in recent_entries if e.intervention_needed)
-        if intervention_needed >= 2:
-            alerts.append({
-                "type": "intervention_requests",
-                "severity": "medium",
-                "message": f"{intervention_needed} requests for intervention in past week",
-                "recommendation": "Increase session frequency or provide additional support"
-            })
+        Entry-based alerts are read from the alert stream's sliding-window
+        counters, refreshed from the database so entries logged by other
+        processes count; use alert_stream.subscribe() to receive them as
+        they are raised instead of polling.
+        """
+        alerts = [alert.to_dict() for alert in self.alert_stream.get_active_alerts(patient_id, refresh=True)]
         
         # Check DBT diary cards for concerning urges
-        recent_diaries = self.get_dbt_diary_cards_range(
+        recent_diaries = self.get_diary_card_series(
             patient_id,
             datetime.now() - timedelta(days=7),
             datetime.now()
         )
         
-        for diary in recent_diaries:
-            if diary.suicide_urges >= 5:
+        for day, suicide_urges, self_harm_urges in zip(
+            recent_diaries.dates, recent_diaries.suicide_urges, recent_diaries.self_harm_urges
+        ):
+            if suicide_urges >= 5:
                 alerts.append({
                     "type": "suicide_ideation",
                     "severity": "critical",
-                    "message": f"High suicide urges reported on {diary.date.strftime('%Y-%m-%d')}",
+                    "message": f"High suicide urges reported on {day}",
                     "recommendation": "Immediate safety assessment and intervention required"
                 })
             
-            if diary.self_harm_urges >= 7:
+            if self_harm_urges >= 7:
                 alerts.append({
                     "type": "self_harm_urges",
                     "severity": "high",
-                    "message": f"High self-harm urges reported on {diary.date.strftime('%Y-%m-%d')}",
+                    "message": f"High self-harm urges reported on {day}",
                     "recommendation": "Assess safety and provide crisis coping skills"
                 })
         
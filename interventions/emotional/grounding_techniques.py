@@ -1,13 +1,19 @@
 import sqlite3
 import json
+from bisect import bisect_left, bisect_right
+from collections import Counter
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Tuple, Any
-from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple, Any, Iterable
+from dataclasses import dataclass, field, replace
 from enum import Enum
-import uuid
 import random
+import threading
 from pathlib import Path
 
+from utilities.data_storage import WritePipeline, WriteEvent, RowWrite, WriteOperation, get_write_pipeline
+from utilities.identifiers import new_id
+from utilities.reference_catalog import get_reference_library
+
 
 class GroundingType(Enum):
     SENSORY_5_4_3_2_1 = "sensory_5_4_3_2_1"
@@ -39,7 +45,7 @@ class GroundingSetting(Enum):
 
 @dataclass
 class GroundingTechnique:
-    technique_id: str = field(default_factory=lambda: str(uuid.uuid4()))
+    technique_id: str = field(default_factory=new_id)
     name: str = ""
     grounding_type: GroundingType = GroundingType.SENSORY_5_4_3_2_1
     difficulty_level: DifficultyLevel = DifficultyLevel.BEGINNER
@@ -63,7 +69,7 @@ class GroundingTechnique:
 
 @dataclass
 class GroundingSession:
-    session_id: str = field(default_factory=lambda: str(uuid.uuid4()))
+    session_id: str = field(default_factory=new_id)
     patient_id: str = ""
     technique_id: str = ""
     
@@ -96,7 +102,7 @@ class GroundingSession:
 
 @dataclass
 class GroundingPlan:
-    plan_id: str = field(default_factory=lambda: str(uuid.uuid4()))
+    plan_id: str = field(default_factory=new_id)
     patient_id: str = ""
     
     preferred_techniques: List[str] = field(default_factory=list)
@@ -113,11 +119,196 @@ class GroundingPlan:
     last_updated: datetime = field(default_factory=datetime.now)
 
 
+# Longest look-back served from the per-patient usage cache
+USAGE_WINDOW_DAYS = 30
+
+
+class GroundingTechniqueIndex:
+    """In-memory lookup structures over the technique library
+    
+    Each technique holds a fixed slot (its load order). Symptoms, settings,
+    difficulty levels, types and duration limits map to bitsets over those
+    slots, so a filter is a few integer ANDs. Rank order, effectiveness then
+    usage count, matches the ORDER BY the technique queries used and is
+    re-sorted when either changes. Techniques handed out are the indexed
+    instances and must be treated as read-only.
+    """
+    
+    __slots__ = (
+        "techniques", "slots", "all_bits", "symptom_bits", "setting_bits",
+        "difficulty_bits", "type_bits", "_durations", "_duration_bits", "_rank"
+    )
+    
+    def __init__(self, techniques: List[GroundingTechnique]):
+        self.techniques = techniques
+        self.slots = {technique.technique_id: slot for slot, technique in enumerate(techniques)}
+        self.all_bits = (1 << len(techniques)) - 1
+        
+        self.symptom_bits: Dict[str, int] = {}
+        self.setting_bits: Dict[GroundingSetting, int] = {}
+        self.difficulty_bits: Dict[DifficultyLevel, int] = {}
+        self.type_bits: Dict[GroundingType, int] = {}
+        duration_bits: Dict[int, int] = {}
+        
+        for slot, technique in enumerate(techniques):
+            bit = 1 << slot
+            for symptom in technique.target_symptoms:
+                self.symptom_bits[symptom] = self.symptom_bits.get(symptom, 0) | bit
+            for setting in technique.settings:
+                self.setting_bits[setting] = self.setting_bits.get(setting, 0) | bit
+            self.difficulty_bits[technique.difficulty_level] = \
+                self.difficulty_bits.get(technique.difficulty_level, 0) | bit
+            self.type_bits[technique.grounding_type] = self.type_bits.get(technique.grounding_type, 0) | bit
+            if technique.duration_minutes is not None:
+                duration_bits[technique.duration_minutes] = duration_bits.get(technique.duration_minutes, 0) | bit
+        
+        # Duration buckets: _duration_bits[i] holds every technique no longer than _durations[i]
+        self._durations = sorted(duration_bits)
+        self._duration_bits = []
+        cumulative = 0
+        for duration in self._durations:
+            cumulative |= duration_bits[duration]
+            self._duration_bits.append(cumulative)
+        
+        self._rank: List[int] = []
+        self._sort_rank()
+    
+    def _sort_rank(self):
+        # ORDER BY effectiveness_rating DESC, usage_count DESC: unrated techniques last,
+        # ties in load order
+        self._rank = sorted(range(len(self.techniques)), key=lambda slot: (
+            self.techniques[slot].effectiveness_rating is None,
+            -(self.techniques[slot].effectiveness_rating or 0),
+            -self.techniques[slot].usage_count,
+            slot
+        ))
+    
+    def get(self, technique_id: str) -> Optional[GroundingTechnique]:
+        slot = self.slots.get(technique_id)
+        return None if slot is None else self.techniques[slot]
+    
+    def bit(self, technique_id: str) -> int:
+        slot = self.slots.get(technique_id)
+        return 0 if slot is None else 1 << slot
+    
+    def within_duration(self, minutes: int) -> int:
+        position = bisect_right(self._durations, minutes)
+        return self._duration_bits[position - 1] if position else 0
+    
+    def for_setting(self, setting: GroundingSetting) -> int:
+        """Techniques usable in setting, including those usable anywhere"""
+        return self.setting_bits.get(setting, 0) | self.setting_bits.get(GroundingSetting.ANYWHERE, 0)
+    
+    def for_symptoms(self, symptoms: Iterable[str]) -> int:
+        """Techniques targeting any of symptoms"""
+        bits = 0
+        for symptom in symptoms:
+            bits |= self.symptom_bits.get(symptom, 0)
+        return bits
+    
+    def ranked(self, bits: int, limit: Optional[int] = None) -> List[GroundingTechnique]:
+        """Techniques in bits, best ranked first"""
+        techniques = []
+        for slot in self._rank:
+            if bits >> slot & 1:
+                techniques.append(self.techniques[slot])
+                if limit is not None and len(techniques) == limit:
+                    break
+        return techniques
+    
+    def record_use(self, technique_id: str):
+        technique = self.get(technique_id)
+        if technique is not None:
+            technique.usage_count += 1
+            self._sort_rank()
+    
+    def set_effectiveness(self, technique_id: str, effectiveness_rating: Optional[float]):
+        technique = self.get(technique_id)
+        if technique is not None:
+            technique.effectiveness_rating = effectiveness_rating
+            self._sort_rank()
+
+
+class PatientUsageHistory:
+    """Start times and techniques of one patient's recent grounding sessions, oldest first"""
+    
+    __slots__ = ("start_times", "technique_ids")
+    
+    def __init__(self, sessions: List[Tuple[str, str]]):
+        sessions = sorted(sessions)
+        self.start_times = [start_time for start_time, _ in sessions]
+        self.technique_ids = [technique_id for _, technique_id in sessions]
+    
+    def add(self, start_time: str, technique_id: str):
+        position = bisect_right(self.start_times, start_time)
+        self.start_times.insert(position, start_time)
+        self.technique_ids.insert(position, technique_id)
+    
+    def counts_since(self, start_time: str) -> Counter:
+        """Sessions per technique started at or after start_time"""
+        return Counter(self.technique_ids[bisect_left(self.start_times, start_time):])
+    
+    def prune(self, start_time: str):
+        """Forget sessions started before start_time"""
+        position = bisect_left(self.start_times, start_time)
+        if position:
+            del self.start_times[:position]
+            del self.technique_ids[:position]
+
+
+class GroundingCache:
+    """Technique index, usage histories and plans shared by every library on one database
+    
+    Recommendation lookups are answered from here: the technique index is built
+    on first use, usage histories and plans are loaded per patient. Each library
+    updates the shared copy as it writes, so another instance on the same file
+    never serves data from before that write.
+    """
+    
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.technique_index: Optional[GroundingTechniqueIndex] = None
+        self.usage_histories: Dict[str, PatientUsageHistory] = {}
+        self.plans: Dict[str, Optional[GroundingPlan]] = {}
+
+
+_caches: Dict[str, GroundingCache] = {}
+_caches_lock = threading.Lock()
+
+
+def get_grounding_cache(db_path: str = "data/therapy_system.db") -> GroundingCache:
+    """Process-wide grounding cache for a database file"""
+    
+    key = str(Path(db_path).resolve())
+    with _caches_lock:
+        cache = _caches.get(key)
+        if cache is None:
+            cache = GroundingCache()
+            _caches[key] = cache
+        return cache
+
+
 class GroundingTechniqueLibrary:
     
-    def __init__(self, db_path: str = "data/therapy_system.db"):
+    def __init__(self, db_path: str = "data/therapy_system.db",
+                 write_pipeline: Optional[WritePipeline] = None):
         self.db_path = db_path
         self._initialize_database()
+        self.write_pipeline = write_pipeline or get_write_pipeline(db_path)
+        
+        # Built techniques shared by every library instance in the process
+        self.reference_techniques = get_reference_library(
+            "grounding_techniques", self._get_default_techniques, key="technique_id",
+            indexes={
+                "grounding_type": "grounding_type", "difficulty_level": "difficulty_level",
+                "setting": "settings", "symptom": "target_symptoms"
+            }
+        )
+        
+        # Recommendation lookups are answered from memory shared with every other
+        # library on this database
+        self._cache = get_grounding_cache(db_path)
+        
         self._populate_default_techniques()
     
     def _initialize_database(self):
@@ -195,7 +386,7 @@ class GroundingTechniqueLibrary:
             conn.commit()
     
     def _populate_default_techniques(self):
-        default_techniques = self._get_default_techniques()
+        default_techniques = self.reference_techniques.values()
         
         with sqlite3.connect(self.db_path) as conn:
             cursor = conn.cursor()
@@ -225,6 +416,90 @@ class GroundingTechniqueLibrary:
                 ))
             
             conn.commit()
+        
+        self.refresh_technique_index()
+    
+    @property
+    def technique_index(self) -> GroundingTechniqueIndex:
+        with self._cache.lock:
+            if self._cache.technique_index is None:
+                with sqlite3.connect(self.db_path) as conn:
+                    cursor = conn.cursor()
+                    cursor.execute("SELECT * FROM grounding_techniques ORDER BY rowid")
+                    techniques = [self._row_to_technique(row) for row in cursor.fetchall()]
+                self._cache.technique_index = GroundingTechniqueIndex(techniques)
+            return self._cache.technique_index
+    
+    def refresh_technique_index(self):
+        """Rebuild the technique index on next use, after the library changed outside this process"""
+        with self._cache.lock:
+            self._cache.technique_index = None
+    
+    def _row_to_technique(self, row: Tuple) -> GroundingTechnique:
+        # Built-in techniques take their content from the reference catalog; only
+        # the usage statistics are read from the row
+        reference = self.reference_techniques.get(row[0])
+        if reference is not None:
+            return replace(
+                reference, effectiveness_rating=row[13], usage_count=row[14],
+                created_date=datetime.fromisoformat(row[15])
+            )
+        
+        return GroundingTechnique(
+            technique_id=row[0],
+            name=row[1],
+            grounding_type=GroundingType(row[2]),
+            difficulty_level=DifficultyLevel(row[3]),
+            duration_minutes=row[4],
+            description=row[5] or "",
+            instructions=json.loads(row[6] or '[]'),
+            settings=[GroundingSetting(s) for s in json.loads(row[7] or '[]')],
+            target_symptoms=json.loads(row[8] or '[]'),
+            contraindications=json.loads(row[9] or '[]'),
+            materials_needed=json.loads(row[10] or '[]'),
+            audio_cues=json.loads(row[11] or '[]'),
+            variations=json.loads(row[12] or '[]'),
+            effectiveness_rating=row[13],
+            usage_count=row[14],
+            created_date=datetime.fromisoformat(row[15])
+        )
+    
+    def _get_usage_history(self, patient_id: str) -> PatientUsageHistory:
+        window_start = (datetime.now() - timedelta(days=USAGE_WINDOW_DAYS)).isoformat()
+        
+        with self._cache.lock:
+            history = self._cache.usage_histories.get(patient_id)
+            if history is None:
+                self.write_pipeline.flush()
+                with sqlite3.connect(self.db_path) as conn:
+                    cursor = conn.cursor()
+                    cursor.execute("""
+                        SELECT start_time, technique_id FROM grounding_sessions
+                        WHERE patient_id = ? AND start_time >= ?
+                    """, (patient_id, window_start))
+                    history = PatientUsageHistory(cursor.fetchall())
+                self._cache.usage_histories[patient_id] = history
+            else:
+                history.prune(window_start)
+            
+            return history
+    
+    def get_technique_usage_counts(self, patient_id: str, days_back: int = 30) -> Dict[str, int]:
+        """Sessions per technique the patient started in the last days_back days"""
+        
+        start_date = (datetime.now() - timedelta(days=days_back)).isoformat()
+        if days_back <= USAGE_WINDOW_DAYS:
+            return self._get_usage_history(patient_id).counts_since(start_date)
+        
+        self.write_pipeline.flush()
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT technique_id, COUNT(*) FROM grounding_sessions
+                WHERE patient_id = ? AND start_time >= ?
+                GROUP BY technique_id
+            """, (patient_id, start_date))
+            return dict(cursor.fetchall())
     
     def _get_default_techniques(self) -> List[GroundingTechnique]:
         return [
@@ -488,69 +763,11 @@ class GroundingTechniqueLibrary:
         ]
     
     def get_technique(self, technique_id: str) -> Optional[GroundingTechnique]:
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.cursor()
-            
-            cursor.execute("""
-                SELECT * FROM grounding_techniques WHERE technique_id = ?
-            """, (technique_id,))
-            
-            row = cursor.fetchone()
-            if not row:
-                return None
-            
-            return GroundingTechnique(
-                technique_id=row[0],
-                name=row[1],
-                grounding_type=GroundingType(row[2]),
-                difficulty_level=DifficultyLevel(row[3]),
-                duration_minutes=row[4],
-                description=row[5] or "",
-                instructions=json.loads(row[6] or '[]'),
-                settings=[GroundingSetting(s) for s in json.loads(row[7] or '[]')],
-                target_symptoms=json.loads(row[8] or '[]'),
-                contraindications=json.loads(row[9] or '[]'),
-                materials_needed=json.loads(row[10] or '[]'),
-                audio_cues=json.loads(row[11] or '[]'),
-                variations=json.loads(row[12] or '[]'),
-                effectiveness_rating=row[13],
-                usage_count=row[14],
-                created_date=datetime.fromisoformat(row[15])
-            )
+        return self.technique_index.get(technique_id)
     
     def get_techniques_by_type(self, grounding_type: GroundingType) -> List[GroundingTechnique]:
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.cursor()
-            
-            cursor.execute("""
-                SELECT * FROM grounding_techniques 
-                WHERE grounding_type = ?
-                ORDER BY effectiveness_rating DESC, usage_count DESC
-            """, (grounding_type.value,))
-            
-            techniques = []
-            for row in cursor.fetchall():
-                technique = GroundingTechnique(
-                    technique_id=row[0],
-                    name=row[1],
-                    grounding_type=GroundingType(row[2]),
-                    difficulty_level=DifficultyLevel(row[3]),
-                    duration_minutes=row[4],
-                    description=row[5] or "",
-                    instructions=json.loads(row[6] or '[]'),
-                    settings=[GroundingSetting(s) for s in json.loads(row[7] or '[]')],
-                    target_symptoms=json.loads(row[8] or '[]'),
-                    contraindications=json.loads(row[9] or '[]'),
-                    materials_needed=json.loads(row[10] or '[]'),
-                    audio_cues=json.loads(row[11] or '[]'),
-                    variations=json.loads(row[12] or '[]'),
-                    effectiveness_rating=row[13],
-                    usage_count=row[14],
-                    created_date=datetime.fromisoformat(row[15])
-                )
-                techniques.append(technique)
-            
-            return techniques
+        index = self.technique_index
+        return index.ranked(index.type_bits.get(grounding_type, 0))
     
     def get_recommended_techniques(
         self,
@@ -561,52 +778,22 @@ class GroundingTechniqueLibrary:
         difficulty_level: DifficultyLevel = None
     ) -> List[GroundingTechnique]:
         
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.cursor()
-            
-            query = "SELECT * FROM grounding_techniques WHERE 1=1"
-            params = []
-            
-            if available_time:
-                query += " AND duration_minutes <= ?"
-                params.append(available_time)
-            
-            if difficulty_level:
-                query += " AND difficulty_level = ?"
-                params.append(difficulty_level.value)
-            
-            query += " ORDER BY effectiveness_rating DESC, usage_count DESC LIMIT 10"
-            
-            cursor.execute(query, params)
-            
-            all_techniques = []
-            for row in cursor.fetchall():
-                technique = GroundingTechnique(
-                    technique_id=row[0],
-                    name=row[1],
-                    grounding_type=GroundingType(row[2]),
-                    difficulty_level=DifficultyLevel(row[3]),
-                    duration_minutes=row[4],
-                    description=row[5] or "",
-                    instructions=json.loads(row[6] or '[]'),
-                    settings=[GroundingSetting(s) for s in json.loads(row[7] or '[]')],
-                    target_symptoms=json.loads(row[8] or '[]'),
-                    contraindications=json.loads(row[9] or '[]'),
-                    materials_needed=json.loads(row[10] or '[]'),
-                    audio_cues=json.loads(row[11] or '[]'),
-                    variations=json.loads(row[12] or '[]'),
-                    effectiveness_rating=row[13],
-                    usage_count=row[14],
-                    created_date=datetime.fromisoformat(row[15])
-                )
-                all_techniques.append(technique)
+        index = self.technique_index
         
-        filtered_techniques = all_techniques
+        candidates = index.all_bits
+        if available_time:
+            candidates &= index.within_duration(available_time)
+        if difficulty_level:
+            candidates &= index.difficulty_bits.get(difficulty_level, 0)
+        
+        filtered_techniques = index.ranked(candidates, limit=10)
         
         if current_symptoms:
+            symptom_bits = [index.symptom_bits.get(symptom, 0) for symptom in set(current_symptoms)]
             symptom_matches = []
-            for technique in all_techniques:
-                matches = len(set(current_symptoms) & set(technique.target_symptoms))
+            for technique in filtered_techniques:
+                bit = index.bit(technique.technique_id)
+                matches = sum(1 for bits in symptom_bits if bits & bit)
                 if matches > 0:
                     symptom_matches.append((technique, matches))
             
@@ -614,15 +801,13 @@ class GroundingTechniqueLibrary:
             filtered_techniques = [t[0] for t in symptom_matches[:5]]
         
         if setting:
+            setting_bits = index.for_setting(setting)
             filtered_techniques = [
-                t for t in filtered_techniques 
-                if setting in t.settings or GroundingSetting.ANYWHERE in t.settings
+                t for t in filtered_techniques
+                if index.bit(t.technique_id) & setting_bits
             ]
         
-        past_sessions = self.get_patient_session_history(patient_id, days_back=30)
-        technique_usage = {}
-        for session in past_sessions:
-            technique_usage[session.technique_id] = technique_usage.get(session.technique_id, 0) + 1
+        technique_usage = self.get_technique_usage_counts(patient_id, days_back=30)
         
         def sort_key(technique):
             usage_penalty = technique_usage.get(technique.technique_id, 0) * 0.1
@@ -652,39 +837,45 @@ class GroundingTechniqueLibrary:
             crisis_situation=crisis_situation
         )
         
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.cursor()
-            
-            cursor.execute("""
-                INSERT INTO grounding_sessions (
-                    session_id, patient_id, technique_id, start_time,
-                    end_time, duration_minutes, pre_session_distress,
-                    post_session_distress, distress_reduction,
-                    completion_status, symptoms_before, symptoms_after,
-                    effectiveness_rating, notes, barriers_encountered,
-                    setting_used, modifications_made, therapist_guided,
-                    crisis_situation, created_date, last_updated
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """, (
-                session.session_id, session.patient_id, session.technique_id,
-                session.start_time.isoformat(), None, None,
-                session.pre_session_distress, None, None,
-                session.completion_status, json.dumps(session.symptoms_before),
-                json.dumps(session.symptoms_after), None, session.notes,
-                json.dumps(session.barriers_encountered),
-                session.setting_used.value if session.setting_used else None,
-                json.dumps(session.modifications_made), session.therapist_guided,
-                session.crisis_situation, session.created_date.isoformat(),
-                session.last_updated.isoformat()
-            ))
-            
-            cursor.execute("""
-                UPDATE grounding_techniques 
-                SET usage_count = usage_count + 1 
-                WHERE technique_id = ?
-            """, (technique_id,))
-            
-            conn.commit()
+        self.write_pipeline.record(WriteEvent(
+            event_type="grounding_session_started",
+            patient_id=patient_id,
+            source="grounding_techniques",
+            durable=crisis_situation,
+            writes=[
+                RowWrite(WriteOperation.INSERT, "grounding_sessions", values={
+                    "session_id": session.session_id,
+                    "patient_id": session.patient_id,
+                    "technique_id": session.technique_id,
+                    "start_time": session.start_time.isoformat(),
+                    "end_time": None,
+                    "duration_minutes": None,
+                    "pre_session_distress": session.pre_session_distress,
+                    "post_session_distress": None,
+                    "distress_reduction": None,
+                    "completion_status": session.completion_status,
+                    "symptoms_before": json.dumps(session.symptoms_before),
+                    "symptoms_after": json.dumps(session.symptoms_after),
+                    "effectiveness_rating": None,
+                    "notes": session.notes,
+                    "barriers_encountered": json.dumps(session.barriers_encountered),
+                    "setting_used": session.setting_used.value if session.setting_used else None,
+                    "modifications_made": json.dumps(session.modifications_made),
+                    "therapist_guided": session.therapist_guided,
+                    "crisis_situation": session.crisis_situation,
+                    "created_date": session.created_date.isoformat(),
+                    "last_updated": session.last_updated.isoformat()
+                }),
+                RowWrite(WriteOperation.INCREMENT, "grounding_techniques",
+                         values={"usage_count": 1}, where={"technique_id": technique_id})
+            ]
+        ))
+        
+        with self._cache.lock:
+            self.technique_index.record_use(technique_id)
+            history = self._cache.usage_histories.get(patient_id)
+            if history is not None:
+                history.add(session.start_time.isoformat(), technique_id)
         
         return session.session_id
     
@@ -701,6 +892,8 @@ class GroundingTechniqueLibrary:
         
         end_time = datetime.now()
         
+        # The session row may still be queued from start_grounding_session
+        self.write_pipeline.flush()
         with sqlite3.connect(self.db_path) as conn:
             cursor = conn.cursor()
             
@@ -764,6 +957,9 @@ class GroundingTechniqueLibrary:
             
             conn.commit()
         
+        with self._cache.lock:
+            self.technique_index.set_effectiveness(technique_id, avg_effectiveness)
+        
         return True
     
     def get_patient_session_history(
@@ -775,6 +971,7 @@ class GroundingTechniqueLibrary:
         
         start_date = datetime.now() - timedelta(days=days_back)
         
+        self.write_pipeline.flush()
         with sqlite3.connect(self.db_path) as conn:
             cursor = conn.cursor()
             
@@ -922,8 +1119,17 @@ class GroundingTechniqueLibrary:
             ))
             
             conn.commit()
+        
+        with self._cache.lock:
+            self._cache.plans.pop(plan.patient_id, None)
     
     def get_grounding_plan(self, patient_id: str) -> Optional[GroundingPlan]:
+        with self._cache.lock:
+            if patient_id not in self._cache.plans:
+                self._cache.plans[patient_id] = self._load_grounding_plan(patient_id)
+            return self._cache.plans[patient_id]
+    
+    def _load_grounding_plan(self, patient_id: str) -> Optional[GroundingPlan]:
         with sqlite3.connect(self.db_path) as conn:
             cursor = conn.cursor()
             
@@ -970,25 +1176,20 @@ class GroundingTechniqueLibrary:
         else:
             technique_pool = plan.backup_techniques if plan else ["mindful_observation", "progressive_muscle_relaxation"]
         
-        suitable_techniques = []
-        for technique_id in technique_pool:
-            technique = self.get_technique(technique_id)
-            if technique:
-                if technique.duration_minutes <= available_time:
-                    if setting in technique.settings or GroundingSetting.ANYWHERE in technique.settings:
-                        if symptoms:
-                            if any(symptom in technique.target_symptoms for symptom in symptoms):
-                                suitable_techniques.append(technique)
-                        else:
-                            suitable_techniques.append(technique)
+        index = self.technique_index
+        suitable_bits = index.within_duration(available_time) & index.for_setting(setting)
+        if symptoms:
+            suitable_bits &= index.for_symptoms(symptoms)
+        
+        suitable_techniques = [
+            index.get(technique_id) for technique_id in technique_pool
+            if index.bit(technique_id) & suitable_bits
+        ]
         
         if not suitable_techniques:
             return self.get_technique("5_4_3_2_1_sensory")
         
-        recent_usage = {}
-        recent_sessions = self.get_patient_session_history(patient_id, days_back=7)
-        for session in recent_sessions:
-            recent_usage[session.technique_id] = recent_usage.get(session.technique_id, 0) + 1
+        recent_usage = self.get_technique_usage_counts(patient_id, days_back=7)
         
         least_used = min(suitable_techniques, key=lambda t: recent_usage.get(t.technique_id, 0))
         return least_used
@@ -1293,7 +1494,7 @@ class GroundingTechniqueLibrary:
                     patient_id, timestamp
                 ) VALUES (?, ?, ?, ?, ?, ?)
             """, (
-                str(uuid.uuid4()), technique_id, feedback_type, feedback_text,
+                new_id(), technique_id, feedback_type, feedback_text,
                 patient_id, feedback_entry["timestamp"]
             ))
             
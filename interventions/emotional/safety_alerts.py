@@ -0,0 +1,449 @@
+"""
+Emotion Safety Alerts Module
+Event-driven safety alerting for emotion tracking
+Each logged entry updates per-patient sliding-window counters; threshold crossings
+are pushed to subscribers as they happen instead of being found by polling
+"""
+
+import sqlite3
+import asyncio
+import bisect
+import logging
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Any, Callable, Set, Tuple, Union, Awaitable
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from utilities.identifiers import new_id
+
+
+# Entries counted by the sliding window
+ALERT_WINDOW = timedelta(days=7)
+
+# Intensity at which an entry counts as a high-intensity episode
+HIGH_INTENSITY_LEVEL = 9
+
+# Entries the rolling mean needs before it can raise an alert
+MIN_ENTRIES_FOR_MEAN = 5
+
+# Window counters that raise an alert when they reach their threshold; an
+# alert fires once per crossing and re-arms when the counter drops below it
+SAFETY_ALERT_RULES = {
+    "high_intensity_episodes": {
+        "counter": "high_intensity_count",
+        "threshold": 3,
+        "severity": "high",
+        "message": "{value} high-intensity emotional episodes in past week",
+        "recommendation": "Consider crisis intervention and safety planning"
+    },
+    "intervention_requests": {
+        "counter": "intervention_count",
+        "threshold": 2,
+        "severity": "medium",
+        "message": "{value} requests for intervention in past week",
+        "recommendation": "Increase session frequency or provide additional support"
+    },
+    "elevated_mean_intensity": {
+        "counter": "mean_intensity",
+        "threshold": 7.0,
+        "severity": "medium",
+        "message": "Average intensity of {value:.1f} across {entry_count} entries in past week",
+        "recommendation": "Review crisis survival and distress tolerance skills"
+    }
+}
+
+
+@dataclass
+class EmotionSafetyAlert:
+    patient_id: str
+    alert_type: str
+    severity: str
+    message: str
+    recommendation: str
+    value: float
+    threshold: float
+    entry_id: Optional[str] = None
+    alert_id: str = field(default_factory=lambda: new_id("ALERT"))
+    triggered_at: datetime = field(default_factory=datetime.now)
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """The shape check_safety_alerts reports alerts in"""
+        return {
+            "type": self.alert_type,
+            "severity": self.severity,
+            "message": self.message,
+            "recommendation": self.recommendation
+        }
+
+
+class PatientAlertWindow:
+    """Sliding-window counters over one patient's recent entries"""
+    
+    __slots__ = ("entries", "entry_ids", "high_intensity_count", "intervention_count", "intensity_sum", "active_alerts")
+    
+    def __init__(self):
+        # (timestamp, intensity, intervention_needed, entry_id), oldest first
+        self.entries: List[Tuple[datetime, int, bool, str]] = []
+        self.entry_ids: Set[str] = set()
+        self.high_intensity_count = 0
+        self.intervention_count = 0
+        self.intensity_sum = 0
+        self.active_alerts: Dict[str, bool] = {}
+    
+    def add(self, timestamp: datetime, intensity: int, intervention_needed: bool,
+            entry_id: Optional[str] = None) -> bool:
+        """Count an entry; False if an entry with this ID is already counted"""
+        if entry_id:
+            if entry_id in self.entry_ids:
+                return False
+            self.entry_ids.add(entry_id)
+        
+        item = (timestamp, intensity, bool(intervention_needed), entry_id or "")
+        if not self.entries or timestamp >= self.entries[-1][0]:
+            self.entries.append(item)
+        else:
+            bisect.insort(self.entries, item)
+        self._count(item, 1)
+        return True
+    
+    def evict(self, cutoff: datetime):
+        """Drop entries older than cutoff"""
+        expired = bisect.bisect_left(self.entries, (cutoff,))
+        for item in self.entries[:expired]:
+            self._count(item, -1)
+            self.entry_ids.discard(item[3])
+        del self.entries[:expired]
+    
+    def _count(self, item: Tuple[datetime, int, bool, str], sign: int):
+        _, intensity, intervention_needed, _ = item
+        self.intensity_sum += sign * intensity
+        if intensity >= HIGH_INTENSITY_LEVEL:
+            self.high_intensity_count += sign
+        if intervention_needed:
+            self.intervention_count += sign
+    
+    @property
+    def entry_count(self) -> int:
+        return len(self.entries)
+    
+    @property
+    def mean_intensity(self) -> float:
+        if len(self.entries) < MIN_ENTRIES_FOR_MEAN:
+            return 0.0
+        return self.intensity_sum / len(self.entries)
+
+
+class AlertSubscription:
+    """Alerts for one asyncio consumer, delivered through a queue
+    
+    Iterate with `async for alert in subscription`, or await get(). Alerts
+    raised from other threads are handed to the subscriber's loop.
+    """
+    
+    def __init__(self, stream: 'EmotionAlertStream', loop: asyncio.AbstractEventLoop,
+                 patient_id: Optional[str] = None):
+        self.patient_id = patient_id
+        self.queue: asyncio.Queue = asyncio.Queue()
+        self._stream = stream
+        self._loop = loop
+    
+    def matches(self, alert: EmotionSafetyAlert) -> bool:
+        return self.patient_id is None or alert.patient_id == self.patient_id
+    
+    def deliver(self, alert: EmotionSafetyAlert) -> bool:
+        """Queue an alert from any thread; False once the subscriber's loop is gone"""
+        if self._loop.is_closed():
+            return False
+        if _running_loop() is self._loop:
+            self.queue.put_nowait(alert)
+        else:
+            self._loop.call_soon_threadsafe(self.queue.put_nowait, alert)
+        return True
+    
+    async def get(self) -> EmotionSafetyAlert:
+        return await self.queue.get()
+    
+    def __aiter__(self):
+        return self
+    
+    async def __anext__(self) -> EmotionSafetyAlert:
+        return await self.queue.get()
+    
+    def close(self):
+        self._stream.unsubscribe(self)
+
+
+AlertListener = Callable[[EmotionSafetyAlert], Union[None, Awaitable[None]]]
+
+
+def _running_loop() -> Optional[asyncio.AbstractEventLoop]:
+    try:
+        return asyncio.get_running_loop()
+    except RuntimeError:
+        return None
+
+
+class EmotionAlertStream:
+    """Per-patient sliding-window safety counters with push delivery
+    
+    observe() is called for every logged entry. It updates the patient's
+    high-intensity count, intervention_needed count and rolling mean
+    intensity, and publishes an alert the moment one of them crosses its
+    threshold. A patient's window is loaded from emotion_entries the first
+    time they are seen, and which alerts are active is kept in SQLite, so a
+    restart neither loses the counts nor repeats alerts already raised.
+    Entries are counted once by entry ID, however they reach the window.
+    
+    Use get_alert_stream() so every tracker on a database shares one stream.
+    Entries written by other processes only reach the window when it is
+    refreshed, which get_active_alerts(refresh=True) does.
+    """
+    
+    def __init__(self, db_path: str = "data/therapy_system.db"):
+        self.db_path = db_path
+        self.logger = logging.getLogger(__name__)
+        self._initialize_database()
+        
+        self._lock = threading.RLock()
+        self._windows: Dict[str, PatientAlertWindow] = {}
+        self._subscriptions: List[AlertSubscription] = []
+        self._listeners: List[Tuple[AlertListener, Optional[asyncio.AbstractEventLoop]]] = []
+    
+    def _initialize_database(self):
+        Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
+        
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS emotion_alert_state (
+                    patient_id TEXT NOT NULL,
+                    alert_type TEXT NOT NULL,
+                    active BOOLEAN NOT NULL,
+                    value REAL,
+                    updated_date TEXT NOT NULL,
+                    PRIMARY KEY (patient_id, alert_type)
+                )
+            """)
+            
+            conn.commit()
+    
+    # ========================================================================
+    # SUBSCRIPTION
+    # ========================================================================
+    
+    def subscribe(self, patient_id: Optional[str] = None,
+                  loop: Optional[asyncio.AbstractEventLoop] = None) -> AlertSubscription:
+        """Queue-backed subscription to alerts for one patient, or all when patient_id is None"""
+        
+        loop = loop or asyncio.get_running_loop()
+        subscription = AlertSubscription(self, loop, patient_id)
+        with self._lock:
+            self._subscriptions.append(subscription)
+        return subscription
+    
+    def unsubscribe(self, subscription: AlertSubscription):
+        with self._lock:
+            if subscription in self._subscriptions:
+                self._subscriptions.remove(subscription)
+    
+    def add_alert_listener(self, listener: AlertListener, loop: Optional[asyncio.AbstractEventLoop] = None):
+        """Register a callback for every alert
+        
+        Plain functions run on the thread that logged the entry. Coroutine
+        functions are scheduled on loop, or on the loop running at
+        registration.
+        """
+        if asyncio.iscoroutinefunction(listener):
+            loop = loop or asyncio.get_running_loop()
+        with self._lock:
+            self._listeners.append((listener, loop))
+    
+    def remove_alert_listener(self, listener: AlertListener):
+        with self._lock:
+            self._listeners = [(existing, loop) for existing, loop in self._listeners if existing is not listener]
+    
+    # ========================================================================
+    # COUNTERS
+    # ========================================================================
+    
+    def observe(self, patient_id: str, timestamp: datetime, intensity: int,
+                intervention_needed: bool, entry_id: Optional[str] = None) -> List[EmotionSafetyAlert]:
+        """Count a newly logged entry and publish any alerts it raises"""
+        
+        now = datetime.now()
+        with self._lock:
+            window = self._get_window(patient_id)
+            window.evict(now - ALERT_WINDOW)
+            if timestamp >= now - ALERT_WINDOW:
+                window.add(timestamp, intensity, intervention_needed, entry_id)
+            alerts = self._evaluate(patient_id, window, entry_id)
+        
+        for alert in alerts:
+            self._publish(alert)
+        return alerts
+    
+    def get_window_counters(self, patient_id: str) -> Dict[str, Any]:
+        """Current counters for a patient's window"""
+        
+        with self._lock:
+            window = self._get_window(patient_id)
+            window.evict(datetime.now() - ALERT_WINDOW)
+            self._evaluate(patient_id, window)
+            return {
+                "entry_count": window.entry_count,
+                "high_intensity_count": window.high_intensity_count,
+                "intervention_count": window.intervention_count,
+                "mean_intensity": round(window.mean_intensity, 2),
+                "active_alerts": sorted(alert for alert, active in window.active_alerts.items() if active)
+            }
+    
+    def get_active_alerts(self, patient_id: str, refresh: bool = False) -> List[EmotionSafetyAlert]:
+        """Alerts whose condition currently holds for the patient
+        
+        With refresh, the window is first re-read from the database so
+        entries logged by other processes are counted.
+        """
+        
+        with self._lock:
+            window = self.refresh(patient_id) if refresh else self._get_window(patient_id)
+            window.evict(datetime.now() - ALERT_WINDOW)
+            self._evaluate(patient_id, window)
+            return [
+                self._build_alert(patient_id, alert_type, window)
+                for alert_type in SAFETY_ALERT_RULES
+                if window.active_alerts.get(alert_type)
+            ]
+    
+    def refresh(self, patient_id: str) -> PatientAlertWindow:
+        """Re-read the patient's window from the database
+        
+        Entries observed here but not yet committed are kept, so a refresh
+        never drops an entry still queued in the write pipeline.
+        """
+        
+        with self._lock:
+            previous = self._windows.pop(patient_id, None)
+            window = self._get_window(patient_id)
+            if previous is not None:
+                for timestamp, intensity, intervention_needed, entry_id in previous.entries:
+                    if entry_id:
+                        window.add(timestamp, intensity, intervention_needed, entry_id)
+            return window
+    
+    def _get_window(self, patient_id: str) -> PatientAlertWindow:
+        """The patient's window, loaded from the database on first use"""
+        
+        window = self._windows.get(patient_id)
+        if window is not None:
+            return window
+        
+        window = PatientAlertWindow()
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            
+            # Includes the entry being observed when it is already committed;
+            # the caller's add() skips it by ID
+            cursor.execute("""
+                SELECT timestamp, intensity, intervention_needed, entry_id
+                FROM emotion_entries
+                WHERE patient_id = ? AND timestamp >= ?
+                ORDER BY timestamp
+            """, (patient_id, (datetime.now() - ALERT_WINDOW).isoformat()))
+            for timestamp, intensity, intervention_needed, entry_id in cursor.fetchall():
+                window.add(datetime.fromisoformat(timestamp), intensity, intervention_needed, entry_id)
+            
+            cursor.execute("""
+                SELECT alert_type, active FROM emotion_alert_state WHERE patient_id = ?
+            """, (patient_id,))
+            window.active_alerts = {alert_type: bool(active) for alert_type, active in cursor.fetchall()}
+        
+        self._windows[patient_id] = window
+        return window
+    
+    def _evaluate(self, patient_id: str, window: PatientAlertWindow,
+                  entry_id: Optional[str] = None) -> List[EmotionSafetyAlert]:
+        """Alerts for counters that just crossed their threshold; re-arms those that fell back"""
+        
+        alerts = []
+        changes = []
+        for alert_type, rule in SAFETY_ALERT_RULES.items():
+            value = getattr(window, rule["counter"])
+            active = value >= rule["threshold"]
+            if active == window.active_alerts.get(alert_type, False):
+                continue
+            
+            window.active_alerts[alert_type] = active
+            changes.append((patient_id, alert_type, active, value, datetime.now().isoformat()))
+            if active:
+                alerts.append(self._build_alert(patient_id, alert_type, window, entry_id))
+        
+        if changes:
+            with sqlite3.connect(self.db_path) as conn:
+                conn.executemany("""
+                    INSERT OR REPLACE INTO emotion_alert_state (patient_id, alert_type, active, value, updated_date)
+                    VALUES (?, ?, ?, ?, ?)
+                """, changes)
+                conn.commit()
+        
+        return alerts
+    
+    def _build_alert(self, patient_id: str, alert_type: str, window: PatientAlertWindow,
+                     entry_id: Optional[str] = None) -> EmotionSafetyAlert:
+        rule = SAFETY_ALERT_RULES[alert_type]
+        value = getattr(window, rule["counter"])
+        return EmotionSafetyAlert(
+            patient_id=patient_id,
+            alert_type=alert_type,
+            severity=rule["severity"],
+            message=rule["message"].format(value=value, entry_count=window.entry_count),
+            recommendation=rule["recommendation"],
+            value=value,
+            threshold=rule["threshold"],
+            entry_id=entry_id
+        )
+    
+    # ========================================================================
+    # DELIVERY
+    # ========================================================================
+    
+    def _publish(self, alert: EmotionSafetyAlert):
+        """Push an alert to every matching subscription and listener; failures are logged"""
+        
+        with self._lock:
+            subscriptions = list(self._subscriptions)
+            listeners = list(self._listeners)
+        
+        for subscription in subscriptions:
+            if subscription.matches(alert) and not subscription.deliver(alert):
+                self.unsubscribe(subscription)
+        
+        for listener, loop in listeners:
+            try:
+                if loop is None:
+                    listener(alert)
+                elif not loop.is_closed():
+                    if _running_loop() is loop:
+                        loop.create_task(listener(alert))
+                    else:
+                        asyncio.run_coroutine_threadsafe(listener(alert), loop)
+            except Exception as e:
+                self.logger.error(f"Alert listener failed: {e}")
+
+
+# One stream per database file, shared by every tracker in the process
+_streams: Dict[str, EmotionAlertStream] = {}
+_streams_lock = threading.Lock()
+
+
+def get_alert_stream(db_path: str = "data/therapy_system.db") -> EmotionAlertStream:
+    """Process-wide alert stream for a database file"""
+    
+    key = str(Path(db_path).resolve())
+    with _streams_lock:
+        stream = _streams.get(key)
+        if stream is None:
+            stream = EmotionAlertStream(db_path)
+            _streams[key] = stream
+        return stream
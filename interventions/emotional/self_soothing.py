@@ -2,12 +2,14 @@ import sqlite3
 import json
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional, Tuple, Any
-from dataclasses import dataclass, field
+from dataclasses import dataclass, field, replace
 from enum import Enum
-import uuid
 import random
 from pathlib import Path
 
+from utilities.identifiers import new_id
+from utilities.reference_catalog import get_reference_library
+
 
 class SoothingCategory(Enum):
     VISUAL = "visual"
@@ -49,7 +51,7 @@ class SoothingContext(Enum):
 
 @dataclass
 class SoothingActivity:
-    activity_id: str = field(default_factory=lambda: str(uuid.uuid4()))
+    activity_id: str = field(default_factory=new_id)
     name: str = ""
     category: SoothingCategory = SoothingCategory.TACTILE
     description: str = ""
@@ -80,7 +82,7 @@ class SoothingActivity:
 
 @dataclass
 class SoothingSession:
-    session_id: str = field(default_factory=lambda: str(uuid.uuid4()))
+    session_id: str = field(default_factory=new_id)
     patient_id: str = ""
     activity_id: str = ""
     
@@ -115,7 +117,7 @@ class SoothingSession:
 
 @dataclass
 class SoothingKit:
-    kit_id: str = field(default_factory=lambda: str(uuid.uuid4()))
+    kit_id: str = field(default_factory=new_id)
     patient_id: str = ""
     name: str = ""
     
@@ -137,7 +139,7 @@ class SoothingKit:
 
 @dataclass
 class SoothingPlan:
-    plan_id: str = field(default_factory=lambda: str(uuid.uuid4()))
+    plan_id: str = field(default_factory=new_id)
     patient_id: str = ""
     
     morning_routine: List[str] = field(default_factory=list)
@@ -161,6 +163,14 @@ class SelfSoothingSystem:
     
     def __init__(self, db_path: str = "data/therapy_system.db"):
         self.db_path = db_path
+        self.reference_activities = get_reference_library(
+            "soothing_activities", self._get_default_activities, key="activity_id",
+            indexes={
+                "category": "category", "intensity_level": "intensity_level",
+                "accessibility": "accessibility", "context": "target_contexts",
+                "setting": "indoor_outdoor"
+            }
+        )
         self._initialize_database()
         self._populate_default_activities()
     
@@ -266,7 +276,7 @@ class SelfSoothingSystem:
             conn.commit()
     
     def _populate_default_activities(self):
-        default_activities = self._get_default_activities()
+        default_activities = self.reference_activities.values()
         
         with sqlite3.connect(self.db_path) as conn:
             cursor = conn.cursor()
@@ -655,28 +665,40 @@ class SelfSoothingSystem:
             if not row:
                 return None
             
-            return SoothingActivity(
-                activity_id=row[0],
-                name=row[1],
-                category=SoothingCategory(row[2]),
-                description=row[3] or "",
-                detailed_instructions=json.loads(row[4] or '[]'),
-                materials_needed=json.loads(row[5] or '[]'),
-                setup_time_minutes=row[6] or 0,
-                duration_minutes=row[7] or 10,
-                intensity_level=IntensityLevel(row[8]),
-                accessibility=AccessibilityLevel(row[9]),
-                target_contexts=[SoothingContext(c) for c in json.loads(row[10] or '[]')],
-                contraindications=json.loads(row[11] or '[]'),
-                personalization_options=json.loads(row[12] or '[]'),
-                variations=json.loads(row[13] or '[]'),
-                effectiveness_rating=row[14],
-                usage_count=row[15] or 0,
-                cost_level=row[16] or "free",
-                indoor_outdoor=row[17] or "both",
-                alone_social=row[18] or "alone",
+            return self._row_to_activity(row)
+    
+    def _row_to_activity(self, row: Tuple) -> SoothingActivity:
+        # Built-in activities take their content from the reference catalog; only
+        # the usage statistics are read from the row
+        reference = self.reference_activities.get(row[0])
+        if reference is not None:
+            return replace(
+                reference, effectiveness_rating=row[14], usage_count=row[15] or 0,
                 created_date=datetime.fromisoformat(row[19])
             )
+        
+        return SoothingActivity(
+            activity_id=row[0],
+            name=row[1],
+            category=SoothingCategory(row[2]),
+            description=row[3] or "",
+            detailed_instructions=json.loads(row[4] or '[]'),
+            materials_needed=json.loads(row[5] or '[]'),
+            setup_time_minutes=row[6] or 0,
+            duration_minutes=row[7] or 10,
+            intensity_level=IntensityLevel(row[8]),
+            accessibility=AccessibilityLevel(row[9]),
+            target_contexts=[SoothingContext(c) for c in json.loads(row[10] or '[]')],
+            contraindications=json.loads(row[11] or '[]'),
+            personalization_options=json.loads(row[12] or '[]'),
+            variations=json.loads(row[13] or '[]'),
+            effectiveness_rating=row[14],
+            usage_count=row[15] or 0,
+            cost_level=row[16] or "free",
+            indoor_outdoor=row[17] or "both",
+            alone_social=row[18] or "alone",
+            created_date=datetime.fromisoformat(row[19])
+        )
     
     def get_activities_by_category(self, category: SoothingCategory) -> List[SoothingActivity]:
         with sqlite3.connect(self.db_path) as conn:
@@ -690,28 +712,7 @@ class SelfSoothingSystem:
             
             activities = []
             for row in cursor.fetchall():
-                activity = SoothingActivity(
-                    activity_id=row[0],
-                    name=row[1],
-                    category=SoothingCategory(row[2]),
-                    description=row[3] or "",
-                    detailed_instructions=json.loads(row[4] or '[]'),
-                    materials_needed=json.loads(row[5] or '[]'),
-                    setup_time_minutes=row[6] or 0,
-                    duration_minutes=row[7] or 10,
-                    intensity_level=IntensityLevel(row[8]),
-                    accessibility=AccessibilityLevel(row[9]),
-                    target_contexts=[SoothingContext(c) for c in json.loads(row[10] or '[]')],
-                    contraindications=json.loads(row[11] or '[]'),
-                    personalization_options=json.loads(row[12] or '[]'),
-                    variations=json.loads(row[13] or '[]'),
-                    effectiveness_rating=row[14],
-                    usage_count=row[15] or 0,
-                    cost_level=row[16] or "free",
-                    indoor_outdoor=row[17] or "both",
-                    alone_social=row[18] or "alone",
-                    created_date=datetime.fromisoformat(row[19])
-                )
+                activity = self._row_to_activity(row)
                 activities.append(activity)
             
             return activities
@@ -750,28 +751,7 @@ class SelfSoothingSystem:
             
             all_activities = []
             for row in cursor.fetchall():
-                activity = SoothingActivity(
-                    activity_id=row[0],
-                    name=row[1],
-                    category=SoothingCategory(row[2]),
-                    description=row[3] or "",
-                    detailed_instructions=json.loads(row[4] or '[]'),
-                    materials_needed=json.loads(row[5] or '[]'),
-                    setup_time_minutes=row[6] or 0,
-                    duration_minutes=row[7] or 10,
-                    intensity_level=IntensityLevel(row[8]),
-                    accessibility=AccessibilityLevel(row[9]),
-                    target_contexts=[SoothingContext(c) for c in json.loads(row[10] or '[]')],
-                    contraindications=json.loads(row[11] or '[]'),
-                    personalization_options=json.loads(row[12] or '[]'),
-                    variations=json.loads(row[13] or '[]'),
-                    effectiveness_rating=row[14],
-                    usage_count=row[15] or 0,
-                    cost_level=row[16] or "free",
-                    indoor_outdoor=row[17] or "both",
-                    alone_social=row[18] or "alone",
-                    created_date=datetime.fromisoformat(row[19])
-                )
+                activity = self._row_to_activity(row)
                 all_activities.append(activity)
         
         filtered_activities = all_activities
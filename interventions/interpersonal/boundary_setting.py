@@ -4,9 +4,10 @@ from datetime import datetime, timedelta
 from typing import Dict, List, Optional, Tuple, Any
 from dataclasses import dataclass, field
 from enum import Enum
-import uuid
 from pathlib import Path
 
+from utilities.identifiers import new_id
+
 
 class BoundaryType(Enum):
     PHYSICAL = "physical"
@@ -60,7 +61,7 @@ class CommunicationApproach(Enum):
 
 @dataclass
 class BoundaryRule:
-    rule_id: str = field(default_factory=lambda: str(uuid.uuid4()))
+    rule_id: str = field(default_factory=new_id)
     patient_id: str = ""
     
     boundary_type: BoundaryType = BoundaryType.EMOTIONAL
@@ -90,7 +91,7 @@ class BoundaryRule:
 
 @dataclass 
 class BoundaryViolation:
-    violation_id: str = field(default_factory=lambda: str(uuid.uuid4()))
+    violation_id: str = field(default_factory=new_id)
     patient_id: str = ""
     boundary_rule_id: Optional[str] = None
     
@@ -118,7 +119,7 @@ class BoundaryViolation:
 
 @dataclass
 class BoundaryPracticeSession:
-    session_id: str = field(default_factory=lambda: str(uuid.uuid4()))
+    session_id: str = field(default_factory=new_id)
     patient_id: str = ""
     boundary_rule_id: str = ""
     
@@ -146,7 +147,7 @@ class BoundaryPracticeSession:
 
 @dataclass
 class BoundaryAssessment:
-    assessment_id: str = field(default_factory=lambda: str(uuid.uuid4()))
+    assessment_id: str = field(default_factory=new_id)
     patient_id: str = ""
     
     assessment_date: datetime = field(default_factory=datetime.now)
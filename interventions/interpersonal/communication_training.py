@@ -4,9 +4,11 @@ from datetime import datetime, timedelta
 from typing import Dict, List, Optional, Tuple, Any
 from dataclasses import dataclass, field
 from enum import Enum
-import uuid
 from pathlib import Path
 
+from utilities.identifiers import new_id
+from utilities.reference_catalog import get_reference_library
+
 
 class CommunicationSkill(Enum):
     ACTIVE_LISTENING = "active_listening"
@@ -67,7 +69,7 @@ class NonverbalElement(Enum):
 
 @dataclass
 class CommunicationSkillModule:
-    module_id: str = field(default_factory=lambda: str(uuid.uuid4()))
+    module_id: str = field(default_factory=new_id)
     skill: CommunicationSkill = CommunicationSkill.ACTIVE_LISTENING
     module_name: str = ""
     
@@ -94,7 +96,7 @@ class CommunicationSkillModule:
 
 @dataclass
 class CommunicationPracticeSession:
-    session_id: str = field(default_factory=lambda: str(uuid.uuid4()))
+    session_id: str = field(default_factory=new_id)
     patient_id: str = ""
     skill_focus: CommunicationSkill = CommunicationSkill.ACTIVE_LISTENING
     
@@ -131,7 +133,7 @@ class CommunicationPracticeSession:
 
 @dataclass
 class CommunicationAssessment:
-    assessment_id: str = field(default_factory=lambda: str(uuid.uuid4()))
+    assessment_id: str = field(default_factory=new_id)
     patient_id: str = ""
     
     assessment_date: datetime = field(default_factory=datetime.now)
@@ -165,7 +167,7 @@ class CommunicationAssessment:
 
 @dataclass
 class ConversationScript:
-    script_id: str = field(default_factory=lambda: str(uuid.uuid4()))
+    script_id: str = field(default_factory=new_id)
     patient_id: str = ""
     
     skill_focus: CommunicationSkill = CommunicationSkill.ASSERTIVENESS
@@ -196,7 +198,7 @@ class ConversationScript:
 
 @dataclass
 class CommunicationChallenge:
-    challenge_id: str = field(default_factory=lambda: str(uuid.uuid4()))
+    challenge_id: str = field(default_factory=new_id)
     patient_id: str = ""
     
     challenge_date: datetime = field(default_factory=datetime.now)
@@ -231,6 +233,10 @@ class CommunicationTrainingSystem:
     
     def __init__(self, db_path: str = "data/therapy_system.db"):
         self.db_path = db_path
+        self.reference_modules = get_reference_library(
+            "communication_skill_modules", self._get_default_skill_modules, key="module_id",
+            indexes={"skill": "skill", "difficulty_level": "difficulty_level"}
+        )
         self._initialize_database()
         self._populate_skill_modules()
     
@@ -373,7 +379,7 @@ class CommunicationTrainingSystem:
             conn.commit()
     
     def _populate_skill_modules(self):
-        modules = self._get_default_skill_modules()
+        modules = self.reference_modules.values()
         
         with sqlite3.connect(self.db_path) as conn:
             cursor = conn.cursor()
@@ -796,6 +802,10 @@ class CommunicationTrainingSystem:
         return session.session_id
     
     def _get_skill_module(self, skill: CommunicationSkill) -> Optional[CommunicationSkillModule]:
+        module = self.reference_modules.first("skill", skill)
+        if module is not None:
+            return module
+        
         with sqlite3.connect(self.db_path) as conn:
             cursor = conn.cursor()
             
@@ -4,9 +4,11 @@ from datetime import datetime, timedelta
 from typing import Dict, List, Optional, Tuple, Any
 from dataclasses import dataclass, field
 from enum import Enum
-import uuid
 from pathlib import Path
 
+from utilities.identifiers import new_id
+from utilities.reference_catalog import get_reference_library
+
 
 class ConflictType(Enum):
     INTERPERSONAL = "interpersonal"
@@ -71,7 +73,7 @@ class EmotionRegulationTechnique(Enum):
 
 @dataclass
 class ConflictSituation:
-    conflict_id: str = field(default_factory=lambda: str(uuid.uuid4()))
+    conflict_id: str = field(default_factory=new_id)
     patient_id: str = ""
     
     conflict_date: datetime = field(default_factory=datetime.now)
@@ -114,7 +116,7 @@ class ConflictSituation:
 
 @dataclass
 class ConflictResolutionSkill:
-    skill_id: str = field(default_factory=lambda: str(uuid.uuid4()))
+    skill_id: str = field(default_factory=new_id)
     skill_name: str = ""
     category: str = ""
     
@@ -142,7 +144,7 @@ class ConflictResolutionSkill:
 
 @dataclass
 class ConflictPracticeSession:
-    session_id: str = field(default_factory=lambda: str(uuid.uuid4()))
+    session_id: str = field(default_factory=new_id)
     patient_id: str = ""
     
     practice_date: datetime = field(default_factory=datetime.now)
@@ -177,7 +179,7 @@ class ConflictPracticeSession:
 
 @dataclass
 class ConflictAnalysis:
-    analysis_id: str = field(default_factory=lambda: str(uuid.uuid4()))
+    analysis_id: str = field(default_factory=new_id)
     conflict_id: str = ""
     patient_id: str = ""
     
@@ -207,7 +209,7 @@ class ConflictAnalysis:
 
 @dataclass
 class ConflictResolutionPlan:
-    plan_id: str = field(default_factory=lambda: str(uuid.uuid4()))
+    plan_id: str = field(default_factory=new_id)
     conflict_id: str = ""
     patient_id: str = ""
     
@@ -244,6 +246,10 @@ class ConflictResolutionSystem:
     
     def __init__(self, db_path: str = "data/therapy_system.db"):
         self.db_path = db_path
+        self.reference_skills = get_reference_library(
+            "conflict_resolution_skills", self._get_default_resolution_skills, key="skill_id",
+            indexes={"category": "category", "difficulty_level": "difficulty_level"}
+        )
         self._initialize_database()
         self._populate_resolution_skills()
     
@@ -395,7 +401,7 @@ class ConflictResolutionSystem:
             conn.commit()
     
     def _populate_resolution_skills(self):
-        skills = self._get_default_resolution_skills()
+        skills = self.reference_skills.values()
         
         with sqlite3.connect(self.db_path) as conn:
             cursor = conn.cursor()
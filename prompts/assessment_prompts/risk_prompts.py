@@ -9,7 +9,8 @@ from dataclasses import dataclass, field
 from enum import Enum
 import json
 from datetime import datetime
-import uuid
+
+from utilities.identifiers import new_id
 
 
 class RiskType(Enum):
@@ -1289,7 +1290,7 @@ class RiskAssessmentWorkflow:
         """Execute complete risk assessment workflow"""
         
         workflow_result = {
-            "workflow_id": str(uuid.uuid4()),
+            "workflow_id": new_id(),
             "risk_type": risk_type.value,
             "start_time": datetime.now(),
             "phases_completed": [],
@@ -5,6 +5,8 @@ from datetime import datetime, timedelta
 import sqlite3
 import json
 
+from utilities.identifiers import new_id
+
 
 class GoalType(Enum):
     SESSION_GOAL = "session_goal"
@@ -322,7 +324,7 @@ class SessionGoalSetting:
     def create_treatment_goal(self, patient_id: str, goal_category: str, 
                             specific_focus: str, patient_input: Dict[str, Any]) -> TherapeuticGoal:
         
-        goal_id = f"{patient_id}_{goal_category}_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+        goal_id = f"{patient_id}_{goal_category}_{new_id()}"
         
         template = self.goal_templates.get(goal_category, {}).get(specific_focus, {})
         
@@ -391,7 +393,7 @@ class SessionGoalSetting:
             "time_bound": patient_preferences.get("target_timeline", "")
         }
         
-        goal_id = f"{patient_id}_smart_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+        goal_id = f"{patient_id}_smart_{new_id()}"
         
         goal = TherapeuticGoal(
             goal_id=goal_id,
@@ -5,6 +5,8 @@ from datetime import datetime, timedelta
 import sqlite3
 import json
 
+from utilities.identifiers import new_id
+
 
 class SessionPhase(Enum):
     OPENING = "opening"
@@ -417,7 +419,7 @@ class SessionFramework:
                                therapy_modality: TherapyModality, session_number: int,
                                duration: int = 50) -> SessionStructure:
         
-        session_id = f"{patient_id}_{session_number}_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+        session_id = f"{patient_id}_{session_number}_{new_id()}"
         
         modality_template = self.modality_structures.get(therapy_modality.value, 
                                                         self.modality_structures["cbt"])
@@ -5,6 +5,8 @@ from datetime import datetime, timedelta
 import sqlite3
 import json
 
+from utilities.identifiers import new_id
+
 
 class SkillCategory(Enum):
     COGNITIVE = "cognitive"
@@ -551,7 +553,7 @@ class SkillPracticeSystem:
     def conduct_skill_practice(self, session_id: str, patient_id: str, skill_id: str,
                              practice_format: PracticeFormat, scenario: str = "") -> SkillPracticeSession:
         
-        practice_id = f"{patient_id}_{skill_id}_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+        practice_id = f"{patient_id}_{skill_id}_{new_id()}"
         
         skill = self.skill_library.get(skill_id)
         if not skill:
@@ -585,7 +587,7 @@ class SkillPracticeSystem:
     def assess_skill_mastery(self, patient_id: str, skill_id: str, 
                            performance_data: Dict[str, Any]) -> SkillAssessment:
         
-        assessment_id = f"{patient_id}_{skill_id}_assessment_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+        assessment_id = f"{patient_id}_{skill_id}_assessment_{new_id()}"
         
         skill = self.skill_library.get(skill_id)
         if not skill:
@@ -0,0 +1,241 @@
+"""
+Core module tests
+"""
+
+import asyncio
+import shutil
+import sqlite3
+import tempfile
+import unittest
+from pathlib import Path
+
+from core.gemini_interface import (
+    AIResponse, ConversationContext, ConversationMode, ConversationTurn, GeminiTherapyInterface,
+    IncrementalResponseScreen, ResponseCache, ResponseType, RollingConversationSummary, SafetyLevel,
+    StreamEventType, TherapySafetyMonitor
+)
+from core.model_backends import FakeModelBackend
+from utilities.data_storage import WritePipeline
+
+
+class TestSafetyScreenPhrasing(unittest.TestCase):
+    """Intensifiers and inflections that the old substring screen caught must still be flagged"""
+    
+    CRISIS_PHRASES = [
+        "I've never felt this desperate",
+        "No one can help me",
+        "I am desperately alone",
+    ]
+    DISTRESS_PHRASES = [
+        "I have never been so hopeless",
+        "I feel total hopelessness",
+        "Everything is so overwhelming and I can't cope",
+    ]
+    
+    def setUp(self):
+        self.monitor = TherapySafetyMonitor()
+    
+    def test_crisis_phrasings_screen_high(self):
+        for message in self.CRISIS_PHRASES:
+            with self.subTest(message=message):
+                result = self.monitor.screen_message(message)
+                self.assertEqual(result.risk_level, SafetyLevel.HIGH)
+                self.assertIn('crisis_indicators', result.flags)
+    
+    def test_distress_phrasings_are_flagged(self):
+        for message in self.DISTRESS_PHRASES:
+            with self.subTest(message=message):
+                result = self.monitor.screen_message(message)
+                self.assertNotEqual(result.risk_level, SafetyLevel.LOW)
+                self.assertIn('high_distress', result.flags)
+    
+    def test_negated_suicide_mention_still_critical(self):
+        result = self.monitor.screen_message("I'm not going to kill myself, I just feel low")
+        self.assertEqual(result.risk_level, SafetyLevel.CRITICAL)
+    
+    def test_negated_psychosis_cue_is_dropped(self):
+        result = self.monitor.screen_message("I am not paranoid about it")
+        self.assertEqual(result.risk_level, SafetyLevel.LOW)
+        self.assertEqual(result.flags, [])
+    
+    def test_hopelessness_routes_to_crisis_response(self):
+        interface = GeminiTherapyInterface(api_key="test-key")
+        for message in ["I have never been so hopeless", "I feel total hopelessness"]:
+            with self.subTest(message=message):
+                self.assertEqual(
+                    interface._determine_response_type(ConversationMode.PSYCHOEDUCATION, message),
+                    ResponseType.CRISIS_RESPONSE
+                )
+
+
+
+class TestRollingSummaryTallies(unittest.TestCase):
+    """Summary tallies count whole words, so longer words containing a keyword are not mentions"""
+    
+    def _summary(self, *messages: str) -> RollingConversationSummary:
+        summary = RollingConversationSummary()
+        for message in messages:
+            summary.observe(ConversationTurn('user', message))
+        return summary
+    
+    def test_words_containing_risk_keywords_are_not_risk_mentions(self):
+        summary = self._summary("I started a new diet", "I studied all weekend")
+        self.assertEqual(summary.risk_mentions, 0)
+    
+    def test_inflected_keywords_are_counted(self):
+        summary = self._summary("I feel hopelessness", "Work has me stressed", "I keep hurting people")
+        self.assertEqual(summary.risk_mentions, 2)
+        self.assertEqual(summary.theme_counts, {'stress coping': 1})
+
+
+
+class TestResponseCache(unittest.TestCase):
+    """Cached replies are built from patient-specific prompts and must stay with that patient"""
+    
+    def _context(self, patient_id: str) -> ConversationContext:
+        return ConversationContext(
+            patient_id=patient_id, session_id="S1", therapy_modality="CBT",
+            session_number=3, treatment_phase="middle"
+        )
+    
+    def test_reply_is_not_served_to_another_patient(self):
+        cache = ResponseCache()
+        mode = ConversationMode.PSYCHOEDUCATION
+        key = cache.signature(mode, self._context("P_A"), "Can you explain grounding?")
+        cache.put(key, AIResponse(content="For you, Ann, grounding...", response_type=ResponseType.THERAPEUTIC,
+                                  confidence_score=0.9))
+        
+        self.assertIsNotNone(cache.get(cache.signature(mode, self._context("P_A"), "explain grounding please")))
+        self.assertIsNone(cache.get(cache.signature(mode, self._context("P_B"), "Can you explain grounding?")))
+
+
+
+class TestStreamingResponse(unittest.TestCase):
+    
+    def test_empty_completion_is_not_reported_as_a_failure(self):
+        interface = GeminiTherapyInterface(api_key="test-key")
+        interface.backend = FakeModelBackend(responder=lambda payload, prompt: "")
+        context = ConversationContext(
+            patient_id="P_A", session_id="S1", therapy_modality="CBT",
+            session_number=1, treatment_phase="initial"
+        )
+        
+        async def collect():
+            return [event async for event in interface.stream_therapeutic_response(context, "I had an okay week")]
+        
+        events = asyncio.run(collect())
+        self.assertNotIn(StreamEventType.REPLACE, [event.event_type for event in events])
+        self.assertEqual(events[-1].event_type, StreamEventType.COMPLETE)
+        self.assertIsNotNone(events[-1].response.time_to_first_token_ms)
+
+
+
+class TestStreamingScreenParity(unittest.TestCase):
+    """Streaming and blocking turns apply the same response screen and end with the same text"""
+    
+    RESPONSES = [
+        "If this becomes an emergency, your safety matters and help is available.",
+        "If this becomes an emergency please call someone.",
+        "A crisis line offers help for your safety.",
+        "I feel that you are doing well.",
+        "Hi feeling better is the goal; think about it.",
+        "You mentioned my lifestyle and your personal experiences matter.",
+        "In my life I think you should rest.",
+        "Notice five things you can see.",
+    ]
+    
+    def _context(self) -> ConversationContext:
+        return ConversationContext(
+            patient_id="P_A", session_id="S1", therapy_modality="CBT",
+            session_number=1, treatment_phase="initial"
+        )
+    
+    def test_streamed_and_blocking_turns_agree(self):
+        async def both(interface):
+            blocking = await interface.generate_therapeutic_response(self._context(), "I had a week")
+            events = [event async for event in interface.stream_therapeutic_response(self._context(), "I had a week")]
+            return blocking, events
+        
+        for text in self.RESPONSES:
+            with self.subTest(text=text):
+                interface = GeminiTherapyInterface(api_key="test-key")
+                interface.backend = FakeModelBackend(responder=lambda payload, prompt, text=text: text, chunk_words=1)
+                interface.min_request_interval = 0
+                blocking, events = asyncio.run(both(interface))
+                
+                self.assertEqual(events[-1].response.content, blocking.content)
+                replaced = any(event.event_type == StreamEventType.REPLACE for event in events)
+                self.assertEqual(replaced, blocking.content != text)
+    
+    def test_flagged_text_is_never_released(self):
+        monitor = TherapySafetyMonitor()
+        for text in self.RESPONSES:
+            with self.subTest(text=text):
+                screen = IncrementalResponseScreen(monitor)
+                released = ""
+                reason = None
+                for char in text:
+                    reason = screen.feed(char)
+                    if reason:
+                        break
+                    released = screen.text[:screen.releasable_length()]
+                reason = reason or screen.finish()
+                
+                flags = monitor.screen_response(text).flags
+                self.assertEqual(reason is not None, bool(flags))
+                if reason:
+                    self.assertIn(reason, flags)
+                    self.assertEqual(monitor.screen_response(released).flags, [])
+                    self.assertNotIn("emergency", released.lower())
+
+
+
+class TestStreamedTurnPersistence(unittest.TestCase):
+    """Streamed turns reach conversation_turns on every exit path, crisis included"""
+    
+    def setUp(self):
+        self.workdir = Path(tempfile.mkdtemp())
+        self.pipeline = WritePipeline(str(self.workdir / "therapy.db"))
+        self.interface = GeminiTherapyInterface(api_key="test-key", write_pipeline=self.pipeline)
+        self.interface.backend = FakeModelBackend(
+            responder=lambda payload, prompt: "That sounds like a hard week. What helped most?"
+        )
+        self.context = ConversationContext(
+            patient_id="P_A", session_id="S1", therapy_modality="CBT",
+            session_number=2, treatment_phase="middle"
+        )
+    
+    def tearDown(self):
+        self.pipeline.close()
+        shutil.rmtree(self.workdir, ignore_errors=True)
+    
+    def _stream(self, message: str):
+        async def run():
+            events = [event async for event in self.interface.stream_therapeutic_response(self.context, message)]
+            await self.interface.flush_persistence()
+            return events
+        return asyncio.run(run())
+    
+    def _turns(self):
+        with sqlite3.connect(self.pipeline.db_path) as conn:
+            return conn.execute(
+                "SELECT role, content, risk_level FROM conversation_turns ORDER BY created_date, rowid"
+            ).fetchall()
+    
+    def test_streamed_turn_is_persisted(self):
+        events = self._stream("I had a hard week at work")
+        turns = self._turns()
+        self.assertEqual([role for role, _, _ in turns], ['user', 'assistant'])
+        self.assertEqual(turns[1][1], events[-1].response.content)
+    
+    def test_crisis_turn_is_persisted_durably(self):
+        events = self._stream("I want to kill myself tonight")
+        self.assertEqual(events[-1].response.response_type, ResponseType.CRISIS_RESPONSE)
+        turns = self._turns()
+        self.assertEqual([(role, risk) for role, _, risk in turns],
+                         [('user', SafetyLevel.CRITICAL.value), ('assistant', SafetyLevel.CRITICAL.value)])
+        self.assertEqual(self.pipeline.stats.durable_batches, self.pipeline.stats.batches_committed)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,307 @@
+"""
+Integration tests
+"""
+
+import asyncio
+import gzip
+import json
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+import unittest
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+from core.patient_profile import Demographics, Gender, PatientProfileManager
+from interventions.behavioral.behavioral_experiments import BehavioralExperimentDesigner
+from interventions.behavioral.exposure_protocols import ExposureTherapyManager
+from interventions.emotional.emotion_tracking import (
+    EMOTION_CODES, DBTDiaryCard, EmotionCategory, EmotionEntry, EmotionTracker
+)
+from interventions.emotional.grounding_techniques import GroundingTechniqueLibrary
+from interventions.emotional.safety_alerts import ALERT_WINDOW, EmotionAlertStream
+from utilities.export_tools import EXPORT_MODULES, REDACTED_VALUE, StreamingExporter
+
+
+class TestPatientExportRedaction(unittest.TestCase):
+    """Streaming exports must not carry profile contact details unless include_sensitive is set"""
+    
+    def setUp(self):
+        self.workdir = Path(tempfile.mkdtemp())
+        self.db_path = str(self.workdir / "therapy.db")
+        manager = PatientProfileManager(self.db_path)
+        profile = manager.create_patient_profile(Demographics(
+            first_name="Ann",
+            last_name="Lee",
+            date_of_birth=date(1990, 1, 1),
+            gender=Gender.FEMALE,
+            phone_number="555-1234",
+            email="ann@x.com",
+            address="1 Main St"
+        ))
+        self.patient_id = profile.patient_id
+        profile.notes.append({"date": date.today().isoformat(), "note": "Discussed family conflict"})
+        manager.update_patient_profile(profile)
+    
+    def tearDown(self):
+        shutil.rmtree(self.workdir, ignore_errors=True)
+    
+    def _exported_profile(self, include_sensitive: bool) -> str:
+        exporter = StreamingExporter(self.db_path, output_dir=str(self.workdir / "exports"), compress=True)
+        manifest = exporter.export_patient(self.patient_id, modules=["patient_profile"],
+                                           include_sensitive=include_sensitive)
+        entry = next(entry for entry in manifest.files if entry.table == "patient_profiles")
+        with gzip.open(exporter.output_dir / manifest.export_id / entry.path, "rt") as handle:
+            return handle.read()
+    
+    def test_contact_details_and_notes_are_redacted(self):
+        content = self._exported_profile(include_sensitive=False)
+        for value in ["555-1234", "ann@x.com", "1 Main St", "Discussed family conflict"]:
+            self.assertNotIn(value, content)
+        
+        row = json.loads(content.splitlines()[0])
+        demographics = json.loads(row["demographics"])
+        self.assertEqual(demographics["phone_number"], REDACTED_VALUE)
+        self.assertEqual(demographics["email"], REDACTED_VALUE)
+        self.assertEqual(demographics["first_name"], "Ann")
+        self.assertEqual(row["notes"], REDACTED_VALUE)
+    
+    def test_include_sensitive_keeps_contact_details(self):
+        content = self._exported_profile(include_sensitive=True)
+        self.assertIn("555-1234", content)
+        self.assertIn("ann@x.com", content)
+
+
+class TestEmotionExport(unittest.TestCase):
+    """Emotion exports carry every emotion table and redact clinician and patient free text"""
+    
+    def setUp(self):
+        self.workdir = Path(tempfile.mkdtemp())
+        self.db_path = str(self.workdir / "therapy.db")
+        self.tracker = EmotionTracker(self.db_path)
+        # Two intervention requests cross an alert threshold, which persists alert state
+        for _ in range(2):
+            self.tracker.log_emotion(EmotionEntry(
+                patient_id="P1", emotion=EmotionCategory.FEAR, intensity=9,
+                intervention_needed=True, therapist_notes="Disclosed abuse history"
+            ))
+        card = self.tracker.create_dbt_diary_card("P1", datetime.now())
+        card.daily_notes = "Argued with my sister"
+        self.tracker.update_dbt_diary_card(card)
+        self.tracker.write_pipeline.flush(timeout=10)
+    
+    def tearDown(self):
+        shutil.rmtree(self.workdir, ignore_errors=True)
+    
+    def _export(self, include_sensitive: bool) -> dict:
+        exporter = StreamingExporter(self.db_path, output_dir=str(self.workdir / "exports"))
+        return {table: row for table, row in exporter.iter_module_records("emotion", ["P1"], include_sensitive)}
+    
+    def test_later_tables_are_registered(self):
+        registered = {source.table for sources in EXPORT_MODULES.values() for source in sources}
+        for table in ["conversation_turns", "thought_analyses", "emotion_alert_state"]:
+            self.assertIn(table, registered)
+    
+    def test_free_text_notes_are_redacted(self):
+        rows = self._export(include_sensitive=False)
+        self.assertIn("emotion_alert_state", rows)
+        self.assertEqual(rows["emotion_entries"]["therapist_notes"], REDACTED_VALUE)
+        self.assertEqual(rows["dbt_diary_cards"]["daily_notes"], REDACTED_VALUE)
+        
+        rows = self._export(include_sensitive=True)
+        self.assertEqual(rows["emotion_entries"]["therapist_notes"], "Disclosed abuse history")
+        self.assertEqual(rows["dbt_diary_cards"]["daily_notes"], "Argued with my sister")
+
+
+class TestEmotionAlertStream(unittest.TestCase):
+    """Alerts fire once per threshold crossing and re-arm when the counter falls back"""
+    
+    def setUp(self):
+        self.workdir = Path(tempfile.mkdtemp())
+        self.db_path = str(self.workdir / "therapy.db")
+        self.tracker = EmotionTracker(self.db_path)
+        self.stream = EmotionAlertStream(self.db_path)
+    
+    def tearDown(self):
+        shutil.rmtree(self.workdir, ignore_errors=True)
+    
+    def _observe(self, intensity: int = 5, intervention_needed: bool = False, timestamp: datetime = None):
+        return self.stream.observe("P1", timestamp or datetime.now(), intensity, intervention_needed)
+    
+    def test_alert_fires_once_per_crossing(self):
+        self.assertEqual(self._observe(intensity=9), [])
+        self.assertEqual(self._observe(intensity=9), [])
+        alerts = self._observe(intensity=10)
+        self.assertEqual([alert.alert_type for alert in alerts], ["high_intensity_episodes"])
+        self.assertEqual(alerts[0].value, 3)
+        self.assertEqual(self._observe(intensity=9), [])
+        self.assertIn("high_intensity_episodes", self.stream.get_window_counters("P1")["active_alerts"])
+    
+    def test_alert_re_arms_when_entries_leave_the_window(self):
+        expiring = datetime.now() - ALERT_WINDOW + timedelta(seconds=0.3)
+        self._observe(intervention_needed=True, timestamp=expiring)
+        self.assertEqual(len(self._observe(intervention_needed=True, timestamp=expiring)), 1)
+        
+        time.sleep(0.4)
+        counters = self.stream.get_window_counters("P1")
+        self.assertEqual(counters["intervention_count"], 0)
+        self.assertEqual(counters["active_alerts"], [])
+        
+        self._observe(intervention_needed=True)
+        alerts = self._observe(intervention_needed=True)
+        self.assertEqual([alert.alert_type for alert in alerts], ["intervention_requests"])
+    
+    def test_restart_does_not_repeat_a_raised_alert(self):
+        for _ in range(2):
+            self.tracker.log_emotion(EmotionEntry(patient_id="P1", intensity=5, intervention_needed=True))
+        self.tracker.write_pipeline.flush(timeout=10)
+        
+        restarted = EmotionAlertStream(self.db_path)
+        self.assertEqual(restarted.observe("P1", datetime.now(), 5, True), [])
+        self.assertEqual([alert.alert_type for alert in restarted.get_active_alerts("P1")], ["intervention_requests"])
+    
+    def test_subscribers_receive_alerts_raised_on_other_threads(self):
+        async def receive():
+            subscription = self.stream.subscribe("P1")
+            other_patient = self.stream.subscribe("P2")
+            producer = threading.Thread(target=lambda: [self._observe(intensity=9) for _ in range(3)])
+            producer.start()
+            alert = await asyncio.wait_for(subscription.get(), timeout=5)
+            producer.join()
+            await asyncio.sleep(0)
+            return alert, other_patient.queue.qsize()
+        
+        alert, other_patient_alerts = asyncio.run(receive())
+        self.assertEqual(alert.alert_type, "high_intensity_episodes")
+        self.assertEqual(other_patient_alerts, 0)
+
+
+class TestDiaryCardMetrics(unittest.TestCase):
+    """Diary card rollups must agree with the emotion levels stored on the cards"""
+    
+    def setUp(self):
+        self.workdir = Path(tempfile.mkdtemp())
+        self.db_path = str(self.workdir / "therapy.db")
+        self.tracker = EmotionTracker(self.db_path)
+        self.day = datetime(2025, 3, 5)
+    
+    def tearDown(self):
+        shutil.rmtree(self.workdir, ignore_errors=True)
+    
+    def _save_card(self, **emotions) -> None:
+        card = self.tracker.create_dbt_diary_card("P1", self.day)
+        card.emotions.update(emotions)
+        self.tracker.update_dbt_diary_card(card)
+    
+    def _week(self):
+        return self.tracker.get_weekly_diary_rollups("P1", datetime(2025, 3, 3), datetime(2025, 3, 9))
+    
+    def test_fractional_and_unlisted_emotions_are_kept(self):
+        self._save_card(anger=2.5, gratitude=6.5)
+        
+        rollups = self._week()
+        self.assertEqual(rollups.emotion_sums[0][EMOTION_CODES["anger"]], 2.5)
+        self.assertEqual(rollups.other_emotion_sums, [{"gratitude": 6.5}])
+        
+        series = self.tracker.get_diary_card_series("P1", self.day, self.day)
+        self.assertEqual(series.emotion_levels[0][EMOTION_CODES["anger"]], 2.5)
+        self.assertEqual(series.other_emotions, [{"gratitude": 6.5}])
+    
+    def test_values_that_do_not_fit_are_rejected(self):
+        card = self.tracker.create_dbt_diary_card("P1", self.day)
+        for field_name, value in [("emotions", {"anger": "very"}), ("suicide_urges", 2.5)]:
+            with self.subTest(field=field_name):
+                rejected = DBTDiaryCard(diary_id=card.diary_id, patient_id="P1", date=self.day)
+                setattr(rejected, field_name, value)
+                with self.assertRaises(ValueError):
+                    self.tracker.update_dbt_diary_card(rejected)
+        
+        self.assertEqual(self.tracker.get_dbt_diary_card("P1", self.day).suicide_urges, 0)
+        self.assertEqual(self.tracker.get_diary_card_totals("P1", self.day, self.day)["suicide_urges_sum"], 0)
+    
+    def test_metrics_from_the_integer_layout_are_rebuilt(self):
+        self._save_card(anger=2.5)
+        with sqlite3.connect(self.db_path) as conn:
+            conn.execute("ALTER TABLE dbt_diary_metrics DROP COLUMN other_emotions")
+            conn.execute("UPDATE dbt_diary_metrics SET emotion_levels = x''")
+        
+        tracker = EmotionTracker(self.db_path)
+        rollups = tracker.get_weekly_diary_rollups("P1", datetime(2025, 3, 3), datetime(2025, 3, 9))
+        self.assertEqual(rollups.emotion_sums[0][EMOTION_CODES["anger"]], 2.5)
+
+
+class TestGroundingLibraryCaches(unittest.TestCase):
+    """Libraries on one database must see each other's sessions and plans"""
+    
+    def setUp(self):
+        self.workdir = Path(tempfile.mkdtemp())
+        self.db_path = str(self.workdir / "therapy.db")
+        self.writer = GroundingTechniqueLibrary(self.db_path)
+        self.reader = GroundingTechniqueLibrary(self.db_path)
+    
+    def tearDown(self):
+        shutil.rmtree(self.workdir, ignore_errors=True)
+    
+    def test_sessions_from_another_library_are_seen(self):
+        self.assertEqual(self.reader.get_technique_usage_counts("P1"), {})
+        before = self.reader.get_technique("box_breathing").usage_count
+        
+        session_id = self.writer.start_grounding_session("P1", "box_breathing", pre_distress=8)
+        self.writer.complete_grounding_session(session_id, post_distress=3, effectiveness_rating=9)
+        
+        self.assertEqual(self.reader.get_technique_usage_counts("P1"), {"box_breathing": 1})
+        technique = self.reader.get_technique("box_breathing")
+        self.assertEqual(technique.usage_count, before + 1)
+        self.assertEqual(technique.effectiveness_rating, 9)
+    
+    def test_plan_saved_by_another_library_is_seen(self):
+        self.assertIsNone(self.reader.get_grounding_plan("P1"))
+        plan_id = self.writer.create_personalized_plan("P1")
+        self.assertEqual(self.reader.get_grounding_plan("P1").plan_id, plan_id)
+
+
+class TestReferenceCatalogLookups(unittest.TestCase):
+    """Built-in templates and protocols are served from the shared catalog, custom ones from the database"""
+    
+    def setUp(self):
+        self.workdir = Path(tempfile.mkdtemp())
+        self.db_path = str(self.workdir / "therapy.db")
+    
+    def tearDown(self):
+        shutil.rmtree(self.workdir, ignore_errors=True)
+    
+    def test_experiment_templates(self):
+        designer = BehavioralExperimentDesigner(self.db_path)
+        self.assertIs(designer._get_template_by_id("temp_001"), designer.reference_templates["temp_001"])
+        self.assertIsNone(designer._get_template_by_id("missing"))
+        
+        with sqlite3.connect(self.db_path) as conn:
+            row = list(conn.execute("SELECT * FROM experiment_templates WHERE template_id = 'temp_001'").fetchone())
+            row[0], row[1] = "custom_001", "Custom Social Test"
+            conn.execute(f"INSERT INTO experiment_templates VALUES ({', '.join('?' * len(row))})", row)
+        
+        custom = designer._get_template_by_id("custom_001")
+        self.assertEqual(custom.name, "Custom Social Test")
+        self.assertEqual(custom.suggested_steps, designer.reference_templates["temp_001"].suggested_steps)
+        
+        experiment = designer.design_experiment("P1", template_id="temp_001")
+        self.assertEqual(experiment.title, "Custom: Social Interaction Test")
+    
+    def test_exposure_protocols(self):
+        manager = ExposureTherapyManager(self.db_path)
+        self.assertIs(manager._get_protocol_by_id("exp_protocol_001"), manager.reference_protocols["exp_protocol_001"])
+        self.assertIsNone(manager._get_protocol_by_id("missing"))
+        self.assertEqual([protocol.protocol_id for protocol in manager._get_protocols_by_category("social")],
+                         ["exp_protocol_001"])
+        
+        hierarchy = manager.create_exposure_hierarchy("P1", "public speaking", "social_anxiety",
+                                                      protocol_id="exp_protocol_001")
+        stored = manager.get_exposure_hierarchy(hierarchy.hierarchy_id)
+        self.assertEqual(len(stored.exposure_items), len(hierarchy.exposure_items))
+        self.assertGreater(len(stored.exposure_items), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,304 @@
+"""
+Utility module tests
+"""
+
+import asyncio
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+import unittest
+from concurrent.futures import Future
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from core.session_manager import SessionManager, SessionStatus, SessionType
+from interventions.emotional.emotion_tracking import EmotionCategory, EmotionEntry, EmotionTracker
+from utilities.archive_manager import ArchiveManager
+from utilities.backup_manager import BackupManager, BackupType
+from utilities.data_storage import RowWrite, WriteEvent, WriteOperation, WritePipeline
+
+
+class TestArchiveManager(unittest.TestCase):
+    """Archived rows leave the hot tables but still read back, and restore, unchanged"""
+    
+    def setUp(self):
+        self.workdir = Path(tempfile.mkdtemp())
+        self.db_path = str(self.workdir / "therapy.db")
+        self.archive = ArchiveManager(self.db_path, archive_dir=str(self.workdir / "archive"), horizon_days=365)
+        self.sessions = SessionManager(self.db_path, archive_manager=self.archive)
+        self.tracker = EmotionTracker(self.db_path, archive_manager=self.archive)
+        
+        old = datetime.now() - timedelta(days=800)
+        session = self.sessions.create_session("P1", SessionType.THERAPY, 1, old, "CBT", "initial")
+        self.session_id = session.session_id
+        self.sessions.add_session_note(self.session_id, "clinical", "Discussed sleep", ["passive ideation"])
+        self.sessions.complete_session(self.session_id, "Plan agreed")
+        self.tracker.log_emotion(EmotionEntry(
+            patient_id="P1", timestamp=old, emotion=EmotionCategory.FEAR, intensity=6, therapist_notes="Old entry"
+        ))
+        self.tracker.log_emotion(EmotionEntry(patient_id="P1", emotion=EmotionCategory.JOY, intensity=4))
+        self.tracker.write_pipeline.flush()
+        self.before = self.sessions.get_session(self.session_id)
+    
+    def tearDown(self):
+        shutil.rmtree(self.workdir, ignore_errors=True)
+    
+    def _hot_count(self, table: str) -> int:
+        with sqlite3.connect(self.db_path) as conn:
+            return conn.execute(f"SELECT COUNT(*) FROM {table} WHERE patient_id = 'P1'").fetchone()[0]
+    
+    def test_archived_rows_read_back_transparently(self):
+        result = self.archive.run_archival()
+        self.assertEqual(result.errors, [])
+        self.assertEqual(result.sessions_archived, 1)
+        self.assertEqual(result.rows_archived["emotion_entries"], 1)
+        self.assertEqual(self._hot_count("therapy_sessions"), 0)
+        self.assertEqual(self._hot_count("emotion_entries"), 1)
+        
+        session = self.sessions.get_session(self.session_id)
+        self.assertEqual(session.status, SessionStatus.COMPLETED)
+        self.assertEqual([note.content for note in session.session_notes],
+                         [note.content for note in self.before.session_notes])
+        self.assertTrue(self.archive.get_archived_sessions("P1")[0]["risk_flagged"])
+        
+        entries = self.tracker.get_emotion_entries("P1")
+        self.assertEqual([entry.emotion for entry in entries], [EmotionCategory.JOY, EmotionCategory.FEAR])
+        self.assertEqual(entries[1].therapist_notes, "Old entry")
+    
+    def test_restored_session_returns_to_the_hot_set(self):
+        self.archive.run_archival()
+        self.assertTrue(self.archive.restore_session(self.session_id))
+        
+        self.assertEqual(self._hot_count("therapy_sessions"), 1)
+        self.assertEqual(self.archive.get_archived_sessions("P1"), [])
+        self.assertIsNone(self.archive.get_archived_session_rows(self.session_id))
+        session = self.sessions.get_session(self.session_id)
+        self.assertEqual(len(session.session_notes), len(self.before.session_notes))
+    
+    def test_corrupted_segment_is_not_served(self):
+        self.archive.run_archival()
+        for archive_file in (self.workdir / "archive").glob("archive_*.db"):
+            with sqlite3.connect(archive_file) as conn:
+                conn.execute("UPDATE archive_segments SET payload = payload || x'00'")
+        
+        self.assertIsNone(self.archive.get_archived_session_rows(self.session_id))
+        self.assertEqual(len(self.tracker.get_emotion_entries("P1")), 1)
+
+
+class TestBackupManager(unittest.TestCase):
+    """Backups of a database that is being written to must finish and restore cleanly"""
+    
+    def setUp(self):
+        self.workdir = Path(tempfile.mkdtemp())
+        self.db_path = str(self.workdir / "therapy.db")
+        with sqlite3.connect(self.db_path) as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("CREATE TABLE notes (id INTEGER PRIMARY KEY, body TEXT)")
+            conn.executemany("INSERT INTO notes (body) VALUES (?)", [("x" * 400,) for _ in range(5000)])
+        self.manager = BackupManager(self.db_path, backup_dir=str(self.workdir / "backups"))
+        self.stop_writer = threading.Event()
+    
+    def tearDown(self):
+        self.stop_writer.set()
+        shutil.rmtree(self.workdir, ignore_errors=True)
+    
+    def _start_writer(self) -> threading.Thread:
+        def write():
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            try:
+                while not self.stop_writer.is_set():
+                    conn.execute("INSERT INTO notes (body) VALUES ('concurrent')")
+                    conn.commit()
+                    time.sleep(0.002)
+            finally:
+                conn.close()
+        
+        writer = threading.Thread(target=write)
+        writer.start()
+        return writer
+    
+    def _row_count(self, path: str) -> int:
+        with sqlite3.connect(path) as conn:
+            return conn.execute("SELECT COUNT(*) FROM notes").fetchone()[0]
+    
+    def test_backup_and_restore_with_concurrent_writer(self):
+        writer = self._start_writer()
+        try:
+            full = self.manager.create_full_backup()
+            time.sleep(0.05)
+            incremental = self.manager.create_incremental_backup()
+        finally:
+            self.stop_writer.set()
+            writer.join()
+        
+        self.assertTrue(full.success, full.error)
+        self.assertTrue(incremental.success, incremental.error)
+        self.assertEqual(incremental.record.backup_type, BackupType.INCREMENTAL)
+        self.assertLess(incremental.record.changed_pages, incremental.record.page_count)
+        
+        restored_path = str(self.workdir / "restored.db")
+        restore = self.manager.restore_backup(incremental.record.backup_id, restored_path)
+        self.assertTrue(restore.success, restore.error)
+        self.assertEqual(restore.chain_length, 2)
+        self.assertGreaterEqual(self._row_count(restored_path), 5000)
+        self.assertLessEqual(self._row_count(restored_path), self._row_count(self.db_path))
+    
+    def test_restore_into_live_database_with_concurrent_writer(self):
+        full = self.manager.create_full_backup()
+        with sqlite3.connect(self.db_path) as conn:
+            conn.execute("DELETE FROM notes WHERE id > 100")
+        
+        writer = self._start_writer()
+        try:
+            restore = self.manager.restore_backup(full.record.backup_id)
+        finally:
+            self.stop_writer.set()
+            writer.join()
+        
+        self.assertTrue(restore.success, restore.error)
+        self.assertGreaterEqual(self._row_count(self.db_path), 5000)
+        with sqlite3.connect(self.db_path) as conn:
+            self.assertEqual(conn.execute("PRAGMA integrity_check").fetchone()[0], "ok")
+    
+    def test_unchanged_database_skips_incremental(self):
+        self.manager.create_full_backup()
+        result = self.manager.create_incremental_backup()
+        self.assertTrue(result.success)
+        self.assertEqual(result.skipped_reason, "no pages changed since last snapshot")
+        self.assertEqual(len(self.manager.list_backups()), 1)
+
+
+
+class TestWritePipeline(unittest.TestCase):
+    """Group-commit writes must land, in order, even when the database is briefly unavailable"""
+    
+    def setUp(self):
+        self.workdir = Path(tempfile.mkdtemp())
+        self.db_path = str(self.workdir / "therapy.db")
+        with sqlite3.connect(self.db_path) as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("CREATE TABLE notes (note_id TEXT PRIMARY KEY, body TEXT)")
+        self.pipeline = WritePipeline(self.db_path, busy_timeout_seconds=0.05, retry_delay_ms=10)
+    
+    def tearDown(self):
+        self.pipeline.close()
+        shutil.rmtree(self.workdir, ignore_errors=True)
+    
+    def _note(self, note_id: str, durable: bool = False) -> WriteEvent:
+        return WriteEvent(
+            event_type="note_added", patient_id="P1", source="tests", durable=durable,
+            writes=[RowWrite(WriteOperation.INSERT, "notes", values={"note_id": note_id, "body": "text"})]
+        )
+    
+    def _note_ids(self):
+        with sqlite3.connect(self.db_path) as conn:
+            return {row[0] for row in conn.execute("SELECT note_id FROM notes")}
+    
+    def _hold_write_lock(self, seconds: float) -> threading.Thread:
+        locked = threading.Event()
+        
+        def hold():
+            conn = sqlite3.connect(self.db_path, isolation_level=None)
+            conn.execute("BEGIN IMMEDIATE")
+            locked.set()
+            time.sleep(seconds)
+            conn.execute("COMMIT")
+            conn.close()
+        
+        holder = threading.Thread(target=hold)
+        holder.start()
+        locked.wait()
+        return holder
+    
+    def test_concurrent_events_are_group_committed(self):
+        def produce(thread_index: int):
+            futures = [self.pipeline.submit(self._note(f"{thread_index}_{i}")) for i in range(50)]
+            for future in futures:
+                future.result(timeout=10)
+        
+        threads = [threading.Thread(target=produce, args=(i,)) for i in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        
+        self.assertEqual(len(self._note_ids()), 200)
+        self.assertEqual(self.pipeline.stats.events_committed, 200)
+        self.assertLessEqual(self.pipeline.stats.batches_committed, 200)
+        self.assertEqual(len(self.pipeline.get_event_log(patient_id="P1", limit=500)), 200)
+    
+    def test_failing_event_does_not_fail_its_batch(self):
+        self.pipeline.write(self._note("dup"))
+        futures = [self.pipeline.submit(self._note(note_id)) for note_id in ["a", "dup", "b"]]
+        
+        futures[0].result(timeout=10)
+        with self.assertRaises(sqlite3.IntegrityError):
+            futures[1].result(timeout=10)
+        futures[2].result(timeout=10)
+        self.assertEqual(self._note_ids(), {"dup", "a", "b"})
+    
+    def test_locked_database_batch_is_retried_not_dropped(self):
+        holder = self._hold_write_lock(0.4)
+        future = self.pipeline.record(self._note("background"))
+        
+        self.assertFalse(self.pipeline.flush(timeout=0.1))
+        holder.join()
+        self.assertTrue(self.pipeline.flush(timeout=10))
+        
+        future.result(timeout=0)
+        self.assertIn("background", self._note_ids())
+        self.assertGreater(self.pipeline.stats.batch_retries, 0)
+        self.assertEqual(self.pipeline.stats.events_failed, 0)
+    
+    def test_writer_survives_unexpected_batch_error(self):
+        apply_batch = self.pipeline._apply_batch
+        calls = []
+        
+        def fail_once(*args):
+            calls.append(args)
+            if len(calls) == 1:
+                raise ValueError("unexpected")
+            return apply_batch(*args)
+        
+        self.pipeline._apply_batch = fail_once
+        with self.assertRaises(ValueError):
+            self.pipeline.write(self._note("lost"), timeout=10)
+        self.pipeline.write(self._note("kept"), timeout=10)
+        self.assertEqual(self._note_ids(), {"kept"})
+    
+    def test_flush_restarts_a_dead_writer(self):
+        self.pipeline.write(self._note("first"), timeout=10)
+        self.pipeline._queue.put(None)
+        self.pipeline._writer.join(timeout=10)
+        self.assertFalse(self.pipeline._writer.is_alive())
+        
+        # Queue an event behind the stopped writer, as if it had died mid-run
+        with self.pipeline._progress:
+            self.pipeline._submitted_seq += 1
+            self.pipeline._queue.put((self._note("second"), Future(), self.pipeline._submitted_seq))
+        
+        self.assertTrue(self.pipeline.flush(timeout=10))
+        self.assertEqual(self._note_ids(), {"first", "second"})
+    
+    def test_durable_record_does_not_block_the_event_loop(self):
+        holder = self._hold_write_lock(0.4)
+        
+        async def record_from_coroutines():
+            started = time.perf_counter()
+            future = self.pipeline.record(self._note("sync_caller", durable=True))
+            returned_after = time.perf_counter() - started
+            await self.pipeline.record_async(self._note("async_caller", durable=True))
+            return future, returned_after
+        
+        future, returned_after = asyncio.run(record_from_coroutines())
+        holder.join()
+        
+        self.assertLess(returned_after, 0.2)
+        self.assertTrue(future.done())
+        self.assertEqual(self._note_ids(), {"sync_caller", "async_caller"})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -5,6 +5,9 @@ from datetime import datetime, timedelta
 import sqlite3
 import json
 
+from utilities.identifiers import new_id
+from utilities.reference_catalog import get_reference_library
+
 
 class AcceptanceType(Enum):
     EMOTIONAL = "emotional"
@@ -92,9 +95,12 @@ class AcceptanceStrategiesModule:
     
     def __init__(self, db_path: str = "therapy_system.db"):
         self.db_path = db_path
-        self.acceptance_strategies = self._initialize_acceptance_strategies()
-        self.metaphor_library = self._initialize_metaphor_library()
-        self.assessment_tools = self._initialize_assessment_tools()
+        self.acceptance_strategies = get_reference_library(
+            "act_acceptance_strategies", self._initialize_acceptance_strategies,
+            indexes={"acceptance_type": "acceptance_type", "obstacle": "common_obstacles"}
+        )
+        self.metaphor_library = get_reference_library("act_acceptance_metaphors", self._initialize_metaphor_library)
+        self.assessment_tools = get_reference_library("act_acceptance_assessment_tools", self._initialize_assessment_tools)
         self._create_tables()
     
     def _create_tables(self):
@@ -521,7 +527,7 @@ class AcceptanceStrategiesModule:
     def conduct_acceptance_practice(self, patient_id: str, session_id: str, 
                                   strategy_id: str, target_experience: str) -> AcceptancePractice:
         
-        practice_id = f"{patient_id}_{strategy_id}_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+        practice_id = f"{patient_id}_{strategy_id}_{new_id()}"
         
         strategy = self.acceptance_strategies.get(strategy_id)
         if not strategy:
@@ -551,7 +557,7 @@ class AcceptanceStrategiesModule:
     
     def assess_acceptance_levels(self, patient_id: str, assessment_data: Dict[str, Any]) -> AcceptanceAssessment:
         
-        assessment_id = f"{patient_id}_acceptance_assessment_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+        assessment_id = f"{patient_id}_acceptance_assessment_{new_id()}"
         
         domain_scores = {}
         for domain_type in AcceptanceType:
@@ -5,6 +5,9 @@ from datetime import datetime, timedelta
 import sqlite3
 import json
 
+from utilities.identifiers import new_id
+from utilities.reference_catalog import get_reference_library
+
 
 class DefusionTechnique(Enum):
     MENTAL_DISTANCING = "mental_distancing"
@@ -109,9 +112,15 @@ class CognitiveDefusionModule:
     
     def __init__(self, db_path: str = "therapy_system.db"):
         self.db_path = db_path
-        self.defusion_techniques = self._initialize_defusion_techniques()
-        self.thought_pattern_library = self._initialize_thought_patterns()
-        self.assessment_tools = self._initialize_assessment_tools()
+        self.defusion_techniques = get_reference_library(
+            "act_defusion_techniques", self._initialize_defusion_techniques,
+            indexes={
+                "technique_type": "technique_type", "thought_type": "target_thought_types",
+                "difficulty_level": "difficulty_level"
+            }
+        )
+        self.thought_pattern_library = get_reference_library("act_thought_patterns", self._initialize_thought_patterns)
+        self.assessment_tools = get_reference_library("act_defusion_assessment_tools", self._initialize_assessment_tools)
         self._create_tables()
     
     def _create_tables(self):
@@ -652,7 +661,7 @@ class CognitiveDefusionModule:
     def conduct_defusion_practice(self, patient_id: str, session_id: str, 
                                 technique_id: str, target_thought: str) -> DefusionPractice:
         
-        practice_id = f"{patient_id}_{technique_id}_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+        practice_id = f"{patient_id}_{technique_id}_{new_id()}"
         
         technique = self.defusion_techniques.get(technique_id)
         if not technique:
@@ -709,7 +718,7 @@ class CognitiveDefusionModule:
     
     def assess_fusion_levels(self, patient_id: str, assessment_data: Dict[str, Any]) -> DefusionAssessment:
         
-        assessment_id = f"{patient_id}_defusion_assessment_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+        assessment_id = f"{patient_id}_defusion_assessment_{new_id()}"
         
         overall_fusion = self._calculate_overall_fusion(assessment_data)
         thought_type_fusion = self._assess_thought_type_fusion(assessment_data)
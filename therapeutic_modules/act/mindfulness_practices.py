@@ -5,6 +5,9 @@ from datetime import datetime, timedelta
 import sqlite3
 import json
 
+from utilities.identifiers import new_id
+from utilities.reference_catalog import get_reference_library
+
 
 class MindfulnessType(Enum):
     PRESENT_MOMENT = "present_moment"
@@ -113,9 +116,15 @@ class ACTMindfulnessPracticesModule:
     
     def __init__(self, db_path: str = "therapy_system.db"):
         self.db_path = db_path
-        self.mindfulness_practices = self._initialize_mindfulness_practices()
-        self.guided_scripts = self._initialize_guided_scripts()
-        self.assessment_tools = self._initialize_assessment_tools()
+        self.mindfulness_practices = get_reference_library(
+            "act_mindfulness_practices", self._initialize_mindfulness_practices,
+            indexes={
+                "mindfulness_type": "mindfulness_type", "practice_format": "practice_format",
+                "difficulty_level": "difficulty_level"
+            }
+        )
+        self.guided_scripts = get_reference_library("act_guided_scripts", self._initialize_guided_scripts)
+        self.assessment_tools = get_reference_library("act_mindfulness_assessment_tools", self._initialize_assessment_tools)
         self._create_tables()
     
     def _create_tables(self):
@@ -666,7 +675,7 @@ class ACTMindfulnessPracticesModule:
     def conduct_mindfulness_session(self, patient_id: str, practice_id: str, 
                                   session_duration: int) -> MindfulnessSession:
         
-        session_id = f"{patient_id}_{practice_id}_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+        session_id = f"{patient_id}_{practice_id}_{new_id()}"
         
         practice = self.mindfulness_practices.get(practice_id)
         if not practice:
@@ -700,7 +709,7 @@ class ACTMindfulnessPracticesModule:
     def assess_mindfulness_capacity(self, patient_id: str, 
                                   assessment_data: Dict[str, Any]) -> MindfulnessAssessment:
         
-        assessment_id = f"{patient_id}_mindfulness_assessment_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+        assessment_id = f"{patient_id}_mindfulness_assessment_{new_id()}"
         
         domain_scores = self._calculate_domain_scores(assessment_data)
         overall_score = sum(domain_scores.values()) / len(domain_scores)
@@ -3,9 +3,11 @@ from dataclasses import dataclass, field
 from enum import Enum
 import sqlite3
 import json
-import uuid
 from datetime import datetime
 
+from utilities.identifiers import new_id
+from utilities.reference_catalog import get_reference_library
+
 
 class ValuesArea(Enum):
     FAMILY_RELATIONSHIPS = "family_relationships"
@@ -122,9 +124,9 @@ class ACTValuesClarificationModule:
     
     def __init__(self, db_path: str = "therapy_system.db"):
         self.db_path = db_path
-        self.values_exercises = self._initialize_values_exercises()
-        self.metaphor_library = self._initialize_metaphor_library()
-        self.assessment_tools = self._initialize_assessment_tools()
+        self.values_exercises = get_reference_library("act_values_exercises", self._initialize_values_exercises)
+        self.metaphor_library = get_reference_library("act_values_metaphors", self._initialize_metaphor_library)
+        self.assessment_tools = get_reference_library("act_values_assessment_tools", self._initialize_assessment_tools)
         self._create_tables()
     
     def _create_tables(self):
@@ -427,7 +429,7 @@ class ACTValuesClarificationModule:
     
     def conduct_values_exploration(self, patient_id: str, exercise_type: ValuesExerciseType, 
                                  session_notes: str = "") -> ValuesSession:
-        session_id = str(uuid.uuid4())
+        session_id = new_id()
         exercise = self.values_exercises[exercise_type]
         
         values_session = ValuesSession(
@@ -450,7 +452,7 @@ class ACTValuesClarificationModule:
         return values_session
     
     def assess_values_clarity(self, patient_id: str) -> ValuesAssessment:
-        assessment_id = str(uuid.uuid4())
+        assessment_id = new_id()
         current_values = self._get_patient_values(patient_id)
         
         assessment = ValuesAssessment(
@@ -474,7 +476,7 @@ class ACTValuesClarificationModule:
     
     def create_personal_value(self, patient_id: str, value_name: str, values_area: ValuesArea,
                             personal_definition: str, importance_rating: int) -> PersonalValue:
-        value_id = str(uuid.uuid4())
+        value_id = new_id()
         
         personal_value = PersonalValue(
             value_id=value_id,
@@ -3,9 +3,10 @@ from dataclasses import dataclass, field
 from enum import Enum
 import sqlite3
 import json
-import uuid
 from datetime import datetime, date
 
+from utilities.identifiers import new_id
+
 
 class IntakePhase(Enum):
     WELCOME_ORIENTATION = "welcome_orientation"
@@ -396,8 +397,8 @@ class IntakeAssessmentModule:
         }
     
     def start_intake_assessment(self, patient_id: str) -> IntakeSession:
-        session_id = str(uuid.uuid4())
-        assessment_id = str(uuid.uuid4())
+        session_id = new_id()
+        assessment_id = new_id()
         
         session = IntakeSession(
             session_id=session_id,
@@ -3,9 +3,10 @@ from dataclasses import dataclass, field
 from enum import Enum
 import sqlite3
 import json
-import uuid
 from datetime import datetime
 
+from utilities.identifiers import new_id
+
 
 class MSEDomain(Enum):
     APPEARANCE = "appearance"
@@ -524,7 +525,7 @@ class MentalStatusExamModule:
     
     def conduct_mental_status_exam(self, patient_id: str, session_id: str, 
                                   examiner: str, template_type: str = "comprehensive") -> str:
-        exam_id = str(uuid.uuid4())
+        exam_id = new_id()
         template = self.mse_templates.get(template_type, self.mse_templates["comprehensive"])
         
         exam = MentalStatusExamination(
@@ -667,7 +668,7 @@ class MentalStatusExamModule:
         if not test_config:
             return {"error": "Test not found"}
         
-        assessment_id = str(uuid.uuid4())
+        assessment_id = new_id()
         raw_score = self._calculate_cognitive_score(test_name, responses)
         interpretation = self._interpret_cognitive_score(test_name, raw_score)
         
@@ -3,9 +3,11 @@ from dataclasses import dataclass, field
 from enum import Enum
 import sqlite3
 import json
-import uuid
 from datetime import datetime, timedelta
 
+from utilities.text_normalization import get_term_matcher
+from utilities.identifiers import new_id
+
 
 class RiskType(Enum):
     SUICIDE_RISK = "suicide_risk"
@@ -64,6 +66,28 @@ class InterventionLevel(Enum):
     EMERGENCY_SERVICES = "emergency_services"
 
 
+# Whole-word screening keywords ("*" also matches longer forms). Negations are not
+# applied: a denied risk ("I wouldn't kill myself") still warrants follow-up
+SCREENING_RISK_KEYWORDS = {
+    RiskType.SUICIDE_RISK: ["suicide*", "kill myself", "end it all", "better off dead"],
+    RiskType.VIOLENCE_RISK: ["hurt someone", "kill them", "revenge", "weapon*"],
+    RiskType.SELF_HARM_RISK: ["cut myself", "hurt myself", "self-harm*", "burning"]
+}
+
+CONCERN_RISK_KEYWORDS = {
+    RiskType.SUICIDE_RISK: ["suicide*", "kill myself", "end life", "better off dead", "hopeless", "worthless"],
+    RiskType.VIOLENCE_RISK: ["hurt someone", "kill them", "revenge", "angry", "weapon*", "fight*"],
+    RiskType.SELF_HARM_RISK: ["cut myself", "self-harm*", "hurt myself", "burning", "punish myself"]
+}
+
+IMMEDIATE_SAFETY_KEYWORDS = {
+    "immediate": [
+        "right now", "tonight", "today", "going to do it", "have the means",
+        "can't take it", "tonight's the night", "goodbye"
+    ]
+}
+
+
 @dataclass
 class RiskFactor:
     factor_id: str
@@ -663,7 +687,7 @@ class RiskAssessmentModule:
     
     def conduct_suicide_risk_assessment(self, patient_id: str, session_id: str, 
                                       assessor: str, responses: Dict[str, Any]) -> SuicideRiskAssessment:
-        assessment_id = str(uuid.uuid4())
+        assessment_id = new_id()
         
         assessment = SuicideRiskAssessment(
             assessment_id=assessment_id,
@@ -704,7 +728,7 @@ class RiskAssessmentModule:
     
     def conduct_self_harm_assessment(self, patient_id: str, session_id: str,
                                    assessor: str, responses: Dict[str, Any]) -> SelfHarmAssessment:
-        assessment_id = str(uuid.uuid4())
+        assessment_id = new_id()
         
         assessment = SelfHarmAssessment(
             assessment_id=assessment_id,
@@ -740,7 +764,7 @@ class RiskAssessmentModule:
     
     def conduct_violence_risk_assessment(self, patient_id: str, session_id: str,
                                         assessor: str, responses: Dict[str, Any]) -> ViolenceRiskAssessment:
-        assessment_id = str(uuid.uuid4())
+        assessment_id = new_id()
         
         assessment = ViolenceRiskAssessment(
             assessment_id=assessment_id,
@@ -778,7 +802,7 @@ class RiskAssessmentModule:
     
     def conduct_comprehensive_risk_assessment(self, patient_id: str, session_id: str,
                                             assessor: str, assessment_data: Dict[str, Any]) -> ComprehensiveRiskAssessment:
-        assessment_id = str(uuid.uuid4())
+        assessment_id = new_id()
         
         comprehensive = ComprehensiveRiskAssessment(
             assessment_id=assessment_id,
@@ -826,7 +850,7 @@ class RiskAssessmentModule:
     
     def create_safety_plan(self, patient_id: str, created_by: str, 
                           risk_types: List[RiskType], plan_data: Dict[str, Any]) -> SafetyPlan:
-        plan_id = str(uuid.uuid4())
+        plan_id = new_id()
         
         safety_plan = SafetyPlan(
             plan_id=plan_id,
@@ -1596,7 +1620,7 @@ class RiskAssessmentWorkflow:
         
         # Start comprehensive assessment
         assessment_data = {"identified_risks": risk_types_to_assess}
-        self.current_assessment_id = str(uuid.uuid4())
+        self.current_assessment_id = new_id()
         
         return {
             "assessment_id": self.current_assessment_id,
@@ -1610,20 +1634,12 @@ class RiskAssessmentWorkflow:
         screening_results = {}
         follow_up_needed = []
         
-        # Screen for suicide risk
-        if any(keyword in str(responses).lower() for keyword in ["suicide", "kill myself", "end it all", "better off dead"]):
-            screening_results[RiskType.SUICIDE_RISK] = RiskLevel.MODERATE
-            follow_up_needed.append(RiskType.SUICIDE_RISK)
-        
-        # Screen for violence risk
-        if any(keyword in str(responses).lower() for keyword in ["hurt someone", "kill them", "revenge", "weapon"]):
-            screening_results[RiskType.VIOLENCE_RISK] = RiskLevel.MODERATE
-            follow_up_needed.append(RiskType.VIOLENCE_RISK)
-        
-        # Screen for self-harm
-        if any(keyword in str(responses).lower() for keyword in ["cut myself", "hurt myself", "self-harm", "burning"]):
-            screening_results[RiskType.SELF_HARM_RISK] = RiskLevel.MODERATE
-            follow_up_needed.append(RiskType.SELF_HARM_RISK)
+        # Screen for suicide, violence and self-harm risk
+        hits = get_term_matcher(SCREENING_RISK_KEYWORDS, negation_window=0).scan(str(responses))
+        for risk_type in SCREENING_RISK_KEYWORDS:
+            if hits.count(risk_type) > 0:
+                screening_results[risk_type] = RiskLevel.MODERATE
+                follow_up_needed.append(risk_type)
         
         return {
             "screening_results": {k.value: v.value for k, v in screening_results.items()},
@@ -1693,21 +1709,8 @@ class RiskAssessmentWorkflow:
         }
     
     def _identify_risk_types_from_concerns(self, concerns: List[str]) -> List[RiskType]:
-        risk_types = []
-        concerns_text = " ".join(concerns).lower()
-        
-        suicide_keywords = ["suicide", "kill myself", "end life", "better off dead", "hopeless", "worthless"]
-        violence_keywords = ["hurt someone", "kill them", "revenge", "angry", "weapon", "fight"]
-        self_harm_keywords = ["cut myself", "self-harm", "hurt myself", "burning", "punish myself"]
-        
-        if any(keyword in concerns_text for keyword in suicide_keywords):
-            risk_types.append(RiskType.SUICIDE_RISK)
-        
-        if any(keyword in concerns_text for keyword in violence_keywords):
-            risk_types.append(RiskType.VIOLENCE_RISK)
-        
-        if any(keyword in concerns_text for keyword in self_harm_keywords):
-            risk_types.append(RiskType.SELF_HARM_RISK)
+        hits = get_term_matcher(CONCERN_RISK_KEYWORDS, negation_window=0).scan(". ".join(concerns))
+        risk_types = [risk_type for risk_type in CONCERN_RISK_KEYWORDS if hits.count(risk_type) > 0]
         
         # Default to suicide screening if no specific indicators
         if not risk_types:
@@ -1716,13 +1719,7 @@ class RiskAssessmentWorkflow:
         return risk_types
     
     def _check_immediate_safety_concerns(self, concerns: List[str]) -> bool:
-        immediate_keywords = [
-            "right now", "tonight", "today", "going to do it", "have the means",
-            "can't take it", "tonight's the night", "goodbye"
-        ]
-        
-        concerns_text = " ".join(concerns).lower()
-        return any(keyword in concerns_text for keyword in immediate_keywords)
+        return bool(get_term_matcher(IMMEDIATE_SAFETY_KEYWORDS, negation_window=0).scan(". ".join(concerns)))
     
     def _determine_next_assessment_steps(self, risk_types: List[RiskType]) -> List[str]:
         steps = []
@@ -1851,7 +1848,7 @@ class CrisisInterventionModule:
         if not protocol:
             return {"error": "No crisis protocol for this risk level"}
         
-        intervention_id = str(uuid.uuid4())
+        intervention_id = new_id()
         
         return {
             "intervention_id": intervention_id,
@@ -1870,7 +1867,7 @@ class CrisisInterventionModule:
         }
     
     def document_crisis_incident(self, patient_id: str, incident_data: Dict[str, Any]) -> str:
-        incident_id = str(uuid.uuid4())
+        incident_id = new_id()
         
         with sqlite3.connect(self.risk_module.db_path) as conn:
             cursor = conn.cursor()
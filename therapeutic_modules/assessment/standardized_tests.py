@@ -3,9 +3,10 @@ from dataclasses import dataclass, field
 from enum import Enum
 import sqlite3
 import json
-import uuid
 from datetime import datetime, date
 
+from utilities.identifiers import new_id
+
 
 class AssessmentType(Enum):
     SCREENING = "screening"
@@ -689,7 +690,7 @@ class StandardizedTestsModule:
         if test_id not in self.tests:
             raise ValueError(f"Test {test_id} not found")
         
-        assessment_id = str(uuid.uuid4())
+        assessment_id = new_id()
         
         return AssessmentResult(
             assessment_id=assessment_id,
@@ -828,7 +829,7 @@ class StandardizedTestsModule:
         return risk_flags
     
     def administer_test_battery(self, patient_id: str, test_ids: List[str]) -> Dict[str, AssessmentResult]:
-        session_id = str(uuid.uuid4())
+        session_id = new_id()
         results = {}
         
         for test_id in test_ids:
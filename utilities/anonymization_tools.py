@@ -0,0 +1,379 @@
+"""
+Anonymization Tools Module
+Parallel bulk anonymization of patient data for research datasets
+Streams patient IDs, anonymizes them in a process pool with deterministic salted
+pseudonyms, and appends column-oriented row groups with resumable checkpoints
+"""
+
+import sqlite3
+import gzip
+import json
+import hashlib
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, Future
+from collections import deque
+from typing import Dict, List, Optional, Any, Iterator
+from dataclasses import dataclass, field, asdict
+from datetime import datetime
+from pathlib import Path
+
+from core.patient_profile import (
+    anonymize_profile_row, pseudonymize_id, profile_anchor_date, days_since
+)
+
+
+# Output tables and their columns, in the order they are written
+RESEARCH_TABLES: Dict[str, List[str]] = {
+    "profiles": [
+        "pseudonym", "age_range", "gender", "primary_diagnosis", "secondary_diagnoses",
+        "current_risk_level", "treatment_status", "treatment_phase", "treatment_duration_days",
+        "total_sessions", "sessions_attended", "attendance_rate", "homework_completion_rate",
+        "assessment_count", "latest_scores"
+    ],
+    "assessments": [
+        "pseudonym", "assessment_type", "day_offset", "scores"
+    ],
+    "sessions": [
+        "pseudonym", "session_pseudonym", "session_type", "day_offset",
+        "duration_minutes", "mood_rating"
+    ],
+    "progress": [
+        "pseudonym", "metric_type", "value", "day_offset", "session_number", "source"
+    ]
+}
+
+CHECKPOINT_FILE = "checkpoint.json"
+
+
+@dataclass
+class BulkAnonymizationResult:
+    """Outcome and throughput of a bulk anonymization run"""
+    output_dir: str
+    patients_processed: int = 0
+    rows_written: Dict[str, int] = field(default_factory=dict)
+    batches_written: int = 0
+    resumed_from: Optional[str] = None
+    duration_seconds: float = 0.0
+    patients_per_second: float = 0.0
+    rows_per_second: float = 0.0
+    errors: List[str] = field(default_factory=list)
+
+
+def _empty_columns() -> Dict[str, Dict[str, List[Any]]]:
+    """Column buffers for one row group of every research table"""
+    return {table: {column: [] for column in columns} for table, columns in RESEARCH_TABLES.items()}
+
+
+def anonymize_batch(db_path: str, patient_ids: List[str], salt: str) -> Dict[str, Dict[str, List[Any]]]:
+    """Anonymize a batch of patients into column buffers
+    
+    Runs inside worker processes, so it opens its own connection and only
+    returns plain lists.
+    """
+    
+    columns = _empty_columns()
+    placeholders = ", ".join("?" for _ in patient_ids)
+    
+    with sqlite3.connect(db_path) as conn:
+        conn.row_factory = sqlite3.Row
+        tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+        
+        profile_rows = conn.execute(
+            f"SELECT * FROM patient_profiles WHERE patient_id IN ({placeholders})", patient_ids
+        ).fetchall()
+        
+        anchors, pseudonyms = {}, {}
+        profiles = columns["profiles"]
+        for row in profile_rows:
+            row = tuple(row)
+            record = anonymize_profile_row(row, salt)
+            anchors[row[0]] = profile_anchor_date(row)
+            pseudonyms[row[0]] = record['patient_id']
+            
+            profiles["pseudonym"].append(record['patient_id'])
+            profiles["age_range"].append(record['demographics']['age_range'])
+            profiles["gender"].append(record['demographics']['gender'])
+            profiles["primary_diagnosis"].append(record['clinical_info']['primary_diagnosis'])
+            profiles["secondary_diagnoses"].append(record['clinical_info']['secondary_diagnoses'])
+            profiles["current_risk_level"].append(record['clinical_info']['current_risk_level'])
+            profiles["treatment_status"].append(record['treatment_status'])
+            profiles["treatment_phase"].append(record['treatment_progress']['treatment_phase'])
+            profiles["treatment_duration_days"].append(record['treatment_progress']['treatment_duration_days'])
+            profiles["total_sessions"].append(record['treatment_progress']['total_sessions'])
+            profiles["sessions_attended"].append(record['treatment_progress']['sessions_attended'])
+            profiles["attendance_rate"].append(record['treatment_progress']['attendance_rate'])
+            profiles["homework_completion_rate"].append(record['treatment_progress']['homework_completion_rate'])
+            profiles["assessment_count"].append(record['assessment_history']['assessment_count'])
+            profiles["latest_scores"].append(record['assessment_history']['latest_scores'])
+        
+        if "assessment_results" in tables:
+            assessments = columns["assessments"]
+            for row in conn.execute(f"""
+                SELECT patient_id, assessment_type, assessment_date, scores FROM assessment_results
+                WHERE patient_id IN ({placeholders}) ORDER BY patient_id, assessment_date
+            """, patient_ids):
+                if row["patient_id"] not in pseudonyms:
+                    continue
+                assessments["pseudonym"].append(pseudonyms[row["patient_id"]])
+                assessments["assessment_type"].append(row["assessment_type"])
+                assessments["day_offset"].append(days_since(anchors[row["patient_id"]], row["assessment_date"]))
+                assessments["scores"].append(json.loads(row["scores"]) if row["scores"] else {})
+        
+        if "session_records" in tables:
+            sessions = columns["sessions"]
+            for row in conn.execute(f"""
+                SELECT patient_id, session_id, session_date, session_type, duration_minutes, mood_rating
+                FROM session_records
+                WHERE patient_id IN ({placeholders}) ORDER BY patient_id, session_date
+            """, patient_ids):
+                if row["patient_id"] not in pseudonyms:
+                    continue
+                sessions["pseudonym"].append(pseudonyms[row["patient_id"]])
+                sessions["session_pseudonym"].append(pseudonymize_id(row["session_id"], salt))
+                sessions["session_type"].append(row["session_type"])
+                sessions["day_offset"].append(days_since(anchors[row["patient_id"]], row["session_date"]))
+                sessions["duration_minutes"].append(row["duration_minutes"])
+                sessions["mood_rating"].append(row["mood_rating"])
+        
+        if "progress_data" in tables:
+            progress = columns["progress"]
+            for row in conn.execute(f"""
+                SELECT patient_id, metric_type, value, timestamp, session_number, source
+                FROM progress_data
+                WHERE patient_id IN ({placeholders}) ORDER BY patient_id, timestamp
+            """, patient_ids):
+                if row["patient_id"] not in pseudonyms:
+                    continue
+                progress["pseudonym"].append(pseudonyms[row["patient_id"]])
+                progress["metric_type"].append(row["metric_type"])
+                progress["value"].append(row["value"])
+                progress["day_offset"].append(days_since(anchors[row["patient_id"]], row["timestamp"]))
+                progress["session_number"].append(row["session_number"])
+                progress["source"].append(row["source"])
+    
+    return columns
+
+
+class BulkAnonymizer:
+    """Builds research extracts for whole caseloads
+    
+    Output is one `<table>.columns.jsonl.gz` file per research table. Each batch
+    is appended as its own gzip member holding one JSON row group
+    (`{"row_count": n, "columns": {name: [values]}}`), so files stay valid after
+    an interrupted run and can be truncated back to the last checkpoint.
+    """
+    
+    def __init__(self, db_path: str = "data/therapy_system.db",
+                 output_dir: str = "data/research_extract",
+                 salt: Optional[str] = None,
+                 batch_size: int = 200,
+                 max_workers: Optional[int] = None):
+        if not salt:
+            raise ValueError("A salt is required so pseudonyms are reproducible across runs")
+        
+        self.db_path = db_path
+        self.output_dir = Path(output_dir)
+        self.salt = salt
+        self.batch_size = batch_size
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.logger = logging.getLogger(__name__)
+        
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+    
+    def run(self, resume: bool = True) -> BulkAnonymizationResult:
+        """Anonymize every patient, continuing from the last checkpoint when resume is set"""
+        
+        started = time.perf_counter()
+        result = BulkAnonymizationResult(output_dir=str(self.output_dir))
+        
+        checkpoint = self._load_checkpoint() if resume else None
+        after_patient_id = ""
+        if checkpoint:
+            after_patient_id = checkpoint["last_patient_id"]
+            result.resumed_from = after_patient_id
+            result.patients_processed = checkpoint["patients_processed"]
+            result.rows_written = checkpoint["rows_written"]
+            result.batches_written = checkpoint["batches_written"]
+            self._truncate_outputs(checkpoint["file_sizes"])
+            self.logger.info(f"Resuming bulk anonymization after patient {after_patient_id}")
+        else:
+            self._reset_outputs()
+        
+        processed_this_run = 0
+        rows_this_run = 0
+        window = self.max_workers * 2
+        pending: deque = deque()
+        
+        with ProcessPoolExecutor(max_workers=self.max_workers) as executor:
+            batches = self._iter_patient_batches(after_patient_id)
+            exhausted = False
+            
+            while pending or not exhausted:
+                # Keep a bounded number of batches in flight so memory stays flat
+                while not exhausted and len(pending) < window:
+                    batch = next(batches, None)
+                    if batch is None:
+                        exhausted = True
+                        break
+                    future: Future = executor.submit(anonymize_batch, self.db_path, batch, self.salt)
+                    pending.append((batch, future))
+                
+                if not pending:
+                    break
+                
+                # Results are written in submission order so checkpoints cover a contiguous prefix
+                batch, future = pending.popleft()
+                try:
+                    columns = future.result()
+                except Exception as e:
+                    self.logger.error(f"Batch starting at {batch[0]} failed: {e}")
+                    result.errors.append(f"{batch[0]}..{batch[-1]}: {e}")
+                    break
+                
+                written = self._append_row_groups(columns)
+                for table, count in written.items():
+                    result.rows_written[table] = result.rows_written.get(table, 0) + count
+                result.patients_processed += len(batch)
+                result.batches_written += 1
+                processed_this_run += len(batch)
+                rows_this_run += sum(written.values())
+                
+                self._save_checkpoint(batch[-1], result)
+                
+                elapsed = time.perf_counter() - started
+                self.logger.info(
+                    f"Anonymized {result.patients_processed} patients "
+                    f"({processed_this_run / max(elapsed, 1e-9):.1f} patients/s)"
+                )
+            
+            for _, future in pending:
+                future.cancel()
+        
+        result.duration_seconds = time.perf_counter() - started
+        result.patients_per_second = processed_this_run / max(result.duration_seconds, 1e-9)
+        result.rows_per_second = rows_this_run / max(result.duration_seconds, 1e-9)
+        return result
+    
+    def _iter_patient_batches(self, after_patient_id: str) -> Iterator[List[str]]:
+        """Stream patient IDs in key order, one batch at a time"""
+        
+        last_patient_id = after_patient_id
+        with sqlite3.connect(self.db_path) as conn:
+            while True:
+                batch = [row[0] for row in conn.execute("""
+                    SELECT patient_id FROM patient_profiles
+                    WHERE patient_id > ?
+                    ORDER BY patient_id LIMIT ?
+                """, (last_patient_id, self.batch_size))]
+                if not batch:
+                    return
+                yield batch
+                last_patient_id = batch[-1]
+    
+    # ========================================================================
+    # OUTPUT AND CHECKPOINTS
+    # ========================================================================
+    
+    def _table_path(self, table: str) -> Path:
+        return self.output_dir / f"{table}.columns.jsonl.gz"
+    
+    def _append_row_groups(self, columns: Dict[str, Dict[str, List[Any]]]) -> Dict[str, int]:
+        """Append one row group per table as a separate gzip member"""
+        
+        written = {}
+        for table, table_columns in columns.items():
+            row_count = len(next(iter(table_columns.values())))
+            if not row_count:
+                continue
+            row_group = {"row_count": row_count, "columns": table_columns}
+            with open(self._table_path(table), "ab") as handle:
+                handle.write(gzip.compress(json.dumps(row_group, default=str).encode("utf-8") + b"\n"))
+                handle.flush()
+                os.fsync(handle.fileno())
+            written[table] = row_count
+        return written
+    
+    def _reset_outputs(self):
+        """Start a fresh extract"""
+        
+        for table in RESEARCH_TABLES:
+            self._table_path(table).unlink(missing_ok=True)
+        (self.output_dir / CHECKPOINT_FILE).unlink(missing_ok=True)
+    
+    def _truncate_outputs(self, file_sizes: Dict[str, int]):
+        """Drop row groups written after the last checkpoint"""
+        
+        for table in RESEARCH_TABLES:
+            path = self._table_path(table)
+            size = file_sizes.get(table, 0)
+            if path.exists():
+                with open(path, "r+b") as handle:
+                    handle.truncate(size)
+    
+    def _salt_fingerprint(self) -> str:
+        return hashlib.sha256(self.salt.encode("utf-8")).hexdigest()[:16]
+    
+    def _save_checkpoint(self, last_patient_id: str, result: BulkAnonymizationResult):
+        """Atomically record the last fully written patient"""
+        
+        checkpoint = {
+            "last_patient_id": last_patient_id,
+            "patients_processed": result.patients_processed,
+            "rows_written": result.rows_written,
+            "batches_written": result.batches_written,
+            "salt_fingerprint": self._salt_fingerprint(),
+            "file_sizes": {
+                table: self._table_path(table).stat().st_size if self._table_path(table).exists() else 0
+                for table in RESEARCH_TABLES
+            },
+            "updated": datetime.now().isoformat()
+        }
+        temp_path = self.output_dir / f"{CHECKPOINT_FILE}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as handle:
+            json.dump(checkpoint, handle)
+        os.replace(temp_path, self.output_dir / CHECKPOINT_FILE)
+    
+    def _load_checkpoint(self) -> Optional[Dict[str, Any]]:
+        """Checkpoint of a previous run with the same salt"""
+        
+        path = self.output_dir / CHECKPOINT_FILE
+        if not path.exists():
+            return None
+        
+        with open(path, encoding="utf-8") as handle:
+            checkpoint = json.load(handle)
+        
+        if checkpoint.get("salt_fingerprint") != self._salt_fingerprint():
+            raise ValueError("Checkpoint was written with a different salt; pseudonyms would not link")
+        return checkpoint
+
+
+def read_row_groups(path: str) -> Iterator[Dict[str, List[Any]]]:
+    """Yield the column dict of each row group in a research extract file"""
+    
+    with gzip.open(path, "rt", encoding="utf-8") as handle:
+        for line in handle:
+            yield json.loads(line)["columns"]
+
+
+# Example usage and testing
+if __name__ == "__main__":
+    print("=== BULK ANONYMIZATION DEMONSTRATION ===\n")
+    
+    anonymizer = BulkAnonymizer(salt="demo-research-salt", batch_size=50)
+    
+    print("Running bulk anonymization...")
+    run = anonymizer.run()
+    print(f"Patients processed: {run.patients_processed}")
+    print(f"Rows written: {run.rows_written}")
+    print(f"Throughput: {run.patients_per_second:.1f} patients/s, {run.rows_per_second:.1f} rows/s")
+    if run.resumed_from:
+        print(f"Resumed after: {run.resumed_from}")
+    
+    print("\n=== RUN SUMMARY ===")
+    print(json.dumps(asdict(run), indent=2))
+    
+    print("\n" + "="*60)
+    print("Bulk anonymization demonstration complete!")
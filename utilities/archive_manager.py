@@ -0,0 +1,796 @@
+"""
+Archive Manager Module
+Hot/cold data tiering for the AI therapy system
+Moves completed sessions and aged clinical data into compressed archive databases
+while keeping lightweight summary rows in the primary database
+"""
+
+import sqlite3
+import json
+import zlib
+import hashlib
+import logging
+import threading
+import time
+from itertools import groupby
+from typing import Dict, List, Optional, Any, Iterator, Tuple
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from utilities.identifiers import new_id
+
+
+# Session tables archived together with their parent therapy_sessions row
+SESSION_CHILD_TABLES = ["session_goals", "session_notes", "homework_assignments", "session_metrics"]
+
+# Only sessions in a terminal state are eligible for archival
+ARCHIVABLE_SESSION_STATUSES = ["completed", "cancelled", "no_show"]
+
+# Minimum time between scheduled archival passes of one manager
+ARCHIVAL_INTERVAL = timedelta(hours=24)
+
+# Append-only time series archived in per-patient monthly segments
+TIME_SERIES_TABLES = {
+    "progress_data": {
+        "timestamp_column": "timestamp",
+        "group_column": "metric_type",
+        "value_column": "value"
+    },
+    "emotion_entries": {
+        "timestamp_column": "timestamp",
+        "group_column": "emotion",
+        "value_column": "intensity"
+    }
+}
+
+
+@dataclass
+class ArchiveSegment:
+    """Catalog entry describing one compressed block of archived rows"""
+    segment_id: str
+    table_name: str
+    patient_id: str
+    archive_file: str
+    row_count: int
+    min_timestamp: str
+    max_timestamp: str
+    session_id: Optional[str] = None
+    summary: Dict[str, Any] = field(default_factory=dict)
+    archived_date: datetime = field(default_factory=datetime.now)
+
+
+@dataclass
+class ArchiveRunResult:
+    """Outcome of a single archival pass"""
+    cutoff: datetime
+    sessions_archived: int = 0
+    rows_archived: Dict[str, int] = field(default_factory=dict)
+    segments_written: int = 0
+    compressed_bytes: int = 0
+    duration_seconds: float = 0.0
+    errors: List[str] = field(default_factory=list)
+    skipped_reason: Optional[str] = None
+
+
+class ArchiveManager:
+    """Moves cold clinical data out of the hot database and reads it back transparently"""
+    
+    def __init__(self, db_path: str = "data/therapy_system.db",
+                 archive_dir: Optional[str] = None,
+                 horizon_days: int = 365,
+                 compression_level: int = 6,
+                 enabled: bool = True):
+        self.db_path = db_path
+        self.archive_dir = Path(archive_dir) if archive_dir else Path(db_path).parent / "archive"
+        self.horizon_days = horizon_days
+        self.compression_level = compression_level
+        self.enabled = enabled
+        self.logger = logging.getLogger(__name__)
+        self._last_scheduled_run: Optional[datetime] = None
+        self._ensure_database_exists()
+        self._create_tables()
+    
+    @classmethod
+    def from_config(cls, database_config: Any, db_path: Optional[str] = None) -> "ArchiveManager":
+        """Build a manager from a DatabaseConfig
+        
+        The configured archive_location belongs to the configured database;
+        a manager for another db_path keeps its archive beside that database.
+        """
+        
+        db_path = db_path or database_config.db_path
+        same_database = Path(db_path).resolve() == Path(database_config.db_path).resolve()
+        return cls(
+            db_path=db_path,
+            archive_dir=database_config.archive_location if same_database else None,
+            horizon_days=database_config.archive_horizon_days,
+            compression_level=database_config.archive_compression_level,
+            enabled=database_config.archive_enabled
+        )
+    
+    def _ensure_database_exists(self):
+        """Ensure database directory and file exist"""
+        db_dir = Path(self.db_path).parent
+        db_dir.mkdir(parents=True, exist_ok=True)
+    
+    def _create_tables(self):
+        """Create hot-set catalog and summary tables"""
+        
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            
+            # One row per compressed segment in the cold tier
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS archive_catalog (
+                    segment_id TEXT PRIMARY KEY,
+                    table_name TEXT NOT NULL,
+                    patient_id TEXT NOT NULL,
+                    session_id TEXT,
+                    archive_file TEXT NOT NULL,
+                    row_count INTEGER NOT NULL,
+                    min_timestamp TEXT NOT NULL,
+                    max_timestamp TEXT NOT NULL,
+                    summary TEXT,
+                    archived_date TEXT NOT NULL
+                )
+            """)
+            
+            cursor.execute("""
+                CREATE INDEX IF NOT EXISTS idx_archive_catalog_patient
+                ON archive_catalog (table_name, patient_id, max_timestamp)
+            """)
+            
+            # Lightweight summary rows that replace archived therapy_sessions rows
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS archived_sessions (
+                    session_id TEXT PRIMARY KEY,
+                    patient_id TEXT NOT NULL,
+                    session_type TEXT NOT NULL,
+                    session_number INTEGER NOT NULL,
+                    scheduled_date TEXT NOT NULL,
+                    therapy_modality TEXT NOT NULL,
+                    treatment_phase TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    note_count INTEGER DEFAULT 0,
+                    risk_flagged BOOLEAN DEFAULT 0,
+                    segment_id TEXT NOT NULL,
+                    archived_date TEXT NOT NULL
+                )
+            """)
+            
+            cursor.execute("""
+                CREATE INDEX IF NOT EXISTS idx_archived_sessions_patient
+                ON archived_sessions (patient_id, session_number)
+            """)
+            
+            conn.commit()
+    
+    # ========================================================================
+    # ARCHIVAL
+    # ========================================================================
+    
+    def is_archival_due(self) -> bool:
+        """Whether a scheduled pass should run: archival enabled and none run in the last interval"""
+        
+        if not self.enabled:
+            return False
+        return self._last_scheduled_run is None or datetime.now() - self._last_scheduled_run >= ARCHIVAL_INTERVAL
+    
+    def run_scheduled_archival(self) -> ArchiveRunResult:
+        """Run an archival pass if one is due; meant for the periodic maintenance job"""
+        
+        cutoff = datetime.now() - timedelta(days=self.horizon_days)
+        if not self.enabled:
+            return ArchiveRunResult(cutoff=cutoff, skipped_reason="archival disabled")
+        if not self.is_archival_due():
+            return ArchiveRunResult(cutoff=cutoff, skipped_reason="archival not due")
+        
+        self._last_scheduled_run = datetime.now()
+        return self.run_archival(cutoff)
+    
+    def run_archival(self, cutoff: Optional[datetime] = None) -> ArchiveRunResult:
+        """Archive completed sessions and time-series data older than the horizon"""
+        
+        cutoff = cutoff or (datetime.now() - timedelta(days=self.horizon_days))
+        result = ArchiveRunResult(cutoff=cutoff)
+        started = time.perf_counter()
+        
+        try:
+            self._archive_sessions(cutoff, result)
+        except Exception as e:
+            self.logger.error(f"Failed to archive sessions: {e}")
+            result.errors.append(f"therapy_sessions: {e}")
+        
+        for table_name in TIME_SERIES_TABLES:
+            try:
+                self._archive_time_series(table_name, cutoff, result)
+            except Exception as e:
+                self.logger.error(f"Failed to archive {table_name}: {e}")
+                result.errors.append(f"{table_name}: {e}")
+        
+        # Return freed pages to the filesystem when auto_vacuum is INCREMENTAL
+        with sqlite3.connect(self.db_path) as conn:
+            conn.execute("PRAGMA incremental_vacuum")
+        
+        result.duration_seconds = time.perf_counter() - started
+        self.logger.info(
+            f"Archival pass complete: {result.sessions_archived} sessions, "
+            f"{sum(result.rows_archived.values())} rows, {result.segments_written} segments "
+            f"in {result.duration_seconds:.2f}s"
+        )
+        return result
+    
+    def _archive_sessions(self, cutoff: datetime, result: ArchiveRunResult):
+        """Archive terminal sessions scheduled before the cutoff"""
+        
+        with sqlite3.connect(self.db_path) as conn:
+            if not self._table_exists(conn, "therapy_sessions"):
+                return
+            
+            cursor = conn.cursor()
+            placeholders = ", ".join("?" for _ in ARCHIVABLE_SESSION_STATUSES)
+            cursor.execute(f"""
+                SELECT session_id FROM therapy_sessions
+                WHERE status IN ({placeholders}) AND scheduled_date < ?
+                ORDER BY scheduled_date
+            """, (*ARCHIVABLE_SESSION_STATUSES, cutoff.isoformat()))
+            session_ids = [row[0] for row in cursor.fetchall()]
+            
+            child_tables = [t for t in SESSION_CHILD_TABLES if self._table_exists(conn, t)]
+            
+            for session_id in session_ids:
+                self._archive_single_session(conn, session_id, child_tables, result)
+    
+    def _archive_single_session(self, conn: sqlite3.Connection, session_id: str,
+                                child_tables: List[str], result: ArchiveRunResult):
+        """Move one session and its child rows into the cold tier"""
+        
+        cursor = conn.cursor()
+        cursor.execute("SELECT * FROM therapy_sessions WHERE session_id = ?", (session_id,))
+        session_row = cursor.fetchone()
+        if not session_row:
+            return
+        
+        payload = {"therapy_sessions": self._table_block(cursor, [session_row])}
+        for table_name in child_tables:
+            cursor.execute(f"SELECT * FROM {table_name} WHERE session_id = ?", (session_id,))
+            payload[table_name] = self._table_block(cursor, cursor.fetchall())
+        
+        session = dict(zip(payload["therapy_sessions"]["columns"], session_row))
+        notes = payload.get("session_notes", {"columns": [], "rows": []})
+        risk_index = notes["columns"].index("risk_indicators") if "risk_indicators" in notes["columns"] else None
+        risk_flagged = any(
+            risk_index is not None and row[risk_index] not in (None, "", "[]")
+            for row in notes["rows"]
+        )
+        
+        segment = ArchiveSegment(
+            segment_id=new_id("SEG"),
+            table_name="therapy_sessions",
+            patient_id=session["patient_id"],
+            session_id=session_id,
+            archive_file=self._archive_file_for(session["scheduled_date"]).name,
+            row_count=sum(len(block["rows"]) for block in payload.values()),
+            min_timestamp=session["scheduled_date"],
+            max_timestamp=session["last_updated"],
+            summary={
+                "note_count": len(notes["rows"]),
+                "risk_flagged": risk_flagged
+            }
+        )
+        
+        # The cold copy is durable before anything is removed from the hot set
+        result.compressed_bytes += self._write_segment(segment, payload)
+        
+        cursor.execute("""
+            INSERT OR REPLACE INTO archived_sessions (
+                session_id, patient_id, session_type, session_number, scheduled_date,
+                therapy_modality, treatment_phase, status, note_count, risk_flagged,
+                segment_id, archived_date
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, (
+            session_id,
+            session["patient_id"],
+            session["session_type"],
+            session["session_number"],
+            session["scheduled_date"],
+            session["therapy_modality"],
+            session["treatment_phase"],
+            session["status"],
+            len(notes["rows"]),
+            risk_flagged,
+            segment.segment_id,
+            segment.archived_date.isoformat()
+        ))
+        self._insert_catalog_entry(cursor, segment)
+        
+        for table_name in payload:
+            cursor.execute(f"DELETE FROM {table_name} WHERE session_id = ?", (session_id,))
+        
+        conn.commit()
+        
+        result.sessions_archived += 1
+        result.segments_written += 1
+        result.rows_archived["therapy_sessions"] = result.rows_archived.get("therapy_sessions", 0) + segment.row_count
+    
+    def _archive_time_series(self, table_name: str, cutoff: datetime, result: ArchiveRunResult):
+        """Archive time-series rows older than the cutoff in per-patient monthly segments"""
+        
+        spec = TIME_SERIES_TABLES[table_name]
+        ts_column = spec["timestamp_column"]
+        
+        with sqlite3.connect(self.db_path) as conn:
+            if not self._table_exists(conn, table_name):
+                return
+            
+            read_cursor = conn.cursor()
+            read_cursor.execute(f"""
+                SELECT rowid, * FROM {table_name}
+                WHERE {ts_column} < ?
+                ORDER BY patient_id, {ts_column}
+            """, (cutoff.isoformat(),))
+            
+            columns = [description[0] for description in read_cursor.description][1:]
+            patient_index = columns.index("patient_id")
+            ts_index = columns.index(ts_column)
+            group_index = columns.index(spec["group_column"])
+            value_index = columns.index(spec["value_column"])
+            
+            # Materialize the candidate rows once; deletes below would invalidate the read cursor
+            candidate_rows = read_cursor.fetchall()
+            write_cursor = conn.cursor()
+            
+            def segment_key(row):
+                return row[1 + patient_index], row[1 + ts_index][:7]
+            
+            for (patient_id, month), group in groupby(candidate_rows, key=segment_key):
+                group = list(group)
+                rowids = [row[0] for row in group]
+                rows = [list(row[1:]) for row in group]
+                
+                segment = ArchiveSegment(
+                    segment_id=new_id("SEG"),
+                    table_name=table_name,
+                    patient_id=patient_id,
+                    archive_file=self._archive_file_for(month).name,
+                    row_count=len(rows),
+                    min_timestamp=rows[0][ts_index],
+                    max_timestamp=rows[-1][ts_index],
+                    summary=self._summarize_rows(rows, group_index, value_index)
+                )
+                
+                result.compressed_bytes += self._write_segment(
+                    segment, {table_name: {"columns": columns, "rows": rows}}
+                )
+                self._insert_catalog_entry(write_cursor, segment)
+                write_cursor.executemany(
+                    f"DELETE FROM {table_name} WHERE rowid = ?",
+                    [(rowid,) for rowid in rowids]
+                )
+                conn.commit()
+                
+                result.segments_written += 1
+                result.rows_archived[table_name] = result.rows_archived.get(table_name, 0) + len(rows)
+    
+    def _summarize_rows(self, rows: List[List[Any]], group_index: int, value_index: int) -> Dict[str, Any]:
+        """Per-group count, mean, min and max retained in the hot catalog"""
+        
+        summary = {}
+        for row in rows:
+            key = row[group_index]
+            value = row[value_index]
+            if value is None:
+                continue
+            stats = summary.setdefault(key, {"count": 0, "total": 0.0, "min": value, "max": value})
+            stats["count"] += 1
+            stats["total"] += value
+            stats["min"] = min(stats["min"], value)
+            stats["max"] = max(stats["max"], value)
+        
+        for stats in summary.values():
+            stats["mean"] = round(stats.pop("total") / stats["count"], 4)
+        
+        return summary
+    
+    # ========================================================================
+    # COLD STORAGE I/O
+    # ========================================================================
+    
+    def _archive_file_for(self, timestamp: str) -> Path:
+        """Archive databases are partitioned by calendar year"""
+        return self.archive_dir / f"archive_{timestamp[:4]}.db"
+    
+    def _connect_archive(self, archive_file: Path) -> sqlite3.Connection:
+        """Open an archive database, creating its schema on first use"""
+        
+        self.archive_dir.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(archive_file)
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS archive_segments (
+                segment_id TEXT PRIMARY KEY,
+                table_name TEXT NOT NULL,
+                payload BLOB NOT NULL,
+                checksum TEXT NOT NULL,
+                created_date TEXT NOT NULL
+            )
+        """)
+        return conn
+    
+    def _write_segment(self, segment: ArchiveSegment, payload: Dict[str, Dict[str, Any]]) -> int:
+        """Compress and persist a segment payload, returning its compressed size"""
+        
+        blob = zlib.compress(json.dumps(payload, default=str).encode("utf-8"), self.compression_level)
+        
+        with self._connect_archive(self.archive_dir / segment.archive_file) as archive_conn:
+            archive_conn.execute("""
+                INSERT OR REPLACE INTO archive_segments (
+                    segment_id, table_name, payload, checksum, created_date
+                ) VALUES (?, ?, ?, ?, ?)
+            """, (
+                segment.segment_id,
+                segment.table_name,
+                blob,
+                hashlib.sha256(blob).hexdigest(),
+                datetime.now().isoformat()
+            ))
+            archive_conn.commit()
+        
+        return len(blob)
+    
+    def _read_segment(self, archive_file: str, segment_id: str) -> Dict[str, Dict[str, Any]]:
+        """Load and decompress a segment payload"""
+        
+        path = self.archive_dir / archive_file
+        if not path.exists():
+            raise FileNotFoundError(f"Archive file missing: {path}")
+        
+        with sqlite3.connect(path) as archive_conn:
+            row = archive_conn.execute(
+                "SELECT payload, checksum FROM archive_segments WHERE segment_id = ?",
+                (segment_id,)
+            ).fetchone()
+        
+        if not row:
+            raise KeyError(f"Archive segment not found: {segment_id}")
+        
+        blob, checksum = row
+        if hashlib.sha256(blob).hexdigest() != checksum:
+            raise ValueError(f"Checksum mismatch for archive segment {segment_id}")
+        
+        return json.loads(zlib.decompress(blob).decode("utf-8"))
+    
+    def _insert_catalog_entry(self, cursor: sqlite3.Cursor, segment: ArchiveSegment):
+        """Record a segment in the hot catalog"""
+        
+        cursor.execute("""
+            INSERT OR REPLACE INTO archive_catalog (
+                segment_id, table_name, patient_id, session_id, archive_file,
+                row_count, min_timestamp, max_timestamp, summary, archived_date
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, (
+            segment.segment_id,
+            segment.table_name,
+            segment.patient_id,
+            segment.session_id,
+            segment.archive_file,
+            segment.row_count,
+            segment.min_timestamp,
+            segment.max_timestamp,
+            json.dumps(segment.summary),
+            segment.archived_date.isoformat()
+        ))
+    
+    # ========================================================================
+    # TRANSPARENT READS
+    # ========================================================================
+    
+    def get_archived_session_rows(self, session_id: str) -> Optional[Dict[str, List[Tuple]]]:
+        """Rows for an archived session keyed by table, in each table's column order"""
+        
+        with sqlite3.connect(self.db_path) as conn:
+            row = conn.execute("""
+                SELECT archive_file, segment_id FROM archive_catalog
+                WHERE table_name = 'therapy_sessions' AND session_id = ?
+            """, (session_id,)).fetchone()
+        
+        if not row:
+            return None
+        
+        try:
+            payload = self._read_segment(row[0], row[1])
+        except Exception as e:
+            self.logger.error(f"Failed to read archived session {session_id}: {e}")
+            return None
+        
+        return {table: [tuple(r) for r in block["rows"]] for table, block in payload.items()}
+    
+    def get_archived_sessions(self, patient_id: str) -> List[Dict[str, Any]]:
+        """Summary rows for a patient's archived sessions, newest first"""
+        
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT session_id, session_type, session_number, scheduled_date,
+                       therapy_modality, treatment_phase, status, note_count,
+                       risk_flagged, archived_date
+                FROM archived_sessions WHERE patient_id = ?
+                ORDER BY session_number DESC
+            """, (patient_id,))
+            
+            return [
+                {
+                    'session_id': row[0],
+                    'session_type': row[1],
+                    'session_number': row[2],
+                    'scheduled_date': row[3],
+                    'therapy_modality': row[4],
+                    'treatment_phase': row[5],
+                    'status': row[6],
+                    'note_count': row[7],
+                    'risk_flagged': bool(row[8]),
+                    'archived_date': row[9]
+                }
+                for row in cursor.fetchall()
+            ]
+    
+    def has_archived_data(self, table_name: str, patient_id: str,
+                          start: Optional[datetime] = None) -> bool:
+        """Cheap catalog probe used by readers before touching the cold tier"""
+        
+        with sqlite3.connect(self.db_path) as conn:
+            row = conn.execute("""
+                SELECT 1 FROM archive_catalog
+                WHERE table_name = ? AND patient_id = ? AND max_timestamp >= ?
+                LIMIT 1
+            """, (table_name, patient_id, start.isoformat() if start else "")).fetchone()
+        
+        return row is not None
+    
+    def iter_archived_rows(self, table_name: str, patient_id: str,
+                           start: Optional[datetime] = None,
+                           end: Optional[datetime] = None) -> Iterator[Tuple]:
+        """Yield archived rows for a patient in timestamp order, filtered to [start, end]"""
+        
+        spec = TIME_SERIES_TABLES[table_name]
+        start_str = start.isoformat() if start else ""
+        end_str = end.isoformat() if end else None
+        
+        with sqlite3.connect(self.db_path) as conn:
+            query = """
+                SELECT archive_file, segment_id FROM archive_catalog
+                WHERE table_name = ? AND patient_id = ? AND max_timestamp >= ?
+            """
+            params = [table_name, patient_id, start_str]
+            if end_str:
+                query += " AND min_timestamp <= ?"
+                params.append(end_str)
+            query += " ORDER BY min_timestamp"
+            segments = conn.execute(query, params).fetchall()
+        
+        for archive_file, segment_id in segments:
+            try:
+                block = self._read_segment(archive_file, segment_id)[table_name]
+            except Exception as e:
+                self.logger.error(f"Failed to read archive segment {segment_id}: {e}")
+                continue
+            
+            ts_index = block["columns"].index(spec["timestamp_column"])
+            for row in block["rows"]:
+                if row[ts_index] < start_str:
+                    continue
+                if end_str and row[ts_index] > end_str:
+                    continue
+                yield tuple(row)
+    
+    def get_archive_summary(self, patient_id: str) -> Dict[str, Any]:
+        """Hot-set summary of everything archived for a patient"""
+        
+        summary = {
+            'archived_sessions': self.get_archived_sessions(patient_id),
+            'archived_series': {}
+        }
+        
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT table_name, row_count, min_timestamp, max_timestamp, summary
+                FROM archive_catalog
+                WHERE patient_id = ? AND table_name != 'therapy_sessions'
+                ORDER BY table_name, min_timestamp
+            """, (patient_id,))
+            
+            for table_name, row_count, min_ts, max_ts, segment_summary in cursor.fetchall():
+                series = summary['archived_series'].setdefault(table_name, {
+                    'row_count': 0,
+                    'first_timestamp': min_ts,
+                    'last_timestamp': max_ts,
+                    'segments': []
+                })
+                series['row_count'] += row_count
+                series['last_timestamp'] = max(series['last_timestamp'], max_ts)
+                series['segments'].append({
+                    'period_start': min_ts,
+                    'period_end': max_ts,
+                    'row_count': row_count,
+                    'summary': json.loads(segment_summary) if segment_summary else {}
+                })
+        
+        return summary
+    
+    # ========================================================================
+    # MAINTENANCE
+    # ========================================================================
+    
+    def restore_session(self, session_id: str) -> bool:
+        """Move an archived session back into the hot set"""
+        
+        with sqlite3.connect(self.db_path) as conn:
+            row = conn.execute("""
+                SELECT archive_file, segment_id FROM archive_catalog
+                WHERE table_name = 'therapy_sessions' AND session_id = ?
+            """, (session_id,)).fetchone()
+        
+        if not row:
+            return False
+        
+        try:
+            payload = self._read_segment(row[0], row[1])
+            
+            with sqlite3.connect(self.db_path) as conn:
+                cursor = conn.cursor()
+                for table_name, block in payload.items():
+                    if not block["rows"]:
+                        continue
+                    column_list = ", ".join(block["columns"])
+                    placeholders = ", ".join("?" for _ in block["columns"])
+                    cursor.executemany(
+                        f"INSERT OR REPLACE INTO {table_name} ({column_list}) VALUES ({placeholders})",
+                        block["rows"]
+                    )
+                cursor.execute("DELETE FROM archived_sessions WHERE session_id = ?", (session_id,))
+                cursor.execute("DELETE FROM archive_catalog WHERE segment_id = ?", (row[1],))
+                conn.commit()
+            
+            self._delete_segment(row[0], row[1])
+            self.logger.info(f"Restored archived session: {session_id}")
+            return True
+        
+        except Exception as e:
+            self.logger.error(f"Failed to restore archived session {session_id}: {e}")
+            return False
+    
+    def purge_patient(self, patient_id: str) -> int:
+        """Permanently remove all archived data for a patient"""
+        
+        with sqlite3.connect(self.db_path) as conn:
+            segments = conn.execute(
+                "SELECT archive_file, segment_id FROM archive_catalog WHERE patient_id = ?",
+                (patient_id,)
+            ).fetchall()
+        
+        for archive_file, segment_id in segments:
+            self._delete_segment(archive_file, segment_id)
+        
+        with sqlite3.connect(self.db_path) as conn:
+            conn.execute("DELETE FROM archived_sessions WHERE patient_id = ?", (patient_id,))
+            conn.execute("DELETE FROM archive_catalog WHERE patient_id = ?", (patient_id,))
+            conn.commit()
+        
+        self.logger.info(f"Purged {len(segments)} archive segments for patient {patient_id}")
+        return len(segments)
+    
+    def _delete_segment(self, archive_file: str, segment_id: str):
+        """Remove a segment from its archive database"""
+        
+        path = self.archive_dir / archive_file
+        if not path.exists():
+            return
+        
+        with sqlite3.connect(path) as archive_conn:
+            archive_conn.execute("DELETE FROM archive_segments WHERE segment_id = ?", (segment_id,))
+            archive_conn.commit()
+    
+    def get_archive_statistics(self) -> Dict[str, Any]:
+        """Catalog-level statistics for monitoring the cold tier"""
+        
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT table_name, COUNT(*), SUM(row_count), MIN(min_timestamp), MAX(max_timestamp)
+                FROM archive_catalog GROUP BY table_name
+            """)
+            tables = {
+                row[0]: {
+                    'segments': row[1],
+                    'rows': row[2] or 0,
+                    'oldest': row[3],
+                    'newest': row[4]
+                }
+                for row in cursor.fetchall()
+            }
+        
+        archive_files = sorted(self.archive_dir.glob("archive_*.db")) if self.archive_dir.exists() else []
+        
+        return {
+            'tables': tables,
+            'archive_files': [path.name for path in archive_files],
+            'archive_size_bytes': sum(path.stat().st_size for path in archive_files),
+            'horizon_days': self.horizon_days
+        }
+    
+    # ========================================================================
+    # HELPERS
+    # ========================================================================
+    
+    def _table_exists(self, conn: sqlite3.Connection, table_name: str) -> bool:
+        """Check whether a table exists in the hot database"""
+        row = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (table_name,)
+        ).fetchone()
+        return row is not None
+    
+    def _table_block(self, cursor: sqlite3.Cursor, rows: List[Tuple]) -> Dict[str, Any]:
+        """Column names of the last query plus its rows"""
+        return {
+            "columns": [description[0] for description in cursor.description],
+            "rows": [list(row) for row in rows]
+        }
+
+
+# Archive settings applied to managers built by get_archive_manager; defaults until configured
+_archive_config: Optional[Any] = None
+_managers: Dict[str, ArchiveManager] = {}
+_managers_lock = threading.Lock()
+
+
+def configure_archiving(database_config: Any):
+    """Apply a DatabaseConfig's archive settings to every manager built from now on"""
+    
+    global _archive_config
+    with _managers_lock:
+        _archive_config = database_config
+        _managers.clear()
+
+
+def get_archive_manager(db_path: str = "data/therapy_system.db") -> ArchiveManager:
+    """Process-wide archive manager for a database file, built from the configured settings"""
+    
+    key = str(Path(db_path).resolve())
+    with _managers_lock:
+        manager = _managers.get(key)
+        if manager is None:
+            if _archive_config is not None:
+                manager = ArchiveManager.from_config(_archive_config, db_path=db_path)
+            else:
+                manager = ArchiveManager(db_path)
+            _managers[key] = manager
+        return manager
+
+
+# Example usage and testing
+if __name__ == "__main__":
+    from config.settings import DatabaseConfig
+    
+    print("=== ARCHIVE MANAGER DEMONSTRATION ===\n")
+    
+    configure_archiving(DatabaseConfig())
+    archive_manager = get_archive_manager()
+    
+    print("Running scheduled archival pass...")
+    run = archive_manager.run_scheduled_archival()
+    print(f"Skipped: {run.skipped_reason}" if run.skipped_reason else "Pass completed")
+    print(f"Cutoff: {run.cutoff.isoformat()}")
+    print(f"Sessions archived: {run.sessions_archived}")
+    print(f"Rows archived: {run.rows_archived}")
+    print(f"Compressed bytes written: {run.compressed_bytes}")
+    print(f"Duration: {run.duration_seconds:.2f}s")
+    
+    print("\n=== ARCHIVE STATISTICS ===")
+    stats = archive_manager.get_archive_statistics()
+    for table_name, table_stats in stats['tables'].items():
+        print(f"  {table_name}: {table_stats['rows']} rows in {table_stats['segments']} segments")
+    print(f"  Archive files: {stats['archive_files']}")
+    
+    print("\n" + "="*60)
+    print("Archive manager demonstration complete!")
@@ -0,0 +1,842 @@
+"""
+Backup Manager Module
+Online backup and restore for the AI therapy system database
+Reads the live database inside one read transaction so active sessions are never stalled,
+keeps compressed full and page-level incremental snapshots, and prunes by retention policy
+"""
+
+import sqlite3
+import gzip
+import json
+import shutil
+import hashlib
+import logging
+import tempfile
+import time
+from enum import Enum
+from typing import Dict, List, Optional, Any, Tuple
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from utilities.identifiers import new_id
+
+
+# Bytes of page-hash digest kept per database page in snapshot manifests
+PAGE_DIGEST_SIZE = 8
+
+# Bytes of page number stored ahead of each page in an incremental delta
+DELTA_INDEX_SIZE = 4
+
+# Tries at pinning a read snapshot that matches the main database file before the
+# snapshot is copied out through the backup API instead
+SNAPSHOT_ATTEMPTS = 5
+
+
+class BackupType(Enum):
+    """Kinds of snapshot kept in the backup catalog"""
+    FULL = "full"
+    INCREMENTAL = "incremental"
+
+
+@dataclass
+class BackupRecord:
+    """Catalog entry for one stored snapshot"""
+    backup_id: str
+    backup_type: BackupType
+    file_path: str
+    manifest_path: str
+    page_size: int
+    page_count: int
+    changed_pages: int
+    original_bytes: int
+    compressed_bytes: int
+    checksum: str
+    verified: bool
+    duration_seconds: float
+    parent_id: Optional[str] = None
+    base_id: Optional[str] = None
+    created_date: datetime = field(default_factory=datetime.now)
+
+
+@dataclass
+class BackupResult:
+    """Outcome of a backup run"""
+    success: bool
+    record: Optional[BackupRecord] = None
+    skipped_reason: Optional[str] = None
+    copy_seconds: float = 0.0
+    verify_seconds: float = 0.0
+    compress_seconds: float = 0.0
+    pruned_backups: List[str] = field(default_factory=list)
+    error: Optional[str] = None
+
+
+@dataclass
+class RestoreResult:
+    """Outcome and timing breakdown of a restore"""
+    success: bool
+    backup_id: str
+    target_path: str
+    chain_length: int = 0
+    pages_applied: int = 0
+    decompress_seconds: float = 0.0
+    apply_seconds: float = 0.0
+    verify_seconds: float = 0.0
+    copy_seconds: float = 0.0
+    total_seconds: float = 0.0
+    error: Optional[str] = None
+
+
+class BackupManager:
+    """Online backups of the therapy database with incremental snapshots"""
+    
+    def __init__(self, db_path: str = "data/therapy_system.db",
+                 backup_dir: Optional[str] = None,
+                 enabled: bool = True,
+                 frequency_hours: int = 24,
+                 retention_days: int = 30,
+                 compression_level: int = 6,
+                 max_chain_length: int = 7):
+        self.db_path = db_path
+        self.backup_dir = Path(backup_dir) if backup_dir else Path(db_path).parent / "backups"
+        self.catalog_path = self.backup_dir / "backup_catalog.db"
+        self.enabled = enabled
+        self.frequency_hours = frequency_hours
+        self.retention_days = retention_days
+        self.compression_level = compression_level
+        self.max_chain_length = max_chain_length
+        self.logger = logging.getLogger(__name__)
+        
+        self.backup_dir.mkdir(parents=True, exist_ok=True)
+        self._create_tables()
+    
+    @classmethod
+    def from_config(cls, database_config: Any, backup_location: Optional[str] = None) -> "BackupManager":
+        """Build a manager from a DatabaseConfig (and optional SystemConfig.backup_location)"""
+        return cls(
+            db_path=database_config.db_path,
+            backup_dir=backup_location,
+            enabled=database_config.backup_enabled,
+            frequency_hours=database_config.backup_frequency_hours,
+            retention_days=database_config.backup_retention_days
+        )
+    
+    def _create_tables(self):
+        """Create backup catalog and restore history tables
+        
+        The catalog lives beside the backups rather than in the live database,
+        so restoring a snapshot never rewinds the record of which snapshots exist.
+        """
+        
+        with sqlite3.connect(self.catalog_path) as conn:
+            cursor = conn.cursor()
+            
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS backups (
+                    backup_id TEXT PRIMARY KEY,
+                    backup_type TEXT NOT NULL,
+                    parent_id TEXT,
+                    base_id TEXT,
+                    file_path TEXT NOT NULL,
+                    manifest_path TEXT NOT NULL,
+                    page_size INTEGER NOT NULL,
+                    page_count INTEGER NOT NULL,
+                    changed_pages INTEGER NOT NULL,
+                    original_bytes INTEGER NOT NULL,
+                    compressed_bytes INTEGER NOT NULL,
+                    checksum TEXT NOT NULL,
+                    verified BOOLEAN DEFAULT 0,
+                    duration_seconds REAL,
+                    created_date TEXT NOT NULL
+                )
+            """)
+            
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS restore_history (
+                    restore_id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    backup_id TEXT NOT NULL,
+                    target_path TEXT NOT NULL,
+                    success BOOLEAN NOT NULL,
+                    chain_length INTEGER,
+                    pages_applied INTEGER,
+                    decompress_seconds REAL,
+                    apply_seconds REAL,
+                    verify_seconds REAL,
+                    copy_seconds REAL,
+                    total_seconds REAL,
+                    error TEXT,
+                    restored_date TEXT NOT NULL
+                )
+            """)
+            
+            cursor.execute("""
+                CREATE INDEX IF NOT EXISTS idx_backups_created
+                ON backups (created_date)
+            """)
+            
+            conn.commit()
+    
+    # ========================================================================
+    # BACKUP
+    # ========================================================================
+    
+    def is_backup_due(self) -> bool:
+        """Check whether the configured backup frequency has elapsed"""
+        
+        if not self.enabled:
+            return False
+        
+        latest = self._get_latest_record()
+        if not latest:
+            return True
+        return datetime.now() - latest.created_date >= timedelta(hours=self.frequency_hours)
+    
+    def run_scheduled_backup(self) -> BackupResult:
+        """Take a backup if one is due, choosing full or incremental, then prune"""
+        
+        if not self.enabled:
+            return BackupResult(success=True, skipped_reason="backups disabled")
+        if not self.is_backup_due():
+            return BackupResult(success=True, skipped_reason="backup not due")
+        
+        chain = self._get_current_chain()
+        if not chain or len(chain) >= self.max_chain_length:
+            result = self.create_full_backup()
+        else:
+            result = self.create_incremental_backup()
+        
+        if result.success:
+            result.pruned_backups = self.prune_backups()
+        return result
+    
+    def create_full_backup(self) -> BackupResult:
+        """Take a compressed full snapshot of the live database"""
+        return self._create_backup(BackupType.FULL)
+    
+    def create_incremental_backup(self) -> BackupResult:
+        """Store only the pages that changed since the previous snapshot
+        
+        Falls back to a full backup when there is no chain to extend or the page
+        size of the database has changed.
+        """
+        return self._create_backup(BackupType.INCREMENTAL)
+    
+    def _create_backup(self, backup_type: BackupType) -> BackupResult:
+        """Snapshot, verify and store the database"""
+        
+        started = time.perf_counter()
+        result = BackupResult(success=False)
+        
+        try:
+            with tempfile.TemporaryDirectory(dir=self.backup_dir) as work_dir:
+                phase_started = time.perf_counter()
+                snapshot, snapshot_path = self._open_snapshot(Path(work_dir))
+                result.copy_seconds = time.perf_counter() - phase_started
+                
+                try:
+                    phase_started = time.perf_counter()
+                    verified = self._integrity_ok(snapshot)
+                    result.verify_seconds = time.perf_counter() - phase_started
+                    if not verified:
+                        result.error = "integrity_check failed on snapshot"
+                        self.logger.error(f"Backup aborted: {result.error}")
+                        return result
+                    
+                    page_size = snapshot.execute("PRAGMA page_size").fetchone()[0]
+                    page_count = snapshot.execute("PRAGMA page_count").fetchone()[0]
+                    parent = self._get_latest_record()
+                    
+                    if backup_type == BackupType.INCREMENTAL and (not parent or parent.page_size != page_size):
+                        backup_type = BackupType.FULL
+                    
+                    backup_id = new_id("BKP")
+                    manifest_path = self.backup_dir / f"{backup_id}.pages.gz"
+                    
+                    phase_started = time.perf_counter()
+                    if backup_type == BackupType.FULL:
+                        file_path = self.backup_dir / f"{backup_id}.full.db.gz"
+                        page_hashes = self._write_full(snapshot_path, file_path, page_size, page_count)
+                        changed = list(range(page_count))
+                        parent_id, base_id = None, backup_id
+                    else:
+                        file_path = self.backup_dir / f"{backup_id}.delta.gz"
+                        parent_hashes = self._read_manifest(Path(parent.manifest_path))
+                        page_hashes, changed = self._write_delta(
+                            snapshot_path, file_path, page_size, page_count, parent_hashes
+                        )
+                        if not changed and page_count == len(parent_hashes):
+                            file_path.unlink()
+                            result.success = True
+                            result.skipped_reason = "no pages changed since last snapshot"
+                            return result
+                        parent_id, base_id = parent.backup_id, parent.base_id
+                    
+                    self._write_manifest(manifest_path, page_hashes)
+                    result.compress_seconds = time.perf_counter() - phase_started
+                finally:
+                    # Ends the read transaction, letting checkpoints past the snapshot again
+                    snapshot.close()
+            
+            record = BackupRecord(
+                backup_id=backup_id,
+                backup_type=backup_type,
+                file_path=str(file_path),
+                manifest_path=str(manifest_path),
+                page_size=page_size,
+                page_count=page_count,
+                changed_pages=len(changed),
+                original_bytes=page_size * page_count,
+                compressed_bytes=file_path.stat().st_size,
+                checksum=self._file_checksum(file_path),
+                verified=True,
+                duration_seconds=time.perf_counter() - started,
+                parent_id=parent_id,
+                base_id=base_id
+            )
+            self._save_record(record)
+            
+            result.success = True
+            result.record = record
+            self.logger.info(
+                f"{backup_type.value.title()} backup {backup_id} stored: "
+                f"{record.changed_pages}/{record.page_count} pages, "
+                f"{record.compressed_bytes} bytes in {record.duration_seconds:.2f}s"
+            )
+            return result
+        
+        except Exception as e:
+            self.logger.error(f"Backup failed: {e}")
+            result.error = str(e)
+            return result
+    
+    def _open_snapshot(self, work_dir: Path) -> Tuple[sqlite3.Connection, Path]:
+        """Open a read transaction on the live database and the file its pages can be read from
+        
+        A WAL reader's snapshot matches the main file once every frame up to it is
+        checkpointed, and keeps matching while the reader is open because checkpoints
+        never backfill past an active reader. So the live file is read in place when a
+        checkpoint run after the read began finds nothing left to backfill; in
+        rollback-journal mode the shared lock alone keeps writers out. Commits landing
+        in between only cost a retry. If writers keep the WAL ahead every time, the
+        snapshot is copied out in a single backup API step instead, which also holds
+        one read transaction for the whole copy and so cannot be restarted by them.
+        """
+        
+        source = sqlite3.connect(self.db_path, isolation_level=None)
+        try:
+            wal_mode = source.execute("PRAGMA journal_mode").fetchone()[0].lower() == "wal"
+            for _ in range(SNAPSHOT_ATTEMPTS):
+                if wal_mode:
+                    source.execute("PRAGMA wal_checkpoint(PASSIVE)")
+                source.execute("BEGIN")
+                source.execute("SELECT COUNT(*) FROM sqlite_master").fetchone()
+                if not wal_mode or self._wal_backfilled():
+                    return source, Path(self.db_path)
+                source.execute("ROLLBACK")
+        except BaseException:
+            source.close()
+            raise
+        source.close()
+        
+        snapshot_path = work_dir / "snapshot.db"
+        self._online_copy(self.db_path, str(snapshot_path))
+        return sqlite3.connect(snapshot_path), snapshot_path
+    
+    def _wal_backfilled(self) -> bool:
+        """Whether a passive checkpoint leaves no WAL frame outside the main database file"""
+        
+        checker = sqlite3.connect(self.db_path)
+        try:
+            _, wal_frames, checkpointed = checker.execute("PRAGMA wal_checkpoint(PASSIVE)").fetchone()
+        finally:
+            checker.close()
+        return wal_frames == checkpointed
+    
+    def _online_copy(self, source_path: str, target_path: str, standalone: bool = True):
+        """Copy a database with the online backup API in a single step
+        
+        One step holds one read transaction on the source for the whole copy. A
+        stepped copy restarts whenever another connection commits to the source,
+        so under a steady writer it would never finish.
+        """
+        
+        source = sqlite3.connect(source_path)
+        target = sqlite3.connect(target_path)
+        try:
+            source.backup(target)
+            if standalone:
+                # Snapshots are standalone files, never opened alongside a -wal sidecar
+                target.execute("PRAGMA journal_mode=DELETE")
+        finally:
+            target.close()
+            source.close()
+    
+    def _verify_database(self, path: str) -> bool:
+        """Run PRAGMA integrity_check against a database file"""
+        
+        try:
+            conn = sqlite3.connect(path)
+            try:
+                return self._integrity_ok(conn)
+            finally:
+                conn.close()
+        except sqlite3.DatabaseError as e:
+            self.logger.error(f"Integrity check failed for {path}: {e}")
+            return False
+    
+    def _integrity_ok(self, conn: sqlite3.Connection) -> bool:
+        """Run PRAGMA integrity_check on an open connection"""
+        
+        try:
+            rows = conn.execute("PRAGMA integrity_check").fetchall()
+            return len(rows) == 1 and rows[0][0] == "ok"
+        except sqlite3.DatabaseError as e:
+            self.logger.error(f"Integrity check failed: {e}")
+            return False
+    
+    # ========================================================================
+    # RESTORE
+    # ========================================================================
+    
+    def restore_backup(self, backup_id: Optional[str] = None,
+                       target_path: Optional[str] = None) -> RestoreResult:
+        """Rebuild a snapshot and copy it into the target database
+        
+        Defaults to the latest backup and the live database. The rebuilt image is
+        verified before anything is written, and the final copy goes through the
+        online backup API so connections already open on the target stay valid.
+        """
+        
+        started = time.perf_counter()
+        target_path = target_path or self.db_path
+        record = self._get_record(backup_id) if backup_id else self._get_latest_record()
+        result = RestoreResult(
+            success=False,
+            backup_id=record.backup_id if record else (backup_id or ""),
+            target_path=target_path
+        )
+        
+        if not record:
+            result.error = "backup not found"
+            self.logger.error(f"Restore failed: {result.error}")
+            return result
+        
+        try:
+            chain = self._get_chain(record)
+            result.chain_length = len(chain)
+            
+            with tempfile.TemporaryDirectory(dir=self.backup_dir) as work_dir:
+                image_path = Path(work_dir) / "restore.db"
+                
+                phase_started = time.perf_counter()
+                for link in chain:
+                    if self._file_checksum(Path(link.file_path)) != link.checksum:
+                        raise ValueError(f"checksum mismatch for backup {link.backup_id}")
+                self._decompress_file(Path(chain[0].file_path), image_path)
+                result.decompress_seconds = time.perf_counter() - phase_started
+                
+                phase_started = time.perf_counter()
+                for link in chain[1:]:
+                    result.pages_applied += self._apply_delta(image_path, Path(link.file_path))
+                result.apply_seconds = time.perf_counter() - phase_started
+                
+                phase_started = time.perf_counter()
+                self._make_standalone(image_path)
+                if not self._verify_database(str(image_path)):
+                    raise ValueError("integrity_check failed on rebuilt image")
+                result.verify_seconds = time.perf_counter() - phase_started
+                
+                phase_started = time.perf_counter()
+                Path(target_path).parent.mkdir(parents=True, exist_ok=True)
+                self._online_copy(str(image_path), target_path, standalone=False)
+                result.copy_seconds = time.perf_counter() - phase_started
+            
+            result.success = True
+        
+        except Exception as e:
+            self.logger.error(f"Restore of {record.backup_id} failed: {e}")
+            result.error = str(e)
+        
+        result.total_seconds = time.perf_counter() - started
+        self._save_restore_result(result)
+        
+        if result.success:
+            self.logger.info(
+                f"Restored {record.backup_id} to {target_path} "
+                f"({result.chain_length} snapshots, {result.total_seconds:.2f}s)"
+            )
+        return result
+    
+    def verify_backup(self, backup_id: str) -> bool:
+        """Rebuild a snapshot into a scratch file and integrity-check it"""
+        
+        with tempfile.TemporaryDirectory(dir=self.backup_dir) as work_dir:
+            result = self.restore_backup(backup_id, str(Path(work_dir) / "verify.db"))
+        return result.success
+    
+    # ========================================================================
+    # RETENTION
+    # ========================================================================
+    
+    def prune_backups(self, retention_days: Optional[int] = None) -> List[str]:
+        """Delete backup chains whose newest snapshot is past retention
+        
+        Chains are removed as a unit because incrementals are useless without
+        their base, and the most recent chain is always kept.
+        """
+        
+        retention_days = self.retention_days if retention_days is None else retention_days
+        cutoff = datetime.now() - timedelta(days=retention_days)
+        pruned = []
+        
+        try:
+            records = self._get_all_records()
+            if not records:
+                return pruned
+            
+            chains: Dict[str, List[BackupRecord]] = {}
+            for record in records:
+                chains.setdefault(record.base_id, []).append(record)
+            current_base = records[-1].base_id
+            
+            for base_id, chain in chains.items():
+                if base_id == current_base:
+                    continue
+                if max(record.created_date for record in chain) >= cutoff:
+                    continue
+                
+                for record in chain:
+                    Path(record.file_path).unlink(missing_ok=True)
+                    Path(record.manifest_path).unlink(missing_ok=True)
+                    pruned.append(record.backup_id)
+                
+                with sqlite3.connect(self.catalog_path) as conn:
+                    conn.execute("DELETE FROM backups WHERE base_id = ?", (base_id,))
+                    conn.commit()
+            
+            if pruned:
+                self.logger.info(f"Pruned {len(pruned)} backups older than {retention_days} days")
+            return pruned
+        
+        except Exception as e:
+            self.logger.error(f"Error pruning backups: {e}")
+            return pruned
+    
+    # ========================================================================
+    # REPORTING
+    # ========================================================================
+    
+    def list_backups(self) -> List[BackupRecord]:
+        """All catalogued backups, oldest first"""
+        
+        try:
+            return self._get_all_records()
+        except Exception as e:
+            self.logger.error(f"Error listing backups: {e}")
+            return []
+    
+    def get_backup_statistics(self) -> Dict[str, Any]:
+        """Storage, backup and restore timing statistics"""
+        
+        try:
+            records = self._get_all_records()
+            
+            with sqlite3.connect(self.catalog_path) as conn:
+                cursor = conn.cursor()
+                cursor.execute("""
+                    SELECT COUNT(*), AVG(total_seconds), MAX(total_seconds),
+                           AVG(decompress_seconds), AVG(apply_seconds),
+                           AVG(verify_seconds), AVG(copy_seconds)
+                    FROM restore_history WHERE success = 1
+                """)
+                restore_row = cursor.fetchone()
+                cursor.execute("SELECT COUNT(*) FROM restore_history WHERE success = 0")
+                failed_restores = cursor.fetchone()[0]
+            
+            full = [r for r in records if r.backup_type == BackupType.FULL]
+            incremental = [r for r in records if r.backup_type == BackupType.INCREMENTAL]
+            
+            return {
+                'total_backups': len(records),
+                'full_backups': len(full),
+                'incremental_backups': len(incremental),
+                'stored_bytes': sum(r.compressed_bytes for r in records),
+                'latest_backup': records[-1].created_date.isoformat() if records else None,
+                'average_backup_seconds': (
+                    sum(r.duration_seconds for r in records) / len(records) if records else 0.0
+                ),
+                'average_changed_page_ratio': (
+                    sum(r.changed_pages / r.page_count for r in incremental if r.page_count) / len(incremental)
+                    if incremental else 0.0
+                ),
+                'restores': {
+                    'successful': restore_row[0],
+                    'failed': failed_restores,
+                    'average_seconds': restore_row[1] or 0.0,
+                    'max_seconds': restore_row[2] or 0.0,
+                    'average_decompress_seconds': restore_row[3] or 0.0,
+                    'average_apply_seconds': restore_row[4] or 0.0,
+                    'average_verify_seconds': restore_row[5] or 0.0,
+                    'average_copy_seconds': restore_row[6] or 0.0
+                }
+            }
+        
+        except Exception as e:
+            self.logger.error(f"Error getting backup statistics: {e}")
+            return {}
+    
+    # ========================================================================
+    # SNAPSHOT FILES
+    # ========================================================================
+    
+    def _read_pages(self, path: Path, page_size: int, page_count: int):
+        """Yield the first page_count pages of a database file"""
+        
+        with open(path, "rb") as handle:
+            for index in range(page_count):
+                page = handle.read(page_size)
+                if len(page) != page_size:
+                    raise ValueError(f"{path} ended at page {index} of {page_count}")
+                yield page
+    
+    def _page_digest(self, page: bytes) -> bytes:
+        """Manifest digest of one page"""
+        return hashlib.blake2b(page, digest_size=PAGE_DIGEST_SIZE).digest()
+    
+    def _write_full(self, snapshot_path: Path, file_path: Path,
+                    page_size: int, page_count: int) -> List[bytes]:
+        """Compress every page of the snapshot, returning the page digests"""
+        
+        digests = []
+        with gzip.open(file_path, "wb", compresslevel=self.compression_level) as target:
+            for page in self._read_pages(snapshot_path, page_size, page_count):
+                digests.append(self._page_digest(page))
+                target.write(page)
+        return digests
+    
+    def _make_standalone(self, path: Path):
+        """Switch a rebuilt image out of WAL mode so it needs no -wal sidecar"""
+        
+        conn = sqlite3.connect(path)
+        try:
+            conn.execute("PRAGMA journal_mode=DELETE")
+        finally:
+            conn.close()
+    
+    def _write_manifest(self, path: Path, digests: List[bytes]):
+        """Store page digests for the next incremental comparison"""
+        with gzip.open(path, "wb", compresslevel=self.compression_level) as handle:
+            handle.write(b"".join(digests))
+    
+    def _read_manifest(self, path: Path) -> List[bytes]:
+        """Load page digests written by _write_manifest"""
+        with gzip.open(path, "rb") as handle:
+            data = handle.read()
+        return [data[i:i + PAGE_DIGEST_SIZE] for i in range(0, len(data), PAGE_DIGEST_SIZE)]
+    
+    def _write_delta(self, snapshot_path: Path, delta_path: Path, page_size: int,
+                     page_count: int, parent_hashes: List[bytes]) -> Tuple[List[bytes], List[int]]:
+        """Write the pages whose digest differs from the parent manifest
+        
+        The delta is a JSON header line followed by one record per changed page:
+        its page number, then the raw page. Pages are hashed as they are read from
+        the snapshot, so only changed pages are ever written out.
+        """
+        
+        digests = []
+        changed = []
+        header = {"page_size": page_size, "page_count": page_count}
+        with gzip.open(delta_path, "wb", compresslevel=self.compression_level) as target:
+            target.write(json.dumps(header).encode("utf-8") + b"\n")
+            for index, page in enumerate(self._read_pages(snapshot_path, page_size, page_count)):
+                digest = self._page_digest(page)
+                digests.append(digest)
+                if index < len(parent_hashes) and parent_hashes[index] == digest:
+                    continue
+                changed.append(index)
+                target.write(index.to_bytes(DELTA_INDEX_SIZE, "big"))
+                target.write(page)
+        return digests, changed
+    
+    def _apply_delta(self, image_path: Path, delta_path: Path) -> int:
+        """Patch a rebuilt image in place with the pages of one delta"""
+        
+        applied = 0
+        with gzip.open(delta_path, "rb") as source, open(image_path, "r+b") as image:
+            header = json.loads(source.readline().decode("utf-8"))
+            page_size = header["page_size"]
+            while True:
+                index_bytes = source.read(DELTA_INDEX_SIZE)
+                if not index_bytes:
+                    break
+                page = source.read(page_size)
+                if len(index_bytes) != DELTA_INDEX_SIZE or len(page) != page_size:
+                    raise ValueError(f"truncated delta {delta_path}")
+                image.seek(int.from_bytes(index_bytes, "big") * page_size)
+                image.write(page)
+                applied += 1
+            image.truncate(header["page_count"] * page_size)
+        return applied
+    
+    def _decompress_file(self, source_path: Path, target_path: Path):
+        """Inflate a gzip file in streaming fashion"""
+        with gzip.open(source_path, "rb") as source, open(target_path, "wb") as target:
+            shutil.copyfileobj(source, target)
+    
+    def _file_checksum(self, path: Path) -> str:
+        """SHA-256 of a stored backup file"""
+        
+        digest = hashlib.sha256()
+        with open(path, "rb") as handle:
+            for block in iter(lambda: handle.read(1024 * 1024), b""):
+                digest.update(block)
+        return digest.hexdigest()
+    
+    # ========================================================================
+    # CATALOG
+    # ========================================================================
+    
+    def _save_record(self, record: BackupRecord):
+        """Insert a backup into the catalog"""
+        
+        with sqlite3.connect(self.catalog_path) as conn:
+            conn.execute("""
+                INSERT INTO backups (
+                    backup_id, backup_type, parent_id, base_id, file_path, manifest_path,
+                    page_size, page_count, changed_pages, original_bytes, compressed_bytes,
+                    checksum, verified, duration_seconds, created_date
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """, (
+                record.backup_id,
+                record.backup_type.value,
+                record.parent_id,
+                record.base_id,
+                record.file_path,
+                record.manifest_path,
+                record.page_size,
+                record.page_count,
+                record.changed_pages,
+                record.original_bytes,
+                record.compressed_bytes,
+                record.checksum,
+                record.verified,
+                record.duration_seconds,
+                record.created_date.isoformat()
+            ))
+            conn.commit()
+    
+    def _save_restore_result(self, result: RestoreResult):
+        """Record restore timings for reporting"""
+        
+        try:
+            with sqlite3.connect(self.catalog_path) as conn:
+                conn.execute("""
+                    INSERT INTO restore_history (
+                        backup_id, target_path, success, chain_length, pages_applied,
+                        decompress_seconds, apply_seconds, verify_seconds, copy_seconds,
+                        total_seconds, error, restored_date
+                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """, (
+                    result.backup_id, result.target_path, result.success, result.chain_length,
+                    result.pages_applied, result.decompress_seconds, result.apply_seconds,
+                    result.verify_seconds, result.copy_seconds, result.total_seconds,
+                    result.error, datetime.now().isoformat()
+                ))
+                conn.commit()
+        except Exception as e:
+            self.logger.error(f"Error recording restore result: {e}")
+    
+    def _get_record(self, backup_id: str) -> Optional[BackupRecord]:
+        """Fetch one catalog entry"""
+        
+        with sqlite3.connect(self.catalog_path) as conn:
+            row = conn.execute("SELECT * FROM backups WHERE backup_id = ?", (backup_id,)).fetchone()
+        return self._row_to_record(row) if row else None
+    
+    def _get_latest_record(self) -> Optional[BackupRecord]:
+        """Most recent catalog entry"""
+        
+        with sqlite3.connect(self.catalog_path) as conn:
+            row = conn.execute("SELECT * FROM backups ORDER BY created_date DESC, rowid DESC LIMIT 1").fetchone()
+        return self._row_to_record(row) if row else None
+    
+    def _get_all_records(self) -> List[BackupRecord]:
+        """Every catalog entry, oldest first"""
+        
+        with sqlite3.connect(self.catalog_path) as conn:
+            rows = conn.execute("SELECT * FROM backups ORDER BY created_date, rowid").fetchall()
+        return [self._row_to_record(row) for row in rows]
+    
+    def _get_chain(self, record: BackupRecord) -> List[BackupRecord]:
+        """Full base followed by every incremental up to and including record"""
+        
+        chain = [record]
+        while chain[0].parent_id:
+            parent = self._get_record(chain[0].parent_id)
+            if not parent:
+                raise ValueError(f"missing parent backup {chain[0].parent_id}")
+            chain.insert(0, parent)
+        return chain
+    
+    def _get_current_chain(self) -> List[BackupRecord]:
+        """Chain that the next incremental would extend"""
+        
+        latest = self._get_latest_record()
+        return self._get_chain(latest) if latest else []
+    
+    def _row_to_record(self, row: Tuple) -> BackupRecord:
+        """Convert a backups row to a BackupRecord"""
+        return BackupRecord(
+            backup_id=row[0],
+            backup_type=BackupType(row[1]),
+            parent_id=row[2],
+            base_id=row[3],
+            file_path=row[4],
+            manifest_path=row[5],
+            page_size=row[6],
+            page_count=row[7],
+            changed_pages=row[8],
+            original_bytes=row[9],
+            compressed_bytes=row[10],
+            checksum=row[11],
+            verified=bool(row[12]),
+            duration_seconds=row[13] or 0.0,
+            created_date=datetime.fromisoformat(row[14])
+        )
+
+
+# Example usage and testing
+if __name__ == "__main__":
+    print("=== BACKUP MANAGER DEMONSTRATION ===\n")
+    
+    backup_manager = BackupManager()
+    
+    print("Taking full backup...")
+    full = backup_manager.create_full_backup()
+    if full.success and full.record:
+        print(f"Backup {full.record.backup_id}: {full.record.page_count} pages, "
+              f"{full.record.compressed_bytes} bytes compressed")
+        print(f"Copy {full.copy_seconds:.3f}s, verify {full.verify_seconds:.3f}s, "
+              f"compress {full.compress_seconds:.3f}s")
+    
+    print("\nTaking incremental backup...")
+    incremental = backup_manager.create_incremental_backup()
+    if incremental.skipped_reason:
+        print(f"Skipped: {incremental.skipped_reason}")
+    elif incremental.record:
+        print(f"Backup {incremental.record.backup_id}: "
+              f"{incremental.record.changed_pages}/{incremental.record.page_count} pages changed")
+    
+    print("\nVerifying latest backup...")
+    latest = backup_manager.list_backups()[-1]
+    print(f"Verified: {backup_manager.verify_backup(latest.backup_id)}")
+    
+    print("\n=== BACKUP STATISTICS ===")
+    stats = backup_manager.get_backup_statistics()
+    print(f"Backups: {stats['full_backups']} full, {stats['incremental_backups']} incremental")
+    print(f"Stored bytes: {stats['stored_bytes']}")
+    print(f"Average restore: {stats['restores']['average_seconds']:.3f}s")
+    
+    print("\n" + "="*60)
+    print("Backup manager demonstration complete!")
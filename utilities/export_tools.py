@@ -0,0 +1,507 @@
+"""
+Export Tools Module
+Streaming, chunked data export for the AI therapy system
+Reads every module's tables with keyset-paginated queries and writes NDJSON or CSV
+incrementally, so patient and caseload exports run in constant memory
+"""
+
+import sqlite3
+import csv
+import gzip
+import json
+import hashlib
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from itertools import chain
+from typing import Dict, List, Optional, Any, Iterator, Iterable, Tuple
+from dataclasses import dataclass, field, asdict
+from datetime import datetime
+from pathlib import Path
+
+from utilities.archive_manager import ArchiveManager, SESSION_CHILD_TABLES, TIME_SERIES_TABLES, get_archive_manager
+from utilities.identifiers import new_id
+
+
+# Output formats supported by the streaming writers
+EXPORT_FORMATS = ["ndjson", "csv"]
+
+# Replacement written for sensitive columns unless include_sensitive is set
+REDACTED_VALUE = "[REDACTED]"
+
+# Contact details inside the patient_profiles demographics JSON
+DEMOGRAPHIC_CONTACT_FIELDS = (
+    "phone_number", "email", "address", "emergency_contact_name", "emergency_contact_phone"
+)
+
+
+@dataclass(frozen=True)
+class ExportSource:
+    """One table exported by a module
+    
+    Tables without a patient_id column are reached through `parent`, a
+    (parent_table, link_column) pair whose parent rows carry the patient_id.
+    `redact_fields` pairs a JSON column with the keys redacted inside it.
+    """
+    table: str
+    parent: Optional[Tuple[str, str]] = None
+    redact_columns: Tuple[str, ...] = ()
+    redact_fields: Tuple[Tuple[str, Tuple[str, ...]], ...] = ()
+    include_archived: bool = False
+
+
+# Patient-scoped tables grouped by the module that owns them
+EXPORT_MODULES: Dict[str, List[ExportSource]] = {
+    "patient_profile": [
+        ExportSource("patient_profiles", redact_columns=("notes",),
+                     redact_fields=(("demographics", DEMOGRAPHIC_CONTACT_FIELDS),)),
+        ExportSource("assessment_results"),
+        ExportSource("session_records", redact_columns=("session_notes", "progress_notes")),
+        ExportSource("treatment_goals"),
+        ExportSource("safety_plans")
+    ],
+    "sessions": [
+        ExportSource("therapy_sessions", include_archived=True),
+        ExportSource("session_goals", parent=("therapy_sessions", "session_id"), include_archived=True),
+        ExportSource("session_notes", parent=("therapy_sessions", "session_id"),
+                     redact_columns=("content",), include_archived=True),
+        ExportSource("homework_assignments", parent=("therapy_sessions", "session_id"), include_archived=True),
+        ExportSource("session_metrics", parent=("therapy_sessions", "session_id"), include_archived=True),
+        ExportSource("archived_sessions")
+    ],
+    "progress": [
+        ExportSource("progress_data", include_archived=True),
+        ExportSource("goal_progress"),
+        ExportSource("session_progress"),
+        ExportSource("progress_alerts"),
+        ExportSource("progress_trends")
+    ],
+    "emotion": [
+        ExportSource("emotion_entries", redact_columns=("therapist_notes",), include_archived=True),
+        ExportSource("dbt_diary_cards", redact_columns=("daily_notes",)),
+        ExportSource("emotion_patterns"),
+        ExportSource("emotion_alert_state")
+    ],
+    "soothing": [
+        ExportSource("soothing_sessions"),
+        ExportSource("soothing_kits"),
+        ExportSource("soothing_plans")
+    ],
+    "grounding": [
+        ExportSource("grounding_sessions"),
+        ExportSource("grounding_plans")
+    ],
+    "boundary": [
+        ExportSource("boundary_rules"),
+        ExportSource("boundary_violations"),
+        ExportSource("boundary_practice_sessions"),
+        ExportSource("boundary_assessments")
+    ],
+    "communication": [
+        ExportSource("communication_practice_sessions"),
+        ExportSource("communication_assessments"),
+        ExportSource("conversation_scripts"),
+        ExportSource("communication_challenges")
+    ],
+    "conflict": [
+        ExportSource("conflict_situations"),
+        ExportSource("conflict_practice_sessions"),
+        ExportSource("conflict_analyses"),
+        ExportSource("conflict_resolution_plans")
+    ],
+    "standardized_tests": [
+        ExportSource("assessment_sessions"),
+        ExportSource("progress_tracking")
+    ],
+    "cognitive": [
+        ExportSource("thought_records"),
+        ExportSource("balanced_thinking_exercises"),
+        ExportSource("thought_challenges"),
+        ExportSource("distortion_identifications"),
+        ExportSource("distortion_challenges", parent=("distortion_identifications", "identification_id")),
+        ExportSource("distortion_patterns"),
+        ExportSource("thought_analyses")
+    ],
+    "behavioral": [
+        ExportSource("scheduled_activities"),
+        ExportSource("activity_plans"),
+        ExportSource("activity_tracking"),
+        ExportSource("behavioral_experiments"),
+        ExportSource("experiment_predictions", parent=("behavioral_experiments", "experiment_id")),
+        ExportSource("experiment_safety_behaviors", parent=("behavioral_experiments", "experiment_id")),
+        ExportSource("exposure_hierarchies"),
+        ExportSource("exposure_items", parent=("exposure_hierarchies", "hierarchy_id")),
+        ExportSource("exposure_sessions")
+    ],
+    "conversation": [
+        ExportSource("conversation_turns", redact_columns=("content",))
+    ]
+}
+
+
+@dataclass
+class ExportFileEntry:
+    """Manifest entry for one written file"""
+    module: str
+    table: str
+    path: str
+    rows: int
+    bytes: int
+    sha256: str
+
+
+@dataclass
+class ExportManifest:
+    """Description of a completed export, written last as manifest.json"""
+    export_id: str
+    export_date: str
+    format: str
+    compressed: bool
+    include_sensitive: bool
+    patient_ids: Optional[List[str]]
+    modules: List[str]
+    files: List[ExportFileEntry] = field(default_factory=list)
+    errors: List[str] = field(default_factory=list)
+    total_rows: int = 0
+    duration_seconds: float = 0.0
+
+
+class _RowWriter:
+    """Incremental NDJSON/CSV writer with optional gzip"""
+    
+    def __init__(self, path: Path, export_format: str, columns: List[str], compress: bool):
+        self.path = path
+        self.export_format = export_format
+        self.columns = columns
+        self.rows = 0
+        if compress:
+            self.handle = gzip.open(path, "wt", encoding="utf-8", newline="")
+        else:
+            self.handle = open(path, "w", encoding="utf-8", newline="")
+        
+        if export_format == "csv":
+            self.csv_writer = csv.writer(self.handle)
+            self.csv_writer.writerow(columns)
+    
+    def write(self, row: Dict[str, Any]):
+        if self.export_format == "csv":
+            self.csv_writer.writerow([row[column] for column in self.columns])
+        else:
+            self.handle.write(json.dumps(row, default=str) + "\n")
+        self.rows += 1
+    
+    def close(self):
+        self.handle.close()
+
+
+class StreamingExporter:
+    """Constant-memory export of patient data across every module's tables"""
+    
+    def __init__(self, db_path: str = "data/therapy_system.db",
+                 output_dir: str = "data/exports",
+                 export_format: str = "ndjson",
+                 compress: bool = True,
+                 page_size: int = 500,
+                 max_workers: int = 4,
+                 archive_manager: Optional[ArchiveManager] = None):
+        if export_format not in EXPORT_FORMATS:
+            raise ValueError(f"Unsupported export format: {export_format}")
+        
+        self.db_path = db_path
+        self.output_dir = Path(output_dir)
+        self.export_format = export_format
+        self.compress = compress
+        self.page_size = page_size
+        self.max_workers = max_workers
+        self.archive_manager = archive_manager or get_archive_manager(db_path)
+        self.logger = logging.getLogger(__name__)
+    
+    # ========================================================================
+    # EXPORT RUNS
+    # ========================================================================
+    
+    def export_patient(self, patient_id: str, modules: Optional[List[str]] = None,
+                       include_sensitive: bool = False) -> ExportManifest:
+        """Export every module's data for one patient"""
+        return self.export_caseload([patient_id], modules, include_sensitive)
+    
+    def export_caseload(self, patient_ids: Optional[Iterable[str]] = None,
+                        modules: Optional[List[str]] = None,
+                        include_sensitive: bool = False) -> ExportManifest:
+        """Export a set of patients (or the whole database when None), one module per worker"""
+        
+        started = time.perf_counter()
+        modules = modules or list(EXPORT_MODULES.keys())
+        unknown = [module for module in modules if module not in EXPORT_MODULES]
+        if unknown:
+            raise ValueError(f"Unknown export modules: {unknown}")
+        
+        patient_ids = list(dict.fromkeys(patient_ids)) if patient_ids is not None else None
+        export_id = f"EXPORT_{new_id()}"
+        export_dir = self.output_dir / export_id
+        export_dir.mkdir(parents=True, exist_ok=True)
+        
+        manifest = ExportManifest(
+            export_id=export_id,
+            export_date=datetime.now().isoformat(),
+            format=self.export_format,
+            compressed=self.compress,
+            include_sensitive=include_sensitive,
+            patient_ids=patient_ids,
+            modules=modules
+        )
+        
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = {
+                executor.submit(self._export_module, module, patient_ids, include_sensitive, export_dir): module
+                for module in modules
+            }
+            for future in as_completed(futures):
+                module = futures[future]
+                try:
+                    entries, errors = future.result()
+                    manifest.files.extend(entries)
+                    manifest.errors.extend(errors)
+                except Exception as e:
+                    self.logger.error(f"Export of module {module} failed: {e}")
+                    manifest.errors.append(f"{module}: {e}")
+        
+        manifest.files.sort(key=lambda entry: entry.path)
+        manifest.total_rows = sum(entry.rows for entry in manifest.files)
+        manifest.duration_seconds = time.perf_counter() - started
+        
+        with open(export_dir / "manifest.json", "w", encoding="utf-8") as handle:
+            json.dump(asdict(manifest), handle, indent=2)
+        
+        self.logger.info(
+            f"Export {export_id} complete: {manifest.total_rows} rows in "
+            f"{len(manifest.files)} files ({manifest.duration_seconds:.2f}s)"
+        )
+        return manifest
+    
+    def _export_module(self, module: str, patient_ids: Optional[List[str]],
+                       include_sensitive: bool, export_dir: Path) -> Tuple[List[ExportFileEntry], List[str]]:
+        """Write one file per table of a module"""
+        
+        module_dir = export_dir / module
+        module_dir.mkdir(parents=True, exist_ok=True)
+        suffix = f".{self.export_format}" + (".gz" if self.compress else "")
+        entries, errors = [], []
+        
+        with sqlite3.connect(self.db_path) as conn:
+            for source in EXPORT_MODULES[module]:
+                columns = self._table_columns(conn, source.table)
+                if not columns:
+                    continue
+                
+                path = module_dir / f"{source.table}{suffix}"
+                writer = _RowWriter(path, self.export_format, columns, self.compress)
+                try:
+                    for row in self._iter_source(conn, source, columns, patient_ids, include_sensitive):
+                        writer.write(row)
+                except Exception as e:
+                    self.logger.error(f"Error exporting {source.table}: {e}")
+                    errors.append(f"{module}.{source.table}: {e}")
+                finally:
+                    writer.close()
+                
+                entries.append(ExportFileEntry(
+                    module=module,
+                    table=source.table,
+                    path=str(path.relative_to(export_dir)),
+                    rows=writer.rows,
+                    bytes=path.stat().st_size,
+                    sha256=self._file_checksum(path)
+                ))
+        
+        return entries, errors
+    
+    # ========================================================================
+    # ROW STREAMS
+    # ========================================================================
+    
+    def iter_module_records(self, module: str, patient_ids: Optional[Iterable[str]] = None,
+                            include_sensitive: bool = False) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """Yield (table, row) pairs for a module without writing files"""
+        
+        patient_ids = list(patient_ids) if patient_ids is not None else None
+        with sqlite3.connect(self.db_path) as conn:
+            for source in EXPORT_MODULES[module]:
+                columns = self._table_columns(conn, source.table)
+                if not columns:
+                    continue
+                for row in self._iter_source(conn, source, columns, patient_ids, include_sensitive):
+                    yield source.table, row
+    
+    def _iter_source(self, conn: sqlite3.Connection, source: ExportSource, columns: List[str],
+                     patient_ids: Optional[List[str]], include_sensitive: bool) -> Iterator[Dict[str, Any]]:
+        """Hot rows followed by archived rows, redacted as requested"""
+        
+        redact = [] if include_sensitive else [c for c in source.redact_columns if c in columns]
+        redact_fields = [] if include_sensitive else [(c, keys) for c, keys in source.redact_fields if c in columns]
+        
+        rows = self._iter_hot_rows(conn, source, columns, patient_ids)
+        if source.include_archived:
+            rows = chain(rows, self._iter_archived_rows(conn, source, patient_ids))
+        
+        for values in rows:
+            row = dict(zip(columns, values))
+            for column in redact:
+                row[column] = REDACTED_VALUE
+            for column, keys in redact_fields:
+                row[column] = self._redact_json_fields(row[column], keys)
+            yield row
+    
+    def _redact_json_fields(self, value: Optional[str], keys: Tuple[str, ...]) -> Optional[str]:
+        """Redact keys inside a JSON object column; unparseable values are redacted whole"""
+        
+        if not value:
+            return value
+        try:
+            document = json.loads(value)
+        except (TypeError, ValueError):
+            return REDACTED_VALUE
+        if not isinstance(document, dict):
+            return REDACTED_VALUE
+        
+        for key in keys:
+            if document.get(key):
+                document[key] = REDACTED_VALUE
+        return json.dumps(document)
+    
+    def _iter_hot_rows(self, conn: sqlite3.Connection, source: ExportSource, columns: List[str],
+                       patient_ids: Optional[List[str]]) -> Iterator[Tuple]:
+        """Keyset-paginate a table on rowid, one page in memory at a time"""
+        
+        column_list = ", ".join(columns)
+        
+        # SQLite caps bound parameters, so large caseloads are filtered in chunks
+        patient_chunks: List[Optional[List[str]]] = [None]
+        if patient_ids is not None:
+            patient_chunks = [patient_ids[i:i + self.page_size] for i in range(0, len(patient_ids), self.page_size)]
+        
+        for chunk in patient_chunks:
+            where, params = self._patient_filter(source, chunk)
+            last_rowid = 0
+            while True:
+                page = conn.execute(f"""
+                    SELECT rowid, {column_list} FROM {source.table}
+                    WHERE rowid > ? AND {where}
+                    ORDER BY rowid LIMIT ?
+                """, (last_rowid, *params, self.page_size)).fetchall()
+                if not page:
+                    break
+                for row in page:
+                    yield row[1:]
+                last_rowid = page[-1][0]
+    
+    def _iter_archived_rows(self, conn: sqlite3.Connection, source: ExportSource,
+                            patient_ids: Optional[List[str]]) -> Iterator[Tuple]:
+        """Rows of the table that were moved to the cold tier"""
+        
+        if source.table in TIME_SERIES_TABLES:
+            archived_patients = patient_ids
+            if archived_patients is None:
+                archived_patients = [row[0] for row in conn.execute(
+                    "SELECT DISTINCT patient_id FROM archive_catalog WHERE table_name = ?", (source.table,)
+                )]
+            for patient_id in archived_patients:
+                yield from self.archive_manager.iter_archived_rows(source.table, patient_id)
+        
+        elif source.table == "therapy_sessions" or source.table in SESSION_CHILD_TABLES:
+            if patient_ids is None:
+                session_ids = [row[0] for row in conn.execute("SELECT session_id FROM archived_sessions")]
+            else:
+                session_ids = []
+                for patient_id in patient_ids:
+                    session_ids.extend(row[0] for row in conn.execute(
+                        "SELECT session_id FROM archived_sessions WHERE patient_id = ?", (patient_id,)
+                    ))
+            for session_id in session_ids:
+                tables = self.archive_manager.get_archived_session_rows(session_id) or {}
+                yield from tables.get(source.table, [])
+    
+    def _patient_filter(self, source: ExportSource, patient_ids: Optional[List[str]]) -> Tuple[str, List[str]]:
+        """WHERE fragment restricting a table to the requested patients"""
+        
+        if patient_ids is None:
+            return "1 = 1", []
+        
+        placeholders = ", ".join("?" for _ in patient_ids)
+        if source.parent:
+            parent_table, link_column = source.parent
+            return (
+                f"{link_column} IN (SELECT {link_column} FROM {parent_table} "
+                f"WHERE patient_id IN ({placeholders}))",
+                list(patient_ids)
+            )
+        return f"patient_id IN ({placeholders})", list(patient_ids)
+    
+    # ========================================================================
+    # HELPERS
+    # ========================================================================
+    
+    def _table_columns(self, conn: sqlite3.Connection, table_name: str) -> List[str]:
+        """Column names of a table, empty when the owning module never created it"""
+        return [row[1] for row in conn.execute(f"PRAGMA table_info({table_name})")]
+    
+    def _file_checksum(self, path: Path) -> str:
+        """SHA-256 of a written export file"""
+        
+        digest = hashlib.sha256()
+        with open(path, "rb") as handle:
+            for block in iter(lambda: handle.read(1024 * 1024), b""):
+                digest.update(block)
+        return digest.hexdigest()
+
+
+def verify_export(export_dir: str) -> Dict[str, Any]:
+    """Re-hash every file listed in an export manifest"""
+    
+    export_path = Path(export_dir)
+    with open(export_path / "manifest.json", encoding="utf-8") as handle:
+        manifest = json.load(handle)
+    
+    mismatched = []
+    for entry in manifest["files"]:
+        digest = hashlib.sha256()
+        file_path = export_path / entry["path"]
+        if not file_path.exists():
+            mismatched.append(entry["path"])
+            continue
+        with open(file_path, "rb") as data:
+            for block in iter(lambda: data.read(1024 * 1024), b""):
+                digest.update(block)
+        if digest.hexdigest() != entry["sha256"]:
+            mismatched.append(entry["path"])
+    
+    return {
+        'export_id': manifest["export_id"],
+        'files_checked': len(manifest["files"]),
+        'mismatched_files': mismatched,
+        'valid': not mismatched
+    }
+
+
+# Example usage and testing
+if __name__ == "__main__":
+    print("=== STREAMING EXPORT DEMONSTRATION ===\n")
+    
+    exporter = StreamingExporter(export_format="ndjson", compress=True)
+    
+    print("Exporting caseload...")
+    manifest = exporter.export_caseload()
+    print(f"Export ID: {manifest.export_id}")
+    print(f"Files written: {len(manifest.files)}")
+    print(f"Total rows: {manifest.total_rows}")
+    print(f"Duration: {manifest.duration_seconds:.2f}s")
+    for entry in manifest.files:
+        if entry.rows:
+            print(f"  {entry.path}: {entry.rows} rows")
+    
+    print("\nVerifying manifest checksums...")
+    verification = verify_export(str(exporter.output_dir / manifest.export_id))
+    print(f"Valid: {verification['valid']} ({verification['files_checked']} files checked)")
+    
+    print("\n" + "="*60)
+    print("Streaming export demonstration complete!")
@@ -0,0 +1,367 @@
+"""
+Instrumentation Module
+Latency and token metrics for the AI therapy system
+Components report observations to a pluggable sink; the in-memory registry keeps
+histograms and exports Prometheus text, the JSON-lines sink keeps raw records
+"""
+
+import json
+import logging
+import threading
+from typing import Dict, List, Optional, Any, Tuple, Iterable
+from dataclasses import dataclass, field, asdict
+from datetime import datetime
+from pathlib import Path
+
+
+# Latency buckets in milliseconds, token buckets in whitespace tokens
+LATENCY_BUCKETS_MS = (1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000)
+TOKEN_BUCKETS = (16, 32, 64, 128, 256, 512, 1024, 2048, 4096, 8192, 16384)
+
+LabelSet = Tuple[Tuple[str, str], ...]
+
+
+def _label_key(labels: Optional[Dict[str, Any]]) -> LabelSet:
+    return tuple(sorted((name, str(value)) for name, value in (labels or {}).items()))
+
+
+def _escape_label_value(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(labels: LabelSet, extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(labels) + ([extra] if extra else [])
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape_label_value(value)}"' for name, value in pairs) + "}"
+
+
+def _format_bound(bound: float) -> str:
+    return f"{bound:g}"
+
+
+@dataclass
+class TurnMetrics:
+    """Everything recorded about one conversation turn"""
+    mode: str
+    modality: str
+    response_type: str
+    stage_timings_ms: Dict[str, float] = field(default_factory=dict)
+    tokens_by_section: Dict[str, int] = field(default_factory=dict)
+    tokens_used: int = 0
+    from_cache: bool = False
+    streamed: bool = False
+    time_to_first_token_ms: Optional[float] = None
+    safety_flags: List[str] = field(default_factory=list)
+    timestamp: datetime = field(default_factory=datetime.now)
+
+
+class Histogram:
+    """Cumulative-bucket histogram in the Prometheus style"""
+    
+    __slots__ = ('buckets', 'counts', 'count', 'total')
+    
+    def __init__(self, buckets: Iterable[float]):
+        self.buckets = tuple(sorted(buckets))
+        self.counts = [0] * len(self.buckets)
+        self.count = 0
+        self.total = 0.0
+    
+    def observe(self, value: float):
+        self.count += 1
+        self.total += value
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[index] += 1
+                break
+    
+    def cumulative_counts(self) -> List[int]:
+        cumulative = []
+        running = 0
+        for count in self.counts:
+            running += count
+            cumulative.append(running)
+        return cumulative
+    
+    def quantile(self, q: float) -> Optional[float]:
+        """Upper bound of the bucket containing the q-th observation"""
+        
+        if not self.count:
+            return None
+        target = q * self.count
+        for bound, cumulative in zip(self.buckets, self.cumulative_counts()):
+            if cumulative >= target:
+                return bound
+        return float('inf')
+    
+    def summary(self) -> Dict[str, Any]:
+        return {
+            'count': self.count,
+            'mean': self.total / self.count if self.count else 0.0,
+            'p50': self.quantile(0.50),
+            'p95': self.quantile(0.95),
+            'p99': self.quantile(0.99)
+        }
+
+
+class MetricsSink:
+    """Destination for instrumentation; subclasses override what they need"""
+    
+    def increment(self, name: str, value: float = 1.0, labels: Optional[Dict[str, Any]] = None):
+        return None
+    
+    def observe(self, name: str, value: float, labels: Optional[Dict[str, Any]] = None,
+                buckets: Iterable[float] = LATENCY_BUCKETS_MS):
+        return None
+    
+    def record_turn(self, turn: TurnMetrics):
+        """Default fan-out of a turn into counters and histograms"""
+        
+        labels = {'mode': turn.mode, 'modality': turn.modality}
+        self.increment('therapy_turns_total', labels=dict(labels, response_type=turn.response_type))
+        if turn.from_cache:
+            self.increment('therapy_turn_cache_hits_total', labels=labels)
+        for flag in turn.safety_flags:
+            self.increment('therapy_turn_safety_flags_total', labels=dict(labels, flag=flag))
+        
+        for stage, duration_ms in turn.stage_timings_ms.items():
+            self.observe('therapy_turn_stage_duration_ms', duration_ms, labels=dict(labels, stage=stage))
+        for section, tokens in turn.tokens_by_section.items():
+            self.observe('therapy_turn_tokens', tokens, labels=dict(labels, section=section),
+                         buckets=TOKEN_BUCKETS)
+        if turn.time_to_first_token_ms is not None:
+            self.observe('therapy_stream_ttft_ms', turn.time_to_first_token_ms, labels=labels)
+    
+    def flush(self):
+        return None
+    
+    def close(self):
+        self.flush()
+
+
+class InMemoryMetricsRegistry(MetricsSink):
+    """Thread-safe counters and histograms with a Prometheus text exporter"""
+    
+    HELP = {
+        'therapy_turns_total': 'Conversation turns completed',
+        'therapy_turn_cache_hits_total': 'Turns served from the response cache',
+        'therapy_turn_safety_flags_total': 'Safety flags raised on responses',
+        'therapy_turn_stage_duration_ms': 'Per-stage turn latency in milliseconds',
+        'therapy_turn_tokens': 'Tokens per prompt or completion section',
+        'therapy_stream_ttft_ms': 'Streaming time to first token in milliseconds'
+    }
+    
+    def __init__(self):
+        self._counters: Dict[str, Dict[LabelSet, float]] = {}
+        self._histograms: Dict[str, Dict[LabelSet, Histogram]] = {}
+        self._lock = threading.Lock()
+    
+    def increment(self, name: str, value: float = 1.0, labels: Optional[Dict[str, Any]] = None):
+        key = _label_key(labels)
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0.0) + value
+    
+    def observe(self, name: str, value: float, labels: Optional[Dict[str, Any]] = None,
+                buckets: Iterable[float] = LATENCY_BUCKETS_MS):
+        key = _label_key(labels)
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            histogram = series.get(key)
+            if histogram is None:
+                histogram = series[key] = Histogram(buckets)
+            histogram.observe(value)
+    
+    def get_counter(self, name: str, labels: Optional[Dict[str, Any]] = None) -> float:
+        with self._lock:
+            return self._counters.get(name, {}).get(_label_key(labels), 0.0)
+    
+    def get_histogram_summary(self, name: str, **label_filter: Any) -> Dict[str, Any]:
+        """Merge every series of a histogram whose labels match the filter"""
+        
+        wanted = {(label, str(value)) for label, value in label_filter.items()}
+        merged: Optional[Histogram] = None
+        with self._lock:
+            for labels, histogram in self._histograms.get(name, {}).items():
+                if not wanted.issubset(labels):
+                    continue
+                if merged is None:
+                    merged = Histogram(histogram.buckets)
+                merged.count += histogram.count
+                merged.total += histogram.total
+                merged.counts = [a + b for a, b in zip(merged.counts, histogram.counts)]
+        return merged.summary() if merged else {'count': 0}
+    
+    def snapshot(self) -> Dict[str, Any]:
+        """Plain-dict view of every series"""
+        
+        with self._lock:
+            return {
+                'counters': {
+                    name: {_format_labels(labels) or '{}': value for labels, value in series.items()}
+                    for name, series in self._counters.items()
+                },
+                'histograms': {
+                    name: {_format_labels(labels) or '{}': histogram.summary() for labels, histogram in series.items()}
+                    for name, series in self._histograms.items()
+                }
+            }
+    
+    def export_prometheus(self) -> str:
+        """Prometheus text exposition format (version 0.0.4)"""
+        
+        lines: List[str] = []
+        with self._lock:
+            for name in sorted(self._counters):
+                lines.append(f"# HELP {name} {self.HELP.get(name, name)}")
+                lines.append(f"# TYPE {name} counter")
+                for labels, value in sorted(self._counters[name].items()):
+                    lines.append(f"{name}{_format_labels(labels)} {value:g}")
+            
+            for name in sorted(self._histograms):
+                lines.append(f"# HELP {name} {self.HELP.get(name, name)}")
+                lines.append(f"# TYPE {name} histogram")
+                for labels, histogram in sorted(self._histograms[name].items()):
+                    for bound, cumulative in zip(histogram.buckets, histogram.cumulative_counts()):
+                        lines.append(f"{name}_bucket{_format_labels(labels, ('le', _format_bound(bound)))} {cumulative}")
+                    lines.append(f"{name}_bucket{_format_labels(labels, ('le', '+Inf'))} {histogram.count}")
+                    lines.append(f"{name}_sum{_format_labels(labels)} {histogram.total:g}")
+                    lines.append(f"{name}_count{_format_labels(labels)} {histogram.count}")
+        
+        return "\n".join(lines) + "\n"
+    
+    def write_prometheus_file(self, path: str):
+        """Write the exposition atomically, for node-exporter's textfile collector"""
+        
+        target = Path(path)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = target.with_suffix(target.suffix + ".tmp")
+        temp_path.write_text(self.export_prometheus(), encoding='utf-8')
+        temp_path.replace(target)
+    
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+
+class JsonLinesMetricsSink(MetricsSink):
+    """Appends one JSON record per turn to a file
+    
+    Records are buffered and written every `flush_every` turns, and on close.
+    """
+    
+    def __init__(self, path: str = "data/metrics/turns.jsonl", flush_every: int = 50):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.flush_every = flush_every
+        self._buffer: List[str] = []
+        self._lock = threading.Lock()
+        self.logger = logging.getLogger(__name__)
+    
+    def record_turn(self, turn: TurnMetrics):
+        record = asdict(turn)
+        record['timestamp'] = turn.timestamp.isoformat()
+        with self._lock:
+            self._buffer.append(json.dumps(record))
+            should_flush = len(self._buffer) >= self.flush_every
+        if should_flush:
+            self.flush()
+    
+    def flush(self):
+        with self._lock:
+            lines, self._buffer = self._buffer, []
+        if not lines:
+            return
+        try:
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write("\n".join(lines) + "\n")
+        except Exception as e:
+            self.logger.error(f"Error writing metrics records: {e}")
+
+
+class CompositeMetricsSink(MetricsSink):
+    """Forwards every observation to several sinks"""
+    
+    def __init__(self, sinks: List[MetricsSink]):
+        self.sinks = sinks
+    
+    def increment(self, name: str, value: float = 1.0, labels: Optional[Dict[str, Any]] = None):
+        for sink in self.sinks:
+            sink.increment(name, value, labels)
+    
+    def observe(self, name: str, value: float, labels: Optional[Dict[str, Any]] = None,
+                buckets: Iterable[float] = LATENCY_BUCKETS_MS):
+        for sink in self.sinks:
+            sink.observe(name, value, labels, buckets)
+    
+    def record_turn(self, turn: TurnMetrics):
+        for sink in self.sinks:
+            sink.record_turn(turn)
+    
+    def flush(self):
+        for sink in self.sinks:
+            sink.flush()
+
+
+def create_metrics_sink(config: Dict[str, Any]) -> MetricsSink:
+    """Build the sink named by config["metrics_sink"]
+    
+    - "memory" (default): InMemoryMetricsRegistry
+    - "jsonl": JsonLinesMetricsSink at config["metrics_path"]
+    - "memory+jsonl": both
+    - "none": discard everything
+    A MetricsSink instance may also be passed directly.
+    """
+    
+    sink = config.get("metrics_sink", "memory")
+    if isinstance(sink, MetricsSink):
+        return sink
+    
+    metrics_path = config.get("metrics_path", "data/metrics/turns.jsonl")
+    if sink == "memory":
+        return InMemoryMetricsRegistry()
+    if sink == "jsonl":
+        return JsonLinesMetricsSink(metrics_path)
+    if sink == "memory+jsonl":
+        return CompositeMetricsSink([InMemoryMetricsRegistry(), JsonLinesMetricsSink(metrics_path)])
+    if sink == "none":
+        return MetricsSink()
+    
+    raise ValueError(f"Unknown metrics sink: {sink}")
+
+
+# Example usage and testing
+if __name__ == "__main__":
+    import random
+    
+    print("=== INSTRUMENTATION DEMONSTRATION ===\n")
+    
+    registry = InMemoryMetricsRegistry()
+    rng = random.Random(3)
+    
+    for _ in range(200):
+        mode = rng.choice(["therapy_session", "skill_building"])
+        registry.record_turn(TurnMetrics(
+            mode=mode,
+            modality="CBT",
+            response_type="therapeutic",
+            stage_timings_ms={
+                'prescreen': rng.uniform(0.1, 2),
+                'prompt_build': rng.uniform(0.2, 3),
+                'model_call': rng.lognormvariate(6, 0.4),
+                'total': rng.lognormvariate(6.1, 0.4)
+            },
+            tokens_by_section={'system': 220, 'history': rng.randint(0, 900), 'completion': rng.randint(80, 400)}
+        ))
+    
+    print("Model call latency (therapy_session):")
+    print(registry.get_histogram_summary('therapy_turn_stage_duration_ms', stage='model_call', mode='therapy_session'))
+    print()
+    
+    exposition = registry.export_prometheus()
+    print(f"Prometheus exposition: {len(exposition.splitlines())} lines, e.g.")
+    for line in exposition.splitlines()[:6]:
+        print(f"  {line}")
+    
+    print("\n" + "="*60)
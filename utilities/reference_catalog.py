@@ -0,0 +1,198 @@
+"""
+Reference Catalog Module
+Process-wide, read-only catalog of the static libraries the intervention modules ship with
+Each library (techniques, activities, skills, protocols, practices) is built once, on first use,
+and shared by every manager instance and thread in the process
+"""
+
+import threading
+from collections.abc import Mapping
+from types import MappingProxyType
+from typing import Any, Callable, Dict, Hashable, Iterator, List, Mapping as MappingType, Optional, Tuple, Union
+
+
+# How a library entry's key is found: an attribute name or a function of the entry
+KeySpec = Union[str, Callable[[Any], Hashable]]
+
+# Secondary index name -> attribute name or function giving the value(s) to index an entry under;
+# list, tuple, set and frozenset values index the entry under each of their elements
+IndexSpec = MappingType[str, KeySpec]
+
+_MULTI_VALUE_TYPES = (list, tuple, set, frozenset)
+
+
+def _accessor(spec: KeySpec) -> Callable[[Any], Any]:
+    if callable(spec):
+        return spec
+    return lambda entry: getattr(entry, spec)
+
+
+class ReferenceLibrary(Mapping):
+    """One library: entries by key in definition order, plus secondary indexes
+    
+    Behaves as a read-only mapping of key to entry, so it can stand in for the
+    dicts the modules used to build per instance. where() returns the entries
+    an index files under a value, in definition order. The library itself
+    cannot be modified; its entries are shared by every caller and must be
+    treated as read-only too.
+    """
+    
+    __slots__ = ("name", "_entries", "_indexes")
+    
+    def __init__(self, name: str, entries: Dict[Hashable, Any], indexes: Optional[IndexSpec] = None):
+        object.__setattr__(self, "name", name)
+        object.__setattr__(self, "_entries", MappingProxyType(dict(entries)))
+        
+        built: Dict[str, Dict[Hashable, Tuple[Any, ...]]] = {}
+        for index_name, spec in (indexes or {}).items():
+            accessor = _accessor(spec)
+            buckets: Dict[Hashable, List[Any]] = {}
+            for entry in self._entries.values():
+                value = accessor(entry)
+                values = value if isinstance(value, _MULTI_VALUE_TYPES) else (value,)
+                for item in dict.fromkeys(values):
+                    buckets.setdefault(item, []).append(entry)
+            built[index_name] = MappingProxyType({value: tuple(group) for value, group in buckets.items()})
+        object.__setattr__(self, "_indexes", MappingProxyType(built))
+    
+    def __setattr__(self, name: str, value: Any):
+        raise AttributeError(f"Reference library {self.name!r} is read-only")
+    
+    def __delattr__(self, name: str):
+        raise AttributeError(f"Reference library {self.name!r} is read-only")
+    
+    def __getitem__(self, key: Hashable) -> Any:
+        return self._entries[key]
+    
+    def __iter__(self) -> Iterator[Hashable]:
+        return iter(self._entries)
+    
+    def __len__(self) -> int:
+        return len(self._entries)
+    
+    def __repr__(self) -> str:
+        return f"ReferenceLibrary({self.name!r}, {len(self)} entries, indexes={list(self._indexes)})"
+    
+    def where(self, index_name: str, value: Hashable) -> Tuple[Any, ...]:
+        """Entries filed under value in the named index"""
+        return self._indexes[index_name].get(value, ())
+    
+    def first(self, index_name: str, value: Hashable) -> Optional[Any]:
+        entries = self.where(index_name, value)
+        return entries[0] if entries else None
+    
+    def index_values(self, index_name: str) -> Tuple[Hashable, ...]:
+        """Values the named index has entries for"""
+        return tuple(self._indexes[index_name])
+
+
+class ReferenceCatalog:
+    """Lazily built, process-wide reference libraries, looked up by name
+    
+    The first request for a name runs its builder; later requests from any
+    instance or thread get the same library. The builder may return a
+    mapping of key to entry or a sequence of entries with a key spec.
+    """
+    
+    def __init__(self):
+        self._libraries: Dict[str, ReferenceLibrary] = {}
+        self._lock = threading.Lock()
+    
+    def get(
+        self,
+        name: str,
+        builder: Callable[[], Union[MappingType[Hashable, Any], List[Any]]],
+        key: Optional[KeySpec] = None,
+        indexes: Optional[IndexSpec] = None
+    ) -> ReferenceLibrary:
+        library = self._libraries.get(name)
+        if library is not None:
+            return library
+        
+        with self._lock:
+            library = self._libraries.get(name)
+            if library is None:
+                library = self._build(name, builder, key, indexes)
+                self._libraries[name] = library
+        return library
+    
+    def _build(self, name: str, builder, key: Optional[KeySpec], indexes: Optional[IndexSpec]) -> ReferenceLibrary:
+        entries = builder()
+        if not isinstance(entries, MappingType):
+            if key is None:
+                raise ValueError(f"Reference library {name!r} needs a key for its entries")
+            key_of = _accessor(key)
+            entries = {key_of(entry): entry for entry in entries}
+        return ReferenceLibrary(name, entries, indexes)
+    
+    def loaded(self) -> Tuple[str, ...]:
+        """Names of the libraries built so far"""
+        return tuple(self._libraries)
+    
+    def clear(self, name: Optional[str] = None):
+        """Drop one library, or all, so the next request rebuilds it"""
+        with self._lock:
+            if name is None:
+                self._libraries.clear()
+            else:
+                self._libraries.pop(name, None)
+
+
+_catalog = ReferenceCatalog()
+
+
+def get_reference_library(
+    name: str,
+    builder: Callable[[], Union[MappingType[Hashable, Any], List[Any]]],
+    key: Optional[KeySpec] = None,
+    indexes: Optional[IndexSpec] = None
+) -> ReferenceLibrary:
+    """The process-wide library registered under name, built by builder on first use"""
+    return _catalog.get(name, builder, key, indexes)
+
+
+def get_reference_catalog() -> ReferenceCatalog:
+    return _catalog
+
+
+# Example usage and testing
+if __name__ == "__main__":
+    import time
+    from concurrent.futures import ThreadPoolExecutor
+    
+    print("=== REFERENCE CATALOG DEMONSTRATION ===\n")
+    
+    builds = []
+    
+    def build_demo_library():
+        builds.append(1)
+        time.sleep(0.05)
+        return [
+            {"id": "box_breathing", "category": "breathing", "settings": ["anywhere", "work"]},
+            {"id": "cold_water", "category": "physical", "settings": ["home"]},
+            {"id": "paced_breathing", "category": "breathing", "settings": ["anywhere"]}
+        ]
+    
+    def lookup(_):
+        return get_reference_library(
+            "demo_techniques", build_demo_library,
+            key=lambda entry: entry["id"],
+            indexes={"category": lambda entry: entry["category"], "setting": lambda entry: entry["settings"]}
+        )
+    
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        libraries = list(executor.map(lookup, range(32)))
+    
+    library = libraries[0]
+    print(f"32 lookups from 8 threads: {len(builds)} build, one shared instance: "
+          f"{all(other is library for other in libraries)}")
+    print(library)
+    print(f"Breathing: {[entry['id'] for entry in library.where('category', 'breathing')]}")
+    print(f"Usable anywhere: {[entry['id'] for entry in library.where('setting', 'anywhere')]}")
+    
+    try:
+        library.name = "changed"
+    except AttributeError as error:
+        print(f"Modification refused: {error}")
+    
+    print("\n" + "="*60)
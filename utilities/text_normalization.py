@@ -0,0 +1,245 @@
+"""
+Text Normalization Module
+Shared lowercasing, tokenization and word/phrase matching for message analysis
+Each text is normalized once and its token stream cached for every module that reads it
+"""
+
+import re
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple, Any, Hashable, Iterable, Mapping, Sequence, Set, Union
+
+
+# Words (keeping in-word apostrophes and hyphens) and the punctuation that closes a clause
+_TOKEN_PATTERN = re.compile(r"[^\W_]+(?:['\-][^\W_]+)*|[.,;:!?]")
+_CLAUSE_BREAKS = frozenset(".,;:!?")
+_APOSTROPHES = str.maketrans({"’": "'", "‘": "'", "ʼ": "'"})
+
+# "can't" and "cannot" are left out: they usually express inability ("I can't
+# stop feeling worthless") rather than deny what follows
+NEGATION_TOKENS = frozenset({
+    "not", "no", "never", "none", "nor", "neither", "without", "hardly", "barely",
+    "don't", "doesn't", "didn't", "isn't", "wasn't", "aren't", "weren't", "won't",
+    "wouldn't", "shouldn't", "haven't", "hasn't", "hadn't", "ain't",
+    "dont", "doesnt", "didnt", "isnt", "wasnt", "arent", "wont"
+})
+
+# Tokens before a term, within the same clause, that are checked for a negation
+DEFAULT_NEGATION_WINDOW = 3
+
+# Marks a term whose last word also matches longer forms ("weapon*" matches "weapons")
+PREFIX_MARKER = "*"
+
+
+class NormalizedText:
+    """A text lowercased and tokenized once; shared by every matcher that reads it"""
+    
+    __slots__ = ("text", "lower", "tokens", "clause_starts")
+    
+    def __init__(self, text: str):
+        self.text = text
+        self.lower = text.lower().translate(_APOSTROPHES)
+        
+        tokens = []
+        clause_starts = []
+        clause_start = 0
+        for token in _TOKEN_PATTERN.findall(self.lower):
+            if token in _CLAUSE_BREAKS:
+                clause_start = len(tokens)
+                continue
+            tokens.append(token)
+            clause_starts.append(clause_start)
+        
+        self.tokens: Tuple[str, ...] = tuple(tokens)
+        self.clause_starts: Tuple[int, ...] = tuple(clause_starts)
+    
+    def is_negated(self, index: int, window: int = DEFAULT_NEGATION_WINDOW) -> bool:
+        """Whether a negation precedes the token at index within window tokens of its clause"""
+        
+        start = max(self.clause_starts[index], index - window)
+        for token in self.tokens[start:index]:
+            if token in NEGATION_TOKENS:
+                return True
+        return False
+
+
+@lru_cache(maxsize=4096)
+def normalize_text(text: str) -> NormalizedText:
+    """Normalized form of text, cached so repeated analysis of one message tokenizes it once"""
+    return NormalizedText(text)
+
+
+def tokenize(text: str) -> Tuple[str, ...]:
+    return normalize_text(text).tokens
+
+
+class TermMatches:
+    """Terms found in one text, split into asserted and negated-only, with per-group counts"""
+    
+    __slots__ = ("terms", "negated", "counts", "_matcher")
+    
+    def __init__(self, terms: Set[str], negated: Set[str], counts: Dict[Hashable, int], matcher: 'TermMatcher'):
+        self.terms = terms
+        self.negated = negated
+        self.counts = counts
+        self._matcher = matcher
+    
+    def count(self, group: Hashable) -> int:
+        """Number of entries in the group's term list found in the text"""
+        return self.counts.get(group, 0)
+    
+    def matched(self, group: Hashable) -> List[str]:
+        """The group's matching terms, in the group's own order"""
+        if group not in self.counts:
+            return []
+        negated_counts = not self._matcher.is_negatable(group)
+        return [
+            term for term in self._matcher.groups[group]
+            if term in self.terms or (negated_counts and term in self.negated)
+        ]
+    
+    def __bool__(self) -> bool:
+        return bool(self.counts)
+
+
+class TermMatcher:
+    """Word and phrase matching over normalized token streams
+    
+    Terms are grouped under caller-chosen keys (a term may sit in several
+    groups, or twice in one) and match on whole words: "all" does not match
+    "really", and a phrase matches only as consecutive words. Keywords are
+    lowercased and tokenized once, at construction. A trailing "*" lets the
+    last word also match longer forms.
+    
+    With a negation window, an occurrence preceded by a negation within that
+    many tokens of the same clause ("not hopeless") is negated. Negated-only
+    terms are not counted for negatable groups; groups listed outside
+    negatable_groups (for example suicide or self-harm vocabularies, where a
+    denial still warrants follow-up) count them regardless.
+    """
+    
+    def __init__(
+        self,
+        groups: Mapping[Hashable, Sequence[str]],
+        negation_window: int = DEFAULT_NEGATION_WINDOW,
+        negatable_groups: Optional[Iterable[Hashable]] = None
+    ):
+        self.groups = {key: list(terms) for key, terms in groups.items()}
+        self.negation_window = negation_window
+        self.negatable_groups = None if negatable_groups is None else frozenset(negatable_groups)
+        
+        term_groups: Dict[str, List[Hashable]] = {}
+        for key, terms in self.groups.items():
+            for term in terms:
+                term_groups.setdefault(term, []).append(key)
+        self._term_groups = {term: tuple(keys) for term, keys in term_groups.items()}
+        self.vocabulary: Tuple[str, ...] = tuple(self._term_groups)
+        
+        # First word -> (term words, last word is a prefix, term); prefix-only single
+        # words are looked up by the lengths they can have
+        self._index: Dict[str, List[Tuple[Tuple[str, ...], bool, str]]] = {}
+        prefix_lengths = set()
+        for term in self.vocabulary:
+            prefix = term.endswith(PREFIX_MARKER)
+            words = NormalizedText(term.rstrip(PREFIX_MARKER)).tokens
+            if not words:
+                continue
+            self._index.setdefault(words[0], []).append((words, prefix, term))
+            if prefix and len(words) == 1:
+                prefix_lengths.add(len(words[0]))
+        self._prefix_lengths = tuple(sorted(prefix_lengths))
+    
+    def is_negatable(self, group: Hashable) -> bool:
+        return self.negation_window > 0 and (self.negatable_groups is None or group in self.negatable_groups)
+    
+    def scan(self, text: Union[str, NormalizedText]) -> TermMatches:
+        """Terms present in text, and the number of each group's entries they account for"""
+        
+        normalized = text if isinstance(text, NormalizedText) else normalize_text(text)
+        tokens = normalized.tokens
+        token_count = len(tokens)
+        index = self._index
+        window = self.negation_window
+        
+        asserted: Set[str] = set()
+        negated: Set[str] = set()
+        for position, token in enumerate(tokens):
+            candidates = index.get(token, ())
+            for length in self._prefix_lengths:
+                if length < len(token):
+                    candidates = list(candidates) + index.get(token[:length], [])
+            
+            for words, prefix, term in candidates:
+                if term in asserted:
+                    continue
+                end = position + len(words)
+                if end > token_count:
+                    continue
+                if tokens[position:end - 1] != words[:-1]:
+                    continue
+                last = tokens[end - 1]
+                if not (last.startswith(words[-1]) if prefix else last == words[-1]):
+                    continue
+                
+                if window and normalized.is_negated(position, window):
+                    negated.add(term)
+                else:
+                    asserted.add(term)
+        
+        negated -= asserted
+        return self._count(asserted, negated)
+    
+    def find_terms(self, text: Union[str, NormalizedText]) -> Set[str]:
+        """Terms asserted (not negated) in text"""
+        return self.scan(text).terms
+    
+    def matches(self, hits: TermMatches) -> TermMatches:
+        """This matcher's view of hits from a combined matcher covering its vocabulary"""
+        return self._count(hits.terms, hits.negated)
+    
+    def _count(self, asserted: Set[str], negated: Set[str]) -> TermMatches:
+        counts: Dict[Hashable, int] = {}
+        term_groups = self._term_groups
+        for term in asserted:
+            for key in term_groups.get(term, ()):
+                counts[key] = counts.get(key, 0) + 1
+        for term in negated:
+            for key in term_groups.get(term, ()):
+                if not self.is_negatable(key):
+                    counts[key] = counts.get(key, 0) + 1
+        return TermMatches(asserted, negated, counts, self)
+
+
+_matcher_cache: Dict[Hashable, TermMatcher] = {}
+
+
+def get_term_matcher(
+    groups: Mapping[Hashable, Sequence[str]],
+    negation_window: int = DEFAULT_NEGATION_WINDOW,
+    negatable_groups: Optional[Iterable[Hashable]] = None
+) -> TermMatcher:
+    """Process-wide matcher for a vocabulary, compiled on first use"""
+    
+    negatable = None if negatable_groups is None else tuple(negatable_groups)
+    fingerprint = (tuple((key, tuple(terms)) for key, terms in groups.items()), negation_window, negatable)
+    matcher = _matcher_cache.get(fingerprint)
+    if matcher is None:
+        matcher = TermMatcher(groups, negation_window, negatable)
+        _matcher_cache[fingerprint] = matcher
+    return matcher
+
+
+def get_combined_matcher(*matchers: TermMatcher) -> TermMatcher:
+    """One matcher over several vocabularies, so a text is scanned once for all of them
+    
+    The hits can be handed to each source matcher's matches(), which applies
+    its own grouping and negation rules. The sources must share a negation
+    window.
+    """
+    
+    windows = {matcher.negation_window for matcher in matchers}
+    if len(windows) > 1:
+        raise ValueError("Combined matchers must share a negation window")
+    return get_term_matcher(
+        {index: matcher.vocabulary for index, matcher in enumerate(matchers)},
+        negation_window=windows.pop() if windows else DEFAULT_NEGATION_WINDOW
+    )